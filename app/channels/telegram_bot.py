@@ -3,6 +3,7 @@ import asyncio
 import json
 import logging
 import os
+import time
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from urllib.parse import urljoin
@@ -32,6 +33,7 @@ class TelegramBotHandler:
         
         # Bot configuration
         self.max_message_length = 4096  # Telegram's limit
+        self.stream_edit_interval = 1.0  # Seconds between edits of a streamed reply
         self.supported_file_types = {
             'photo', 'document', 'audio', 'video', 'voice', 'video_note', 'sticker'
         }
@@ -232,12 +234,11 @@ class TelegramBotHandler:
             # Show typing indicator
             await update.effective_chat.send_action(action="typing")
             
-            # Process message through AI orchestrator
+            # Stream the AI reply into the chat as it is generated
             agent_context = await self._create_agent_context(update)
-            response = await self.orchestrator.process_message(message_text, agent_context)
-            
-            # Send AI response
-            await self._send_ai_response(update, response)
+            await self._send_ai_response_stream(
+                update, self.orchestrator.process_message_stream(message_text, agent_context)
+            )
             
         except Exception as e:
             self.logger.error(f"Error handling text message: {str(e)}")
@@ -489,10 +490,7 @@ class TelegramBotHandler:
             
             for message in messages:
                 # Add inline keyboard if handoff is required
-                reply_markup = None
-                if response.requires_handoff:
-                    keyboard = [[InlineKeyboardButton("👤 Connect to Human", callback_data="human_handoff")]]
-                    reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = self._handoff_markup(response)
                 
                 sent_message = await update.effective_chat.send_message(
                     text=message,
@@ -507,6 +505,86 @@ class TelegramBotHandler:
             self.logger.error(f"Error sending AI response: {str(e)}")
             await self._send_error_message(update, "Sorry, I encountered an error sending my response.")
     
+    async def _send_ai_response_stream(self, update: Update, events):
+        """
+        Send a streamed AI response to Telegram.
+        
+        The first text is sent as soon as it arrives and the message is
+        edited at most once per stream_edit_interval while the reply grows.
+        When the stream ends the message is replaced with the final,
+        validated response.
+        """
+        sent_message = None
+        text = ""
+        last_edit = 0.0
+        response = None
+        
+        try:
+            async for event in events:
+                if event.done:
+                    response = event.response
+                    break
+                
+                text += event.delta
+                preview = text[:self.max_message_length]
+                if not preview.strip():
+                    continue
+                
+                now = time.monotonic()
+                if sent_message is None:
+                    # Plain text until the reply is complete; partial HTML may not parse
+                    sent_message = await update.effective_chat.send_message(text=preview)
+                    last_edit = now
+                elif now - last_edit >= self.stream_edit_interval:
+                    await self._edit_message(sent_message, preview)
+                    last_edit = now
+        except Exception as e:
+            self.logger.error(f"Error streaming AI response: {str(e)}")
+        
+        if sent_message is None:
+            await self._send_ai_response(update, response)
+            return
+        
+        if not response or not response.content:
+            await self._edit_message(sent_message, text[:self.max_message_length] or "...")
+            await self._send_error_message(update, "Sorry, I encountered an error sending my response.")
+            return
+        
+        try:
+            messages = self._split_long_message(response.content)
+            reply_markup = self._handoff_markup(response)
+            
+            await self._edit_message(sent_message, messages[0], reply_markup=reply_markup,
+                                     parse_mode=ParseMode.HTML)
+            await self._store_message(update, "ai_response", messages[0], direction="outbound")
+            
+            for message in messages[1:]:
+                await update.effective_chat.send_message(
+                    text=message,
+                    parse_mode=ParseMode.HTML,
+                    reply_markup=reply_markup
+                )
+                await self._store_message(update, "ai_response", message, direction="outbound")
+            
+        except Exception as e:
+            self.logger.error(f"Error sending AI response: {str(e)}")
+            await self._send_error_message(update, "Sorry, I encountered an error sending my response.")
+    
+    async def _edit_message(self, message, text: str, **kwargs):
+        """Edit a sent message, ignoring edits that change nothing."""
+        try:
+            await message.edit_text(text=text, **kwargs)
+        except telegram.error.BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                raise
+    
+    def _handoff_markup(self, response) -> Optional[InlineKeyboardMarkup]:
+        """Inline keyboard offering a human agent when handoff is required."""
+        if not response.requires_handoff:
+            return None
+        keyboard = [[InlineKeyboardButton("👤 Connect to Human", callback_data="human_handoff")]]
+        return InlineKeyboardMarkup(keyboard)
+    
     async def _send_error_message(self, update: Update, error_text: str):
         """Send error message to user."""
         try:
@@ -1,5 +1,7 @@
 """Web widget API endpoints."""
-from flask import request, g, jsonify
+import asyncio
+import json
+from flask import request, g, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_current_user
 from flask_babel import gettext as _
 from sqlalchemy.orm import joinedload
@@ -21,6 +23,44 @@ from datetime import datetime
 
 logger = structlog.get_logger()
 
+# Shared by widget requests so conversation context carries across messages
+_orchestrator = None
+
+
+def _get_orchestrator():
+    """Get the agent orchestrator used for widget replies."""
+    global _orchestrator
+    if _orchestrator is None:
+        from app.secretary.agents.orchestrator import AgentOrchestrator
+        _orchestrator = AgentOrchestrator()
+    return _orchestrator
+
+
+def _iterate_async(async_iterable):
+    """Iterate an async generator from synchronous code on a private event loop."""
+    from app.services.openai_client import async_openai_clients
+    
+    loop = asyncio.new_event_loop()
+    iterator = async_iterable.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        try:
+            loop.run_until_complete(iterator.aclose())
+            # Clients are bound to this loop; release their connections
+            loop.run_until_complete(async_openai_clients.close())
+        finally:
+            loop.close()
+
+
+def _sse_event(event, data):
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 
 @channels_bp.route('/widget/init', methods=['POST'])
 @jwt_required()
@@ -342,6 +382,107 @@ def send_widget_message(thread_id):
         )
 
 
+@channels_bp.route('/widget/thread/<int:thread_id>/messages/<int:message_id>/reply/stream', methods=['GET'])
+@jwt_required()
+@require_tenant()
+@log_api_call('widget_stream_reply')
+def stream_widget_reply(thread_id, message_id):
+    """
+    Stream the AI reply to a customer message as server-sent events.
+    
+    Emits ``delta`` events while the reply is generated and a final
+    ``done`` event with the stored message, whose content replaces the
+    streamed text. Deltas are also broadcast to the thread's WebSocket room.
+    """
+    try:
+        # Verify thread exists and belongs to tenant
+        thread = TenantAwareQuery.get_by_id_or_404(Thread, thread_id)
+        
+        # Ensure it's a web widget thread
+        if thread.channel.type != 'web_widget':
+            return error_response(
+                error_code='INVALID_THREAD_TYPE',
+                message=_('Thread is not a web widget thread'),
+                status_code=400
+            )
+        
+        message = TenantAwareQuery.get_by_id_or_404(InboxMessage, message_id)
+        if message.thread_id != thread_id or not message.is_from_customer():
+            return not_found_response('Message')
+        
+        from app.secretary.agents.base_agent import AgentContext
+        agent_context = AgentContext(
+            tenant_id=str(g.tenant_id),
+            channel_type='web_widget',
+            conversation_id=str(thread_id),
+            customer_id=thread.customer_id,
+            metadata={'message_id': message_id}
+        )
+        
+    except Exception as e:
+        logger.error("Failed to start widget reply stream", thread_id=thread_id, error=str(e))
+        return error_response(
+            error_code='WIDGET_STREAM_FAILED',
+            message=_('Failed to generate reply'),
+            status_code=500
+        )
+    
+    tenant_id = g.tenant_id
+    room = f"thread_{thread_id}"
+    
+    def generate():
+        from app.utils.websocket_manager import emit_with_fallback
+        
+        try:
+            events = _get_orchestrator().process_message_stream(message.content, agent_context)
+            for event in _iterate_async(events):
+                if not event.done:
+                    delta = {'thread_id': thread_id, 'reply_to': message_id, 'delta': event.delta}
+                    emit_with_fallback('ai_response_delta', delta, room=room)
+                    yield _sse_event('delta', delta)
+                    continue
+                
+                response = event.response
+                reply = InboxMessage.create_outbound(
+                    tenant_id=tenant_id,
+                    channel_id=thread.channel_id,
+                    thread_id=thread_id,
+                    content=response.content,
+                    sender_id='ai_assistant',
+                    content_type='text',
+                    message_type='message'
+                )
+                reply.set_metadata('source', 'ai_assistant')
+                reply.set_metadata('agent_type', response.intent or 'unknown')
+                reply.set_metadata('confidence', response.confidence)
+                reply.set_metadata('requires_handoff', response.requires_handoff)
+                reply.set_metadata('reply_to', message_id)
+                reply.mark_as_sent()
+                reply.save()
+                
+                # Logged intents are training data for the local intent classifier
+                if response.intent in ('sales', 'support', 'billing', 'operations'):
+                    confidence = 'high' if response.confidence >= 0.8 else 'medium' if response.confidence >= 0.5 else 'low'
+                    message.set_ai_response(response.content, confidence=confidence, intent=response.intent)
+                    message.save()
+                
+                reply_data = reply.to_dict()
+                reply_data['user_name'] = 'AI Assistant'
+                reply_data['is_ai_response'] = True
+                emit_with_fallback('ai_response_complete', reply_data, room=room)
+                yield _sse_event('done', reply_data)
+                
+        except Exception as e:
+            logger.error("Failed to stream widget reply", thread_id=thread_id, error=str(e), exc_info=True)
+            yield _sse_event('error', {'thread_id': thread_id, 'message': _('Failed to generate reply')})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @channels_bp.route('/widget/thread/<int:thread_id>/typing', methods=['POST'])
 @jwt_required()
 @require_tenant()
@@ -1,5 +1,5 @@
 """CLI commands for the application."""
-from app.cli import data_retention, translation_commands, seed_data, database_commands, performance
+from app.cli import data_retention, translation_commands, seed_data, database_commands, performance, knowledge_commands, intent_commands
 
 
 def init_app(app):
@@ -8,4 +8,6 @@ def init_app(app):
     translation_commands.init_translation_commands(app)
     seed_data.init_app(app)
     database_commands.init_app(app)
-    performance.init_app(app)
\ No newline at end of file
+    performance.init_app(app)
+    knowledge_commands.init_app(app)
+    intent_commands.init_app(app)
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""CLI commands for the local intent classifier."""
+import asyncio
+import json
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.group()
+def intents():
+    """Intent routing commands."""
+    pass
+
+
+@intents.command('train')
+@click.option('--tenant-id', type=int, help='Only use messages of this tenant')
+@click.option('--limit', default=20000, help='Newest labelled messages used for training')
+@click.option('--from-file', type=click.File('r'), help='JSONL file of {"message", "intent"} records instead of logged intents')
+@click.option('--output', help='Model path (defaults to INTENT_CLASSIFIER_PATH)')
+@with_appcontext
+def train(tenant_id, limit, from_file, output):
+    """Train the local intent classifier from logged message intents."""
+    from app.secretary.agents.intent_classifier import LocalIntentClassifier, load_replay_set
+    
+    output = output or current_app.config['INTENT_CLASSIFIER_PATH']
+    
+    try:
+        if from_file:
+            samples = load_replay_set(from_file)
+            texts, labels = [text for text, _ in samples], [label for _, label in samples]
+        else:
+            texts, labels = LocalIntentClassifier.training_data_from_messages(tenant_id=tenant_id, limit=limit)
+        
+        classifier = LocalIntentClassifier()
+        counts = classifier.train(texts, labels)
+        classifier.save(output)
+        
+        summary = ', '.join(f"{label}: {count}" for label, count in sorted(counts.items()))
+        click.echo(f"✅ Trained intent classifier on {classifier.sample_count} messages ({summary})")
+        click.echo(f"   Saved to {output}")
+    except Exception as e:
+        click.echo(f"❌ Intent classifier training failed: {e}", err=True)
+        raise click.ClickException(str(e))
+
+
+@intents.command('evaluate')
+@click.argument('replay_file', type=click.File('r'))
+@click.option('--use-llm', is_flag=True, help='Also send unresolved messages to the LLM and score them')
+@with_appcontext
+def evaluate(replay_file, use_llm):
+    """Report LLM-bypass rate and routing accuracy on a labelled JSONL replay set."""
+    from app.secretary.agents.intent_classifier import load_replay_set
+    from app.secretary.agents.router_agent import RouterAgent
+    
+    try:
+        samples = load_replay_set(replay_file)
+        report = asyncio.run(RouterAgent(fast_path=True).evaluate_replay(samples, use_llm=use_llm))
+        click.echo(json.dumps(report, indent=2))
+    except Exception as e:
+        click.echo(f"❌ Replay evaluation failed: {e}", err=True)
+        raise click.ClickException(str(e))
+
+
+def init_app(app):
+    """Initialize CLI commands with Flask app."""
+    app.cli.add_command(intents)
@@ -0,0 +1,75 @@
+"""CLI commands for knowledge base maintenance."""
+import click
+from flask.cli import with_appcontext
+from app.models.knowledge import Chunk, Embedding
+from app.utils.vector_codec import DTYPE_CODES
+
+
+@click.group()
+def knowledge():
+    """Knowledge base maintenance commands."""
+    pass
+
+
+@knowledge.command('migrate-vectors')
+@click.option('--tenant-id', type=int, help='Tenant ID (optional, migrates all tenants if not specified)')
+@click.option('--batch-size', default=1000, help='Rows rewritten per transaction')
+@click.option('--dtype', type=click.Choice(sorted(DTYPE_CODES.keys())), default='float32',
+              help='Target storage dtype')
+@with_appcontext
+def migrate_vectors(tenant_id, batch_size, dtype):
+    """Rewrite stored embedding vectors into the binary storage format."""
+    click.echo(f"Migrating embedding vectors to {dtype} (batch size {batch_size})...")
+    
+    try:
+        result = Embedding.migrate_vector_storage(
+            batch_size=batch_size,
+            dtype=dtype,
+            tenant_id=tenant_id
+        )
+        click.echo(f"✅ Scanned {result['scanned']} embeddings, rewrote {result['rewritten']}")
+    except Exception as e:
+        click.echo(f"❌ Vector migration failed: {e}", err=True)
+        raise click.ClickException(str(e))
+
+
+@knowledge.command('backfill-chunk-hashes')
+@click.option('--tenant-id', type=int, help='Tenant ID (optional, backfills all tenants if not specified)')
+@click.option('--batch-size', default=1000, help='Rows updated per transaction')
+@with_appcontext
+def backfill_chunk_hashes(tenant_id, batch_size):
+    """Store content hashes on existing chunks so their embeddings can be reused."""
+    click.echo(f"Backfilling chunk content hashes (batch size {batch_size})...")
+    
+    try:
+        updated = Chunk.backfill_content_hashes(batch_size=batch_size, tenant_id=tenant_id)
+        click.echo(f"✅ Hashed {updated} chunks")
+    except Exception as e:
+        click.echo(f"❌ Chunk hash backfill failed: {e}", err=True)
+        raise click.ClickException(str(e))
+
+
+@knowledge.command('create-search-index')
+@click.option('--rebuild', is_flag=True, help='Re-index existing chunks (SQLite FTS5)')
+@with_appcontext
+def create_search_index(rebuild):
+    """Create the full-text index used by hybrid knowledge search."""
+    from app import db
+    from app.services.lexical_search import LexicalSearchIndex
+    
+    try:
+        with db.engine.begin() as connection:
+            backend = LexicalSearchIndex.create_index(connection, rebuild=rebuild)
+        
+        if backend:
+            click.echo(f"✅ Full-text index ready ({backend})")
+        else:
+            click.echo("⚠️ No full-text index support, knowledge search uses the BM25 fallback")
+    except Exception as e:
+        click.echo(f"❌ Search index creation failed: {e}", err=True)
+        raise click.ClickException(str(e))
+
+
+def init_app(app):
+    """Initialize CLI commands with Flask app."""
+    app.cli.add_command(knowledge)
@@ -276,6 +276,17 @@ def upload_document(tenant_id, source_id):
             title=title
         )
         
+        # Large documents are ingested by a worker; poll the progress endpoint
+        if document.processing_status in ('pending', 'processing'):
+            return success_response(
+                message="Document uploaded, processing started",
+                data={
+                    'document': document.to_dict(),
+                    'progress': document.get_progress()
+                },
+                status_code=202
+            )
+        
         return success_response(
             message="Document uploaded successfully",
             data={'document': document.to_dict()},
@@ -384,6 +395,41 @@ def get_document(tenant_id, document_id):
         )
 
 
+@knowledge_bp.route('/documents/<int:document_id>/progress', methods=['GET'])
+@jwt_required()
+@tenant_required
+def get_document_progress(tenant_id, document_id):
+    """Get ingestion progress of a document."""
+    try:
+        from app.models.knowledge import Document
+        
+        document = Document.get_by_id(document_id)
+        if not document or document.tenant_id != tenant_id:
+            return error_response(
+                error_code="NOT_FOUND",
+                message="Document not found",
+                status_code=404
+            )
+        
+        return success_response(
+            message="Document progress retrieved successfully",
+            data={
+                'document_id': document.id,
+                'processing_status': document.processing_status,
+                'progress': document.get_progress()
+            }
+        )
+        
+    except Exception as e:
+        current_app.logger.error(f"Failed to get document progress: {str(e)}")
+        return error_response(
+            error_code="DOCUMENT_PROGRESS_FETCH_FAILED",
+            message="Failed to retrieve document progress",
+            status_code=500,
+            details=str(e)
+        )
+
+
 @knowledge_bp.route('/documents/<int:document_id>', methods=['DELETE'])
 @jwt_required()
 @tenant_required
@@ -16,7 +16,7 @@ from app.models.knowledge import KnowledgeSource, Document, Chunk, Embedding
 from app.models.billing import Plan, Subscription, UsageEvent, Entitlement, Invoice
 from app.models.kyb_monitoring import (
     Counterparty, CounterpartySnapshot, CounterpartyDiff, 
-    KYBAlert, KYBMonitoringConfig
+    KYBAlert, KYBMonitoringConfig, SanctionsListVersion
 )
 from app.models.dead_letter import DeadLetterTask
 from app.models.notification import (
@@ -67,6 +67,7 @@ __all__ = [
     'CounterpartyDiff',
     'KYBAlert',
     'KYBMonitoringConfig',
+    'SanctionsListVersion',
     'DeadLetterTask',
     'NotificationTemplate',
     'NotificationPreference', 
@@ -1,9 +1,46 @@
 """Knowledge management models for RAG system."""
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, Boolean, JSON, LargeBinary, Numeric
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, Boolean, JSON, LargeBinary, Numeric, event
 from sqlalchemy.orm import relationship
 from app.models.base import TenantAwareModel, SoftDeleteMixin, AuditMixin, get_fk_reference
 
 
+# Rows sent per multi-row INSERT statement by the bulk create helpers
+BULK_INSERT_BATCH_SIZE = 500
+
+
+def _bulk_insert(model, rows, batch_size=None, commit=True):
+    """
+    Insert rows with batched multi-row INSERT ... RETURNING statements.
+    
+    All batches run in the current transaction, which is committed once at
+    the end (or rolled back on failure) unless commit is False.
+    
+    Returns:
+        Generated primary keys in the order of rows
+    """
+    from sqlalchemy import insert
+    from app import db
+    
+    if not rows:
+        return []
+    
+    batch_size = batch_size or BULK_INSERT_BATCH_SIZE
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    
+    ids = []
+    try:
+        for start in range(0, len(rows), batch_size):
+            result = db.session.execute(statement, rows[start:start + batch_size])
+            ids.extend(result.scalars().all())
+        if commit:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return ids
+
+
 class KnowledgeSource(TenantAwareModel, SoftDeleteMixin, AuditMixin):
     """Knowledge source model for documents and URLs."""
     
@@ -237,6 +274,22 @@ class Document(TenantAwareModel, SoftDeleteMixin, AuditMixin):
         self.processing_status = 'error'
         return self
     
+    def update_progress(self, **fields):
+        """Merge fields into the ingestion progress kept in metadata."""
+        from datetime import datetime
+        
+        progress = dict(self.get_metadata('progress') or {})
+        progress.update(fields)
+        progress['updated_at'] = datetime.utcnow().isoformat()
+        
+        # Assign a new dict so the JSON column change is detected
+        self.extra_data = {**(self.extra_data or {}), 'progress': progress}
+        return self
+    
+    def get_progress(self):
+        """Get ingestion progress."""
+        return self.get_metadata('progress', {})
+    
     def get_chunk_count(self):
         """Get number of chunks for this document."""
         return len(self.chunks) if self.chunks else 0
@@ -261,12 +314,15 @@ class Document(TenantAwareModel, SoftDeleteMixin, AuditMixin):
         return data
     
     @classmethod
-    def find_by_content_hash(cls, tenant_id, content_hash):
-        """Find document by content hash."""
-        return cls.query.filter_by(
+    def find_by_content_hash(cls, tenant_id, content_hash, source_id=None):
+        """Find document by content hash, optionally within a single source."""
+        query = cls.query.filter_by(
             tenant_id=tenant_id,
             content_hash=content_hash
-        ).first()
+        )
+        if source_id is not None:
+            query = query.filter_by(source_id=source_id)
+        return query.first()
     
     @classmethod
     def get_by_source(cls, source_id):
@@ -285,6 +341,7 @@ class Chunk(TenantAwareModel, SoftDeleteMixin):
     
     # Chunk information
     content = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 hash for embedding reuse
     position = Column(Integer, nullable=False)  # Position within document
     token_count = Column(Integer, nullable=True)
     
@@ -312,6 +369,77 @@ class Chunk(TenantAwareModel, SoftDeleteMixin):
         self.extra_data[key] = value
         return self
     
+    @staticmethod
+    def hash_content(content):
+        """Hash chunk text so identical chunks can share an embedding."""
+        import hashlib
+        return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+    
+    def generate_content_hash(self):
+        """Generate SHA-256 hash of content for embedding reuse."""
+        if self.content:
+            self.content_hash = self.hash_content(self.content)
+        return self
+    
+    @classmethod
+    def backfill_content_hashes(cls, batch_size=1000, tenant_id=None):
+        """
+        Fill in content hashes for chunks created before hashes were stored.
+        
+        Returns:
+            Number of chunks updated
+        """
+        from sqlalchemy import bindparam
+        from app import db
+        
+        table = cls.__table__
+        update_stmt = table.update()\
+            .where(table.c.id == bindparam('row_id'))\
+            .values(content_hash=bindparam('row_hash'))
+        
+        last_id = 0
+        updated = 0
+        
+        while True:
+            query = db.session.query(cls.id, cls.content)\
+                .filter(cls.id > last_id, cls.content_hash.is_(None))
+            if tenant_id:
+                query = query.filter(cls.tenant_id == tenant_id)
+            rows = query.order_by(cls.id).limit(batch_size).all()
+            
+            if not rows:
+                break
+            
+            db.session.execute(update_stmt, [
+                {'row_id': row.id, 'row_hash': cls.hash_content(row.content)}
+                for row in rows
+            ])
+            db.session.commit()
+            
+            updated += len(rows)
+            last_id = rows[-1].id
+        
+        return updated
+    
+    @classmethod
+    def bulk_create(cls, rows, batch_size=None, commit=True):
+        """
+        Insert many chunks in batched statements within one transaction.
+        
+        Args:
+            rows: Dictionaries of column values, one per chunk
+            batch_size: Rows per INSERT statement
+            commit: Commit the transaction after the last batch
+        
+        Returns:
+            Generated chunk ids in the order of rows
+        """
+        for row in rows:
+            if not row.get('content_hash'):
+                row['content_hash'] = cls.hash_content(row.get('content'))
+        
+        return _bulk_insert(cls, rows, batch_size=batch_size, commit=commit)
+    
     def get_content_preview(self, max_length=200):
         """Get content preview."""
         if not self.content:
@@ -374,15 +502,31 @@ class Embedding(TenantAwareModel):
     
     def get_vector(self):
         """Get vector as numpy array."""
-        import numpy as np
-        import pickle
-        return pickle.loads(self.vector_data)
+        return self.deserialize_vector(self.vector_data)
+    
+    @staticmethod
+    def deserialize_vector(vector_data):
+        """Decode stored vector bytes (current binary format or legacy pickle)."""
+        from app.utils.vector_codec import decode_vector
+        return decode_vector(vector_data)
+    
+    @staticmethod
+    def serialize_vector(vector, dtype=None):
+        """Encode a vector using the configured storage dtype."""
+        from app.utils.vector_codec import encode_vector
+        
+        if dtype is None:
+            try:
+                from flask import current_app
+                dtype = current_app.config.get('EMBEDDING_STORAGE_DTYPE', 'float32')
+            except RuntimeError:
+                dtype = 'float32'
+        
+        return encode_vector(vector, dtype)
     
-    def set_vector(self, vector):
+    def set_vector(self, vector, dtype=None):
         """Set vector from numpy array."""
-        import numpy as np
-        import pickle
-        self.vector_data = pickle.dumps(vector)
+        self.vector_data = self.serialize_vector(vector, dtype)
         self.dimension = len(vector)
         return self
     
@@ -420,8 +564,26 @@ class Embedding(TenantAwareModel):
     @classmethod
     def find_similar(cls, tenant_id, query_vector, model_name, limit=10, min_similarity=0.7):
         """Find similar embeddings using cosine similarity."""
-        # This is a basic implementation. In production, you'd use a vector database
-        # like pgvector, Pinecone, or Weaviate for efficient similarity search
+        from app.services.vector_index import vector_index_manager
+        
+        # Use the in-process ANN index when available
+        if vector_index_manager.is_enabled():
+            matches = vector_index_manager.search(
+                tenant_id, model_name, query_vector, limit, min_similarity=min_similarity
+            )
+            if matches is not None:
+                if not matches:
+                    return []
+                
+                embeddings = {
+                    embedding.id: embedding
+                    for embedding in cls.query.filter(cls.id.in_([match[0] for match in matches])).all()
+                }
+                return [
+                    (embeddings[embedding_id], similarity)
+                    for embedding_id, _, similarity in matches
+                    if embedding_id in embeddings
+                ]
         
         embeddings = cls.query.filter_by(
             tenant_id=tenant_id,
@@ -442,13 +604,168 @@ class Embedding(TenantAwareModel):
     @classmethod
     def create_from_vector(cls, tenant_id, chunk_id, vector, model_name, **kwargs):
         """Create embedding from vector."""
-        embedding = cls.create(
+        embedding = cls(
             tenant_id=tenant_id,
             chunk_id=chunk_id,
             model_name=model_name,
             **kwargs
         )
+        # vector_data is NOT NULL, so it must be set before the first flush
         embedding.set_vector(vector)
         embedding.save()
         
-        return embedding
\ No newline at end of file
+        return embedding
+    
+    @classmethod
+    def bulk_create(cls, rows, batch_size=None, commit=True):
+        """
+        Insert many embeddings in batched statements within one transaction.
+        
+        Rows may carry a raw 'vector' instead of 'vector_data' and
+        'dimension'; it is serialized with the configured storage dtype.
+        
+        Args:
+            rows: Dictionaries of column values, one per embedding
+            batch_size: Rows per INSERT statement
+            commit: Commit the transaction after the last batch
+        
+        Returns:
+            Generated embedding ids in the order of rows
+        """
+        serialized = []
+        for row in rows:
+            row = dict(row)  # Leave the caller's rows untouched
+            vector = row.pop('vector', None)
+            if vector is not None:
+                row['vector_data'] = cls.serialize_vector(vector)
+                row['dimension'] = len(vector)
+            serialized.append(row)
+        
+        return _bulk_insert(cls, serialized, batch_size=batch_size, commit=commit)
+    
+    @classmethod
+    def find_vectors_by_content_hash(cls, tenant_id, model_name, content_hashes):
+        """
+        Find stored vectors for chunks with the given content hashes.
+        
+        Returns:
+            Dict mapping content hash to (vector_data, dimension)
+        """
+        from app import db
+        
+        content_hashes = list({content_hash for content_hash in content_hashes if content_hash})
+        vectors = {}
+        
+        # Query in slices to stay under bind parameter limits
+        for start in range(0, len(content_hashes), 500):
+            rows = db.session.query(Chunk.content_hash, cls.vector_data, cls.dimension)\
+                .join(Chunk, cls.chunk_id == Chunk.id)\
+                .filter(
+                    cls.tenant_id == tenant_id,
+                    cls.model_name == model_name,
+                    Chunk.content_hash.in_(content_hashes[start:start + 500])
+                ).all()
+            
+            for content_hash, vector_data, dimension in rows:
+                vectors.setdefault(content_hash, (vector_data, dimension))
+        
+        return vectors
+    
+    @classmethod
+    def load_vector_matrix(cls, tenant_id, model_name, source_ids=None):
+        """
+        Load all vectors for a tenant and model with a single query.
+        
+        Returns:
+            Tuple of (embedding_ids, chunk_ids, matrix) where matrix is a
+            contiguous float32 array with one row per embedding
+        """
+        import numpy as np
+        from app import db
+        from app.utils.vector_codec import decode_vectors
+        
+        query = db.session.query(cls.id, cls.chunk_id, cls.vector_data).filter(
+            cls.tenant_id == tenant_id,
+            cls.model_name == model_name
+        )
+        
+        if source_ids:
+            query = query.join(Chunk, cls.chunk_id == Chunk.id)\
+                         .join(Document, Chunk.document_id == Document.id)\
+                         .filter(Document.source_id.in_(source_ids))
+        
+        rows = query.order_by(cls.id).all()
+        
+        embedding_ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+        chunk_ids = np.fromiter((row.chunk_id for row in rows), dtype=np.int64, count=len(rows))
+        matrix = decode_vectors([row.vector_data for row in rows])
+        
+        return embedding_ids, chunk_ids, matrix
+    
+    @classmethod
+    def migrate_vector_storage(cls, batch_size=1000, dtype='float32', tenant_id=None):
+        """
+        Rewrite stored vectors into the binary storage format in batches.
+        
+        Rows are visited in primary key order and each batch is committed
+        separately, so the migration can be interrupted and resumed.
+        
+        Returns:
+            Dictionary with counts of scanned and rewritten rows
+        """
+        from sqlalchemy import bindparam
+        from app import db
+        from app.utils.vector_codec import decode_vector, stored_dtype
+        
+        table = cls.__table__
+        update_stmt = table.update()\
+            .where(table.c.id == bindparam('row_id'))\
+            .values(vector_data=bindparam('row_data'), dimension=bindparam('row_dimension'))
+        
+        last_id = 0
+        scanned = 0
+        rewritten = 0
+        
+        while True:
+            query = db.session.query(cls.id, cls.vector_data).filter(cls.id > last_id)
+            if tenant_id:
+                query = query.filter(cls.tenant_id == tenant_id)
+            rows = query.order_by(cls.id).limit(batch_size).all()
+            
+            if not rows:
+                break
+            
+            updates = []
+            for row in rows:
+                if stored_dtype(row.vector_data) == dtype:
+                    continue
+                vector = decode_vector(row.vector_data)
+                updates.append({
+                    'row_id': row.id,
+                    'row_data': cls.serialize_vector(vector, dtype),
+                    'row_dimension': len(vector)
+                })
+            
+            if updates:
+                db.session.execute(update_stmt, updates)
+                db.session.commit()
+            
+            scanned += len(rows)
+            rewritten += len(updates)
+            last_id = rows[-1].id
+        
+        return {'scanned': scanned, 'rewritten': rewritten}
+
+
+@event.listens_for(Chunk.__table__, 'after_create')
+def _create_chunk_search_index(target, connection, **kwargs):
+    """Create the full-text index over chunk content with the chunks table."""
+    from app.services.lexical_search import LexicalSearchIndex
+    LexicalSearchIndex.create_index(connection)
+
+
+@event.listens_for(Chunk.__table__, 'before_drop')
+def _drop_chunk_search_index(target, connection, **kwargs):
+    """Drop the full-text index before the chunks table."""
+    from app.services.lexical_search import LexicalSearchIndex
+    LexicalSearchIndex.drop_index(connection)
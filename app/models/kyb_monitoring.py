@@ -2,7 +2,7 @@
 from datetime import datetime
 from sqlalchemy import Column, String, Text, Integer, ForeignKey, DateTime, Boolean, Float, JSON
 from sqlalchemy.orm import relationship
-from app.models.base import TenantAwareModel, SoftDeleteMixin, get_fk_reference
+from app.models.base import BaseModel, TenantAwareModel, SoftDeleteMixin, get_fk_reference
 from app import db
 
 
@@ -38,6 +38,11 @@ class Counterparty(TenantAwareModel, SoftDeleteMixin):
     last_checked = Column(DateTime, index=True)
     next_check = Column(DateTime, index=True)
     
+    # Name last screened against the full sanctions lists; list updates only re-screen
+    # it against changed entries until the counterparty is renamed
+    sanctions_screened_name = Column(String(255))
+    sanctions_screened_at = Column(DateTime)
+    
     # Additional metadata
     notes = Column(Text)
     tags = Column(JSON)  # Array of tags for categorization
@@ -307,6 +312,9 @@ class KYBMonitoringConfig(TenantAwareModel):
     snapshot_retention_days = Column(Integer, default=365)
     alert_retention_days = Column(Integer, default=1095)  # 3 years
     
+    # SanctionsListVersion id per source the portfolio was last re-screened against
+    sanctions_list_versions = Column(JSON)
+    
     def __repr__(self):
         return f'<KYBMonitoringConfig for tenant {self.tenant_id}>'
     
@@ -359,4 +367,31 @@ class KYBMonitoringConfig(TenantAwareModel):
             'alerts_days': self.alert_retention_days
         }
         
-        return data
\ No newline at end of file
+        return data
+
+
+class SanctionsListVersion(BaseModel):
+    """A loaded version of a sanctions list and what changed since the previous one."""
+    __tablename__ = 'sanctions_list_versions'
+    
+    source = Column(String(20), nullable=False, index=True)  # EU, OFAC, UK
+    version = Column(String(64), nullable=False, index=True)  # Hash of the list contents
+    list_source = Column(String(500))  # List file, or 'sample'
+    total_entities = Column(Integer, default=0)
+    
+    # Changes since the previous version; all entries are added for the first version
+    added_count = Column(Integer, default=0)
+    modified_count = Column(Integer, default=0)
+    removed_count = Column(Integer, default=0)
+    changes = Column(JSON)  # {'added': [uid], 'modified': [uid], 'removed': [uid]}
+    
+    # Fingerprint per entry uid, to diff the next version against; cleared on older versions
+    entries = Column(JSON)
+    
+    def __repr__(self):
+        return f'<SanctionsListVersion {self.source}:{self.version[:12]}>'
+    
+    def to_dict(self, exclude=None):
+        """Convert to dictionary."""
+        exclude = list(exclude or []) + ['entries']
+        return super().to_dict(exclude=exclude)
@@ -1,12 +1,15 @@
 """Base agent class for all AI agents."""
 
+import asyncio
 import logging
+import contextvars
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import AsyncIterator, Callable, Dict, Any, Optional, List
 from dataclasses import dataclass
 from datetime import datetime
 import openai
 from flask import current_app
+from app.services.openai_client import async_openai_clients
 
 
 @dataclass
@@ -32,6 +35,19 @@ class AgentResponse:
     metadata: Optional[Dict[str, Any]] = None
 
 
+@dataclass
+class AgentStreamEvent:
+    """Incremental output of a streamed agent reply; the last event carries the response."""
+    delta: str = ""
+    done: bool = False
+    response: Optional[AgentResponse] = None
+
+
+# Receives reply deltas while an agent runs inside process_stream
+_stream_sink: contextvars.ContextVar[Optional[Callable[[str], None]]] = \
+    contextvars.ContextVar('agent_stream_sink', default=None)
+
+
 class BaseAgent(ABC):
     """Base class for all AI agents."""
     
@@ -57,6 +73,11 @@ class BaseAgent(ABC):
             self._client = openai.OpenAI(api_key=api_key)
         return self._client
     
+    @property
+    def async_client(self):
+        """Shared AsyncOpenAI client for the running event loop."""
+        return async_openai_clients.get_client()
+    
     @abstractmethod
     async def process(self, message: str, context: AgentContext) -> AgentResponse:
         """Process a message and return a response."""
@@ -80,20 +101,75 @@ Guidelines:
 """
         return base_prompt
     
-    async def _call_openai(self, messages: List[Dict[str, str]], context: AgentContext) -> str:
-        """Make a call to OpenAI API."""
+    async def _call_openai(self, messages: List[Dict[str, str]], context: AgentContext,
+                           timeout: float = None, stream: bool = False) -> str:
+        """
+        Make a call to OpenAI API without blocking the event loop.
+        
+        The request is cancelled if it takes longer than `timeout` seconds
+        or if the awaiting task is cancelled. Calls that produce the
+        customer-facing reply pass stream=True; inside process_stream their
+        tokens are forwarded as they arrive.
+        """
+        timeout = timeout or async_openai_clients.request_timeout()
+        sink = _stream_sink.get() if stream else None
+        if sink is not None:
+            return await self._stream_openai(messages, sink, timeout)
+        
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1000
+            response = await asyncio.wait_for(
+                self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1000
+                ),
+                timeout=timeout
             )
             return response.choices[0].message.content
+        except asyncio.TimeoutError:
+            self.logger.error(f"OpenAI API call timed out after {timeout}s")
+            raise
         except Exception as e:
             self.logger.error(f"OpenAI API call failed: {str(e)}")
             raise
     
+    async def _stream_openai(self, messages: List[Dict[str, str]], sink: Callable[[str], None],
+                             timeout: float) -> str:
+        """Stream a completion into `sink` and return the full text."""
+        parts = []
+        try:
+            stream = await asyncio.wait_for(
+                self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1000,
+                    stream=True
+                ),
+                timeout=timeout
+            )
+            iterator = stream.__aiter__()
+            while True:
+                try:
+                    # Timeout applies to the gap between chunks, not the whole reply
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    break
+                
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    sink(delta)
+            
+            return ''.join(parts)
+        except asyncio.TimeoutError:
+            self.logger.error(f"OpenAI streaming call timed out after {timeout}s")
+            raise
+        except Exception as e:
+            self.logger.error(f"OpenAI streaming call failed: {str(e)}")
+            raise
+    
     def _log_interaction(self, message: str, response: AgentResponse, context: AgentContext):
         """Log agent interaction for monitoring."""
         self.logger.info(
@@ -113,6 +189,39 @@ Guidelines:
         """Generate response - delegates to process method."""
         return await self.process(message, context)
     
+    async def process_stream(self, message: str, context: AgentContext) -> AsyncIterator[AgentStreamEvent]:
+        """
+        Process a message, yielding reply deltas as they are generated.
+        
+        The final event carries the complete AgentResponse. Its content is
+        authoritative: it replaces the streamed text if the agent fell back
+        to a canned reply after streaming had started.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        token = _stream_sink.set(queue.put_nowait)
+        try:
+            # The task copies the current context, sink included
+            task = asyncio.ensure_future(self.process(message, context))
+        finally:
+            _stream_sink.reset(token)
+        
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    break
+                yield AgentStreamEvent(delta=getter.result())
+            
+            while not queue.empty():
+                yield AgentStreamEvent(delta=queue.get_nowait())
+            
+            yield AgentStreamEvent(done=True, response=task.result())
+        finally:
+            if not task.done():
+                task.cancel()
+    
     async def health_check(self):
         """Perform health check on agent."""
         # Simple health check - could be expanded
@@ -0,0 +1,560 @@
+"""Conversation state and agent metrics shared by orchestrator instances."""
+
+import time
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import current_app
+
+from app.secretary.agents.base_agent import AgentContext
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConversationContext:
+    """Context for ongoing conversations."""
+    conversation_id: str
+    tenant_id: str
+    customer_id: str
+    channel_type: str
+    created_at: datetime = field(default_factory=datetime.now)
+    last_activity: datetime = field(default_factory=datetime.now)
+    message_count: int = 0
+    current_agent: Optional[str] = None
+    intent_history: List[str] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class AgentPerformanceMetrics:
+    """Performance metrics for agents."""
+    agent_name: str
+    total_requests: int = 0
+    successful_responses: int = 0
+    failed_responses: int = 0
+    average_response_time: float = 0.0
+    confidence_scores: List[float] = field(default_factory=list)
+    handoff_requests: int = 0
+    stage_timings: Dict[str, float] = field(default_factory=dict)  # Average seconds per stage
+    stage_counts: Dict[str, int] = field(default_factory=dict)
+    last_updated: datetime = field(default_factory=datetime.now)
+
+
+class ConversationStateStore(ABC):
+    """
+    Storage for conversation contexts and per-agent metrics.
+
+    Updates are single atomic operations so concurrent workers handling
+    the same conversation do not lose increments. The orchestrator calls
+    the ``*_async`` forms, which stores doing network I/O run off the
+    event loop.
+    """
+
+    DEFAULT_TTL = 86400  # Seconds of inactivity before a conversation expires
+    MAX_INTENT_HISTORY = 10
+    MAX_CONFIDENCE_SCORES = 100
+    SUCCESS_CONFIDENCE = 0.5  # Responses above this count as successful
+
+    def __init__(self, ttl: int = None):
+        self.ttl = timedelta(seconds=ttl or self.DEFAULT_TTL)
+
+    @abstractmethod
+    def get(self, conversation_id: str) -> Optional[ConversationContext]:
+        """Get a conversation, or None if it does not exist or expired."""
+
+    @abstractmethod
+    def get_or_create(self, context: AgentContext) -> ConversationContext:
+        """Get the conversation of an agent context, creating it if needed."""
+
+    @abstractmethod
+    def record_message(self, context: AgentContext) -> ConversationContext:
+        """Count an incoming message and refresh the conversation's expiry."""
+
+    @abstractmethod
+    def record_intent(self, conversation_id: str, intent: str) -> Optional[ConversationContext]:
+        """Append a detected intent, keeping the most recent MAX_INTENT_HISTORY."""
+
+    @abstractmethod
+    def set_current_agent(self, conversation_id: str, agent_name: str):
+        """Record the agent handling the conversation."""
+
+    @abstractmethod
+    def delete(self, conversation_id: str) -> bool:
+        """Delete a conversation."""
+
+    @abstractmethod
+    def cleanup_expired(self) -> int:
+        """Drop expired conversations and return how many were dropped."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of active conversations."""
+
+    @abstractmethod
+    def record_agent_response(self, agent_name: str, confidence: float, requires_handoff: bool,
+                              processing_time: float, stage_timings: Dict[str, float] = None):
+        """Add one response to an agent's metrics."""
+
+    @abstractmethod
+    def get_agent_metrics(self, agent_name: str) -> AgentPerformanceMetrics:
+        """Get an agent's metrics; agents without responses have zeroed metrics."""
+
+    @abstractmethod
+    def agent_names(self) -> List[str]:
+        """Names of agents with recorded metrics."""
+
+    def all_agent_metrics(self, agent_names: Iterable[str] = ()) -> Dict[str, AgentPerformanceMetrics]:
+        """Metrics of the given agents followed by every other agent with recorded metrics."""
+        names = list(agent_names)
+        names += [name for name in self.agent_names() if name not in names]
+        return {name: self.get_agent_metrics(name) for name in names}
+
+    async def health_check(self):
+        """Raise if the store's backend is unreachable."""
+
+    async def count_async(self) -> int:
+        return self.count()
+
+    async def all_agent_metrics_async(self, agent_names: Iterable[str] = ()) -> Dict[str, AgentPerformanceMetrics]:
+        return self.all_agent_metrics(agent_names)
+
+    async def record_message_async(self, context: AgentContext) -> ConversationContext:
+        return self.record_message(context)
+
+    async def record_intent_async(self, conversation_id: str, intent: str) -> Optional[ConversationContext]:
+        return self.record_intent(conversation_id, intent)
+
+    async def set_current_agent_async(self, conversation_id: str, agent_name: str):
+        self.set_current_agent(conversation_id, agent_name)
+
+    async def record_agent_response_async(self, agent_name: str, confidence: float, requires_handoff: bool,
+                                          processing_time: float, stage_timings: Dict[str, float] = None):
+        self.record_agent_response(agent_name, confidence, requires_handoff, processing_time, stage_timings)
+
+
+class InMemoryConversationStore(ConversationStateStore):
+    """
+    Process-local store for development and tests.
+
+    Conversations are kept in least-recently-active order, so expiry and
+    the size bound only ever look at the oldest entries. Callers get the
+    stored objects themselves.
+    """
+
+    DEFAULT_MAX_CONVERSATIONS = 10000
+
+    def __init__(self, ttl: int = None, max_conversations: int = None):
+        super().__init__(ttl)
+        self.max_conversations = max_conversations or self.DEFAULT_MAX_CONVERSATIONS
+        self._conversations: 'OrderedDict[str, ConversationContext]' = OrderedDict()
+        self._metrics: Dict[str, AgentPerformanceMetrics] = {}
+        self._lock = threading.RLock()
+
+    def _is_expired(self, conversation: ConversationContext, now: datetime) -> bool:
+        return now - conversation.last_activity > self.ttl
+
+    def get(self, conversation_id: str) -> Optional[ConversationContext]:
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is not None and self._is_expired(conversation, datetime.now()):
+                del self._conversations[conversation_id]
+                return None
+            return conversation
+
+    def get_or_create(self, context: AgentContext) -> ConversationContext:
+        with self._lock:
+            conversation = self.get(context.conversation_id)
+            if conversation is None:
+                conversation = ConversationContext(
+                    conversation_id=context.conversation_id,
+                    tenant_id=context.tenant_id,
+                    customer_id=context.customer_id,
+                    channel_type=context.channel_type
+                )
+                self._conversations[context.conversation_id] = conversation
+                self._evict()
+            return conversation
+
+    def record_message(self, context: AgentContext) -> ConversationContext:
+        with self._lock:
+            conversation = self.get_or_create(context)
+            conversation.last_activity = datetime.now()
+            conversation.message_count += 1
+            self._conversations.move_to_end(context.conversation_id)
+            return conversation
+
+    def record_intent(self, conversation_id: str, intent: str) -> Optional[ConversationContext]:
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is not None:
+                conversation.intent_history.append(intent)
+                del conversation.intent_history[:-self.MAX_INTENT_HISTORY]
+            return conversation
+
+    def set_current_agent(self, conversation_id: str, agent_name: str):
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is not None:
+                conversation.current_agent = agent_name
+
+    def delete(self, conversation_id: str) -> bool:
+        with self._lock:
+            return self._conversations.pop(conversation_id, None) is not None
+
+    def cleanup_expired(self) -> int:
+        now = datetime.now()
+        removed = 0
+        with self._lock:
+            while self._conversations:
+                conversation_id, conversation = next(iter(self._conversations.items()))
+                if not self._is_expired(conversation, now):
+                    break
+                del self._conversations[conversation_id]
+                removed += 1
+        return removed
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._conversations)
+
+    def _evict(self):
+        self.cleanup_expired()
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+
+    def record_agent_response(self, agent_name: str, confidence: float, requires_handoff: bool,
+                              processing_time: float, stage_timings: Dict[str, float] = None):
+        with self._lock:
+            metrics = self.get_agent_metrics(agent_name)
+            metrics.total_requests += 1
+
+            if confidence > self.SUCCESS_CONFIDENCE:
+                metrics.successful_responses += 1
+            else:
+                metrics.failed_responses += 1
+
+            # Update average response time
+            total_time = metrics.average_response_time * (metrics.total_requests - 1) + processing_time
+            metrics.average_response_time = total_time / metrics.total_requests
+
+            metrics.confidence_scores.append(confidence)
+            del metrics.confidence_scores[:-self.MAX_CONFIDENCE_SCORES]
+
+            if requires_handoff:
+                metrics.handoff_requests += 1
+
+            # Update average time per pipeline stage
+            for stage, duration in (stage_timings or {}).items():
+                count = metrics.stage_counts.get(stage, 0) + 1
+                average = metrics.stage_timings.get(stage, 0.0)
+                metrics.stage_timings[stage] = average + (duration - average) / count
+                metrics.stage_counts[stage] = count
+
+            metrics.last_updated = datetime.now()
+
+    def get_agent_metrics(self, agent_name: str) -> AgentPerformanceMetrics:
+        with self._lock:
+            metrics = self._metrics.get(agent_name)
+            if metrics is None:
+                metrics = AgentPerformanceMetrics(agent_name=agent_name)
+                self._metrics[agent_name] = metrics
+            return metrics
+
+    def agent_names(self) -> List[str]:
+        with self._lock:
+            return list(self._metrics)
+
+
+class RedisConversationStore(ConversationStateStore):
+    """
+    Redis store shared by all web, bot and Celery workers.
+
+    Each conversation is a hash plus an intent list that expire together
+    after the TTL; a sorted set scored by last activity counts active
+    conversations. Agent metrics are hashes of running sums, so averages
+    cover every worker.
+
+    Request-path operations that fail on Redis are logged and served by a
+    process-local store instead, so a Redis outage degrades conversation
+    state rather than failing the message.
+    """
+
+    KEY_PREFIX = 'conversation_state'
+
+    def __init__(self, redis_client, ttl: int = None):
+        super().__init__(ttl)
+        self.redis = redis_client
+        self.fallback = InMemoryConversationStore(ttl=ttl)
+
+    def _fall_back(self, operation: str, error: Exception) -> InMemoryConversationStore:
+        logger.warning(f"Redis conversation state {operation} failed, using in-process store: {str(error)}")
+        return self.fallback
+
+    def _conversation_key(self, conversation_id: str) -> str:
+        return f"{self.KEY_PREFIX}:conversation:{conversation_id}"
+
+    def _intents_key(self, conversation_id: str) -> str:
+        return f"{self.KEY_PREFIX}:intents:{conversation_id}"
+
+    def _active_key(self) -> str:
+        return f"{self.KEY_PREFIX}:active"
+
+    def _metrics_key(self, agent_name: str) -> str:
+        return f"{self.KEY_PREFIX}:metrics:{agent_name}"
+
+    def _confidence_key(self, agent_name: str) -> str:
+        return f"{self.KEY_PREFIX}:confidence:{agent_name}"
+
+    def _agents_key(self) -> str:
+        return f"{self.KEY_PREFIX}:agents"
+
+    @staticmethod
+    def _text(value) -> Optional[str]:
+        if isinstance(value, bytes):
+            return value.decode('utf-8')
+        return value
+
+    def _conversation_from_redis(self, conversation_id: str, data: Dict, intents: List) -> Optional[ConversationContext]:
+        data = {self._text(key): self._text(value) for key, value in (data or {}).items()}
+        if not data:
+            return None
+
+        return ConversationContext(
+            conversation_id=conversation_id,
+            tenant_id=data.get('tenant_id') or None,
+            customer_id=data.get('customer_id') or None,
+            channel_type=data.get('channel_type') or None,
+            created_at=datetime.fromisoformat(data['created_at']) if data.get('created_at') else datetime.now(),
+            last_activity=datetime.fromisoformat(data['last_activity']) if data.get('last_activity') else datetime.now(),
+            message_count=int(data.get('message_count') or 0),
+            current_agent=data.get('current_agent') or None,
+            intent_history=[self._text(intent) for intent in intents or []]
+        )
+
+    def _read(self, conversation_id: str) -> Optional[ConversationContext]:
+        pipeline = self.redis.pipeline(transaction=True)
+        pipeline.hgetall(self._conversation_key(conversation_id))
+        pipeline.lrange(self._intents_key(conversation_id), 0, -1)
+        data, intents = pipeline.execute()
+        return self._conversation_from_redis(conversation_id, data, intents)
+
+    def get(self, conversation_id: str) -> Optional[ConversationContext]:
+        try:
+            return self._read(conversation_id)
+        except Exception as e:
+            return self._fall_back('read', e).get(conversation_id)
+
+    def get_or_create(self, context: AgentContext) -> ConversationContext:
+        try:
+            self._update(context, message_increment=0)
+            return self._read(context.conversation_id)
+        except Exception as e:
+            return self._fall_back('update', e).get_or_create(context)
+
+    def record_message(self, context: AgentContext) -> ConversationContext:
+        try:
+            self._update(context, message_increment=1)
+            return self._read(context.conversation_id)
+        except Exception as e:
+            return self._fall_back('update', e).record_message(context)
+
+    def _update(self, context: AgentContext, message_increment: int):
+        key = self._conversation_key(context.conversation_id)
+        ttl = int(self.ttl.total_seconds())
+        now = datetime.now()
+
+        pipeline = self.redis.pipeline(transaction=True)
+        # HSETNX keeps the values of the worker that created the conversation
+        for name, value in (('tenant_id', context.tenant_id), ('customer_id', context.customer_id),
+                            ('channel_type', context.channel_type), ('created_at', now.isoformat())):
+            pipeline.hsetnx(key, name, '' if value is None else str(value))
+        pipeline.hincrby(key, 'message_count', message_increment)
+        if message_increment:
+            pipeline.hset(key, 'last_activity', now.isoformat())
+            pipeline.zadd(self._active_key(), {str(context.conversation_id): time.time()})
+            pipeline.expire(self._intents_key(context.conversation_id), ttl)
+        else:
+            pipeline.hsetnx(key, 'last_activity', now.isoformat())
+        pipeline.expire(key, ttl)
+        pipeline.execute()
+
+    def record_intent(self, conversation_id: str, intent: str) -> Optional[ConversationContext]:
+        key = self._intents_key(conversation_id)
+        try:
+            pipeline = self.redis.pipeline(transaction=True)
+            pipeline.rpush(key, intent)
+            pipeline.ltrim(key, -self.MAX_INTENT_HISTORY, -1)
+            pipeline.expire(key, int(self.ttl.total_seconds()))
+            pipeline.execute()
+            return self._read(conversation_id)
+        except Exception as e:
+            return self._fall_back('update', e).record_intent(conversation_id, intent)
+
+    def set_current_agent(self, conversation_id: str, agent_name: str):
+        try:
+            self.redis.hset(self._conversation_key(conversation_id), 'current_agent', agent_name)
+        except Exception as e:
+            self._fall_back('update', e).set_current_agent(conversation_id, agent_name)
+
+    def delete(self, conversation_id: str) -> bool:
+        try:
+            pipeline = self.redis.pipeline(transaction=True)
+            pipeline.delete(self._conversation_key(conversation_id), self._intents_key(conversation_id))
+            pipeline.zrem(self._active_key(), str(conversation_id))
+            deleted, _ = pipeline.execute()
+            return bool(deleted)
+        except Exception as e:
+            return self._fall_back('delete', e).delete(conversation_id)
+
+    def cleanup_expired(self) -> int:
+        # Conversation keys expire on their own; this trims the activity index
+        cutoff = time.time() - self.ttl.total_seconds()
+        try:
+            return int(self.redis.zremrangebyscore(self._active_key(), '-inf', cutoff))
+        except Exception as e:
+            return self._fall_back('cleanup', e).cleanup_expired()
+
+    def count(self) -> int:
+        cutoff = time.time() - self.ttl.total_seconds()
+        try:
+            return int(self.redis.zcount(self._active_key(), cutoff, '+inf'))
+        except Exception as e:
+            return self._fall_back('read', e).count()
+
+    def record_agent_response(self, agent_name: str, confidence: float, requires_handoff: bool,
+                              processing_time: float, stage_timings: Dict[str, float] = None):
+        key = self._metrics_key(agent_name)
+        confidence_key = self._confidence_key(agent_name)
+
+        try:
+            pipeline = self.redis.pipeline(transaction=True)
+            pipeline.sadd(self._agents_key(), agent_name)
+            pipeline.hincrby(key, 'total_requests', 1)
+            pipeline.hincrby(key, 'successful_responses' if confidence > self.SUCCESS_CONFIDENCE else 'failed_responses', 1)
+            pipeline.hincrby(key, 'handoff_requests', 1 if requires_handoff else 0)
+            pipeline.hincrbyfloat(key, 'total_response_time', processing_time)
+            for stage, duration in (stage_timings or {}).items():
+                pipeline.hincrbyfloat(key, f'stage_time:{stage}', duration)
+                pipeline.hincrby(key, f'stage_count:{stage}', 1)
+            pipeline.hset(key, 'last_updated', datetime.now().isoformat())
+            pipeline.lpush(confidence_key, confidence)
+            pipeline.ltrim(confidence_key, 0, self.MAX_CONFIDENCE_SCORES - 1)
+            pipeline.execute()
+        except Exception as e:
+            self._fall_back('metrics update', e).record_agent_response(
+                agent_name, confidence, requires_handoff, processing_time, stage_timings
+            )
+
+    async def record_message_async(self, context: AgentContext) -> ConversationContext:
+        return await asyncio.to_thread(self.record_message, context)
+
+    async def record_intent_async(self, conversation_id: str, intent: str) -> Optional[ConversationContext]:
+        return await asyncio.to_thread(self.record_intent, conversation_id, intent)
+
+    async def set_current_agent_async(self, conversation_id: str, agent_name: str):
+        await asyncio.to_thread(self.set_current_agent, conversation_id, agent_name)
+
+    async def record_agent_response_async(self, agent_name: str, confidence: float, requires_handoff: bool,
+                                          processing_time: float, stage_timings: Dict[str, float] = None):
+        await asyncio.to_thread(
+            self.record_agent_response, agent_name, confidence, requires_handoff, processing_time, stage_timings
+        )
+
+    def get_agent_metrics(self, agent_name: str) -> AgentPerformanceMetrics:
+        try:
+            return self._read_agent_metrics([agent_name])[agent_name]
+        except Exception as e:
+            return self._fall_back('metrics read', e).get_agent_metrics(agent_name)
+
+    def all_agent_metrics(self, agent_names: Iterable[str] = ()) -> Dict[str, AgentPerformanceMetrics]:
+        names = list(agent_names)
+        try:
+            names += [name for name in self._read_agent_names() if name not in names]
+            return self._read_agent_metrics(names)
+        except Exception as e:
+            return self._fall_back('metrics read', e).all_agent_metrics(names)
+
+    def _read_agent_metrics(self, agent_names: List[str]) -> Dict[str, AgentPerformanceMetrics]:
+        # One round-trip for every agent's counters and confidence scores
+        pipeline = self.redis.pipeline(transaction=True)
+        for name in agent_names:
+            pipeline.hgetall(self._metrics_key(name))
+            pipeline.lrange(self._confidence_key(name), 0, -1)
+        results = pipeline.execute()
+
+        return {
+            name: self._metrics_from_redis(name, results[2 * i], results[2 * i + 1])
+            for i, name in enumerate(agent_names)
+        }
+
+    def _metrics_from_redis(self, agent_name: str, data: Dict, scores: List) -> AgentPerformanceMetrics:
+        data = {self._text(key): self._text(value) for key, value in (data or {}).items()}
+
+        metrics = AgentPerformanceMetrics(
+            agent_name=agent_name,
+            total_requests=int(data.get('total_requests') or 0),
+            successful_responses=int(data.get('successful_responses') or 0),
+            failed_responses=int(data.get('failed_responses') or 0),
+            handoff_requests=int(data.get('handoff_requests') or 0),
+            confidence_scores=[float(score) for score in reversed(scores or [])]
+        )
+        if metrics.total_requests:
+            metrics.average_response_time = float(data.get('total_response_time') or 0) / metrics.total_requests
+        if data.get('last_updated'):
+            metrics.last_updated = datetime.fromisoformat(data['last_updated'])
+
+        for name, value in data.items():
+            if name.startswith('stage_count:'):
+                stage = name[len('stage_count:'):]
+                count = int(value)
+                metrics.stage_counts[stage] = count
+                metrics.stage_timings[stage] = float(data.get(f'stage_time:{stage}') or 0) / count if count else 0.0
+        return metrics
+
+    def agent_names(self) -> List[str]:
+        try:
+            return self._read_agent_names()
+        except Exception as e:
+            return self._fall_back('metrics read', e).agent_names()
+
+    def _read_agent_names(self) -> List[str]:
+        return sorted(self._text(name) for name in self.redis.smembers(self._agents_key()))
+
+    async def health_check(self):
+        await asyncio.to_thread(self.redis.ping)
+
+    async def count_async(self) -> int:
+        return await asyncio.to_thread(self.count)
+
+    async def all_agent_metrics_async(self, agent_names: Iterable[str] = ()) -> Dict[str, AgentPerformanceMetrics]:
+        return await asyncio.to_thread(self.all_agent_metrics, list(agent_names))
+
+
+def create_conversation_store() -> ConversationStateStore:
+    """Create the store selected by CONVERSATION_STATE_BACKEND, falling back to memory."""
+    def config(key, default=None):
+        try:
+            return current_app.config.get(key, default)
+        except RuntimeError:
+            return default
+
+    ttl = config('CONVERSATION_STATE_TTL')
+    if config('CONVERSATION_STATE_BACKEND', 'memory') == 'redis':
+        redis_url = config('CONVERSATION_STATE_REDIS_URL') or config('REDIS_URL')
+        try:
+            import redis
+            client = redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+            client.ping()
+            return RedisConversationStore(client, ttl=ttl)
+        except Exception as e:
+            logger.warning(f"Redis conversation state unavailable, using in-process store: {str(e)}")
+
+    return InMemoryConversationStore(ttl=ttl, max_conversations=config('CONVERSATION_STATE_MAX_CONVERSATIONS'))
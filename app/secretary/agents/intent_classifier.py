@@ -0,0 +1,212 @@
+"""Local intent classification used to route messages without an LLM call."""
+
+import re
+import pickle
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import FeatureUnion, Pipeline
+    HAS_SKLEARN = True
+except ImportError:
+    HAS_SKLEARN = False
+
+
+logger = logging.getLogger(__name__)
+
+INTENT_CATEGORIES = ('sales', 'support', 'billing', 'operations')
+
+
+class KeywordIntentMatcher:
+    """
+    Compiled keyword patterns per intent category.
+
+    A message is only classified when its matches point clearly at one
+    category; mixed or single weak matches are left to the next tier.
+    """
+
+    # Extra phrases on top of RouterAgent.intent_categories (en, de, uk, es, fr)
+    EXTRA_PATTERNS = {
+        'sales': [
+            r'pric(?:e|es|ing)', r'quotes?', r'demos?', r'trial', r'discounts?', r'upgrade',
+            r'enterprise plan', r'how much', r'preis(?:e)?', r'angebot', r'ціна', r'precio', r'prix', r'devis'
+        ],
+        'support': [
+            r'bugs?', r'errors?', r'crash(?:es|ed|ing)?', r'broken', r'not working', r"(?:doesn|don|isn)'?t work",
+            r'log ?in', r'password', r'fehler', r'funktioniert nicht', r'помилка', r'не працює',
+            r'no funciona', r'ne fonctionne pas'
+        ],
+        'billing': [
+            r'invoices?', r'payments?', r'billing', r'charged?', r'charges', r'refunds?', r'receipts?',
+            r'rechnung', r'zahlung', r'рахунок', r'оплата', r'factura', r'facture', r'remboursement'
+        ],
+        'operations': [
+            r'(?:opening|business|office) hours', r'open(?:ing)? times?', r'address', r'located', r'location',
+            r'contact', r'öffnungszeiten', r'adresse', r'графік', r'horario', r'horaires'
+        ]
+    }
+
+    def __init__(self, intent_categories: Dict[str, List[str]]):
+        self.patterns = {}
+        for category in intent_categories:
+            terms = [re.escape(keyword) + r's?' for keyword in intent_categories[category]]
+            terms += self.EXTRA_PATTERNS.get(category, [])
+            self.patterns[category] = re.compile(r'\b(?:' + '|'.join(terms) + r')\b', re.IGNORECASE)
+
+    def match(self, message: str) -> Tuple[Optional[str], float, List[str]]:
+        """
+        Match a message against all categories.
+
+        Returns:
+            (category, confidence, matched keywords); category is None when
+            nothing matched
+        """
+        hits = {}
+        for category, pattern in self.patterns.items():
+            found = [match.group(0).lower() for match in pattern.finditer(message)]
+            if found:
+                hits[category] = found
+
+        if not hits:
+            return None, 0.0, []
+
+        ranked = sorted(hits.items(), key=lambda item: len(item[1]), reverse=True)
+        category, keywords = ranked[0]
+        top = len(set(keywords))
+        second = len(set(ranked[1][1])) if len(ranked) > 1 else 0
+
+        if second == 0:
+            confidence = 0.9 if top >= 2 else 0.7
+        elif top >= 3 and top >= 2 * second:
+            confidence = 0.85
+        else:
+            confidence = 0.5  # Competing categories
+
+        return category, confidence, sorted(set(keywords))
+
+
+class LocalIntentClassifier:
+    """
+    TF-IDF and logistic regression model trained on labelled messages.
+
+    Requires scikit-learn; without it the classifier never becomes trained
+    and routing falls through to the LLM.
+    """
+
+    MIN_TRAINING_SAMPLES = 50
+
+    def __init__(self):
+        self.pipeline = None
+        self.trained_at: Optional[datetime] = None
+        self.sample_count = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.pipeline is not None
+
+    def train(self, texts: List[str], labels: List[str]) -> Dict[str, int]:
+        """
+        Fit the model on messages and their intent labels.
+
+        Returns:
+            Number of training samples per category
+        """
+        if not HAS_SKLEARN:
+            raise RuntimeError("scikit-learn is required to train the intent classifier")
+
+        samples = [(text, label) for text, label in zip(texts, labels)
+                   if text and text.strip() and label in INTENT_CATEGORIES]
+        if len(samples) < self.MIN_TRAINING_SAMPLES:
+            raise ValueError(
+                f"At least {self.MIN_TRAINING_SAMPLES} labelled messages are required, got {len(samples)}"
+            )
+        if len({label for _, label in samples}) < 2:
+            raise ValueError("Training data must contain at least two intent categories")
+
+        pipeline = Pipeline([
+            ('features', FeatureUnion([
+                ('words', TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=1)),
+                # Character n-grams cope with typos and inflected languages
+                ('chars', TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5), sublinear_tf=True, min_df=2))
+            ])),
+            ('model', LogisticRegression(max_iter=1000, class_weight='balanced'))
+        ])
+        pipeline.fit([text for text, _ in samples], [label for _, label in samples])
+
+        self.pipeline = pipeline
+        self.trained_at = datetime.utcnow()
+        self.sample_count = len(samples)
+
+        counts = {}
+        for _, label in samples:
+            counts[label] = counts.get(label, 0) + 1
+        return counts
+
+    def predict(self, message: str) -> Tuple[Optional[str], float]:
+        """Most likely category and its probability."""
+        if not self.is_trained or not message or not message.strip():
+            return None, 0.0
+
+        probabilities = self.pipeline.predict_proba([message])[0]
+        best = probabilities.argmax()
+        return self.pipeline.classes_[best], float(probabilities[best])
+
+    def save(self, path: str):
+        """Write the trained model to a file."""
+        if not self.is_trained:
+            raise ValueError("Intent classifier is not trained")
+        with open(path, 'wb') as model_file:
+            pickle.dump({
+                'pipeline': self.pipeline,
+                'trained_at': self.trained_at,
+                'sample_count': self.sample_count
+            }, model_file)
+
+    @classmethod
+    def load(cls, path: str) -> 'LocalIntentClassifier':
+        """Read a model written by save(); only load files you created."""
+        with open(path, 'rb') as model_file:
+            data = pickle.load(model_file)
+
+        classifier = cls()
+        classifier.pipeline = data['pipeline']
+        classifier.trained_at = data.get('trained_at')
+        classifier.sample_count = data.get('sample_count', 0)
+        return classifier
+
+    @staticmethod
+    def training_data_from_messages(tenant_id: int = None, limit: int = 20000) -> Tuple[List[str], List[str]]:
+        """Inbound messages with a logged intent, newest first."""
+        from app.models import InboxMessage
+
+        query = InboxMessage.query.filter(
+            InboxMessage.direction == 'inbound',
+            InboxMessage.ai_intent.in_(INTENT_CATEGORIES),
+            InboxMessage.content.isnot(None)
+        )
+        if tenant_id:
+            query = query.filter(InboxMessage.tenant_id == tenant_id)
+
+        rows = query.with_entities(InboxMessage.content, InboxMessage.ai_intent)\
+            .order_by(InboxMessage.created_at.desc())\
+            .limit(limit).all()
+        return [row.content for row in rows], [row.ai_intent for row in rows]
+
+
+def load_replay_set(lines: Iterable[str]) -> List[Tuple[str, str]]:
+    """Parse a JSONL replay set of {"message": ..., "intent": ...} records."""
+    import json
+
+    samples = []
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if record.get('intent') not in INTENT_CATEGORIES or not record.get('message'):
+            raise ValueError(f"Line {line_number}: expected a message and one of {', '.join(INTENT_CATEGORIES)}")
+        samples.append((record['message'], record['intent']))
+    return samples
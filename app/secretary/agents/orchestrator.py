@@ -1,44 +1,22 @@
 """Agent orchestrator for managing multi-agent AI system."""
+import re
+import time
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass
 
-from app.secretary.agents.base_agent import AgentContext, AgentResponse
+from app.secretary.agents.base_agent import AgentContext, AgentResponse, AgentStreamEvent
+from app.secretary.agents.conversation_state import (
+    AgentPerformanceMetrics, ConversationContext, ConversationStateStore, create_conversation_store
+)
 from app.secretary.agents.router_agent import RouterAgent
 from app.secretary.agents.supervisor_agent import SupervisorAgent
 from app.secretary.agents.specialized_agents import (
     SalesAgent, SupportAgent, BillingAgent, OperationsAgent
 )
-
-
-@dataclass
-class ConversationContext:
-    """Context for ongoing conversations."""
-    conversation_id: str
-    tenant_id: str
-    customer_id: str
-    channel_type: str
-    created_at: datetime = field(default_factory=datetime.now)
-    last_activity: datetime = field(default_factory=datetime.now)
-    message_count: int = 0
-    current_agent: Optional[str] = None
-    intent_history: List[str] = field(default_factory=list)
-    metadata: Dict[str, Any] = field(default_factory=dict)
-
-
-@dataclass
-class AgentPerformanceMetrics:
-    """Performance metrics for agents."""
-    agent_name: str
-    total_requests: int = 0
-    successful_responses: int = 0
-    failed_responses: int = 0
-    average_response_time: float = 0.0
-    confidence_scores: List[float] = field(default_factory=list)
-    handoff_requests: int = 0
-    last_updated: datetime = field(default_factory=datetime.now)
+from app.services.response_cache import ResponseCacheKey, response_cache
 
 
 @dataclass
@@ -55,8 +33,12 @@ class HandoffDecision:
 class AgentOrchestrator:
     """Orchestrates multiple AI agents for handling customer interactions."""
     
-    def __init__(self):
+    # Streamed text is released up to the last sentence end or line break
+    _STREAM_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n')
+    
+    def __init__(self, cache=None, state_store: ConversationStateStore = None):
         self.logger = logging.getLogger("agent.orchestrator")
+        self.response_cache = cache or response_cache
         
         # Initialize agents
         self.router = RouterAgent()
@@ -68,115 +50,285 @@ class AgentOrchestrator:
             'operations': OperationsAgent()
         }
         
-        # Conversation tracking
-        self.conversation_contexts: Dict[str, ConversationContext] = {}
-        self.performance_metrics: Dict[str, AgentPerformanceMetrics] = {}
+        # Conversation tracking and agent metrics, shared between workers with the Redis backend
+        self.state_store = state_store or create_conversation_store()
         
         # Configuration
-        self.max_conversation_age = timedelta(hours=24)
         self.max_handoff_attempts = 3
-        
-        # Initialize performance metrics
-        for agent_name in self.agents.keys():
-            self.performance_metrics[agent_name] = AgentPerformanceMetrics(agent_name=agent_name)
+        self.stream_window_max_chars = 400  # Release text without a sentence end beyond this
+        self.stream_window_holdback = 40  # Characters kept back when cutting mid-sentence
+    
+    @property
+    def performance_metrics(self) -> Dict[str, AgentPerformanceMetrics]:
+        """Metrics of every agent, aggregated over all workers sharing the state store."""
+        return self.state_store.all_agent_metrics(self.agents)
     
     async def process_message(self, message: str, context: AgentContext) -> AgentResponse:
         """Process a message through the agent system."""
         try:
             start_time = datetime.now()
+            stage_timings = {}
             
-            # Update conversation context
-            conv_context = self._get_or_create_conversation_context(context)
-            conv_context.last_activity = datetime.now()
-            conv_context.message_count += 1
-            
-            # Step 1: Supervisor filtering (input)
-            filter_result = await self.supervisor.filter_input(message, context)
-            if not filter_result.is_safe:
-                return AgentResponse(
-                    content=filter_result.response_message,
-                    confidence=1.0,
-                    intent="safety_violation",
-                    requires_handoff=filter_result.requires_human_review,
-                    metadata={"filter_result": filter_result.to_dict()}
-                )
-            
-            # Use filtered message
-            filtered_message = filter_result.filtered_content
-            
-            # Step 2: Intent detection and routing
-            routing_result = await self.router.detect_intent(filtered_message, context)
-            
-            # Update conversation context
-            conv_context.intent_history.append(routing_result.intent)
-            if len(conv_context.intent_history) > 10:  # Keep last 10 intents
-                conv_context.intent_history = conv_context.intent_history[-10:]
-            
-            # Step 3: Determine if handoff is needed
-            handoff_decision = await self._evaluate_handoff_need(
-                routing_result, conv_context, context
+            # Steps 1-4: Filter, detect intent and pick the agent
+            early_response, target_agent, filtered_message, cache_key = await self._route_message(
+                message, context, stage_timings
             )
-            
-            if handoff_decision.requires_human:
-                return AgentResponse(
-                    content="I'd like to connect you with one of our human agents who can better assist you with this request.",
-                    confidence=0.5,
-                    intent=routing_result.intent,
-                    requires_handoff=True,
-                    metadata={
-                        "handoff_reason": handoff_decision.reason,
-                        "urgency": handoff_decision.urgency
-                    }
-                )
-            
-            # Step 4: Route to appropriate agent
-            target_agent = handoff_decision.target_agent or routing_result.intent
-            if target_agent not in self.agents:
-                target_agent = 'operations'  # Default fallback
-            
-            agent = self.agents[target_agent]
-            conv_context.current_agent = target_agent
+            if early_response:
+                return early_response
             
             # Step 5: Generate response
-            response = await agent.generate_response(filtered_message, context)
+            response = await self._timed(
+                'response_generation',
+                self.agents[target_agent].generate_response(filtered_message, context),
+                stage_timings
+            )
             
-            # Step 6: Supervisor validation (output)
-            validation_result = await self.supervisor.validate_response(response.content, context)
-            if validation_result.metadata and not validation_result.metadata.get('is_safe', True):
-                # Use supervisor's filtered response
-                response.content = validation_result.content
-                response.metadata = response.metadata or {}
-                response.metadata["supervisor_intervention"] = True
+            # Steps 6-7: Validate output and update metrics
+            return await self._finish_response(
+                target_agent, response, context, start_time, stage_timings, cache_key
+            )
             
-            # Step 7: Update metrics
-            processing_time = (datetime.now() - start_time).total_seconds()
-            self._update_performance_metrics(target_agent, response, processing_time)
+        except Exception as e:
+            self.logger.error(f"Error processing message: {str(e)}")
+            return self._error_response(e)
+    
+    async def process_message_stream(self, message: str, context: AgentContext) -> AsyncIterator[AgentStreamEvent]:
+        """
+        Process a message, yielding the reply in windows as it is generated.
+        
+        Windows end at sentence boundaries and are masked by the supervisor's
+        pattern checks before release. The final event carries the response
+        after full output validation; its content replaces the streamed text.
+        """
+        start_time = datetime.now()
+        started = time.perf_counter()
+        stage_timings = {}
+        
+        try:
+            early_response, target_agent, filtered_message, cache_key = await self._route_message(
+                message, context, stage_timings
+            )
+        except Exception as e:
+            self.logger.error(f"Error processing message: {str(e)}")
+            yield AgentStreamEvent(done=True, response=self._error_response(e))
+            return
+        
+        if early_response:
+            yield AgentStreamEvent(done=True, response=early_response)
+            return
+        
+        stream = self.agents[target_agent].process_stream(filtered_message, context)
+        generation_started = time.perf_counter()
+        pending = ""
+        response = None
+        try:
+            async for event in stream:
+                if event.done:
+                    response = event.response
+                    break
+                
+                if 'first_token' not in stage_timings:
+                    stage_timings['first_token'] = time.perf_counter() - started
+                
+                window, pending = self._split_stream_window(pending + event.delta)
+                if window:
+                    yield AgentStreamEvent(delta=self.supervisor.filter_stream_window(window))
             
-            return response
+            if pending:
+                yield AgentStreamEvent(delta=self.supervisor.filter_stream_window(pending))
+            stage_timings['response_generation'] = time.perf_counter() - generation_started
             
+            response = await self._finish_response(
+                target_agent, response, context, start_time, stage_timings, cache_key
+            )
         except Exception as e:
-            self.logger.error(f"Error processing message: {str(e)}")
+            self.logger.error(f"Error streaming message: {str(e)}")
+            response = self._error_response(e)
+        finally:
+            await stream.aclose()
+        
+        yield AgentStreamEvent(done=True, response=response)
+    
+    async def _route_message(self, message: str, context: AgentContext, stage_timings: Dict[str, float]):
+        """
+        Filter and route a message.
+        
+        Returns:
+            (early response, target agent name, filtered message, cache key);
+            the early response is set when the message is blocked, handed to
+            a human or answered from the response cache, and the cache key
+            when the agent's answer may be cached
+        """
+        # Update conversation context
+        conv_context = await self.state_store.record_message_async(context)
+        
+        # Steps 1-2: Supervisor filtering (input) and intent detection run concurrently
+        filter_result, routing_result = await self._filter_and_route(message, context, stage_timings)
+        if not filter_result.is_safe:
             return AgentResponse(
-                content="I apologize, but I'm experiencing technical difficulties. Please try again in a moment.",
-                confidence=0.0,
-                intent="error",
+                content=filter_result.response_message,
+                confidence=1.0,
+                intent="safety_violation",
+                requires_handoff=filter_result.requires_human_review,
+                metadata={"filter_result": filter_result.to_dict(), "stage_timings": stage_timings}
+            ), None, None, None
+        
+        # Use filtered message
+        filtered_message = filter_result.filtered_content
+        
+        # Update conversation context
+        conv_context = await self.state_store.record_intent_async(
+            context.conversation_id, routing_result.intent
+        ) or conv_context
+        
+        # Step 3: Determine if handoff is needed
+        handoff_decision = await self._timed(
+            'handoff_evaluation',
+            self._evaluate_handoff_need(routing_result, conv_context, context),
+            stage_timings
+        )
+        
+        if handoff_decision.requires_human:
+            return AgentResponse(
+                content="I'd like to connect you with one of our human agents who can better assist you with this request.",
+                confidence=0.5,
+                intent=routing_result.intent,
                 requires_handoff=True,
-                metadata={"error": str(e)}
+                metadata={
+                    "handoff_reason": handoff_decision.reason,
+                    "urgency": handoff_decision.urgency
+                }
+            ), None, None, None
+        
+        # Step 4: Route to appropriate agent
+        target_agent = handoff_decision.target_agent or routing_result.intent
+        if target_agent not in self.agents:
+            target_agent = 'operations'  # Default fallback
+        
+        await self.state_store.set_current_agent_async(context.conversation_id, target_agent)
+        
+        # Step 4b: Answer repeated questions from the response cache
+        cache_key = None
+        if self.response_cache.is_enabled() and filtered_message == message:  # Messages with masked PII are personal
+            cached_response, cache_key = await self._timed(
+                'cache_lookup',
+                self.response_cache.lookup(
+                    context.tenant_id, filtered_message, target_agent,
+                    routing_result.language or context.language or 'en'
+                ),
+                stage_timings
             )
+            if cached_response:
+                return AgentResponse(
+                    content=cached_response.content,
+                    confidence=cached_response.confidence,
+                    intent=target_agent,
+                    suggested_actions=list(cached_response.suggested_actions),
+                    metadata={
+                        **cached_response.metadata,
+                        "cached": True,
+                        "stage_timings": stage_timings
+                    }
+                ), target_agent, filtered_message, None
+        
+        return None, target_agent, filtered_message, cache_key
     
-    def _get_or_create_conversation_context(self, context: AgentContext) -> ConversationContext:
-        """Get or create conversation context."""
-        conv_id = context.conversation_id
-        
-        if conv_id not in self.conversation_contexts:
-            self.conversation_contexts[conv_id] = ConversationContext(
-                conversation_id=conv_id,
-                tenant_id=context.tenant_id,
-                customer_id=context.customer_id,
-                channel_type=context.channel_type
+    async def _finish_response(self, target_agent: str, response: AgentResponse, context: AgentContext,
+                               start_time: datetime, stage_timings: Dict[str, float],
+                               cache_key: Optional[ResponseCacheKey] = None) -> AgentResponse:
+        """Validate an agent response, cache it if it may be reused and record metrics."""
+        # Step 6: Supervisor validation (output)
+        validation_result = await self._timed(
+            'output_validation',
+            self.supervisor.validate_response(response.content, context),
+            stage_timings
+        )
+        if validation_result.metadata and not validation_result.metadata.get('is_safe', True):
+            # Use supervisor's filtered response
+            response.content = validation_result.content
+            response.metadata = response.metadata or {}
+            response.metadata["supervisor_intervention"] = True
+        elif cache_key and not response.requires_handoff and not (response.metadata or {}).get('fallback'):
+            # Canned replies from failed generations must not be served to other askers
+            await self.response_cache.store_async(
+                cache_key, response.content, response.confidence,
+                suggested_actions=response.suggested_actions, metadata=response.metadata
             )
         
-        return self.conversation_contexts[conv_id]
+        # Step 7: Update metrics
+        processing_time = (datetime.now() - start_time).total_seconds()
+        await self._update_performance_metrics(target_agent, response, processing_time, stage_timings)
+        
+        response.metadata = response.metadata or {}
+        response.metadata["stage_timings"] = stage_timings
+        
+        return response
+    
+    def _split_stream_window(self, text: str) -> Tuple[str, str]:
+        """Split streamed text into a window ready for release and the pending rest."""
+        boundaries = list(self._STREAM_BOUNDARY.finditer(text))
+        if boundaries:
+            cut = boundaries[-1].end()
+            return text[:cut], text[cut:]
+        
+        if len(text) > self.stream_window_max_chars:
+            # No sentence end yet; keep a tail so a split PII value is still masked whole
+            cut = text.rfind(' ', 0, len(text) - self.stream_window_holdback) + 1
+            if cut > 0:
+                return text[:cut], text[cut:]
+        
+        return "", text
+    
+    def _error_response(self, error: Exception) -> AgentResponse:
+        return AgentResponse(
+            content="I apologize, but I'm experiencing technical difficulties. Please try again in a moment.",
+            confidence=0.0,
+            intent="error",
+            requires_handoff=True,
+            metadata={"error": str(error)}
+        )
+    
+    async def _filter_and_route(self, message: str, context: AgentContext,
+                                stage_timings: Dict[str, float]):
+        """
+        Run input filtering and intent detection concurrently.
+        
+        Intent detection sees the message with PII masked. If the supervisor
+        blocks the message, intent detection is cancelled and no routing
+        result is returned.
+        """
+        filter_task = asyncio.ensure_future(self._timed(
+            'input_filter', self.supervisor.filter_input(message, context), stage_timings
+        ))
+        routing_task = asyncio.ensure_future(self._timed(
+            'intent_detection',
+            self.router.detect_intent(self.supervisor._mask_pii(message), context),
+            stage_timings
+        ))
+        
+        try:
+            filter_result = await filter_task
+            if not filter_result.is_safe:
+                return filter_result, None
+            return filter_result, await routing_task
+        finally:
+            for task in (filter_task, routing_task):
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # Mark a discarded failure as retrieved
+    
+    async def _timed(self, stage: str, awaitable, stage_timings: Dict[str, float]):
+        """Await a pipeline stage and record its duration in seconds."""
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            stage_timings[stage] = time.perf_counter() - started
+    
+    def _get_or_create_conversation_context(self, context: AgentContext) -> ConversationContext:
+        """Get or create conversation context."""
+        return self.state_store.get_or_create(context)
     
     async def _evaluate_handoff_need(self, routing_result, conv_context: ConversationContext, 
                                    context: AgentContext) -> HandoffDecision:
@@ -234,68 +386,44 @@ class AgentOrchestrator:
             confidence=routing_result.confidence
         )
     
-    def _update_performance_metrics(self, agent_name: str, response: AgentResponse, 
-                                  processing_time: float):
+    async def _update_performance_metrics(self, agent_name: str, response: AgentResponse,
+                                          processing_time: float, stage_timings: Optional[Dict[str, float]] = None):
         """Update performance metrics for an agent."""
-        if agent_name not in self.performance_metrics:
-            self.performance_metrics[agent_name] = AgentPerformanceMetrics(agent_name=agent_name)
-        
-        metrics = self.performance_metrics[agent_name]
-        metrics.total_requests += 1
-        
-        if response.confidence > 0.5:
-            metrics.successful_responses += 1
-        else:
-            metrics.failed_responses += 1
-        
-        # Update average response time
-        total_time = metrics.average_response_time * (metrics.total_requests - 1) + processing_time
-        metrics.average_response_time = total_time / metrics.total_requests
-        
-        # Track confidence scores
-        metrics.confidence_scores.append(response.confidence)
-        if len(metrics.confidence_scores) > 100:  # Keep last 100 scores
-            metrics.confidence_scores = metrics.confidence_scores[-100:]
-        
-        if response.requires_handoff:
-            metrics.handoff_requests += 1
-        
-        metrics.last_updated = datetime.now()
+        await self.state_store.record_agent_response_async(
+            agent_name,
+            confidence=response.confidence,
+            requires_handoff=response.requires_handoff,
+            processing_time=processing_time,
+            stage_timings=stage_timings
+        )
     
     def get_performance_metrics(self, agent_name: Optional[str] = None) -> Dict[str, Any]:
         """Get performance metrics for agents."""
+        performance_metrics = self.performance_metrics
         if agent_name:
-            if agent_name in self.performance_metrics:
-                return self.performance_metrics[agent_name].__dict__
+            if agent_name in performance_metrics:
+                return performance_metrics[agent_name].__dict__
             return {}
         
-        return {name: metrics.__dict__ for name, metrics in self.performance_metrics.items()}
+        return {name: metrics.__dict__ for name, metrics in performance_metrics.items()}
     
     def get_conversation_context(self, conversation_id: str) -> Optional[ConversationContext]:
         """Get conversation context by ID."""
-        return self.conversation_contexts.get(conversation_id)
+        return self.state_store.get(conversation_id)
     
-    def cleanup_expired_contexts(self):
+    def cleanup_expired_contexts(self) -> int:
         """Clean up expired conversation contexts."""
-        current_time = datetime.now()
-        expired_contexts = []
-        
-        for conv_id, context in self.conversation_contexts.items():
-            if current_time - context.last_activity > self.max_conversation_age:
-                expired_contexts.append(conv_id)
-        
-        for conv_id in expired_contexts:
-            del self.conversation_contexts[conv_id]
-        
-        if expired_contexts:
-            self.logger.info(f"Cleaned up {len(expired_contexts)} expired conversation contexts")
+        removed = self.state_store.cleanup_expired()
+        if removed:
+            self.logger.info(f"Cleaned up {removed} expired conversation contexts")
+        return removed
     
     async def health_check(self) -> Dict[str, Any]:
         """Perform health check on all agents."""
         health_status = {
             "orchestrator": "healthy",
             "agents": {},
-            "conversation_contexts": len(self.conversation_contexts),
+            "conversation_contexts": await self.state_store.count_async(),
             "performance_metrics": {}
         }
         
@@ -321,8 +449,20 @@ class AgentOrchestrator:
             except Exception as e:
                 health_status["agents"][name] = f"unhealthy: {str(e)}"
         
+        # Check the shared conversation state; requests fall back to memory while it is down
+        try:
+            await self.state_store.health_check()
+            health_status["conversation_state"] = "healthy"
+        except Exception as e:
+            health_status["conversation_state"] = f"unhealthy: {str(e)}"
+        
+        # Share of messages routed without an LLM call
+        health_status["routing"] = self.router.get_routing_metrics()
+        health_status["response_cache"] = self.response_cache.get_stats()
+        
         # Add performance summary
-        for name, metrics in self.performance_metrics.items():
+        performance_metrics = await self.state_store.all_agent_metrics_async(self.agents)
+        for name, metrics in performance_metrics.items():
             success_rate = 0
             if metrics.total_requests > 0:
                 success_rate = metrics.successful_responses / metrics.total_requests
@@ -375,7 +515,7 @@ class AgentOrchestrator:
             'orchestrator': {
                 'status': 'active',
                 'agents_count': len(self.agents),
-                'conversation_contexts': len(self.conversation_contexts)
+                'conversation_contexts': await self.state_store.count_async()
             },
             'router': {
                 'status': 'active'
@@ -1,10 +1,26 @@
 """Router Agent for intent detection and message routing."""
 
+import os
 import json
 import re
-from typing import Dict, Any, Optional, List
+import logging
+from typing import Dict, Any, Iterable, Optional, List, Tuple
 from dataclasses import dataclass
+from flask import current_app
 from .base_agent import BaseAgent, AgentContext, AgentResponse
+from .intent_classifier import KeywordIntentMatcher, LocalIntentClassifier
+
+
+logger = logging.getLogger(__name__)
+
+ROUTING_TIERS = ('keyword', 'classifier', 'llm')
+
+
+def _config(key: str, default=None):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        return default
 
 
 @dataclass
@@ -15,12 +31,27 @@ class IntentResult:
     language: str
     customer_context: Dict[str, Any]
     routing_metadata: Dict[str, Any]
+    message: str = ""
+    
+    @property
+    def intent(self) -> str:
+        """Alias of category, as used by the orchestrator."""
+        return self.category
 
 
 class RouterAgent(BaseAgent):
-    """Agent responsible for detecting intent and routing messages to specialized agents."""
+    """
+    Agent responsible for detecting intent and routing messages to specialized agents.
+    
+    Intent detection is tiered: compiled keyword patterns first, then a
+    local classifier trained on logged intents, and only messages neither
+    is confident about go to the LLM.
+    """
+    
+    # Trained classifiers by model path and modification time
+    _classifier_cache: Dict[Tuple[str, float], LocalIntentClassifier] = {}
     
-    def __init__(self):
+    def __init__(self, fast_path: bool = None, classifier: LocalIntentClassifier = None):
         super().__init__("RouterAgent")
         self.intent_categories = {
             'sales': ['quote', 'pricing', 'product', 'demo', 'purchase', 'buy'],
@@ -29,6 +60,29 @@ class RouterAgent(BaseAgent):
             'operations': ['general', 'information', 'hours', 'contact', 'location']
         }
         self.supported_languages = ['en', 'de', 'uk', 'es', 'fr']
+        
+        self.fast_path_enabled = _config('INTENT_FAST_PATH_ENABLED', True) if fast_path is None else fast_path
+        self.keyword_threshold = float(_config('INTENT_KEYWORD_THRESHOLD', 0.85))
+        self.classifier_threshold = float(_config('INTENT_CLASSIFIER_THRESHOLD', 0.8))
+        self.keyword_matcher = KeywordIntentMatcher(self.intent_categories)
+        self.classifier = classifier if classifier is not None else \
+            self._load_classifier(_config('INTENT_CLASSIFIER_PATH'))
+        self.routing_stats = {tier: 0 for tier in ROUTING_TIERS}
+    
+    @classmethod
+    def _load_classifier(cls, path: Optional[str]) -> Optional[LocalIntentClassifier]:
+        """Load the trained classifier if one has been written."""
+        if not path or not os.path.exists(path):
+            return None
+        
+        key = (path, os.path.getmtime(path))
+        if key not in cls._classifier_cache:
+            try:
+                cls._classifier_cache[key] = LocalIntentClassifier.load(path)
+            except Exception as e:
+                logger.warning(f"Failed to load intent classifier from {path}: {str(e)}")
+                return None
+        return cls._classifier_cache[key]
     
     async def process(self, message: str, context: AgentContext) -> AgentResponse:
         """Process message for intent detection and routing."""
@@ -65,6 +119,111 @@ class RouterAgent(BaseAgent):
             )
     
     async def detect_intent(self, message: str, context: AgentContext) -> IntentResult:
+        """Detect the intent of the message, asking OpenAI only for ambiguous messages."""
+        if self.fast_path_enabled:
+            result = self.classify_locally(message)
+            if result:
+                self.routing_stats[result.routing_metadata['tier']] += 1
+                return result
+        
+        self.routing_stats['llm'] += 1
+        return await self._detect_intent_with_llm(message, context)
+    
+    def classify_locally(self, message: str) -> Optional[IntentResult]:
+        """
+        Classify a message without the LLM.
+        
+        Returns:
+            Intent result, or None if no local tier is confident enough
+        """
+        category, confidence, keywords = self.keyword_matcher.match(message)
+        if category and confidence >= self.keyword_threshold:
+            return self._local_intent_result(message, category, confidence, 'keyword', keywords)
+        
+        if self.classifier is not None and self.classifier.is_trained:
+            try:
+                predicted, probability = self.classifier.predict(message)
+            except Exception as e:
+                self.logger.warning(f"Local intent classifier failed: {str(e)}")
+                return None
+            if predicted and probability >= self.classifier_threshold:
+                return self._local_intent_result(message, predicted, probability, 'classifier', keywords)
+        
+        return None
+    
+    def _local_intent_result(self, message: str, category: str, confidence: float,
+                             tier: str, keywords: List[str]) -> IntentResult:
+        urgent = any(word in message.lower() for word in ['urgent', 'asap', 'immediately', 'emergency'])
+        return IntentResult(
+            category=category,
+            confidence=confidence,
+            language=self._detect_language_simple(message),
+            customer_context={
+                'urgency': 'high' if urgent else 'medium',
+                'sentiment': 'neutral',
+                'complexity': 'simple' if len(message) < 200 else 'medium'
+            },
+            routing_metadata={
+                'keywords': keywords,
+                'entities': [],
+                'priority': 'high' if urgent else 'medium',
+                'tier': tier,
+                'llm_bypassed': True
+            },
+            message=message
+        )
+    
+    def get_routing_metrics(self) -> Dict[str, Any]:
+        """Messages routed per tier and the share answered without the LLM."""
+        total = sum(self.routing_stats.values())
+        bypassed = total - self.routing_stats['llm']
+        return {
+            'total': total,
+            'by_tier': dict(self.routing_stats),
+            'llm_bypass_rate': bypassed / total if total else 0.0
+        }
+    
+    async def evaluate_replay(self, samples: Iterable[Tuple[str, str]], context: AgentContext = None,
+                              use_llm: bool = False) -> Dict[str, Any]:
+        """
+        Measure routing against labelled (message, intent) pairs.
+        
+        Messages the local tiers do not answer count as LLM-routed; they are
+        only sent to the LLM and scored when use_llm is set. Routing
+        counters are not changed.
+        """
+        context = context or AgentContext(tenant_id='replay')
+        tiers = {tier: {'count': 0, 'correct': 0} for tier in ROUTING_TIERS}
+        
+        for message, expected in samples:
+            result = self.classify_locally(message) if self.fast_path_enabled else None
+            tier = result.routing_metadata['tier'] if result else 'llm'
+            tiers[tier]['count'] += 1
+            
+            if result is None and use_llm:
+                result = await self._detect_intent_with_llm(message, context)
+            if result is not None and result.category == expected:
+                tiers[tier]['correct'] += 1
+        
+        for tier, stats in tiers.items():
+            scored = stats['count'] and (tier != 'llm' or use_llm)
+            stats['accuracy'] = stats['correct'] / stats['count'] if scored else None
+        
+        total = sum(stats['count'] for stats in tiers.values())
+        bypassed = total - tiers['llm']['count']
+        bypass_correct = tiers['keyword']['correct'] + tiers['classifier']['correct']
+        evaluated = total if use_llm else bypassed
+        correct = bypass_correct + (tiers['llm']['correct'] if use_llm else 0)
+        
+        return {
+            'samples': total,
+            'llm_bypass_rate': bypassed / total if total else 0.0,
+            'bypass_accuracy': bypass_correct / bypassed if bypassed else None,
+            'accuracy': correct / evaluated if evaluated else None,
+            'by_tier': tiers
+        }
+    
+    async def _detect_intent_with_llm(self, message: str, context: AgentContext) -> IntentResult:
         """Detect the intent of the message using OpenAI."""
         system_prompt = self._create_intent_detection_prompt()
         
@@ -77,12 +236,16 @@ class RouterAgent(BaseAgent):
             response = await self._call_openai(messages, context)
             intent_data = json.loads(response)
             
+            routing_metadata = dict(intent_data.get('routing_metadata', {}))
+            routing_metadata['tier'] = 'llm'
+            
             return IntentResult(
                 category=intent_data.get('category', 'operations'),
                 confidence=intent_data.get('confidence', 0.5),
                 language=intent_data.get('language', 'en'),
                 customer_context=intent_data.get('customer_context', {}),
-                routing_metadata=intent_data.get('routing_metadata', {})
+                routing_metadata=routing_metadata,
+                message=message
             )
             
         except (json.JSONDecodeError, KeyError) as e:
@@ -166,8 +329,10 @@ Guidelines:
                 'keywords': [kw for kw in self.intent_categories.get(best_category, []) if kw in message_lower],
                 'entities': [],
                 'priority': 'medium',
-                'fallback_used': True
-            }
+                'fallback_used': True,
+                'tier': 'llm'
+            },
+            message=message
         )
     
     def _detect_language_simple(self, message: str) -> str:
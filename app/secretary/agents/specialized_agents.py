@@ -1,6 +1,7 @@
 """Specialized AI agents for different business functions."""
 
 import json
+import asyncio
 from typing import Dict, Any, List, Optional
 from .base_agent import BaseAgent, AgentContext, AgentResponse
 from app.services.knowledge_service import KnowledgeService
@@ -12,6 +13,9 @@ from app.models.pipeline import Pipeline
 class SalesAgent(BaseAgent):
     """Agent specialized in handling sales inquiries and lead qualification."""
     
+    # Canned reply used when response generation fails; never cached
+    FALLBACK_RESPONSE = "Thank you for your interest in our AI Secretary platform. I'd be happy to help you with information about our features and pricing. Could you tell me more about what you're looking for?"
+    
     def __init__(self):
         super().__init__("SalesAgent")
         self.sales_keywords = [
@@ -29,16 +33,19 @@ class SalesAgent(BaseAgent):
     async def process(self, message: str, context: AgentContext) -> AgentResponse:
         """Process sales-related messages with lead qualification and knowledge integration."""
         try:
-            # Search knowledge base for relevant sales information
-            knowledge_results = await self._search_knowledge(message, context)
-            
-            # Analyze sales intent and qualification level
-            sales_analysis = await self._analyze_sales_intent(message, context)
+            # Search knowledge base and analyze qualification level concurrently
+            knowledge_results, sales_analysis = await asyncio.gather(
+                self._search_knowledge(message, context),
+                self._analyze_sales_intent(message, context)
+            )
             
             # Generate contextual response
             response_content = await self._generate_sales_response(
                 message, context, knowledge_results, sales_analysis
             )
+            fallback = response_content is None
+            if fallback:
+                response_content = self.FALLBACK_RESPONSE
             
             # Determine if lead creation is needed
             should_create_lead = self._should_create_lead(sales_analysis, context)
@@ -51,6 +58,7 @@ class SalesAgent(BaseAgent):
                 suggested_actions=self._get_suggested_actions(sales_analysis, should_create_lead),
                 metadata={
                     'sales_analysis': sales_analysis,
+                    'fallback': fallback,
                     'knowledge_sources': [r.get('citations') for r in knowledge_results],
                     'should_create_lead': should_create_lead,
                     'qualification_level': sales_analysis.get('qualification_level', 'low')
@@ -67,7 +75,7 @@ class SalesAgent(BaseAgent):
                 confidence=0.5,
                 intent='sales',
                 requires_handoff=True,
-                metadata={'error': str(e)}
+                metadata={'error': str(e), 'fallback': True}
             )
     
     async def _search_knowledge(self, message: str, context: AgentContext) -> List[Dict[str, Any]]:
@@ -77,7 +85,7 @@ class SalesAgent(BaseAgent):
             search_query = self._extract_search_terms(message)
             
             # Search knowledge base
-            results = KnowledgeService.search_knowledge(
+            results = await KnowledgeService.search_knowledge_async(
                 tenant_id=int(context.tenant_id),
                 query=search_query,
                 limit=5,
@@ -175,7 +183,7 @@ Keywords indicating sales intent: {', '.join(self.sales_keywords)}"""
         }
     
     async def _generate_sales_response(self, message: str, context: AgentContext, 
-                                     knowledge_results: List[Dict], sales_analysis: Dict) -> str:
+                                     knowledge_results: List[Dict], sales_analysis: Dict) -> Optional[str]:
         """Generate contextual sales response."""
         # Prepare knowledge context
         knowledge_context = ""
@@ -213,10 +221,10 @@ Generate a helpful response to their inquiry."""
         ]
         
         try:
-            return await self._call_openai(messages, context)
+            return await self._call_openai(messages, context, stream=True)
         except Exception as e:
             self.logger.error(f"Sales response generation failed: {str(e)}")
-            return "Thank you for your interest in our AI Secretary platform. I'd be happy to help you with information about our features and pricing. Could you tell me more about what you're looking for?"
+            return None
     
     def _extract_search_terms(self, message: str) -> str:
         """Extract key terms for knowledge base search."""
@@ -268,6 +276,9 @@ Generate a helpful response to their inquiry."""
 class SupportAgent(BaseAgent):
     """Agent specialized in handling technical support and troubleshooting."""
     
+    # Canned reply used when response generation fails; never cached
+    FALLBACK_RESPONSE = "I understand you're experiencing an issue. Let me connect you with our technical support team who can provide immediate assistance."
+    
     def __init__(self):
         super().__init__("SupportAgent")
         self.support_keywords = [
@@ -284,16 +295,19 @@ class SupportAgent(BaseAgent):
     async def process(self, message: str, context: AgentContext) -> AgentResponse:
         """Process support requests with knowledge base integration."""
         try:
-            # Search knowledge base for solutions
-            knowledge_results = await self._search_support_knowledge(message, context)
-            
-            # Analyze support request
-            support_analysis = await self._analyze_support_request(message, context)
+            # Search knowledge base for solutions and analyze the request concurrently
+            knowledge_results, support_analysis = await asyncio.gather(
+                self._search_support_knowledge(message, context),
+                self._analyze_support_request(message, context)
+            )
             
             # Generate support response
             response_content = await self._generate_support_response(
                 message, context, knowledge_results, support_analysis
             )
+            fallback = response_content is None
+            if fallback:
+                response_content = self.FALLBACK_RESPONSE
             
             response = AgentResponse(
                 content=response_content,
@@ -303,6 +317,7 @@ class SupportAgent(BaseAgent):
                 suggested_actions=self._get_support_actions(support_analysis),
                 metadata={
                     'support_analysis': support_analysis,
+                    'fallback': fallback,
                     'knowledge_sources': [r.get('citations') for r in knowledge_results],
                     'severity': support_analysis.get('severity', 'medium'),
                     'category': support_analysis.get('category', 'general')
@@ -319,7 +334,7 @@ class SupportAgent(BaseAgent):
                 confidence=0.5,
                 intent='support',
                 requires_handoff=True,
-                metadata={'error': str(e)}
+                metadata={'error': str(e), 'fallback': True}
             )
     
     async def _search_support_knowledge(self, message: str, context: AgentContext) -> List[Dict[str, Any]]:
@@ -328,7 +343,7 @@ class SupportAgent(BaseAgent):
             # Focus search on technical terms and error messages
             search_query = self._extract_technical_terms(message)
             
-            results = KnowledgeService.search_knowledge(
+            results = await KnowledgeService.search_knowledge_async(
                 tenant_id=int(context.tenant_id),
                 query=search_query,
                 limit=5,
@@ -424,7 +439,7 @@ Support keywords: {', '.join(self.support_keywords)}"""
         }
     
     async def _generate_support_response(self, message: str, context: AgentContext,
-                                       knowledge_results: List[Dict], support_analysis: Dict) -> str:
+                                       knowledge_results: List[Dict], support_analysis: Dict) -> Optional[str]:
         """Generate contextual support response."""
         # Prepare knowledge context
         knowledge_context = ""
@@ -462,10 +477,10 @@ Generate a helpful support response."""
         ]
         
         try:
-            return await self._call_openai(messages, context)
+            return await self._call_openai(messages, context, stream=True)
         except Exception as e:
             self.logger.error(f"Support response generation failed: {str(e)}")
-            return "I understand you're experiencing an issue. Let me connect you with our technical support team who can provide immediate assistance."
+            return None
     
     def _extract_technical_terms(self, message: str) -> str:
         """Extract technical terms for knowledge search."""
@@ -508,6 +523,9 @@ Generate a helpful support response."""
 class BillingAgent(BaseAgent):
     """Agent specialized in handling billing and subscription inquiries."""
     
+    # Canned reply used when response generation fails; never cached
+    FALLBACK_RESPONSE = "I understand you have a billing question. For account security and to access your specific billing information, let me connect you with our billing team."
+    
     def __init__(self):
         super().__init__("BillingAgent")
         self.billing_keywords = [
@@ -525,16 +543,19 @@ class BillingAgent(BaseAgent):
     async def process(self, message: str, context: AgentContext) -> AgentResponse:
         """Process billing inquiries with account integration."""
         try:
-            # Search knowledge base for billing information
-            knowledge_results = await self._search_billing_knowledge(message, context)
-            
-            # Analyze billing request
-            billing_analysis = await self._analyze_billing_request(message, context)
+            # Search knowledge base for billing information and analyze the request concurrently
+            knowledge_results, billing_analysis = await asyncio.gather(
+                self._search_billing_knowledge(message, context),
+                self._analyze_billing_request(message, context)
+            )
             
             # Generate billing response
             response_content = await self._generate_billing_response(
                 message, context, knowledge_results, billing_analysis
             )
+            fallback = response_content is None
+            if fallback:
+                response_content = self.FALLBACK_RESPONSE
             
             response = AgentResponse(
                 content=response_content,
@@ -544,6 +565,7 @@ class BillingAgent(BaseAgent):
                 suggested_actions=self._get_billing_actions(billing_analysis),
                 metadata={
                     'billing_analysis': billing_analysis,
+                    'fallback': fallback,
                     'knowledge_sources': [r.get('citations') for r in knowledge_results],
                     'category': billing_analysis.get('category', 'general'),
                     'sensitive_data': billing_analysis.get('contains_sensitive_data', False)
@@ -560,7 +582,7 @@ class BillingAgent(BaseAgent):
                 confidence=0.5,
                 intent='billing',
                 requires_handoff=True,
-                metadata={'error': str(e)}
+                metadata={'error': str(e), 'fallback': True}
             )
     
     async def _search_billing_knowledge(self, message: str, context: AgentContext) -> List[Dict[str, Any]]:
@@ -568,7 +590,7 @@ class BillingAgent(BaseAgent):
         try:
             search_query = self._extract_billing_terms(message)
             
-            results = KnowledgeService.search_knowledge(
+            results = await KnowledgeService.search_knowledge_async(
                 tenant_id=int(context.tenant_id),
                 query=search_query,
                 limit=5,
@@ -664,7 +686,7 @@ Billing keywords: {', '.join(self.billing_keywords)}"""
         }
     
     async def _generate_billing_response(self, message: str, context: AgentContext,
-                                       knowledge_results: List[Dict], billing_analysis: Dict) -> str:
+                                       knowledge_results: List[Dict], billing_analysis: Dict) -> Optional[str]:
         """Generate contextual billing response."""
         # Prepare knowledge context
         knowledge_context = ""
@@ -703,10 +725,10 @@ Generate a helpful billing response while maintaining security."""
         ]
         
         try:
-            return await self._call_openai(messages, context)
+            return await self._call_openai(messages, context, stream=True)
         except Exception as e:
             self.logger.error(f"Billing response generation failed: {str(e)}")
-            return "I understand you have a billing question. For account security and to access your specific billing information, let me connect you with our billing team."
+            return None
     
     def _extract_billing_terms(self, message: str) -> str:
         """Extract billing-related terms for knowledge search."""
@@ -747,6 +769,9 @@ Generate a helpful billing response while maintaining security."""
 class OperationsAgent(BaseAgent):
     """Agent specialized in handling general business operations and inquiries."""
     
+    # Canned reply used when response generation fails; never cached
+    FALLBACK_RESPONSE = "Thank you for your question. I'm here to help with general information about our business. Could you please provide more details about what you'd like to know?"
+    
     def __init__(self):
         super().__init__("OperationsAgent")
         self.operations_keywords = [
@@ -764,16 +789,19 @@ class OperationsAgent(BaseAgent):
     async def process(self, message: str, context: AgentContext) -> AgentResponse:
         """Process general operations inquiries."""
         try:
-            # Search knowledge base for general information
-            knowledge_results = await self._search_operations_knowledge(message, context)
-            
-            # Analyze operations request
-            ops_analysis = await self._analyze_operations_request(message, context)
+            # Search knowledge base for general information and analyze the request concurrently
+            knowledge_results, ops_analysis = await asyncio.gather(
+                self._search_operations_knowledge(message, context),
+                self._analyze_operations_request(message, context)
+            )
             
             # Generate operations response
             response_content = await self._generate_operations_response(
                 message, context, knowledge_results, ops_analysis
             )
+            fallback = response_content is None
+            if fallback:
+                response_content = self.FALLBACK_RESPONSE
             
             response = AgentResponse(
                 content=response_content,
@@ -783,6 +811,7 @@ class OperationsAgent(BaseAgent):
                 suggested_actions=self._get_operations_actions(ops_analysis),
                 metadata={
                     'operations_analysis': ops_analysis,
+                    'fallback': fallback,
                     'knowledge_sources': [r.get('citations') for r in knowledge_results],
                     'inquiry_type': ops_analysis.get('inquiry_type', 'general')
                 }
@@ -798,7 +827,7 @@ class OperationsAgent(BaseAgent):
                 confidence=0.5,
                 intent='operations',
                 requires_handoff=False,
-                metadata={'error': str(e)}
+                metadata={'error': str(e), 'fallback': True}
             )
     
     async def _search_operations_knowledge(self, message: str, context: AgentContext) -> List[Dict[str, Any]]:
@@ -806,7 +835,7 @@ class OperationsAgent(BaseAgent):
         try:
             search_query = self._extract_operations_terms(message)
             
-            results = KnowledgeService.search_knowledge(
+            results = await KnowledgeService.search_knowledge_async(
                 tenant_id=int(context.tenant_id),
                 query=search_query,
                 limit=5,
@@ -899,7 +928,7 @@ Operations keywords: {', '.join(self.operations_keywords)}"""
         }
     
     async def _generate_operations_response(self, message: str, context: AgentContext,
-                                          knowledge_results: List[Dict], ops_analysis: Dict) -> str:
+                                          knowledge_results: List[Dict], ops_analysis: Dict) -> Optional[str]:
         """Generate contextual operations response."""
         # Prepare knowledge context
         knowledge_context = ""
@@ -936,10 +965,10 @@ Generate a helpful operations response."""
         ]
         
         try:
-            return await self._call_openai(messages, context)
+            return await self._call_openai(messages, context, stream=True)
         except Exception as e:
             self.logger.error(f"Operations response generation failed: {str(e)}")
-            return "Thank you for your question. I'm here to help with general information about our business. Could you please provide more details about what you'd like to know?"
+            return None
     
     def _extract_operations_terms(self, message: str) -> str:
         """Extract operations-related terms for knowledge search."""
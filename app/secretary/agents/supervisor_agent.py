@@ -2,9 +2,10 @@
 
 import re
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 from .base_agent import BaseAgent, AgentContext, AgentResponse
+from app.utils.text_scanner import PatternScanner, ScanMatch, word_list_pattern
 
 
 @dataclass
@@ -44,24 +45,43 @@ class PolicyViolation:
 class SupervisorAgent(BaseAgent):
     """Agent responsible for content filtering, PII detection, and policy enforcement."""
     
+    # Toxic language by category, matched as whole words
+    TOXIC_WORDS = {
+        'profanity': ['fuck', 'fucking', 'shit', 'damn', 'bitch', 'asshole', 'bastard'],
+        'insult': ['idiot', 'stupid', 'moron', 'retard'],
+        'violence': ['hate', 'kill', 'die', 'murder']
+    }
+    
+    # PII patterns in match priority order: where two overlap, the first wins
+    PII_PATTERNS = {
+        'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+        'credit_card': r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',
+        'iban': r'\b[A-Z]{2}\d{2}[A-Z0-9]{4}\d{7}([A-Z0-9]?){0,16}\b',
+        'ssn': r'\b\d{3}-\d{2}-\d{4}\b',
+        'phone': r'\b(?:\+?1[-.\s]?)?\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}\b'
+    }
+    
+    PII_PLACEHOLDERS = {
+        'email': '[EMAIL_REDACTED]',
+        'credit_card': '[CARD_REDACTED]',
+        'iban': '[IBAN_REDACTED]',
+        'ssn': '[SSN_REDACTED]',
+        'phone': '[PHONE_REDACTED]'
+    }
+    
+    _content_scanner: Optional[PatternScanner] = None
+    
     def __init__(self):
         super().__init__("SupervisorAgent")
         
         # Toxic language patterns
-        self.toxic_patterns = [
-            r'\b(fuck|fucking|shit|damn|bitch|asshole|bastard)\b',
-            r'\b(idiot|stupid|moron|retard)\b',
-            r'\b(hate|kill|die|murder)\b'
-        ]
+        self.toxic_patterns = [word_list_pattern(words) for words in self.TOXIC_WORDS.values()]
         
         # PII patterns
-        self.pii_patterns = {
-            'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            'phone': r'\b(?:\+?1[-.\s]?)?\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}\b',
-            'ssn': r'\b\d{3}-\d{2}-\d{4}\b',
-            'credit_card': r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',
-            'iban': r'\b[A-Z]{2}\d{2}[A-Z0-9]{4}\d{7}([A-Z0-9]?){0,16}\b'
-        }
+        self.pii_patterns = dict(self.PII_PATTERNS)
+        
+        # PII and toxic language are found in one pass over the content
+        self.content_scanner = self._get_content_scanner()
         
         # Compliance keywords that require special handling
         self.compliance_keywords = [
@@ -117,19 +137,13 @@ class SupervisorAgent(BaseAgent):
         filtered_content = content
         is_safe = True
         
-        # Check for toxic language
-        toxic_violations = self._detect_toxic_content(content)
+        # Check for toxic language and PII, masking both
+        toxic_violations, pii_violations, filtered_content = self._scan_content(content)
+        violations.extend(toxic_violations)
+        violations.extend(pii_violations)
         if toxic_violations:
-            violations.extend(toxic_violations)
-            filtered_content = self._mask_toxic_content(filtered_content)
             is_safe = False
         
-        # Check for PII
-        pii_violations = self._detect_pii(content)
-        if pii_violations:
-            violations.extend(pii_violations)
-            filtered_content = self._mask_pii(filtered_content)
-        
         # Use OpenAI for advanced content analysis
         ai_analysis = await self._analyze_content_with_ai(content, context)
         if ai_analysis.get('violations'):
@@ -163,88 +177,69 @@ class SupervisorAgent(BaseAgent):
             requires_human_review=requires_human_review
         )
     
-    def _detect_toxic_content(self, content: str) -> List[str]:
-        """Detect toxic language using pattern matching."""
+    @classmethod
+    def _get_content_scanner(cls) -> PatternScanner:
+        """Get the scanner shared by all supervisors, compiling it on first use."""
+        if cls._content_scanner is None:
+            patterns = dict(cls.PII_PATTERNS)
+            patterns.update(
+                (category, word_list_pattern(words)) for category, words in cls.TOXIC_WORDS.items()
+            )
+            cls._content_scanner = PatternScanner(patterns, start=r'\b|(?=[(+])')
+        return cls._content_scanner
+    
+    def _scan_content(self, content: str) -> Tuple[List[str], List[str], str]:
+        """
+        Detect and mask toxic language and PII in a single pass.
+        
+        Returns:
+            Tuple of (toxic violations, PII violations, masked content)
+        """
+        filtered_content, matches = self.content_scanner.mask(content, self._mask_match)
+        return self._toxic_violations(matches), self._pii_violations(matches), filtered_content
+    
+    def _mask_match(self, match: ScanMatch) -> Optional[str]:
+        if match.type in self.TOXIC_WORDS:
+            return '*' * len(match.value)
+        return self.PII_PLACEHOLDERS.get(match.type)
+    
+    def _toxic_violations(self, matches: List[ScanMatch]) -> List[str]:
         violations = []
-        content_lower = content.lower()
-        
-        for pattern in self.toxic_patterns:
-            matches = re.findall(pattern, content_lower, re.IGNORECASE)
-            if matches:
-                violations.append(f"Toxic language detected: {', '.join(matches)}")
-        
+        for category in self.TOXIC_WORDS:
+            words = [match.value.lower() for match in matches if match.type == category]
+            if words:
+                violations.append(f"Toxic language detected: {', '.join(words)}")
         return violations
     
-    def _detect_pii(self, content: str) -> List[str]:
-        """Detect personally identifiable information."""
+    def _pii_violations(self, matches: List[ScanMatch]) -> List[str]:
         violations = []
-        
-        for pii_type, pattern in self.pii_patterns.items():
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            if matches:
-                violations.append(f"PII detected ({pii_type}): {len(matches)} instances")
-        
+        for pii_type in self.PII_PATTERNS:
+            count = sum(1 for match in matches if match.type == pii_type)
+            if count:
+                violations.append(f"PII detected ({pii_type}): {count} instances")
         return violations
     
+    def _detect_toxic_content(self, content: str) -> List[str]:
+        """Detect toxic language using pattern matching."""
+        return self._toxic_violations(self.content_scanner.scan(content))
+    
+    def _detect_pii(self, content: str) -> List[str]:
+        """Detect personally identifiable information."""
+        return self._pii_violations(self.content_scanner.scan(content))
+    
     def _mask_toxic_content(self, content: str) -> str:
         """Mask toxic content with asterisks."""
-        filtered_content = content
-        
-        for pattern in self.toxic_patterns:
-            # Extract the words from the pattern (remove \b and parentheses)
-            words = pattern.replace(r'\b', '').replace('(', '').replace(')', '').split('|')
-            for word in words:
-                # Replace each word individually with case-insensitive matching
-                word_pattern = r'\b' + re.escape(word) + r'\b'
-                filtered_content = re.sub(
-                    word_pattern, 
-                    '*' * len(word), 
-                    filtered_content, 
-                    flags=re.IGNORECASE
-                )
-        
-        return filtered_content
+        return self.content_scanner.mask(
+            content,
+            lambda match: '*' * len(match.value) if match.type in self.TOXIC_WORDS else None
+        )[0]
     
     def _mask_pii(self, content: str) -> str:
         """Mask PII with appropriate placeholders."""
-        filtered_content = content
-        
-        # Mask emails
-        filtered_content = re.sub(
-            self.pii_patterns['email'], 
-            '[EMAIL_REDACTED]', 
-            filtered_content
-        )
-        
-        # Mask phone numbers
-        filtered_content = re.sub(
-            self.pii_patterns['phone'], 
-            '[PHONE_REDACTED]', 
-            filtered_content
-        )
-        
-        # Mask SSN
-        filtered_content = re.sub(
-            self.pii_patterns['ssn'], 
-            '[SSN_REDACTED]', 
-            filtered_content
-        )
-        
-        # Mask credit cards
-        filtered_content = re.sub(
-            self.pii_patterns['credit_card'], 
-            '[CARD_REDACTED]', 
-            filtered_content
-        )
-        
-        # Mask IBAN
-        filtered_content = re.sub(
-            self.pii_patterns['iban'], 
-            '[IBAN_REDACTED]', 
-            filtered_content
-        )
-        
-        return filtered_content
+        return self.content_scanner.mask(
+            content,
+            lambda match: self.PII_PLACEHOLDERS.get(match.type)
+        )[0]
     
     async def _analyze_content_with_ai(self, content: str, context: AgentContext) -> Dict[str, Any]:
         """Use OpenAI to analyze content for safety and appropriateness."""
@@ -384,6 +379,16 @@ Guidelines:
             }
         )
     
+    def filter_stream_window(self, content: str) -> str:
+        """
+        Mask toxic language and PII in a window of a streamed response.
+        
+        Uses the pattern checks only so windows can be released without an
+        extra model call; the complete response still goes through
+        validate_response once streaming finishes.
+        """
+        return self._scan_content(content)[2]
+    
     def get_safety_report(self, content: str, filter_result: FilterResult) -> Dict[str, Any]:
         """Generate a safety report for audit purposes."""
         return {
@@ -0,0 +1,260 @@
+"""Streaming ingestion pipeline for uploaded knowledge documents."""
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, Iterator, List
+from flask import current_app
+from app import db
+from app.models.knowledge import Document, Chunk, Embedding
+from app.services.document_processor import DocumentProcessor
+from app.services.embedding_service import EmbeddingService
+from app.services.text_chunker import TextChunker
+from app.services.vector_index import vector_index_manager
+from app.services.response_cache import response_cache
+from app.utils.exceptions import ProcessingError
+
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentIngestionPipeline:
+    """
+    Extract, chunk, store and embed a document as a stream.
+
+    Pages flow through extraction, chunking, batched chunk inserts and
+    batched embedding without the whole document being held in memory.
+    Progress is written to the document after every batch so it can be
+    polled while a worker is processing it.
+    """
+
+    # Chunks inserted and embedded per batch
+    DEFAULT_BATCH_SIZE = 64
+
+    # Characters of extracted text kept on Document.content
+    DEFAULT_CONTENT_LIMIT = 1000000
+
+    def __init__(self, tenant_id: int, batch_size: int = None, content_limit: int = None):
+        """
+        Initialize ingestion pipeline.
+
+        Args:
+            tenant_id: Tenant owning the documents
+            batch_size: Chunks inserted and embedded per batch
+            content_limit: Characters of extracted text kept on the document
+        """
+        self.tenant_id = tenant_id
+        self.batch_size = batch_size or current_app.config.get(
+            'KNOWLEDGE_INGESTION_BATCH_SIZE', self.DEFAULT_BATCH_SIZE
+        )
+        self.content_limit = content_limit or current_app.config.get(
+            'KNOWLEDGE_DOCUMENT_CONTENT_LIMIT', self.DEFAULT_CONTENT_LIMIT
+        )
+        self.chunker = TextChunker()
+        self._embedding_service = None
+
+    @property
+    def embedding_service(self) -> EmbeddingService:
+        """Create the embedding service on first use."""
+        if self._embedding_service is None:
+            self._embedding_service = EmbeddingService()
+        return self._embedding_service
+
+    def run(self, document_id: int) -> Dict[str, Any]:
+        """
+        Ingest an uploaded document from its stored file.
+
+        Returns:
+            Final progress dictionary
+        """
+        document = Document.get_by_id(document_id)
+        if not document or document.tenant_id != self.tenant_id:
+            raise ProcessingError("Document not found")
+
+        try:
+            metadata, sections = DocumentProcessor.stream_text_from_file(
+                document.file_path, document.mime_type
+            )
+
+            # Metadata title only replaces the filename placeholder
+            if metadata.get('title') and document.title == document.filename:
+                document.title = metadata['title']
+
+            return self.ingest(document, sections, metadata)
+
+        except Exception as e:
+            db.session.rollback()
+            document.mark_as_error()
+            document.update_progress(stage='error', error=str(e))
+            document.save()
+
+            logger.error(f"Failed to ingest document {document_id}: {str(e)}")
+            if isinstance(e, ProcessingError):
+                raise
+            raise ProcessingError(f"Failed to ingest document: {str(e)}")
+
+    def ingest(self, document: Document, sections: Iterable[str], metadata: Dict[str, Any] = None,
+               update_source: bool = True) -> Dict[str, Any]:
+        """
+        Chunk, store and embed a stream of text sections for a document.
+
+        Chunks left by an interrupted earlier attempt are removed first, so
+        the pipeline can be retried safely.
+
+        Args:
+            document: Document to ingest into
+            sections: Text sections in document order
+            metadata: Document metadata passed to the chunker
+            update_source: Whether to refresh source statistics and cached
+                answers now; callers ingesting many documents do it once
+
+        Returns:
+            Final progress dictionary
+        """
+        metadata = metadata or {}
+
+        self._delete_chunks(document)
+
+        document.mark_as_processing()
+        document.update_progress(
+            stage='processing',
+            sections_total=metadata.get('pages'),
+            sections_processed=0,
+            chunks_created=0,
+            embeddings_created=0,
+            embedding_errors=0,
+            error=None
+        )
+        document.save()
+
+        stats = {
+            'sections_processed': 0,
+            'chunks_created': 0,
+            'embeddings_created': 0,
+            'embedding_errors': 0,
+            'token_count': 0
+        }
+        hasher = hashlib.sha256()
+        content_parts = []
+        content_length = 0
+
+        def tracked_sections() -> Iterator[str]:
+            nonlocal content_length
+            for section in sections:
+                if stats['sections_processed']:
+                    hasher.update(b'\n\n')
+                hasher.update(section.encode('utf-8'))
+                stats['token_count'] += self.chunker._count_tokens(section)
+
+                if content_length < self.content_limit:
+                    content_parts.append(section[:self.content_limit - content_length])
+                    content_length += len(content_parts[-1])
+
+                stats['sections_processed'] += 1
+                yield section
+
+        batch = []
+        for chunk_data in self.chunker.chunk_document_stream(tracked_sections(), metadata):
+            batch.append(chunk_data)
+            if len(batch) >= self.batch_size:
+                self._store_batch(document, batch, stats)
+                batch = []
+
+        if batch:
+            self._store_batch(document, batch, stats)
+
+        if not stats['chunks_created']:
+            raise ProcessingError("No text content found in document")
+
+        document.content = '\n\n'.join(content_parts)
+        document.content_hash = hasher.hexdigest()
+        document.token_count = stats['token_count']
+        document.mark_as_completed()
+        document.update_progress(
+            stage='completed',
+            sections_processed=stats['sections_processed'],
+            chunks_created=stats['chunks_created'],
+            embeddings_created=stats['embeddings_created'],
+            embedding_errors=stats['embedding_errors']
+        )
+        document.save()
+
+        if update_source:
+            # Update source statistics
+            source = document.source
+            if source:
+                source.update_statistics()
+                source.save()
+
+            # Cached answers may contradict the new content
+            response_cache.invalidate_tenant(self.tenant_id)
+
+        logger.info(
+            f"Ingested document {document.id}: {stats['sections_processed']} sections, "
+            f"{stats['chunks_created']} chunks, {stats['embeddings_created']} embeddings"
+        )
+        return document.get_progress()
+
+    def _store_batch(self, document: Document, batch: List[Dict[str, Any]], stats: Dict[str, int]):
+        """Insert a batch of chunks in one transaction, then embed them."""
+        rows = [
+            {
+                'tenant_id': self.tenant_id,
+                'document_id': document.id,
+                'content': chunk_data['content'],
+                'content_hash': Chunk.hash_content(chunk_data['content']),
+                'position': chunk_data['position'],
+                'token_count': chunk_data['token_count'],
+                'overlap_start': chunk_data['overlap_start'],
+                'overlap_end': chunk_data['overlap_end'],
+                'extra_data': {
+                    'chunk_type': chunk_data.get('chunk_type', 'unknown'),
+                    'is_first': chunk_data.get('is_first', False),
+                    'is_last': chunk_data.get('is_last', False)
+                }
+            }
+            for chunk_data in batch
+        ]
+        chunk_ids = Chunk.bulk_create(rows)
+        chunks = [Chunk(id=chunk_id, **row) for chunk_id, row in zip(chunk_ids, rows)]
+
+        stats['chunks_created'] += len(chunks)
+
+        try:
+            embeddings = self.embedding_service.create_chunk_embeddings(self.tenant_id, chunks)
+            stats['embeddings_created'] += len(embeddings)
+        except Exception as e:
+            # Chunks stay searchable by text; embeddings can be regenerated later
+            stats['embedding_errors'] += len(chunks)
+            logger.warning(f"Failed to generate embeddings for document {document.id}: {str(e)}")
+
+        document.update_progress(
+            stage='processing',
+            sections_processed=stats['sections_processed'],
+            chunks_created=stats['chunks_created'],
+            embeddings_created=stats['embeddings_created'],
+            embedding_errors=stats['embedding_errors']
+        )
+        document.save()
+
+    def _delete_chunks(self, document: Document):
+        """Remove chunks and embeddings from an earlier attempt."""
+        chunk_ids = [row.id for row in db.session.query(Chunk.id).filter(Chunk.document_id == document.id)]
+        if not chunk_ids:
+            return
+
+        removed_ids = {}
+        for embedding_id, model_name in db.session.query(Embedding.id, Embedding.model_name)\
+                .filter(Embedding.chunk_id.in_(chunk_ids)):
+            removed_ids.setdefault(model_name, []).append(embedding_id)
+
+        Embedding.query.filter(Embedding.chunk_id.in_(chunk_ids)).delete(synchronize_session=False)
+        Chunk.query.filter(Chunk.id.in_(chunk_ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+        if vector_index_manager.is_enabled():
+            for model_name, embedding_ids in removed_ids.items():
+                try:
+                    vector_index_manager.remove_embeddings(self.tenant_id, model_name, embedding_ids)
+                except Exception as e:
+                    logger.warning(f"Failed to update vector index for tenant {self.tenant_id}: {str(e)}")
+
+        logger.info(f"Removed {len(chunk_ids)} chunks from an earlier ingestion of document {document.id}")
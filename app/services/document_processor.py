@@ -2,7 +2,7 @@
 import os
 import hashlib
 import mimetypes
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from urllib.parse import urlparse
 import requests
 from io import BytesIO
@@ -133,6 +133,55 @@ class DocumentProcessor:
             logger.error(f"Failed to extract text from {file_path}: {str(e)}")
             raise ProcessingError(f"Failed to extract text: {str(e)}")
     
+    @classmethod
+    def stream_text_from_file(cls, file_path: str, mime_type: str = None) -> Tuple[Dict[str, Any], Iterator[str]]:
+        """
+        Extract text content from a file section by section.
+        
+        PDFs yield one section per page, DOCX files one per paragraph and text
+        files blocks of lines, so the full text is never held in memory.
+        
+        Args:
+            file_path: Path to the file
+            mime_type: MIME type of the file (optional, will be detected)
+            
+        Returns:
+            Tuple of (metadata, iterator over text sections)
+        """
+        try:
+            # Validate file exists and size
+            if not os.path.exists(file_path):
+                raise ProcessingError(f"File not found: {file_path}")
+            
+            file_size = os.path.getsize(file_path)
+            if file_size > cls.MAX_FILE_SIZE:
+                raise ProcessingError(f"File too large: {file_size} bytes (max: {cls.MAX_FILE_SIZE})")
+            
+            # Detect MIME type if not provided
+            if not mime_type:
+                mime_type, _ = mimetypes.guess_type(file_path)
+            
+            file_ext = os.path.splitext(file_path)[1].lower().lstrip('.')
+            
+            if file_ext == 'pdf' or mime_type == 'application/pdf':
+                return cls._stream_pdf_text(file_path)
+            elif file_ext in ['doc', 'docx'] or 'word' in (mime_type or ''):
+                return cls._stream_docx_text(file_path)
+            elif file_ext == 'md' or mime_type == 'text/markdown':
+                return cls._stream_markdown_text(file_path)
+            elif file_ext in ['html', 'htm'] or mime_type == 'text/html':
+                # HTML has to be parsed as a whole
+                content, metadata = cls._extract_html_text(file_path)
+                return metadata, iter([content])
+            else:
+                return {'format': 'plain_text'}, cls._stream_text_lines(file_path)
+            
+        except ProcessingError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to extract text from {file_path}: {str(e)}")
+            raise ProcessingError(f"Failed to extract text: {str(e)}")
+    
     @classmethod
     def extract_text_from_url(cls, url: str, max_depth: int = 1) -> List[Dict[str, Any]]:
         """
@@ -286,6 +335,104 @@ class DocumentProcessor:
         except Exception as e:
             raise ProcessingError(f"Failed to extract PDF text: {str(e)}")
     
+    @staticmethod
+    def _stream_pdf_text(file_path: str) -> Tuple[Dict[str, Any], Iterator[str]]:
+        """Extract text from PDF file one page at a time."""
+        if not HAS_PDF_SUPPORT:
+            raise ProcessingError("PDF support not available. Please install PyPDF2.")
+        
+        try:
+            pdf_reader = PyPDF2.PdfReader(file_path)
+            
+            # Extract metadata
+            metadata = {
+                'pages': len(pdf_reader.pages),
+                'title': pdf_reader.metadata.get('/Title', '') if pdf_reader.metadata else '',
+                'author': pdf_reader.metadata.get('/Author', '') if pdf_reader.metadata else '',
+                'subject': pdf_reader.metadata.get('/Subject', '') if pdf_reader.metadata else '',
+                'format': 'pdf'
+            }
+        except Exception as e:
+            raise ProcessingError(f"Failed to extract PDF text: {str(e)}")
+        
+        def pages():
+            for page_num, page in enumerate(pdf_reader.pages):
+                try:
+                    page_text = page.extract_text()
+                except Exception as e:
+                    logger.warning(f"Failed to extract text from page {page_num + 1}: {str(e)}")
+                    continue
+                
+                if page_text and page_text.strip():
+                    yield f"[Page {page_num + 1}]\n{page_text}"
+        
+        return metadata, pages()
+    
+    @staticmethod
+    def _stream_docx_text(file_path: str) -> Tuple[Dict[str, Any], Iterator[str]]:
+        """Extract text from DOCX file one paragraph at a time."""
+        if not HAS_DOCX_SUPPORT:
+            raise ProcessingError("DOCX support not available. Please install python-docx.")
+        
+        try:
+            doc = DocxDocument(file_path)
+            
+            # Extract metadata
+            metadata = {
+                'title': doc.core_properties.title or '',
+                'author': doc.core_properties.author or '',
+                'subject': doc.core_properties.subject or '',
+                'paragraphs': len(doc.paragraphs)
+            }
+        except Exception as e:
+            raise ProcessingError(f"Failed to extract DOCX text: {str(e)}")
+        
+        def paragraphs():
+            for paragraph in doc.paragraphs:
+                text = paragraph.text.strip()
+                if text:
+                    yield text
+        
+        return metadata, paragraphs()
+    
+    @classmethod
+    def _stream_markdown_text(cls, file_path: str) -> Tuple[Dict[str, Any], Iterator[str]]:
+        """Extract text from Markdown file in blocks of lines."""
+        try:
+            # Look for title in first few lines
+            title = ''
+            with open(file_path, 'r', encoding='utf-8') as file:
+                for _, line in zip(range(10), file):
+                    if line.startswith('# '):
+                        title = line[2:].strip()
+                        break
+        except Exception as e:
+            raise ProcessingError(f"Failed to extract Markdown text: {str(e)}")
+        
+        metadata = {
+            'title': title,
+            'format': 'markdown'
+        }
+        
+        return metadata, cls._stream_text_lines(file_path)
+    
+    @staticmethod
+    def _stream_text_lines(file_path: str, block_size: int = 64 * 1024) -> Iterator[str]:
+        """Read a text file in blocks of whole lines."""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            lines = []
+            size = 0
+            for line in file:
+                lines.append(line)
+                size += len(line)
+                if size >= block_size:
+                    yield ''.join(lines)
+                    lines = []
+                    size = 0
+            
+            if lines:
+                yield ''.join(lines)
+    
     @staticmethod
     def _extract_pdf_content(content_bytes: bytes) -> Tuple[str, Dict[str, Any]]:
         """Extract text from PDF content bytes."""
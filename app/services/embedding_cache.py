@@ -0,0 +1,252 @@
+"""Two-tier cache for embedding vectors keyed by model and normalized text."""
+import re
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from flask import current_app
+
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    In-process LRU cache with TTL, backed by an optional shared Redis tier.
+
+    Entries are keyed by ``(model, sha256(normalized text))`` so identical
+    queries and re-uploaded chunks map to the same vector across workers.
+    Vectors are held as read-only float32 arrays; Redis stores them in the
+    binary format from ``app.utils.vector_codec``.
+    """
+
+    DEFAULT_MAX_SIZE = 5000  # ~30MB of 1536-dimension float32 vectors
+    DEFAULT_TTL = 86400  # Seconds
+    KEY_PREFIX = 'embedding'
+    REDIS_RETRY_INTERVAL = 60  # Seconds to skip Redis after a connection failure
+
+    _WHITESPACE = re.compile(r'\s+')
+
+    def __init__(self, max_size: int = None, ttl: int = None, redis_client=None):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: 'OrderedDict[str, Tuple[float, np.ndarray]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis_client = redis_client
+        self._redis_configured = redis_client is not None
+        self._redis_retry_at = 0.0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'memory_hits': 0,
+            'redis_hits': 0,
+            'stores': 0,
+            'evictions': 0,
+            'errors': 0
+        }
+
+    def _config(self, key: str, default=None):
+        try:
+            return current_app.config.get(key, default)
+        except RuntimeError:
+            return default
+
+    def is_enabled(self) -> bool:
+        """Check whether the embedding cache is enabled for the current app."""
+        return bool(self._config('EMBEDDING_CACHE_ENABLED', True))
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size or int(self._config('EMBEDDING_CACHE_SIZE', self.DEFAULT_MAX_SIZE))
+
+    @property
+    def ttl(self) -> int:
+        return self._ttl or int(self._config('EMBEDDING_CACHE_TTL', self.DEFAULT_TTL))
+
+    @classmethod
+    def normalize_text(cls, text: str) -> str:
+        """Normalize text so trivially different inputs share a cache entry."""
+        text = unicodedata.normalize('NFC', text or '')
+        return cls._WHITESPACE.sub(' ', text).strip()
+
+    @classmethod
+    def make_key(cls, model: str, text: str) -> str:
+        """Build the cache key for a model and text."""
+        digest = hashlib.sha256(cls.normalize_text(text).encode('utf-8')).hexdigest()
+        return f"{cls.KEY_PREFIX}:{model}:{digest}"
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Get a cached vector, or None on a miss."""
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Get cached vectors for several texts, with None for each miss."""
+        if not self.is_enabled() or not texts:
+            return [None] * len(texts)
+
+        keys = [self.make_key(model, text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        now = time.monotonic()
+
+        # Level 1: in-process LRU
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, vector = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                results[i] = vector
+                self._stats['memory_hits'] += 1
+
+        # Level 2: shared Redis tier
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing:
+            found = self._redis_get([keys[i] for i in missing])
+            for i, vector in zip(missing, found):
+                if vector is not None:
+                    results[i] = vector
+                    self._store_local(keys[i], vector)
+                    self._stats['redis_hits'] += 1
+
+        hits = sum(1 for vector in results if vector is not None)
+        self._stats['hits'] += hits
+        self._stats['misses'] += len(results) - hits
+        return results
+
+    def set(self, model: str, text: str, vector: np.ndarray) -> np.ndarray:
+        """Cache a vector and return the stored read-only float32 copy."""
+        return self.set_many(model, [text], [vector])[0]
+
+    def set_many(self, model: str, texts: List[str], vectors: List[np.ndarray]) -> List[np.ndarray]:
+        """Cache several vectors and return the stored read-only float32 copies."""
+        stored = [self._freeze(vector) for vector in vectors]
+        if not self.is_enabled():
+            return stored
+
+        items = [
+            (self.make_key(model, text), vector)
+            for text, vector in zip(texts, stored)
+            if vector.size > 0
+        ]
+        for key, vector in items:
+            self._store_local(key, vector)
+        self._redis_set(items)
+        self._stats['stores'] += len(items)
+
+        return stored
+
+    def clear(self):
+        """Drop all in-process entries. The Redis tier expires on its own TTL."""
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        """Reset hit/miss counters."""
+        for key in self._stats:
+            self._stats[key] = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss metrics."""
+        lookups = self._stats['hits'] + self._stats['misses']
+        with self._lock:
+            size = len(self._entries)
+
+        return {
+            **self._stats,
+            'hit_rate': (self._stats['hits'] / lookups) if lookups else 0.0,
+            'size': size,
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'redis_enabled': self._get_redis() is not None
+        }
+
+    @staticmethod
+    def _freeze(vector) -> np.ndarray:
+        vector = np.array(vector, dtype=np.float32)
+        vector.flags.writeable = False
+        return vector
+
+    def _store_local(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _get_redis(self):
+        """Get the Redis client, connecting lazily when the Redis tier is configured."""
+        if self._redis_client is not None or self._redis_configured:
+            return self._redis_client
+
+        if not self._config('EMBEDDING_CACHE_REDIS_ENABLED', False):
+            return None
+
+        redis_url = self._config('EMBEDDING_CACHE_REDIS_URL') or self._config('REDIS_URL')
+        if not redis_url or time.monotonic() < self._redis_retry_at:
+            return None
+
+        try:
+            import redis
+            client = redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+            client.ping()
+        except Exception as e:
+            logger.warning(f"Embedding cache Redis tier unavailable: {str(e)}")
+            self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_INTERVAL
+            self._stats['errors'] += 1
+            return None
+
+        self._redis_client = client
+        self._redis_configured = True
+        return client
+
+    def _redis_get(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        client = self._get_redis()
+        if client is None:
+            return [None] * len(keys)
+
+        from app.utils.vector_codec import decode_vector
+
+        try:
+            values = client.mget(keys)
+        except Exception as e:
+            logger.warning(f"Embedding cache Redis read failed: {str(e)}")
+            self._stats['errors'] += 1
+            return [None] * len(keys)
+
+        vectors = []
+        for value in values:
+            try:
+                vectors.append(self._freeze(decode_vector(value)) if value else None)
+            except Exception:
+                self._stats['errors'] += 1
+                vectors.append(None)
+        return vectors
+
+    def _redis_set(self, items: List[Tuple[str, np.ndarray]]):
+        client = self._get_redis() if items else None
+        if client is None:
+            return
+
+        from app.utils.vector_codec import encode_vector
+
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for key, vector in items:
+                pipeline.setex(key, self.ttl, encode_vector(vector))
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Embedding cache Redis write failed: {str(e)}")
+            self._stats['errors'] += 1
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,255 @@
+"""Concurrent, rate-aware executor for embedding API batches."""
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
+
+from flask import current_app
+
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    tiktoken = None
+    HAS_TIKTOKEN = False
+
+from app.utils.exceptions import ProcessingError
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateBudget:
+    """
+    Requests-per-minute and tokens-per-minute budget shared by worker threads.
+
+    Both limits are token buckets that refill continuously, so a burst up to
+    one minute's allowance goes out immediately and the rest is smoothed.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated_at = clock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60.0)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60.0)
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Block until one request of `tokens` tokens fits in the budget.
+
+        Returns:
+            Seconds spent waiting
+        """
+        # A single request larger than the whole budget waits for a full bucket
+        tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                self._refill(self._clock())
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return waited
+
+                wait = max(
+                    (1 - self._requests) * 60.0 / self.requests_per_minute,
+                    (tokens - self._tokens) * 60.0 / self.tokens_per_minute
+                )
+
+            self._sleep(wait)
+            waited += wait
+
+
+@dataclass
+class EmbeddingBatchResult:
+    """Vectors per input text; failed texts have no vector and an error."""
+
+    vectors: List[Optional[List[float]]]
+    errors: Dict[int, str] = field(default_factory=dict)
+    requests: int = 0
+    retries: int = 0
+
+    @property
+    def failed_count(self) -> int:
+        return len(self.errors)
+
+
+class EmbeddingBatchExecutor:
+    """
+    Send embedding requests for many texts concurrently.
+
+    Texts are packed into requests by token count, requests run on a
+    bounded thread pool within a per-model rate budget, and each request
+    is retried with jittered exponential backoff. A request that keeps
+    failing only fails its own texts.
+    """
+
+    DEFAULT_MAX_WORKERS = 4
+    DEFAULT_MAX_BATCH_SIZE = 100  # Inputs per request
+    DEFAULT_MAX_BATCH_TOKENS = 50000  # Tokens per request
+    DEFAULT_REQUESTS_PER_MINUTE = 3000
+    DEFAULT_TOKENS_PER_MINUTE = 1000000
+    DEFAULT_MAX_RETRIES = 3
+    DEFAULT_RETRY_DELAY = 1.0  # Seconds before the first retry
+    TOKEN_ENCODING = 'cl100k_base'
+
+    _budgets: Dict[str, RateBudget] = {}
+    _budgets_lock = threading.Lock()
+    _encoding = None
+    _encoding_loaded = False
+
+    def __init__(self, client, max_workers: int = None, max_batch_size: int = None,
+                 max_batch_tokens: int = None, requests_per_minute: int = None,
+                 tokens_per_minute: int = None, max_retries: int = None,
+                 retry_delay: float = None):
+        self.client = client
+        self.max_workers = max_workers or self.DEFAULT_MAX_WORKERS
+        self.max_batch_size = max_batch_size or self.DEFAULT_MAX_BATCH_SIZE
+        self.max_batch_tokens = max_batch_tokens or self.DEFAULT_MAX_BATCH_TOKENS
+        self.requests_per_minute = requests_per_minute or self.DEFAULT_REQUESTS_PER_MINUTE
+        self.tokens_per_minute = tokens_per_minute or self.DEFAULT_TOKENS_PER_MINUTE
+        self.max_retries = max_retries or self.DEFAULT_MAX_RETRIES
+        self.retry_delay = self.DEFAULT_RETRY_DELAY if retry_delay is None else retry_delay
+
+    @classmethod
+    def from_config(cls, client) -> 'EmbeddingBatchExecutor':
+        """Create an executor using the EMBEDDING_* settings of the current app."""
+        def config(key):
+            try:
+                return current_app.config.get(key)
+            except RuntimeError:
+                return None
+
+        return cls(
+            client,
+            max_workers=config('EMBEDDING_MAX_WORKERS'),
+            max_batch_size=config('EMBEDDING_BATCH_MAX_SIZE'),
+            max_batch_tokens=config('EMBEDDING_BATCH_MAX_TOKENS'),
+            requests_per_minute=config('EMBEDDING_REQUESTS_PER_MINUTE'),
+            tokens_per_minute=config('EMBEDDING_TOKENS_PER_MINUTE'),
+            max_retries=config('EMBEDDING_MAX_RETRIES'),
+            retry_delay=config('EMBEDDING_RETRY_DELAY')
+        )
+
+    def get_budget(self, model: str) -> RateBudget:
+        """Get the process-wide rate budget for a model."""
+        key = f"{model}:{self.requests_per_minute}:{self.tokens_per_minute}"
+        with self._budgets_lock:
+            budget = self._budgets.get(key)
+            if budget is None:
+                budget = RateBudget(self.requests_per_minute, self.tokens_per_minute)
+                self._budgets[key] = budget
+            return budget
+
+    @classmethod
+    def count_tokens(cls, text: str) -> int:
+        """Count tokens with tiktoken, or estimate four characters per token."""
+        if not cls._encoding_loaded:
+            cls._encoding_loaded = True
+            if HAS_TIKTOKEN:
+                try:
+                    cls._encoding = tiktoken.get_encoding(cls.TOKEN_ENCODING)
+                except Exception as e:
+                    logger.warning(f"Failed to load tiktoken encoding: {str(e)}")
+
+        if cls._encoding is not None:
+            return len(cls._encoding.encode(text))
+        return len(text) // 4 + 1
+
+    def pack_batches(self, token_counts: List[int]) -> List[List[int]]:
+        """Group text indices into requests bounded by input count and tokens."""
+        batches = []
+        batch = []
+        batch_tokens = 0
+
+        for index, tokens in enumerate(token_counts):
+            if batch and (len(batch) >= self.max_batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(index)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def embed(self, texts: List[str], model: str) -> EmbeddingBatchResult:
+        """Embed texts, returning a vector or an error for every text."""
+        result = EmbeddingBatchResult(vectors=[None] * len(texts))
+        if not texts:
+            return result
+
+        token_counts = [self.count_tokens(text) for text in texts]
+        batches = self.pack_batches(token_counts)
+        budget = self.get_budget(model)
+
+        def run(batch):
+            return self._embed_batch(
+                [texts[index] for index in batch],
+                model,
+                sum(token_counts[index] for index in batch),
+                budget
+            )
+
+        if len(batches) == 1 or self.max_workers == 1:
+            outcomes = [run(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                outcomes = list(pool.map(run, batches))
+
+        for batch, (vectors, error, attempts) in zip(batches, outcomes):
+            result.requests += attempts
+            result.retries += attempts - 1
+            if error is not None:
+                for index in batch:
+                    result.errors[index] = error
+                continue
+            for index, vector in zip(batch, vectors):
+                result.vectors[index] = vector
+
+        if result.errors:
+            logger.warning(
+                f"Failed to embed {result.failed_count} of {len(texts)} texts "
+                f"in {len(batches)} requests using model {model}"
+            )
+        return result
+
+    def _embed_batch(self, texts: List[str], model: str, tokens: int, budget: RateBudget):
+        """Send one request with retries; returns (vectors, error, attempts)."""
+        error = None
+
+        for attempt in range(self.max_retries):
+            budget.acquire(tokens)
+            try:
+                response = self.client.embeddings.create(input=texts, model=model)
+                if len(response.data) != len(texts):
+                    raise ProcessingError(f"Expected {len(texts)} embeddings, received {len(response.data)}")
+                return [item.embedding for item in response.data], None, attempt + 1
+
+            except Exception as e:
+                error = str(e)
+                if attempt < self.max_retries - 1:
+                    delay = self.retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5)  # Jittered backoff
+                    logger.warning(
+                        f"Embedding request for {len(texts)} texts failed (attempt {attempt + 1}), "
+                        f"retrying in {delay:.1f}s: {error}"
+                    )
+                    time.sleep(delay)
+
+        return None, error, self.max_retries
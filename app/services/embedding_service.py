@@ -1,12 +1,17 @@
 """Embedding service for generating and managing vector embeddings."""
 import os
+import asyncio
 import logging
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional, Tuple
 from openai import OpenAI
 from flask import current_app
 from app.models.knowledge import Chunk, Embedding
+from app.services.vector_index import vector_index_manager
+from app.services.embedding_cache import embedding_cache
+from app.services.embedding_executor import EmbeddingBatchExecutor
+from app.services.openai_client import async_openai_clients, run_in_app_context
 from app import db
 from app.utils.exceptions import ProcessingError
 
@@ -16,9 +21,12 @@ class EmbeddingService:
     
     DEFAULT_MODEL = "text-embedding-ada-002"
     DEFAULT_DIMENSION = 1536
-    BATCH_SIZE = 100  # Process embeddings in batches
     MAX_RETRIES = 3  # Maximum retries for API calls
     RETRY_DELAY = 1.0  # Initial delay between retries (seconds)
+    REINDEX_SLICE_SIZE = 1000  # Chunks handed to the batch executor at once during re-indexing
+    INDEX_CANDIDATE_MULTIPLIER = 4  # Vector candidates fetched per requested result for re-ranking
+    MIN_INDEX_CANDIDATES = 50
+    RECENCY_BOOST_DAYS = 30  # Documents newer than this get a relevance boost
     
     # Supported embedding models and their dimensions
     SUPPORTED_MODELS = {
@@ -59,6 +67,11 @@ class EmbeddingService:
         if not text.strip():
             raise ProcessingError("Empty text provided for embedding")
         
+        cached_vector = embedding_cache.get(model, text)
+        if cached_vector is not None:
+            self.logger.debug(f"Embedding cache hit for model {model}")
+            return cached_vector
+        
         # Retry logic for API calls
         for attempt in range(self.MAX_RETRIES):
             try:
@@ -68,8 +81,8 @@ class EmbeddingService:
                     model=model
                 )
                 
-                # Extract embedding vector
-                embedding_vector = np.array(response.data[0].embedding)
+                # Extract embedding vector and cache it for repeat queries
+                embedding_vector = embedding_cache.set(model, text, response.data[0].embedding)
                 
                 self.logger.debug(f"Generated embedding with dimension {len(embedding_vector)} using model {model}")
                 return embedding_vector
@@ -85,44 +98,91 @@ class EmbeddingService:
                     self.logger.error(f"Failed to generate embedding after {self.MAX_RETRIES} attempts: {str(e)}")
                     raise ProcessingError(f"Failed to generate embedding: {str(e)}")
     
-    def generate_embeddings_batch(self, texts: List[str], model: str = None) -> List[np.ndarray]:
-        """Generate embeddings for multiple texts in batch."""
+    async def generate_embedding_async(self, text: str, model: str = None) -> np.ndarray:
+        """Generate embedding for a single text on the shared async client."""
+        model = model or self.DEFAULT_MODEL
+        text = self._prepare_text(text)
+        
+        if not text.strip():
+            raise ProcessingError("Empty text provided for embedding")
+        
+        cached_vector = embedding_cache.get(model, text)
+        if cached_vector is not None:
+            self.logger.debug(f"Embedding cache hit for model {model}")
+            return cached_vector
+        
+        try:
+            # The client retries transient errors; wait_for bounds the total time
+            response = await asyncio.wait_for(
+                async_openai_clients.get_client().embeddings.create(input=text, model=model),
+                timeout=async_openai_clients.request_timeout()
+            )
+            return embedding_cache.set(model, text, response.data[0].embedding)
+            
+        except Exception as e:
+            self.logger.error(f"Failed to generate embedding: {str(e)}")
+            raise ProcessingError(f"Failed to generate embedding: {str(e)}")
+    
+    def generate_embeddings_batch(self, texts: List[str], model: str = None,
+                                  allow_partial: bool = False) -> List[np.ndarray]:
+        """
+        Generate embeddings for multiple texts in batch.
+        
+        Uncached texts are sent through the concurrent batch executor. Empty
+        texts get an empty array; so do texts whose request kept failing when
+        allow_partial is set, otherwise any failure raises ProcessingError.
+        """
         if not self.client:
             self._initialize_client()
         
         model = model or self.DEFAULT_MODEL
-        embeddings = []
+        embeddings = [np.array([]) for _ in texts]
         
         try:
-            # Process in batches to avoid API limits
-            for i in range(0, len(texts), self.BATCH_SIZE):
-                batch_texts = texts[i:i + self.BATCH_SIZE]
-                
-                # Clean and prepare texts
-                prepared_texts = [self._prepare_text(text) for text in batch_texts]
-                
-                # Filter out empty texts
-                valid_texts = [(idx, text) for idx, text in enumerate(prepared_texts) if text.strip()]
+            # Clean and prepare texts, skipping empty ones
+            valid_texts = [(idx, self._prepare_text(text)) for idx, text in enumerate(texts)]
+            valid_texts = [(idx, text) for idx, text in valid_texts if text.strip()]
+            
+            if not valid_texts:
+                return embeddings
+            
+            # Serve cached vectors first
+            cached_vectors = embedding_cache.get_many(model, [text for _, text in valid_texts])
+            
+            # Request each distinct uncached text once
+            pending = {}
+            for (original_idx, text), cached_vector in zip(valid_texts, cached_vectors):
+                if cached_vector is not None:
+                    embeddings[original_idx] = cached_vector
+                else:
+                    pending.setdefault(text, []).append(original_idx)
+            
+            if pending:
+                pending_texts = list(pending)
+                result = EmbeddingBatchExecutor.from_config(self.client).embed(pending_texts, model)
                 
-                if not valid_texts:
-                    # Add empty embeddings for this batch
-                    embeddings.extend([np.array([]) for _ in batch_texts])
-                    continue
+                if result.errors and not allow_partial:
+                    first_error = next(iter(result.errors.values()))
+                    raise ProcessingError(
+                        f"{result.failed_count} of {len(pending_texts)} embeddings failed: {first_error}"
+                    )
                 
-                # Generate embeddings for valid texts
-                response = self.client.embeddings.create(
-                    input=[text for _, text in valid_texts],
-                    model=model
+                # Cache and map embeddings back to original positions
+                generated = [
+                    (text, vector) for text, vector in zip(pending_texts, result.vectors)
+                    if vector is not None
+                ]
+                vectors = embedding_cache.set_many(
+                    model, [text for text, _ in generated], [vector for _, vector in generated]
                 )
+                for (text, _), vector in zip(generated, vectors):
+                    for original_idx in pending[text]:
+                        embeddings[original_idx] = vector
                 
-                # Map embeddings back to original positions
-                batch_embeddings = [np.array([]) for _ in batch_texts]
-                for j, (original_idx, _) in enumerate(valid_texts):
-                    batch_embeddings[original_idx] = np.array(response.data[j].embedding)
-                
-                embeddings.extend(batch_embeddings)
-                
-                self.logger.debug(f"Generated batch embeddings {i+1}-{min(i+self.BATCH_SIZE, len(texts))}/{len(texts)}")
+                self.logger.debug(
+                    f"Generated {len(generated)}/{len(pending_texts)} embeddings "
+                    f"in {result.requests} requests ({result.retries} retries)"
+                )
             
             return embeddings
             
@@ -183,6 +243,18 @@ class EmbeddingService:
                 self.logger.warning(f"No chunks found for document {document_id}")
                 return []
             
+            embeddings = self.create_chunk_embeddings(tenant_id, chunks, model)
+            
+            self.logger.info(f"Created {len(embeddings)} embeddings for document {document_id}")
+            return embeddings
+            
+        except Exception as e:
+            self.logger.error(f"Failed to create document embeddings: {str(e)}")
+            raise ProcessingError(f"Failed to create document embeddings: {str(e)}")
+    
+    def create_chunk_embeddings(self, tenant_id: int, chunks: List[Chunk], model: str = None) -> List[Embedding]:
+        """Create embeddings for a batch of chunks, skipping chunks that already have one."""
+        try:
             embeddings = []
             model_name = model or self.DEFAULT_MODEL
             
@@ -198,129 +270,141 @@ class EmbeddingService:
             chunks_to_process = [chunk for chunk in chunks if chunk.id not in existing_chunk_ids]
             
             if not chunks_to_process:
-                self.logger.info(f"All chunks in document {document_id} already have embeddings")
+                self.logger.info(f"All {len(chunks)} chunks already have embeddings")
                 return existing_embeddings
             
+            # Reuse vectors already stored for identical chunk text in this tenant
+            unhashed_chunks = [chunk for chunk in chunks_to_process if not chunk.content_hash]
+            for chunk in unhashed_chunks:
+                chunk.generate_content_hash()
+            
+            stored_vectors = Embedding.find_vectors_by_content_hash(
+                tenant_id, model_name, [chunk.content_hash for chunk in chunks_to_process]
+            )
+            
+            rows = []
+            chunks_to_embed = []
+            for chunk in chunks_to_process:
+                stored = stored_vectors.get(chunk.content_hash)
+                if stored is None:
+                    chunks_to_embed.append(chunk)
+                    continue
+                
+                vector_data, dimension = stored
+                rows.append({
+                    'tenant_id': tenant_id,
+                    'chunk_id': chunk.id,
+                    'model_name': model_name,
+                    'vector_data': vector_data,
+                    'dimension': dimension
+                })
+            
+            if rows:
+                self.logger.info(f"Reused {len(rows)} stored embeddings")
+            
             # Generate embeddings in batch
-            chunk_texts = [chunk.content for chunk in chunks_to_process]
-            embedding_vectors = self.generate_embeddings_batch(chunk_texts, model)
+            chunk_texts = [chunk.content for chunk in chunks_to_embed]
+            embedding_vectors = self.generate_embeddings_batch(
+                chunk_texts, model, allow_partial=True
+            ) if chunk_texts else []
             
-            # Create embedding records
-            for chunk, vector in zip(chunks_to_process, embedding_vectors):
+            failed = sum(1 for vector in embedding_vectors if vector.size == 0)
+            if failed:
+                # Chunks without an embedding are picked up by the next run
+                self.logger.warning(f"{failed} of {len(chunk_texts)} chunks were not embedded")
+            
+            for chunk, vector in zip(chunks_to_embed, embedding_vectors):
                 if vector.size > 0:  # Skip empty embeddings
-                    embedding = Embedding.create_from_vector(
-                        tenant_id=tenant_id,
-                        chunk_id=chunk.id,
-                        vector=vector,
-                        model_name=model_name
-                    )
-                    embeddings.append(embedding)
+                    # Serialize here so the rows can also build the returned Embedding objects
+                    rows.append({
+                        'tenant_id': tenant_id,
+                        'chunk_id': chunk.id,
+                        'model_name': model_name,
+                        'vector_data': Embedding.serialize_vector(vector),
+                        'dimension': len(vector)
+                    })
+            
+            # Write all embedding records in one transaction
+            if rows:
+                embedding_ids = Embedding.bulk_create(rows)
+                for embedding_id, row in zip(embedding_ids, rows):
+                    embeddings.append(Embedding(id=embedding_id, **row))
+            elif unhashed_chunks:
+                db.session.commit()
+            
+            # Keep the in-process vector index current
+            self._update_vector_index(tenant_id, model_name, added=embeddings)
             
             # Add existing embeddings
             embeddings.extend(existing_embeddings)
             
-            self.logger.info(f"Created {len(embeddings)} embeddings for document {document_id}")
             return embeddings
             
         except Exception as e:
-            self.logger.error(f"Failed to create document embeddings: {str(e)}")
-            raise ProcessingError(f"Failed to create document embeddings: {str(e)}")
+            self.logger.error(f"Failed to create chunk embeddings: {str(e)}")
+            raise ProcessingError(f"Failed to create chunk embeddings: {str(e)}")
     
     def search_similar_chunks(self, tenant_id: int, query: str, limit: int = 10, 
                             min_similarity: float = 0.7, model: str = None, 
-                            source_ids: List[int] = None) -> List[Dict[str, Any]]:
+                            source_ids: List[int] = None,
+                            query_vector: np.ndarray = None) -> List[Dict[str, Any]]:
         """Search for similar chunks using vector similarity with enhanced relevance scoring."""
         try:
             model_name = model or self.DEFAULT_MODEL
             
-            # Generate query embedding
-            query_vector = self.generate_embedding(query, model_name)
+            # Generate query embedding unless the caller already has it
+            if query_vector is None:
+                query_vector = self.generate_embedding(query, model_name)
             
-            # Build query for embeddings
-            query_builder = Embedding.query.join(Chunk).filter(
-                Embedding.tenant_id == tenant_id,
-                Embedding.model_name == model_name
+            # Stage 1: score all vectors at once and keep the best candidates before any ORM access
+            candidate_count = max(limit * self.INDEX_CANDIDATE_MULTIPLIER, self.MIN_INDEX_CANDIDATES)
+            candidates = self._search_vector_index(
+                tenant_id, model_name, query_vector, candidate_count, min_similarity, source_ids
             )
-            
-            # Filter by source IDs if provided
-            if source_ids:
-                from app.models.knowledge import Document
-                query_builder = query_builder.join(Document).filter(
-                    Document.source_id.in_(source_ids)
+            if candidates is None:
+                candidates = self._score_embedding_matrix(
+                    tenant_id, model_name, query_vector, candidate_count, min_similarity, source_ids
                 )
             
-            embeddings = query_builder.all()
-            
-            if not embeddings:
+            if not candidates:
                 self.logger.warning(f"No embeddings found for tenant {tenant_id}")
                 return []
             
-            # Calculate similarities with enhanced scoring
-            similarities = []
+            # Stage 2: eager-load chunks, documents and sources for the candidates in one query
+            chunks = self._load_chunks_with_documents([chunk_id for _, chunk_id, _ in candidates])
+            
+            # Stage 3: re-rank candidates with text and document-level signals
             query_terms = set(query.lower().split())
+            recency_cutoff = datetime.utcnow() - timedelta(days=self.RECENCY_BOOST_DAYS)
+            document_boosts = {}
+            ranked = []
             
-            for embedding in embeddings:
-                try:
-                    # Calculate cosine similarity
-                    cosine_sim = self._calculate_cosine_similarity(
-                        query_vector, 
-                        embedding.get_vector()
-                    )
-                    
-                    if cosine_sim < min_similarity:
-                        continue
-                    
-                    chunk = embedding.chunk
-                    document = chunk.document if chunk else None
-                    
-                    # Enhanced relevance scoring
-                    relevance_score = self._calculate_relevance_score(
-                        cosine_sim, chunk, document, query_terms
-                    )
-                    
-                    similarities.append({
-                        'embedding': embedding,
-                        'cosine_similarity': cosine_sim,
-                        'relevance_score': relevance_score,
-                        'chunk': chunk,
-                        'document': document
-                    })
-                        
-                except Exception as e:
-                    self.logger.warning(f"Failed to calculate similarity for embedding {embedding.id}: {str(e)}")
+            for _, chunk_id, cosine_sim in candidates:
+                chunk = chunks.get(chunk_id)
+                if chunk is None:
                     continue
+                
+                document = chunk.document
+                document_key = document.id if document else None
+                if document_key not in document_boosts:
+                    document_boosts[document_key] = self._calculate_document_boost(
+                        document, query_terms, recency_cutoff
+                    )
+                
+                relevance_score = self._calculate_relevance_score(
+                    cosine_sim, chunk, document, query_terms,
+                    document_boost=document_boosts[document_key]
+                )
+                ranked.append((relevance_score, cosine_sim, chunk, document))
             
             # Sort by relevance score (highest first)
-            similarities.sort(key=lambda x: x['relevance_score'], reverse=True)
+            ranked.sort(key=lambda item: item[0], reverse=True)
             
-            # Format results with enhanced metadata
-            results = []
-            for item in similarities[:limit]:
-                chunk = item['chunk']
-                document = item['document']
-                
-                result = {
-                    'chunk_id': chunk.id,
-                    'document_id': document.id if document else None,
-                    'content': chunk.content,
-                    'content_preview': chunk.get_content_preview(300),
-                    'similarity_score': float(item['cosine_similarity']),
-                    'relevance_score': float(item['relevance_score']),
-                    'citations': self._generate_enhanced_citations(chunk, document, query),
-                    'metadata': {
-                        'chunk_position': chunk.position,
-                        'token_count': chunk.token_count,
-                        'document_title': document.title if document else None,
-                        'source_name': document.source.name if document and document.source else None,
-                        'source_type': document.source.source_type if document and document.source else None,
-                        'url': document.url if document else None,
-                        'model_used': model_name,
-                        'search_query': query,
-                        'chunk_overlap_start': chunk.overlap_start,
-                        'chunk_overlap_end': chunk.overlap_end
-                    }
-                }
-                results.append(result)
+            # Stage 4: build citations only for the results actually returned
+            results = [
+                self._format_search_result(chunk, document, cosine_sim, relevance_score, query, model_name)
+                for relevance_score, cosine_sim, chunk, document in ranked[:limit]
+            ]
             
             self.logger.info(f"Found {len(results)} similar chunks for query with model {model_name}")
             return results
@@ -329,6 +413,79 @@ class EmbeddingService:
             self.logger.error(f"Failed to search similar chunks: {str(e)}")
             raise ProcessingError(f"Failed to search similar chunks: {str(e)}")
     
+    async def search_similar_chunks_async(self, tenant_id: int, query: str, limit: int = 10,
+                                          min_similarity: float = 0.7, model: str = None,
+                                          source_ids: List[int] = None) -> List[Dict[str, Any]]:
+        """Async variant of search_similar_chunks that keeps the event loop free."""
+        query_vector = await self.generate_embedding_async(query, model)
+        return await run_in_app_context(
+            self.search_similar_chunks, tenant_id, query, limit=limit,
+            min_similarity=min_similarity, model=model, source_ids=source_ids,
+            query_vector=query_vector
+        )
+    
+    def _score_embedding_matrix(self, tenant_id: int, model_name: str, query_vector: np.ndarray,
+                                k: int, min_similarity: float,
+                                source_ids: List[int] = None) -> List[Tuple[int, int, float]]:
+        """Score every stored vector with one matrix-vector product and keep the top k."""
+        embedding_ids, chunk_ids, matrix = Embedding.load_vector_matrix(tenant_id, model_name, source_ids)
+        if matrix.shape[0] == 0:
+            return []
+        
+        query = np.asarray(query_vector, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        dots = matrix @ query
+        scores = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+        np.clip(scores, -1.0, 1.0, out=scores)
+        
+        passing = np.flatnonzero(scores >= min_similarity)
+        if passing.size > k:
+            passing = passing[np.argpartition(scores[passing], -k)[-k:]]
+        passing = passing[np.argsort(-scores[passing], kind='stable')]
+        
+        return [(int(embedding_ids[i]), int(chunk_ids[i]), float(scores[i])) for i in passing]
+    
+    def _load_chunks_with_documents(self, chunk_ids: List[int]) -> Dict[int, Chunk]:
+        """Load chunks with their documents and sources eagerly, keyed by chunk id."""
+        from sqlalchemy.orm import joinedload
+        from app.models.knowledge import Document
+        
+        if not chunk_ids:
+            return {}
+        
+        chunks = Chunk.query.options(
+            joinedload(Chunk.document).joinedload(Document.source)
+        ).filter(Chunk.id.in_(chunk_ids)).all()
+        
+        return {chunk.id: chunk for chunk in chunks}
+    
+    def _format_search_result(self, chunk: Chunk, document, cosine_sim: float, relevance_score: float,
+                              query: str, model_name: str) -> Dict[str, Any]:
+        """Format a ranked chunk as a search result with citations."""
+        source = document.source if document else None
+        
+        return {
+            'chunk_id': chunk.id,
+            'document_id': document.id if document else None,
+            'content': chunk.content,
+            'content_preview': chunk.get_content_preview(300),
+            'similarity_score': float(cosine_sim),
+            'relevance_score': float(relevance_score),
+            'citations': self._generate_enhanced_citations(chunk, document, query),
+            'metadata': {
+                'chunk_position': chunk.position,
+                'token_count': chunk.token_count,
+                'document_title': document.title if document else None,
+                'source_name': source.name if source else None,
+                'source_type': source.source_type if source else None,
+                'url': document.url if document else None,
+                'model_used': model_name,
+                'search_query': query,
+                'chunk_overlap_start': chunk.overlap_start,
+                'chunk_overlap_end': chunk.overlap_end
+            }
+        }
+    
     def reindex_knowledge_source(self, tenant_id: int, source_id: int, model: str = None) -> Dict[str, Any]:
         """Re-index all documents in a knowledge source."""
         try:
@@ -346,39 +503,43 @@ class EmbeddingService:
                     'source_id': source_id,
                     'documents_processed': 0,
                     'embeddings_created': 0,
-                    'embeddings_updated': 0
+                    'embeddings_updated': 0,
+                    'embeddings_missing': 0
                 }
             
             model_name = model or self.DEFAULT_MODEL
-            total_embeddings_created = 0
-            total_embeddings_updated = 0
+            document_ids = [document.id for document in documents]
+            
+            # Delete existing embeddings for this model
+            removed_ids = [
+                row.id for row in db.session.query(Embedding.id).join(Chunk).filter(
+                    Chunk.document_id.in_(document_ids),
+                    Embedding.model_name == model_name
+                )
+            ]
+            
+            if removed_ids:
+                Embedding.query.filter(Embedding.id.in_(removed_ids))\
+                    .delete(synchronize_session=False)
+                db.session.commit()
+            self._update_vector_index(tenant_id, model_name, removed_ids=removed_ids)
+            
+            # Embed the whole source in large slices so the batch executor
+            # keeps several requests in flight, instead of one document at a time
+            chunks = Chunk.query.filter(Chunk.document_id.in_(document_ids))\
+                .order_by(Chunk.document_id, Chunk.position).all()
             
-            # Process each document
-            for document in documents:
+            total_embeddings_created = 0
+            for start in range(0, len(chunks), self.REINDEX_SLICE_SIZE):
+                chunk_slice = chunks[start:start + self.REINDEX_SLICE_SIZE]
                 try:
-                    # Delete existing embeddings for this model
-                    existing_embeddings = Embedding.query.join(Chunk).filter(
-                        Chunk.document_id == document.id,
-                        Embedding.model_name == model_name
-                    ).all()
-                    
-                    embeddings_updated = len(existing_embeddings)
-                    for embedding in existing_embeddings:
-                        embedding.delete()
-                    
-                    # Create new embeddings
-                    new_embeddings = self.create_document_embeddings(
-                        tenant_id, document.id, model_name
-                    )
-                    
+                    new_embeddings = self.create_chunk_embeddings(tenant_id, chunk_slice, model_name)
                     total_embeddings_created += len(new_embeddings)
-                    total_embeddings_updated += embeddings_updated
-                    
-                    self.logger.info(f"Re-indexed document {document.id}: {len(new_embeddings)} embeddings")
-                    
                 except Exception as e:
-                    self.logger.error(f"Failed to re-index document {document.id}: {str(e)}")
-                    continue
+                    self.logger.error(
+                        f"Failed to re-index chunks {start + 1}-{start + len(chunk_slice)} "
+                        f"of source {source_id}: {str(e)}"
+                    )
             
             # Update source status
             source.mark_as_completed()
@@ -388,7 +549,8 @@ class EmbeddingService:
                 'source_id': source_id,
                 'documents_processed': len(documents),
                 'embeddings_created': total_embeddings_created,
-                'embeddings_updated': total_embeddings_updated
+                'embeddings_updated': len(removed_ids),
+                'embeddings_missing': len(chunks) - total_embeddings_created
             }
             
             self.logger.info(f"Re-indexed knowledge source {source_id}: {result}")
@@ -398,6 +560,36 @@ class EmbeddingService:
             self.logger.error(f"Failed to re-index knowledge source: {str(e)}")
             raise ProcessingError(f"Failed to re-index knowledge source: {str(e)}")
     
+    def _search_vector_index(self, tenant_id: int, model_name: str, query_vector: np.ndarray,
+                             k: int, min_similarity: float,
+                             source_ids: List[int] = None) -> Optional[List[Tuple[int, int, float]]]:
+        """Get the top candidates from the ANN index, or None to fall back to a full scan."""
+        if not vector_index_manager.is_enabled():
+            return None
+        
+        try:
+            return vector_index_manager.search(
+                tenant_id, model_name, query_vector, k,
+                min_similarity=min_similarity, source_ids=source_ids
+            )
+        except Exception as e:
+            self.logger.warning(f"Vector index search failed, falling back to full scan: {str(e)}")
+            return None
+    
+    def _update_vector_index(self, tenant_id: int, model_name: str, added: List[Embedding] = None,
+                             removed_ids: List[int] = None):
+        """Apply incremental changes to the ANN index without failing the caller."""
+        if not vector_index_manager.is_enabled():
+            return
+        
+        try:
+            if removed_ids:
+                vector_index_manager.remove_embeddings(tenant_id, model_name, removed_ids)
+            if added:
+                vector_index_manager.add_embeddings(tenant_id, model_name, added)
+        except Exception as e:
+            self.logger.warning(f"Failed to update vector index for tenant {tenant_id}: {str(e)}")
+    
     def _prepare_text(self, text: str) -> str:
         """Prepare text for embedding generation."""
         if not text:
@@ -441,7 +633,8 @@ class EmbeddingService:
             self.logger.warning(f"Failed to calculate cosine similarity: {str(e)}")
             return 0.0
     
-    def _calculate_relevance_score(self, cosine_sim: float, chunk: Chunk, document, query_terms: set) -> float:
+    def _calculate_relevance_score(self, cosine_sim: float, chunk: Chunk, document, query_terms: set,
+                                   document_boost: float = None) -> float:
         """Calculate enhanced relevance score combining multiple factors."""
         try:
             # Start with cosine similarity (weight: 0.7)
@@ -455,29 +648,9 @@ class EmbeddingService:
                 relevance_score += text_relevance * 0.2
             
             # Add document-level factors (weight: 0.1)
-            doc_boost = 0.0
-            if document:
-                # Boost for title matches
-                if document.title and any(term in document.title.lower() for term in query_terms):
-                    doc_boost += 0.3
-                
-                # Boost for recent documents (if timestamp available)
-                if hasattr(document, 'created_at') and document.created_at:
-                    from datetime import datetime, timedelta
-                    if isinstance(document.created_at, str):
-                        # Handle string timestamps
-                        try:
-                            from dateutil.parser import parse
-                            doc_date = parse(document.created_at)
-                        except:
-                            doc_date = None
-                    else:
-                        doc_date = document.created_at
-                    
-                    if doc_date and (datetime.utcnow() - doc_date) < timedelta(days=30):
-                        doc_boost += 0.1
-            
-            relevance_score += doc_boost * 0.1
+            if document_boost is None:
+                document_boost = self._calculate_document_boost(document, query_terms)
+            relevance_score += document_boost * 0.1
             
             # Ensure score is between 0 and 1
             return max(0.0, min(1.0, relevance_score))
@@ -486,6 +659,38 @@ class EmbeddingService:
             self.logger.warning(f"Failed to calculate relevance score: {str(e)}")
             return cosine_sim  # Fallback to cosine similarity
     
+    def _calculate_document_boost(self, document, query_terms: set, recency_cutoff: datetime = None) -> float:
+        """Calculate the document-level boost (title matches and recency) shared by its chunks."""
+        doc_boost = 0.0
+        if not document:
+            return doc_boost
+        
+        # Boost for title matches
+        if document.title and any(term in document.title.lower() for term in query_terms):
+            doc_boost += 0.3
+        
+        # Boost for recent documents (if timestamp available)
+        if getattr(document, 'created_at', None):
+            if recency_cutoff is None:
+                recency_cutoff = datetime.utcnow() - timedelta(days=self.RECENCY_BOOST_DAYS)
+            
+            doc_date = document.created_at
+            if isinstance(doc_date, str):
+                # Handle string timestamps
+                try:
+                    from dateutil.parser import parse
+                    doc_date = parse(doc_date)
+                except Exception:
+                    doc_date = None
+            
+            if isinstance(doc_date, datetime):
+                if doc_date.tzinfo is not None:
+                    doc_date = doc_date.astimezone(timezone.utc).replace(tzinfo=None)
+                if doc_date > recency_cutoff:
+                    doc_boost += 0.1
+        
+        return doc_boost
+    
     def _generate_citations(self, chunk: Chunk, document) -> Dict[str, Any]:
         """Generate citation information for a chunk."""
         citations = {
@@ -660,7 +865,8 @@ class EmbeddingService:
                 'embeddings_by_model': {model: count for model, count in model_stats},
                 'total_chunks': total_chunks,
                 'embedded_chunks': embedded_chunks,
-                'embedding_coverage': (embedded_chunks / max(total_chunks, 1)) * 100
+                'embedding_coverage': (embedded_chunks / max(total_chunks, 1)) * 100,
+                'query_cache': embedding_cache.get_stats()
             }
             
         except Exception as e:
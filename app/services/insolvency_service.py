@@ -45,41 +45,63 @@ class InsolvencyMonitoringService:
                     'country_code': counterparty.country_code
                 }
             
-            # Prepare search parameters
-            search_params = {
-                'registration_number': counterparty.registration_number,
-                'city': counterparty.city,
-                'postal_code': counterparty.postal_code
-            }
-            
-            # Remove None values
-            search_params = {k: v for k, v in search_params.items() if v}
-            
             # Perform insolvency check
-            result = self.adapter.check_single(counterparty.name, **search_params)
-            
-            # Process and store results
-            processed_result = self._process_insolvency_result(counterparty, result)
-            
-            # Create snapshot
-            snapshot = self._create_insolvency_snapshot(counterparty, processed_result)
-            
-            # Check for changes and generate alerts if needed
-            if snapshot and processed_result.get('proceedings_found'):
-                self._check_for_new_proceedings(counterparty, snapshot)
+            result = self.adapter.check_single(
+                counterparty.name, **self.search_params(counterparty.registration_number,
+                                                        counterparty.city, counterparty.postal_code)
+            )
             
-            return {
-                'counterparty_id': counterparty_id,
-                'counterparty_name': counterparty.name,
-                'check_result': processed_result,
-                'snapshot_id': snapshot.id if snapshot else None,
-                'checked_at': datetime.utcnow().isoformat()
-            }
+            return self.record_insolvency_check(counterparty, result)
             
         except Exception as e:
             logger.error(f"Error checking insolvency for counterparty {counterparty_id}: {e}")
             raise KYBError(f"Insolvency check failed: {str(e)}")
     
+    @staticmethod
+    def search_params(registration_number: str = None, city: str = None,
+                      postal_code: str = None) -> Dict[str, Any]:
+        """Build adapter search parameters for a counterparty, leaving out missing values."""
+        search_params = {
+            'registration_number': registration_number,
+            'city': city,
+            'postal_code': postal_code
+        }
+        
+        # Remove None values
+        return {k: v for k, v in search_params.items() if v}
+    
+    def record_insolvency_check(self, counterparty: Counterparty, result: Dict[str, Any],
+                                commit: bool = True) -> Dict[str, Any]:
+        """
+        Store an adapter result for a counterparty and alert on new proceedings.
+        
+        Args:
+            counterparty: Counterparty object
+            result: Raw result from adapter
+            commit: Whether to commit; otherwise records are only flushed so
+                the caller can commit them with its own changes
+        
+        Returns:
+            Dict with check results
+        """
+        # Process and store results
+        processed_result = self._process_insolvency_result(counterparty, result)
+        
+        # Create snapshot
+        snapshot = self._create_insolvency_snapshot(counterparty, processed_result, commit=commit)
+        
+        # Check for changes and generate alerts if needed
+        if snapshot and processed_result.get('proceedings_found'):
+            self._check_for_new_proceedings(counterparty, snapshot, commit=commit)
+        
+        return {
+            'counterparty_id': counterparty.id,
+            'counterparty_name': counterparty.name,
+            'check_result': processed_result,
+            'snapshot_id': snapshot.id if snapshot else None,
+            'checked_at': datetime.utcnow().isoformat()
+        }
+    
     def batch_check_insolvency(self, counterparty_ids: List[int]) -> List[Dict[str, Any]]:
         """
         Check multiple counterparties for insolvency proceedings.
@@ -278,13 +300,14 @@ class InsolvencyMonitoringService:
         return risk_analysis
     
     def _create_insolvency_snapshot(self, counterparty: Counterparty, 
-                                  result: Dict[str, Any]) -> Optional[CounterpartySnapshot]:
+                                  result: Dict[str, Any], commit: bool = True) -> Optional[CounterpartySnapshot]:
         """
         Create a snapshot record for insolvency check result.
         
         Args:
             counterparty: Counterparty object
             result: Processed insolvency check result
+            commit: Whether to commit or only flush the snapshot
         
         Returns:
             Created snapshot or None if creation failed
@@ -324,24 +347,29 @@ class InsolvencyMonitoringService:
             )
             
             db.session.add(snapshot)
-            db.session.commit()
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
             
             logger.info(f"Created insolvency snapshot {snapshot.id} for counterparty {counterparty.id}")
             return snapshot
             
         except Exception as e:
             logger.error(f"Error creating insolvency snapshot: {e}")
-            db.session.rollback()
+            if commit:
+                db.session.rollback()
             return None
     
     def _check_for_new_proceedings(self, counterparty: Counterparty, 
-                                 new_snapshot: CounterpartySnapshot) -> None:
+                                 new_snapshot: CounterpartySnapshot, commit: bool = True) -> None:
         """
         Check for new insolvency proceedings and generate alerts.
         
         Args:
             counterparty: Counterparty object
             new_snapshot: New snapshot with insolvency data
+            commit: Whether to commit or only flush generated alerts
         """
         try:
             # Get previous insolvency snapshot
@@ -358,7 +386,8 @@ class InsolvencyMonitoringService:
                         counterparty, 
                         new_snapshot, 
                         'new_insolvency_detected',
-                        'New insolvency proceedings detected'
+                        'New insolvency proceedings detected',
+                        commit=commit
                     )
                 return
             
@@ -377,7 +406,8 @@ class InsolvencyMonitoringService:
                     counterparty,
                     new_snapshot,
                     'new_insolvency_proceeding',
-                    f'New insolvency proceeding(s) detected: {", ".join(truly_new_cases)}'
+                    f'New insolvency proceeding(s) detected: {", ".join(truly_new_cases)}',
+                    commit=commit
                 )
             
             # Check for status changes in existing proceedings
@@ -394,7 +424,8 @@ class InsolvencyMonitoringService:
                         counterparty,
                         new_snapshot,
                         'insolvency_status_change',
-                        f'Insolvency proceeding status changed: {case_number} from {old_proc.get("status")} to {new_proc.get("status")}'
+                        f'Insolvency proceeding status changed: {case_number} from {old_proc.get("status")} to {new_proc.get("status")}',
+                        commit=commit
                     )
             
         except Exception as e:
@@ -402,7 +433,7 @@ class InsolvencyMonitoringService:
     
     def _generate_insolvency_alert(self, counterparty: Counterparty, 
                                  snapshot: CounterpartySnapshot,
-                                 alert_type: str, message: str) -> None:
+                                 alert_type: str, message: str, commit: bool = True) -> None:
         """
         Generate an insolvency-related alert.
         
@@ -411,6 +442,7 @@ class InsolvencyMonitoringService:
             snapshot: Related snapshot
             alert_type: Type of alert
             message: Alert message
+            commit: Whether to commit or only flush the alert
         """
         try:
             # Determine severity based on alert type
@@ -439,10 +471,14 @@ class InsolvencyMonitoringService:
             )
             
             db.session.add(alert)
-            db.session.commit()
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
             
             logger.info(f"Generated insolvency alert {alert.id} for counterparty {counterparty.id}")
             
         except Exception as e:
             logger.error(f"Error generating insolvency alert: {e}")
-            db.session.rollback()
\ No newline at end of file
+            if commit:
+                db.session.rollback()
\ No newline at end of file
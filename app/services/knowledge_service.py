@@ -8,10 +8,13 @@ import requests
 from werkzeug.utils import secure_filename
 from flask import current_app
 from app.models.knowledge import KnowledgeSource, Document, Chunk, Embedding
-from app.services.document_processor import DocumentProcessor
 from app.services.web_scraper import WebScraper
-from app.services.text_chunker import TextChunker, ChunkConfig
+from app.services.site_crawler import SiteCrawler, CrawlPage
 from app.services.embedding_service import EmbeddingService
+from app.services.document_ingestion import DocumentIngestionPipeline
+from app.services.lexical_search import LexicalSearchIndex, reciprocal_rank_fusion
+from app.services.openai_client import run_in_app_context
+from app.services.response_cache import response_cache
 from app import db
 from app.utils.exceptions import ValidationError, ProcessingError
 
@@ -21,6 +24,8 @@ class KnowledgeService:
     
     ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'md', 'txt', 'html', 'htm'}
     MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+    HYBRID_CANDIDATE_MULTIPLIER = 3  # Candidates fetched from each ranking per requested result
+    RRF_K = 60  # Reciprocal-rank fusion constant
     
     @classmethod
     def create_document_source(cls, tenant_id: int, name: str, description: str = None, 
@@ -68,7 +73,7 @@ class KnowledgeService:
     
     @classmethod
     def upload_document(cls, tenant_id: int, source_id: int, file, title: str = None) -> Document:
-        """Upload and process a document."""
+        """Upload a document and queue it for ingestion."""
         try:
             # Validate file
             if not file or not file.filename:
@@ -101,71 +106,39 @@ class KnowledgeService:
             # Get file info
             file_size = os.path.getsize(file_path)
             mime_type = mimetypes.guess_type(filename)[0]
+            file_hash = cls._hash_file(file_path)
             
-            # Process document using DocumentProcessor
-            processor_result = DocumentProcessor.extract_text_from_file(file_path, mime_type)
+            # Re-uploading an unchanged file only fills in missing embeddings
+            existing_doc = cls._find_uploaded_file(tenant_id, source_id, file_size, file_hash)
+            if existing_doc:
+                if existing_doc.file_path != file_path:
+                    os.remove(file_path)
+                
+                try:
+                    embedding_service = EmbeddingService()
+                    embedding_service.create_document_embeddings(tenant_id, existing_doc.id)
+                except Exception as e:
+                    current_app.logger.warning(f"Failed to generate embeddings for document {existing_doc.id}: {str(e)}")
+                
+                current_app.logger.info(f"Document {filename} is unchanged, reusing document {existing_doc.id}")
+                return existing_doc
             
-            # Create document
+            # Create document; text is extracted by the ingestion pipeline
             document = Document.create(
                 tenant_id=tenant_id,
                 source_id=source_id,
-                title=title or processor_result['metadata'].get('title', filename),
-                content=processor_result['content'],
+                title=title or filename,
                 filename=filename,
                 file_path=file_path,
                 file_size=file_size,
                 mime_type=mime_type,
-                token_count=processor_result['token_count'],
-                content_hash=processor_result['content_hash']
-            )
-            
-            # Mark as processing
-            document.mark_as_processing()
-            document.save()
-            
-            # Create chunks using TextChunker
-            chunker = TextChunker()
-            chunks_data = chunker.chunk_document_content(
-                processor_result['content'], 
-                processor_result['metadata']
+                extra_data={'file_hash': file_hash}
             )
-            
-            # Save chunks to database
-            for chunk_data in chunks_data:
-                chunk = Chunk.create(
-                    tenant_id=tenant_id,
-                    document_id=document.id,
-                    content=chunk_data['content'],
-                    position=chunk_data['position'],
-                    token_count=chunk_data['token_count'],
-                    overlap_start=chunk_data['overlap_start'],
-                    overlap_end=chunk_data['overlap_end'],
-                    extra_data={
-                        'chunk_type': chunk_data.get('chunk_type', 'unknown'),
-                        'is_first': chunk_data.get('is_first', False),
-                        'is_last': chunk_data.get('is_last', False)
-                    }
-                )
-                chunk.save()
-            
-            # Mark document as completed
-            document.mark_as_completed()
+            document.update_progress(stage='queued')
             document.save()
             
-            # Generate embeddings for the document
-            try:
-                embedding_service = EmbeddingService()
-                embeddings = embedding_service.create_document_embeddings(tenant_id, document.id)
-                current_app.logger.info(f"Generated {len(embeddings)} embeddings for document {document.id}")
-            except Exception as e:
-                current_app.logger.warning(f"Failed to generate embeddings for document {document.id}: {str(e)}")
-                # Don't fail the entire upload if embedding generation fails
-            
-            # Update source statistics
-            source.update_statistics()
-            source.save()
-            
-            current_app.logger.info(f"Successfully processed document {filename} with {len(chunks_data)} chunks")
+            cls._schedule_ingestion(tenant_id, document)
+            response_cache.invalidate_tenant(tenant_id)
             
             return document
             
@@ -175,9 +148,67 @@ class KnowledgeService:
             current_app.logger.error(f"Failed to upload document: {str(e)}")
             raise ProcessingError(f"Failed to upload document: {str(e)}")
     
+    @classmethod
+    def _schedule_ingestion(cls, tenant_id: int, document: Document) -> bool:
+        """
+        Queue document ingestion on a Celery worker, or run it inline.
+        
+        Returns:
+            True if ingestion was queued, False if it already ran inline
+        """
+        if current_app.config.get('KNOWLEDGE_ASYNC_INGESTION') and current_app.config.get('CELERY_BROKER_URL'):
+            try:
+                from app.workers.knowledge import ingest_document
+                task = ingest_document.delay(tenant_id, document.id)
+                
+                document.update_progress(task_id=task.id)
+                document.save()
+                
+                current_app.logger.info(f"Queued ingestion of document {document.id}, task: {task.id}")
+                return True
+            except Exception as e:
+                current_app.logger.warning(f"Failed to queue ingestion of document {document.id}, running inline: {str(e)}")
+        
+        DocumentIngestionPipeline(tenant_id).run(document.id)
+        return False
+    
+    @staticmethod
+    def _hash_file(file_path: str) -> str:
+        """Hash a stored file without reading it into memory at once."""
+        hasher = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                hasher.update(block)
+        return hasher.hexdigest()
+    
+    @staticmethod
+    def _find_uploaded_file(tenant_id: int, source_id: int, file_size: int, file_hash: str) -> Optional[Document]:
+        """Find a completed document in the source that was ingested from identical file bytes."""
+        candidates = Document.query.filter_by(
+            tenant_id=tenant_id,
+            source_id=source_id,
+            file_size=file_size,
+            processing_status='completed'
+        ).all()
+        
+        for candidate in candidates:
+            if candidate.get_metadata('file_hash') == file_hash:
+                return candidate
+        return None
+    
     @classmethod
     def crawl_url(cls, tenant_id: int, source_id: int, url: str = None) -> List[Document]:
-        """Crawl URL and create documents."""
+        """
+        Crawl URL and create or update documents.
+        
+        Pages stream from the crawler into the ingestion pipeline as they
+        arrive. Pages crawled before are re-fetched with their ETag and
+        Last-Modified, so pages the server reports unchanged are neither
+        downloaded nor re-embedded.
+        
+        Returns:
+            Documents created or updated by this crawl
+        """
         try:
             # Get source
             source = KnowledgeSource.get_by_id(source_id)
@@ -197,88 +228,39 @@ class KnowledgeService:
             source.save()
             
             try:
-                # Crawl URL using WebScraper
-                with WebScraper(respect_robots=True, delay=1.0) as scraper:
-                    scraped_content = scraper.scrape_url(crawl_url, max_depth=source.max_depth)
-                
+                known_documents = cls._crawled_documents(source_id)
+                known_pages = {page_url: crawl_data for page_url, (_, _, crawl_data) in known_documents.items()}
+                pipeline = DocumentIngestionPipeline(tenant_id)
                 documents = []
                 
-                for content_data in scraped_content:
-                    # Check for duplicate content
-                    content_hash = hashlib.sha256(content_data['content'].encode('utf-8')).hexdigest()
-                    existing_doc = Document.find_by_content_hash(tenant_id, content_hash)
-                    
-                    if existing_doc:
-                        current_app.logger.info(f"Skipping duplicate content from {content_data['url']}")
-                        continue
-                    
-                    # Create document
-                    document = Document.create(
-                        tenant_id=tenant_id,
-                        source_id=source_id,
-                        title=content_data['title'],
-                        content=content_data['content'],
-                        url=content_data['url'],
-                        token_count=content_data['token_count'],
-                        content_hash=content_hash
-                    )
-                    
-                    # Mark as processing
-                    document.mark_as_processing()
-                    document.save()
-                    
-                    # Create chunks using TextChunker
-                    chunker = TextChunker()
-                    chunks_data = chunker.chunk_document_content(
-                        content_data['content'], 
-                        content_data['metadata']
+                with WebScraper(respect_robots=True) as scraper:
+                    crawler = SiteCrawler.from_config(
+                        scraper, max_depth=source.max_depth, known_pages=known_pages
                     )
-                    
-                    # Save chunks to database
-                    for chunk_data in chunks_data:
-                        chunk = Chunk.create(
-                            tenant_id=tenant_id,
-                            document_id=document.id,
-                            content=chunk_data['content'],
-                            position=chunk_data['position'],
-                            token_count=chunk_data['token_count'],
-                            overlap_start=chunk_data['overlap_start'],
-                            overlap_end=chunk_data['overlap_end'],
-                            extra_data={
-                                'chunk_type': chunk_data.get('chunk_type', 'unknown'),
-                                'is_first': chunk_data.get('is_first', False),
-                                'is_last': chunk_data.get('is_last', False),
-                                'source_url': content_data['url']
-                            }
+                    for page in crawler.crawl(crawl_url):
+                        document = cls._index_crawled_page(
+                            tenant_id, source_id, page, known_documents.get(page.url), pipeline
                         )
-                        chunk.save()
-                    
-                    # Mark document as completed
-                    document.mark_as_completed()
-                    document.save()
-                    
-                    # Generate embeddings for the document
-                    try:
-                        embedding_service = EmbeddingService()
-                        embeddings = embedding_service.create_document_embeddings(tenant_id, document.id)
-                        current_app.logger.info(f"Generated {len(embeddings)} embeddings for document {document.id}")
-                    except Exception as e:
-                        current_app.logger.warning(f"Failed to generate embeddings for document {document.id}: {str(e)}")
-                        # Don't fail the entire crawl if embedding generation fails
-                    
-                    documents.append(document)
-                    
-                    current_app.logger.info(f"Successfully processed URL {content_data['url']} with {len(chunks_data)} chunks")
+                        if document:
+                            documents.append(document)
+                
+                current_app.logger.info(
+                    f"Crawled {crawl_url}: {crawler.stats['fetched']} fetched, "
+                    f"{crawler.stats['not_modified']} unchanged, {crawler.stats['errors']} failed, "
+                    f"{len(documents)} documents indexed"
+                )
                 
                 # Mark source as completed
                 source.mark_as_completed()
                 source.update_statistics()
                 source.save()
+                response_cache.invalidate_tenant(tenant_id)
                 
                 return documents
                 
             except Exception as e:
                 # Mark source as error
+                db.session.rollback()
                 source.mark_as_error(str(e))
                 source.save()
                 raise
@@ -289,98 +271,252 @@ class KnowledgeService:
             current_app.logger.error(f"Failed to crawl URL: {str(e)}")
             raise ProcessingError(f"Failed to crawl URL: {str(e)}")
     
+    @staticmethod
+    def _crawled_documents(source_id: int) -> Dict[str, Tuple[int, Optional[str], Dict[str, Any]]]:
+        """Map the page URLs of a source to (document id, content hash, crawl validators)."""
+        rows = db.session.query(
+            Document.id, Document.url, Document.content_hash, Document.extra_data
+        ).filter(Document.source_id == source_id, Document.url.isnot(None)).all()
+        
+        return {
+            row.url: (row.id, row.content_hash, (row.extra_data or {}).get('crawl') or {})
+            for row in rows
+        }
+    
+    @classmethod
+    def _index_crawled_page(cls, tenant_id: int, source_id: int, page: CrawlPage,
+                            known: Optional[Tuple[int, Optional[str], Dict[str, Any]]],
+                            pipeline: DocumentIngestionPipeline) -> Optional[Document]:
+        """
+        Index one crawled page.
+        
+        Returns:
+            The document created or re-ingested, or None if nothing changed
+        """
+        content_data = page.content
+        if page.status != 'fetched' or not content_data or not content_data.get('content'):
+            return None
+        
+        crawl_data = {
+            'etag': page.etag,
+            'last_modified': page.last_modified,
+            'links': page.links,
+            'depth': page.depth
+        }
+        content_hash = hashlib.sha256(content_data['content'].encode('utf-8')).hexdigest()
+        document = None
+        
+        try:
+            if known:
+                document_id, known_hash, _ = known
+                document = Document.get_by_id(document_id)
+                document.extra_data = {**(document.extra_data or {}), 'crawl': crawl_data}
+                
+                # Served again without validators, but the text is the same
+                if known_hash == content_hash and document.processing_status == 'completed':
+                    document.save()
+                    return None
+                
+                document.title = content_data['title']
+            else:
+                # Check for duplicate content
+                if Document.find_by_content_hash(tenant_id, content_hash):
+                    current_app.logger.info(f"Skipping duplicate content from {page.url}")
+                    return None
+                
+                document = Document.create(
+                    tenant_id=tenant_id,
+                    source_id=source_id,
+                    title=content_data['title'],
+                    url=page.url,
+                    extra_data={'crawl': crawl_data}
+                )
+            
+            pipeline.ingest(
+                document, [content_data['content']], content_data.get('metadata'), update_source=False
+            )
+            return document
+            
+        except Exception as e:
+            # One bad page must not fail the whole crawl
+            db.session.rollback()
+            if document is not None and document.id:
+                document.mark_as_error()
+                document.update_progress(stage='error', error=str(e))
+                document.save()
+            current_app.logger.warning(f"Failed to index crawled page {page.url}: {str(e)}")
+            return None
+    
     @classmethod
     def search_knowledge(cls, tenant_id: int, query: str, limit: int = 10, 
                         min_similarity: float = 0.7, model: str = None, 
-                        source_ids: List[int] = None) -> List[Dict[str, Any]]:
-        """Search knowledge base for relevant information using vector similarity."""
+                        source_ids: List[int] = None, query_vector=None) -> List[Dict[str, Any]]:
+        """
+        Search knowledge base with vector similarity and full-text search.
+        
+        Both rankings are combined with reciprocal-rank fusion. When
+        embeddings are unavailable the full-text ranking is used on its own.
+        A precomputed query_vector skips the query embedding request.
+        """
         try:
-            # Try vector similarity search first
+            candidate_limit = limit * cls.HYBRID_CANDIDATE_MULTIPLIER
+            vector_results = []
+            vector_error = None
+            
             try:
                 embedding_service = EmbeddingService()
                 vector_results = embedding_service.search_similar_chunks(
                     tenant_id=tenant_id,
                     query=query,
-                    limit=limit,
+                    limit=candidate_limit,
                     min_similarity=min_similarity,
                     model=model,
-                    source_ids=source_ids
+                    source_ids=source_ids,
+                    query_vector=query_vector
                 )
-                
-                if vector_results:
-                    current_app.logger.info(f"Found {len(vector_results)} results using vector search")
-                    return vector_results
-                    
             except Exception as e:
-                current_app.logger.warning(f"Vector search failed, falling back to text search: {str(e)}")
-            
-            # Fallback to text-based search if vector search fails or returns no results
-            from sqlalchemy import and_, or_
-            
-            search_terms = query.lower().split()
-            
-            # Search in document titles and content
-            documents = Document.query.join(KnowledgeSource).filter(
-                and_(
-                    Document.tenant_id == tenant_id,
-                    KnowledgeSource.status == 'completed',
-                    or_(*[
-                        Document.title.ilike(f'%{term}%') 
-                        for term in search_terms
-                    ])
-                )
-            ).limit(limit).all()
+                vector_error = e
+                current_app.logger.warning(f"Vector search failed, using full-text search only: {str(e)}")
             
-            results = []
-            for doc in documents:
-                # Calculate simple relevance score based on term matches
-                title_lower = doc.title.lower()
-                content_lower = (doc.content or '').lower()
-                
-                score = 0
-                for term in search_terms:
-                    if term in title_lower:
-                        score += 2  # Title matches are more important
-                    if term in content_lower:
-                        score += 1
-                
-                if score > 0:
-                    results.append({
-                        'document_id': doc.id,
-                        'title': doc.title,
-                        'content': doc.content[:500] if doc.content else '',
-                        'content_preview': doc.content[:500] if doc.content else '',
-                        'source_name': doc.source.name,
-                        'source_type': doc.source.source_type,
-                        'url': doc.url,
-                        'similarity_score': min(score / 10.0, 1.0),  # Normalize to 0-1 range
-                        'citations': {
-                            'source': doc.source.name,
-                            'title': doc.title,
-                            'url': doc.url or doc.source.source_url,
-                            'document_id': doc.id,
-                            'source_id': doc.source.id,
-                            'source_type': doc.source.source_type
-                        },
-                        'metadata': {
-                            'document_title': doc.title,
-                            'source_name': doc.source.name,
-                            'source_type': doc.source.source_type,
-                            'url': doc.url,
-                            'search_type': 'text_fallback'
-                        }
-                    })
-            
-            # Sort by relevance score
-            results.sort(key=lambda x: x['similarity_score'], reverse=True)
-            
-            current_app.logger.info(f"Found {len(results)} results using text search fallback")
+            try:
+                lexical_results = cls._search_chunk_text(tenant_id, query, candidate_limit, source_ids)
+            except Exception as e:
+                # Without vector results there is nothing to fall back to
+                if vector_error is not None:
+                    raise
+                current_app.logger.warning(f"Full-text search failed: {str(e)}")
+                lexical_results = []
+            
+            if not lexical_results:
+                results = vector_results[:limit]
+            elif not vector_results:
+                results = lexical_results[:limit]
+            else:
+                results = cls._fuse_results(vector_results, lexical_results, limit)
+            
+            current_app.logger.info(
+                f"Found {len(results)} results ({len(vector_results)} vector, "
+                f"{len(lexical_results)} full-text candidates)"
+            )
             return results
             
         except Exception as e:
             current_app.logger.error(f"Failed to search knowledge: {str(e)}")
             raise ProcessingError(f"Failed to search knowledge: {str(e)}")
     
+    @classmethod
+    async def search_knowledge_async(cls, tenant_id: int, query: str, limit: int = 10,
+                                     min_similarity: float = 0.7, model: str = None,
+                                     source_ids: List[int] = None) -> List[Dict[str, Any]]:
+        """
+        Async variant of search_knowledge for the secretary agents.
+        
+        The query embedding is requested on the shared async client and the
+        database work runs in a worker thread, so the event loop stays free.
+        """
+        query_vector = None
+        try:
+            query_vector = await EmbeddingService().generate_embedding_async(query, model)
+        except Exception as e:
+            current_app.logger.warning(f"Async query embedding failed: {str(e)}")
+        
+        return await run_in_app_context(
+            cls.search_knowledge, tenant_id, query, limit=limit,
+            min_similarity=min_similarity, model=model, source_ids=source_ids,
+            query_vector=query_vector
+        )
+    
+    @classmethod
+    def _search_chunk_text(cls, tenant_id: int, query: str, limit: int,
+                           source_ids: List[int] = None) -> List[Dict[str, Any]]:
+        """Rank chunks with the full-text index and format them as search results."""
+        from sqlalchemy.orm import joinedload
+        
+        matches = LexicalSearchIndex.search(tenant_id, query, limit=limit, source_ids=source_ids)
+        if not matches:
+            return []
+        
+        chunks = {
+            chunk.id: chunk
+            for chunk in Chunk.query.options(
+                joinedload(Chunk.document).joinedload(Document.source)
+            ).filter(Chunk.id.in_([chunk_id for chunk_id, _ in matches])).all()
+        }
+        
+        results = []
+        for chunk_id, score in matches:
+            chunk = chunks.get(chunk_id)
+            if chunk is None or chunk.document is None:
+                continue
+            
+            document = chunk.document
+            source = document.source
+            normalized_score = score / (score + 1.0) if score > 0 else 0.0
+            
+            results.append({
+                'chunk_id': chunk.id,
+                'document_id': document.id,
+                'title': document.title,
+                'content': chunk.content,
+                'content_preview': chunk.get_content_preview(300),
+                'source_name': source.name if source else None,
+                'source_type': source.source_type if source else None,
+                'url': document.url,
+                'similarity_score': normalized_score,
+                'relevance_score': normalized_score,
+                'lexical_score': score,
+                'citations': {
+                    'chunk_id': chunk.id,
+                    'position': chunk.position,
+                    'document_id': document.id,
+                    'document_title': document.title,
+                    'document_url': document.url,
+                    'source_id': source.id if source else None,
+                    'source_name': source.name if source else None,
+                    'source_type': source.source_type if source else None,
+                    'source_url': source.source_url if source else None
+                },
+                'metadata': {
+                    'chunk_position': chunk.position,
+                    'token_count': chunk.token_count,
+                    'document_title': document.title,
+                    'source_name': source.name if source else None,
+                    'source_type': source.source_type if source else None,
+                    'url': document.url,
+                    'search_query': query,
+                    'search_type': 'lexical'
+                }
+            })
+        
+        return results
+    
+    @classmethod
+    def _fuse_results(cls, vector_results: List[Dict[str, Any]], lexical_results: List[Dict[str, Any]],
+                      limit: int) -> List[Dict[str, Any]]:
+        """Merge vector and full-text rankings with reciprocal-rank fusion."""
+        vector_by_chunk = {result.get('chunk_id'): result for result in vector_results}
+        lexical_by_chunk = {result.get('chunk_id'): result for result in lexical_results}
+        
+        results = []
+        for chunk_id, fusion_score in reciprocal_rank_fusion(
+                [vector_results, lexical_results], k=cls.RRF_K)[:limit]:
+            in_vector = chunk_id in vector_by_chunk
+            in_lexical = chunk_id in lexical_by_chunk
+            
+            # Vector results carry the richer citations
+            result = dict(vector_by_chunk[chunk_id] if in_vector else lexical_by_chunk[chunk_id])
+            result['fusion_score'] = fusion_score
+            if in_lexical:
+                result['lexical_score'] = lexical_by_chunk[chunk_id]['lexical_score']
+            
+            metadata = dict(result.get('metadata') or {})
+            metadata['search_type'] = 'hybrid' if in_vector and in_lexical else ('vector' if in_vector else 'lexical')
+            result['metadata'] = metadata
+            
+            results.append(result)
+        
+        return results
+    
     @classmethod
     def get_sources(cls, tenant_id: int, status: str = None) -> List[KnowledgeSource]:
         """Get knowledge sources for tenant."""
@@ -430,6 +566,7 @@ class KnowledgeService:
             
             # Delete source (cascades to documents, chunks, embeddings)
             source.delete()
+            response_cache.invalidate_tenant(tenant_id)
             
             return True
             
@@ -459,6 +596,7 @@ class KnowledgeService:
             document.delete()
             source.update_statistics()
             source.save()
+            response_cache.invalidate_tenant(tenant_id)
             
             return True
             
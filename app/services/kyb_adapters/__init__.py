@@ -1,5 +1,5 @@
 """KYB data source adapters."""
-from .base import BaseKYBAdapter, KYBAdapterError, RateLimitExceeded, DataSourceUnavailable, ValidationError
+from .base import BaseKYBAdapter, KYBAdapterError, RateLimitExceeded, DataSourceUnavailable, ValidationError, CircuitOpenError
 from .vies import VIESAdapter
 from .gleif import GLEIFAdapter
 from .sanctions_eu import EUSanctionsAdapter
@@ -12,6 +12,7 @@ __all__ = [
     'RateLimitExceeded', 
     'DataSourceUnavailable',
     'ValidationError',
+    'CircuitOpenError',
     'VIESAdapter',
     'GLEIFAdapter',
     'EUSanctionsAdapter',
@@ -1,8 +1,13 @@
 """Base adapter for KYB data sources."""
+import copy
+import json
 import time
+import random
 import hashlib
+import threading
+import uuid
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from flask import current_app
 from redis import Redis
@@ -10,6 +15,9 @@ import structlog
 
 logger = structlog.get_logger()
 
+# Per-source counters reported by BaseKYBAdapter.get_stats()
+LOOKUP_COUNTERS = ('cache_hits', 'cache_misses', 'lookups', 'coalesced_local', 'coalesced_remote')
+
 
 class KYBAdapterError(Exception):
     """Base exception for KYB adapter errors."""
@@ -31,9 +39,28 @@ class ValidationError(KYBAdapterError):
     pass
 
 
+class CircuitOpenError(DataSourceUnavailable):
+    """Raised when a data source's circuit breaker is open."""
+    pass
+
+
+class _Flight:
+    """An in-process lookup that concurrent callers for the same key wait on."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
 class BaseKYBAdapter(ABC):
     """Base class for KYB data source adapters."""
     
+    # Lookups in flight in this process and per-source lookup counters
+    _flights: Dict[str, _Flight] = {}
+    _flights_lock = threading.Lock()
+    _lookup_counters: Dict[str, Dict[str, int]] = {}
+    
     def __init__(self, redis_client: Optional[Redis] = None):
         """Initialize adapter with optional Redis client for caching."""
         self.redis_client = redis_client
@@ -51,6 +78,18 @@ class BaseKYBAdapter(ABC):
         self.max_retries = getattr(self, 'MAX_RETRIES', 3)
         self.retry_delay = getattr(self, 'RETRY_DELAY', 1)  # seconds
         
+        # Single-flight configuration: how long a Redis lease is held and how
+        # often other workers poll for the lease holder's result
+        self.lease_ttl = getattr(self, 'LEASE_TTL', 30)  # seconds
+        self.lease_poll_interval = getattr(self, 'LEASE_POLL_INTERVAL', 0.1)  # seconds
+        self.flight_result_ttl = getattr(self, 'FLIGHT_RESULT_TTL', 5)  # seconds
+        
+        # Shared HTTP transport and per-source circuit breaker
+        from .transport import CircuitBreaker, get_transport
+        self.transport = get_transport()
+        self.headers = {}
+        self.circuit_breaker = CircuitBreaker(self.source_name, redis_client)
+        
         logger.info(f"Initialized {self.source_name} adapter", 
                    rate_limit=self.rate_limit, 
                    cache_ttl=self.cache_ttl)
@@ -123,14 +162,15 @@ class BaseKYBAdapter(ABC):
         try:
             cached_data = self.redis_client.get(f"kyb_cache:{cache_key}")
             if cached_data:
-                import json
                 result = json.loads(cached_data)
                 logger.debug(f"Cache hit for {self.source_name}", cache_key=cache_key)
+                self._count_lookup('cache_hits')
                 return result
         except Exception as e:
             logger.warning(f"Cache read error for {self.source_name}", 
                          error=str(e), cache_key=cache_key)
         
+        self._count_lookup('cache_misses')
         return None
     
     def _cache_result(self, cache_key: str, result: Dict[str, Any]) -> None:
@@ -139,7 +179,6 @@ class BaseKYBAdapter(ABC):
             return
         
         try:
-            import json
             self.redis_client.setex(
                 f"kyb_cache:{cache_key}", 
                 self.cache_ttl, 
@@ -150,6 +189,127 @@ class BaseKYBAdapter(ABC):
             logger.warning(f"Cache write error for {self.source_name}", 
                          error=str(e), cache_key=cache_key)
     
+    def _single_flight(self, cache_key: str, lookup: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run ``lookup`` at most once at a time per cache key.
+        
+        Concurrent callers in this process wait for the in-flight lookup. Across
+        processes, the caller holding the Redis lease ``kyb_lease:<key>`` performs
+        the lookup and publishes its result; the others poll for it. Results handed
+        to waiting callers are copies marked ``coalesced``.
+        """
+        with self._flights_lock:
+            flight = self._flights.get(cache_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[cache_key] = _Flight()
+        
+        if not leader:
+            if flight.done.wait(self.lease_ttl):
+                if flight.error is not None:
+                    raise flight.error
+                self._count_lookup('coalesced_local')
+                return self._coalesced(flight.result)
+            logger.warning(f"Coalesced {self.source_name} lookup timed out, querying directly",
+                           cache_key=cache_key)
+            self._count_lookup('lookups')
+            return lookup()
+        
+        try:
+            result = self._leased_lookup(cache_key, lookup)
+            flight.result = copy.deepcopy(result)
+            return result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(cache_key, None)
+            flight.done.set()
+    
+    def _leased_lookup(self, cache_key: str, lookup: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Run ``lookup`` under a cluster-wide Redis lease, or reuse the lease holder's result."""
+        if not self.redis_client:
+            self._count_lookup('lookups')
+            return lookup()
+        
+        lease_key = f"kyb_lease:{cache_key}"
+        result_key = f"kyb_flight:{cache_key}"
+        token = uuid.uuid4().hex
+        deadline = time.time() + self.lease_ttl
+        
+        waited = False
+        while True:
+            try:
+                leased = bool(self.redis_client.set(lease_key, token, nx=True, ex=int(self.lease_ttl)))
+            except Exception as e:
+                logger.warning(f"Lease acquisition failed for {self.source_name}", error=str(e))
+                leased = False
+                break
+            
+            # The previous holder may have published its result just before releasing
+            published = self._get_flight_result(result_key) if waited or not leased else None
+            if published is not None:
+                if leased:
+                    self._release_lease(lease_key, token)
+                self._count_lookup('coalesced_remote')
+                return self._coalesced(published)
+            if leased:
+                break
+            if time.time() >= deadline:
+                logger.warning(f"Lease for {self.source_name} lookup not released, querying directly",
+                               cache_key=cache_key)
+                break
+            time.sleep(self.lease_poll_interval)
+            waited = True
+        
+        try:
+            self._count_lookup('lookups')
+            result = lookup()
+            try:
+                self.redis_client.set(result_key, json.dumps(result, default=str), ex=self.flight_result_ttl)
+            except Exception as e:
+                logger.warning(f"Publishing {self.source_name} result failed", error=str(e))
+            return result
+        finally:
+            if leased:
+                self._release_lease(lease_key, token)
+    
+    def _get_flight_result(self, result_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            data = self.redis_client.get(result_key)
+            return json.loads(data) if data else None
+        except Exception as e:
+            logger.warning(f"Reading {self.source_name} published result failed", error=str(e))
+            return None
+    
+    def _release_lease(self, lease_key: str, token: str) -> None:
+        """Delete the lease if this caller still holds it."""
+        try:
+            holder = self.redis_client.get(lease_key)
+            if isinstance(holder, bytes):
+                holder = holder.decode()
+            if holder == token:
+                self.redis_client.delete(lease_key)
+        except Exception as e:
+            logger.warning(f"Lease release failed for {self.source_name}", error=str(e))
+    
+    @staticmethod
+    def _coalesced(result: Dict[str, Any]) -> Dict[str, Any]:
+        result = copy.deepcopy(result)
+        result['coalesced'] = True
+        return result
+    
+    def _count_lookup(self, counter: str) -> None:
+        with self._flights_lock:
+            counters = self._lookup_counters.setdefault(self.source_name, dict.fromkeys(LOOKUP_COUNTERS, 0))
+            counters[counter] += 1
+    
+    def _lookup_stats(self) -> Dict[str, int]:
+        """Cache hit and request coalescing counters for this source in this process."""
+        with self._flights_lock:
+            return dict(self._lookup_counters.get(self.source_name) or dict.fromkeys(LOOKUP_COUNTERS, 0))
+    
     def _execute_with_retry(self, func, *args, **kwargs) -> Any:
         """Execute function with retry logic."""
         last_exception = None
@@ -160,7 +320,7 @@ class BaseKYBAdapter(ABC):
             except (ConnectionError, TimeoutError) as e:
                 last_exception = e
                 if attempt < self.max_retries:
-                    delay = self.retry_delay * (2 ** attempt)  # Exponential backoff
+                    delay = self.retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5)  # Jittered backoff
                     logger.warning(f"Retry attempt {attempt + 1} for {self.source_name}", 
                                  delay=delay, error=str(e))
                     time.sleep(delay)
@@ -175,6 +335,20 @@ class BaseKYBAdapter(ABC):
         # If we get here, all retries failed
         raise DataSourceUnavailable(f"{self.source_name} unavailable after {self.max_retries + 1} attempts: {last_exception}")
     
+    def _http_request(self, method: str, url: str, timeout: float = 15, **kwargs):
+        """Send a request through the shared transport with this adapter's headers and breaker."""
+        headers = {**self.headers, **(kwargs.pop('headers', None) or {})}
+        return self.transport.request(self.source_name, method, url, timeout=timeout,
+                                      breaker=self.circuit_breaker, headers=headers, **kwargs)
+    
+    def _transport_stats(self) -> Dict[str, Any]:
+        """Circuit breaker state, request latency and lookup counters for this source."""
+        return {
+            'circuit_breaker': self.circuit_breaker.state(),
+            'transport': self.transport.get_stats(self.source_name),
+            'lookups': self._lookup_stats()
+        }
+    
     def _validate_identifier(self, identifier: str) -> str:
         """Validate and clean identifier. Override in subclasses."""
         if not identifier or not identifier.strip():
@@ -196,7 +370,7 @@ class BaseKYBAdapter(ABC):
     def get_stats(self) -> Dict[str, Any]:
         """Get adapter statistics."""
         if not self.redis_client:
-            return {'cache_enabled': False, 'rate_limit_enabled': False}
+            return {'cache_enabled': False, 'rate_limit_enabled': False, **self._transport_stats()}
         
         try:
             rate_limit_key = f"kyb_rate_limit:{self.source_name}"
@@ -220,6 +394,7 @@ class BaseKYBAdapter(ABC):
             return {
                 **cache_stats,
                 **rate_stats,
+                **self._transport_stats(),
                 'source': self.source_name
             }
         except Exception as e:
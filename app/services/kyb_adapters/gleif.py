@@ -9,6 +9,7 @@ import structlog
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from .base import BaseKYBAdapter, ValidationError, DataSourceUnavailable, RateLimitExceeded
+from .gleif_golden_copy import get_golden_copy_store
 
 logger = structlog.get_logger()
 
@@ -26,6 +27,7 @@ class GLEIFAdapter(BaseKYBAdapter):
     # GLEIF API endpoints
     BASE_URL = "https://api.gleif.org/api/v1"
     LEI_RECORDS_ENDPOINT = "/lei-records"
+    BULK_BATCH_SIZE = 200  # LEIs per filter[lei] request; GLEIF caps page[size] at 200
     
     # LEI format validation pattern (20 alphanumeric characters)
     LEI_PATTERN = r'^[A-Z0-9]{20}$'
@@ -33,8 +35,7 @@ class GLEIFAdapter(BaseKYBAdapter):
     def __init__(self, redis_client=None):
         """Initialize GLEIF adapter."""
         super().__init__(redis_client)
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers.update({
             'User-Agent': 'AI-Secretary-KYB/1.0',
             'Accept': 'application/vnd.api+json',
             'Content-Type': 'application/vnd.api+json'
@@ -52,6 +53,22 @@ class GLEIFAdapter(BaseKYBAdapter):
                 self.base_url = self.base_url.rstrip('/') + '/api/v1'
             else:
                 self.base_url = self.base_url + '/api/v1'
+        
+        # Offline Golden Copy store and bulk request size
+        try:
+            golden_copy_db = current_app.config.get('GLEIF_GOLDEN_COPY_DB')
+            self.bulk_batch_size = current_app.config.get('GLEIF_BULK_BATCH_SIZE', self.BULK_BATCH_SIZE)
+        except RuntimeError:
+            golden_copy_db = None
+            self.bulk_batch_size = self.BULK_BATCH_SIZE
+        self.bulk_batch_size = max(1, min(self.bulk_batch_size, self.BULK_BATCH_SIZE))
+        self.golden_copy = None
+        if golden_copy_db:
+            try:
+                self.golden_copy = get_golden_copy_store(golden_copy_db)
+            except Exception as e:
+                logger.warning("GLEIF Golden Copy unavailable, using API only",
+                               path=golden_copy_db, error=str(e))
     
     def check_single(self, lei_code: str, **kwargs) -> Dict[str, Any]:
         """
@@ -64,6 +81,9 @@ class GLEIFAdapter(BaseKYBAdapter):
                 - timeout: Request timeout in seconds (default: 15)
                 - include_relationships: Include relationship data (default: False)
                 
+        LEIs present in the offline Golden Copy are answered from disk unless
+        force_refresh is set; other LEIs are looked up through the API.
+                
         Returns:
             Dict with validation result and entity information
         """
@@ -76,6 +96,14 @@ class GLEIFAdapter(BaseKYBAdapter):
             # Validate LEI format
             validated_lei = self._validate_lei_format(lei_code)
             
+            if self.golden_copy and not force_refresh:
+                attributes = self.golden_copy.get(validated_lei)
+                if attributes:
+                    result = self._offline_result(validated_lei, attributes, start_time)
+                    if include_relationships:
+                        result['relationships'] = self.golden_copy.relationships(validated_lei)
+                    return result
+            
             # Check cache first (unless force refresh)
             cache_key = self._get_cache_key(validated_lei, include_relationships=include_relationships)
             if not force_refresh:
@@ -86,47 +114,14 @@ class GLEIFAdapter(BaseKYBAdapter):
                     logger.debug("GLEIF cache hit", lei_code=validated_lei)
                     return cached_result
             
-            # Check rate limit before making API call
-            if not self._check_rate_limit():
-                # If rate limited, try to return cached result even if stale
-                stale_result = self._get_cached_result(cache_key)
-                if stale_result:
-                    stale_result['cached'] = True
-                    stale_result['stale'] = True
-                    stale_result['warning'] = 'Rate limited - returning cached result'
-                    logger.warning("Rate limited, returning stale cache", lei_code=validated_lei)
-                    return stale_result
-                
-                raise RateLimitExceeded(f"Rate limit exceeded for {self.source_name}")
-            
-            # Make API request with retry logic
-            result = self._execute_with_retry(
-                self._make_gleif_request, 
-                validated_lei,
-                include_relationships=include_relationships,
-                timeout=request_timeout
+            # Identical concurrent lookups share one upstream request
+            result = self._single_flight(
+                cache_key,
+                lambda: self._lookup_lei(cache_key, validated_lei, include_relationships,
+                                         request_timeout, start_time)
             )
-            
-            # Enhance result with metadata
-            result['response_time_ms'] = int((time.time() - start_time) * 1000)
-            result['checked_at'] = datetime.utcnow().isoformat() + 'Z'
-            result['source'] = self.source_name
-            result['cached'] = False
-            result['identifier'] = validated_lei
-            
-            # Cache successful and not_found results (but not errors)
-            if result['status'] in ['valid', 'not_found']:
-                self._cache_result(cache_key, result)
-                logger.info("GLEIF check completed and cached", 
-                           lei_code=validated_lei,
-                           status=result['status'],
-                           response_time=result['response_time_ms'])
-            else:
-                logger.warning("GLEIF check completed with error - not caching", 
-                              lei_code=validated_lei,
-                              status=result['status'],
-                              error=result.get('error'))
-            
+            if result.get('coalesced'):
+                result['response_time_ms'] = int((time.time() - start_time) * 1000)
             return result
             
         except ValidationError as e:
@@ -148,25 +143,90 @@ class GLEIFAdapter(BaseKYBAdapter):
             error_result['response_time_ms'] = int((time.time() - start_time) * 1000)
             return error_result
     
+    def _lookup_lei(self, cache_key: str, validated_lei: str, include_relationships: bool,
+                    timeout: int, start_time: float) -> Dict[str, Any]:
+        """Query GLEIF for a validated LEI code and cache the result."""
+        # Check rate limit before making API call
+        if not self._check_rate_limit():
+            # If rate limited, try to return cached result even if stale
+            stale_result = self._get_cached_result(cache_key)
+            if stale_result:
+                stale_result['cached'] = True
+                stale_result['stale'] = True
+                stale_result['warning'] = 'Rate limited - returning cached result'
+                logger.warning("Rate limited, returning stale cache", lei_code=validated_lei)
+                return stale_result
+            
+            raise RateLimitExceeded(f"Rate limit exceeded for {self.source_name}")
+        
+        # Make API request with retry logic
+        result = self._execute_with_retry(
+            self._make_gleif_request, 
+            validated_lei,
+            include_relationships=include_relationships,
+            timeout=timeout
+        )
+        
+        # Enhance result with metadata
+        result['response_time_ms'] = int((time.time() - start_time) * 1000)
+        result['checked_at'] = datetime.utcnow().isoformat() + 'Z'
+        result['source'] = self.source_name
+        result['cached'] = False
+        result['identifier'] = validated_lei
+        
+        # Cache successful and not_found results (but not errors)
+        if result['status'] in ['valid', 'not_found']:
+            self._cache_result(cache_key, result)
+            logger.info("GLEIF check completed and cached", 
+                       lei_code=validated_lei,
+                       status=result['status'],
+                       response_time=result['response_time_ms'])
+        else:
+            logger.warning("GLEIF check completed with error - not caching", 
+                          lei_code=validated_lei,
+                          status=result['status'],
+                          error=result.get('error'))
+        
+        return result
+    
+    def _offline_result(self, lei_code: str, attributes: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        """Build a check result from a Golden Copy record."""
+        result = self._parse_gleif_response({'data': {'id': lei_code, 'attributes': attributes}}, lei_code)
+        result['response_time_ms'] = int((time.time() - start_time) * 1000)
+        result['checked_at'] = datetime.utcnow().isoformat() + 'Z'
+        result['source'] = self.source_name
+        result['cached'] = False
+        result['offline'] = True
+        return result
+    
     def check_batch(self, lei_codes: List[str], **kwargs) -> List[Dict[str, Any]]:
         """
         Check multiple LEI codes with optimized batch processing.
         
+        By default LEIs are answered from the offline Golden Copy and the cache
+        where possible, and the rest are requested in groups of up to
+        GLEIF_BULK_BATCH_SIZE LEIs per API call.
+        
         Args:
             lei_codes: List of LEI codes to check
             **kwargs: Additional options:
-                - batch_delay: Delay between requests (default: 0.5 seconds)
+                - bulk: Group LEIs into multi-LEI requests (default: True)
                 - max_workers: Maximum concurrent workers (default: 5)
-                - fail_fast: Stop on first error (default: False)
                 - timeout: Timeout per request (default: 15 seconds)
-                - include_relationships: Include relationship data (default: False)
+                - include_relationships: Include relationship data (default: False);
+                  checks LEIs one by one
+                - batch_delay: Delay between requests when checking one by one (default: 0.5 seconds)
+                - fail_fast: Stop on first error when checking one by one (default: False)
             
         Returns:
-            List of validation results
+            List of validation results in input order
         """
         if not lei_codes:
             return []
         
+        if kwargs.get('bulk', True) and not kwargs.get('include_relationships', False):
+            return self._check_batch_bulk(lei_codes, **kwargs)
+        
         logger.info("Starting GLEIF batch check", count=len(lei_codes))
         
         # Configuration
@@ -234,6 +294,92 @@ class GLEIFAdapter(BaseKYBAdapter):
         
         return results
     
+    def _check_batch_bulk(self, lei_codes: List[str], **kwargs) -> List[Dict[str, Any]]:
+        """Check LEIs from the Golden Copy and cache, requesting the rest in groups."""
+        start_time = time.time()
+        timeout = kwargs.get('timeout', 15)
+        max_workers = min(kwargs.get('max_workers', 5), 10)
+        
+        logger.info("Starting GLEIF bulk check", count=len(lei_codes))
+        
+        found: Dict[str, Dict[str, Any]] = {}
+        invalid: Dict[int, Dict[str, Any]] = {}
+        validated: List[Optional[str]] = []
+        for i, lei_code in enumerate(lei_codes):
+            try:
+                validated.append(self._validate_lei_format(lei_code))
+            except ValidationError as e:
+                validated.append(None)
+                invalid[i] = self._create_error_result(lei_code, str(e), 'validation_error')
+        
+        pending = list(dict.fromkeys(lei for lei in validated if lei))
+        
+        if self.golden_copy and pending:
+            for lei, attributes in self.golden_copy.get_many(pending).items():
+                found[lei] = self._offline_result(lei, attributes, start_time)
+            pending = [lei for lei in pending if lei not in found]
+        
+        missing = []
+        for lei in pending:
+            cached_result = self._get_cached_result(self._get_cache_key(lei, include_relationships=False))
+            if cached_result:
+                cached_result['cached'] = True
+                found[lei] = cached_result
+            else:
+                missing.append(lei)
+        
+        chunks = [missing[i:i + self.bulk_batch_size] for i in range(0, len(missing), self.bulk_batch_size)]
+        if len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for chunk_results in executor.map(lambda chunk: self._safe_lookup_chunk(chunk, timeout), chunks):
+                    found.update(chunk_results)
+        elif chunks:
+            found.update(self._safe_lookup_chunk(chunks[0], timeout))
+        
+        results = []
+        for i, lei in enumerate(validated):
+            if lei is None:
+                results.append(invalid[i])
+                continue
+            result = dict(found[lei])
+            result['response_time_ms'] = int((time.time() - start_time) * 1000)
+            results.append(result)
+        
+        logger.info("GLEIF bulk check completed",
+                   total=len(lei_codes),
+                   requests=len(chunks),
+                   successful=len([r for r in results if r['status'] in ['valid', 'not_found']]),
+                   offline=len([r for r in results if r.get('offline', False)]),
+                   cached=len([r for r in results if r.get('cached', False)]))
+        
+        return results
+    
+    def _safe_lookup_chunk(self, lei_codes: List[str], timeout: int) -> Dict[str, Dict[str, Any]]:
+        """Look up a group of LEIs, turning a failed request into error results for the group."""
+        try:
+            if not self._check_rate_limit():
+                raise RateLimitExceeded(f"Rate limit exceeded for {self.source_name}")
+            results = self._execute_with_retry(self._make_gleif_bulk_request, lei_codes, timeout=timeout)
+        except RateLimitExceeded as e:
+            logger.warning("Rate limit hit during bulk check", count=len(lei_codes))
+            return {lei: self._create_error_result(lei, str(e), 'rate_limited') for lei in lei_codes}
+        except DataSourceUnavailable as e:
+            logger.warning("GLEIF unavailable during bulk check", count=len(lei_codes), error=str(e))
+            return {lei: self._create_error_result(lei, str(e), 'unavailable') for lei in lei_codes}
+        except Exception as e:
+            logger.error("Unexpected error in bulk check", count=len(lei_codes), error=str(e), exc_info=True)
+            return {lei: self._create_error_result(lei, f"Unexpected error: {str(e)}") for lei in lei_codes}
+        
+        checked_at = datetime.utcnow().isoformat() + 'Z'
+        for lei, result in results.items():
+            result['checked_at'] = checked_at
+            result['source'] = self.source_name
+            result['cached'] = False
+            result['identifier'] = lei
+            if result['status'] in ['valid', 'not_found']:
+                self._cache_result(self._get_cache_key(lei, include_relationships=False), result)
+        return results
+    
     def _safe_check_single(self, lei_code: str, **kwargs) -> Dict[str, Any]:
         """Thread-safe wrapper for check_single with enhanced error handling."""
         try:
@@ -345,7 +491,8 @@ class GLEIFAdapter(BaseKYBAdapter):
                         timeout=timeout,
                         include_relationships=include_relationships)
             
-            response = self.session.get(
+            response = self._http_request(
+                'get',
                 url,
                 params=params,
                 timeout=timeout
@@ -359,21 +506,9 @@ class GLEIFAdapter(BaseKYBAdapter):
             if response.status_code == 200:
                 return self._parse_gleif_response(response.json(), lei_code)
             elif response.status_code == 404:
-                return {
-                    'identifier': lei_code,
-                    'status': 'not_found',
-                    'valid': False,
-                    'error': 'LEI code not found in GLEIF database',
-                    'lei_code': lei_code
-                }
-            elif response.status_code == 429:
-                raise RateLimitExceeded("GLEIF API rate limit exceeded")
-            elif response.status_code in [500, 502, 503, 504]:
-                raise DataSourceUnavailable(f"GLEIF API server error: HTTP {response.status_code}")
-            elif response.status_code == 400:
-                raise ValidationError(f"GLEIF API bad request: HTTP {response.status_code}")
+                return self._not_found_result(lei_code)
             else:
-                raise DataSourceUnavailable(f"GLEIF API returned HTTP {response.status_code}")
+                self._raise_for_status(response.status_code)
             
         except requests.exceptions.Timeout as e:
             logger.warning("GLEIF API timeout", timeout=timeout, error=str(e))
@@ -394,6 +529,72 @@ class GLEIFAdapter(BaseKYBAdapter):
             logger.error("Unexpected error in GLEIF request", error=str(e), exc_info=True)
             raise DataSourceUnavailable(f"Unexpected GLEIF API error: {str(e)}")
     
+    def _make_gleif_bulk_request(self, lei_codes: List[str], timeout: int = 15) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up several LEI codes with one filtered GLEIF API request.
+        
+        Args:
+            lei_codes: Validated LEI codes, at most BULK_BATCH_SIZE
+            timeout: Request timeout in seconds
+            
+        Returns:
+            Parsed results by LEI code; LEIs missing from the response are not_found
+        """
+        url = f"{self.base_url}{self.LEI_RECORDS_ENDPOINT}"
+        params = {
+            'filter[lei]': ','.join(lei_codes),
+            'page[size]': len(lei_codes)
+        }
+        
+        try:
+            logger.debug("Making GLEIF bulk request", count=len(lei_codes), timeout=timeout)
+            
+            response = self._http_request('get', url, params=params, timeout=timeout)
+            
+            if response.status_code != 200:
+                self._raise_for_status(response.status_code)
+            
+            items = response.json().get('data') or []
+            if isinstance(items, dict):
+                items = [items]
+            
+            results = {}
+            for item in items:
+                lei_code = (item.get('id') or item.get('attributes', {}).get('lei') or '').upper()
+                if lei_code in lei_codes:
+                    results[lei_code] = self._parse_gleif_response({'data': item}, lei_code)
+            for lei_code in lei_codes:
+                if lei_code not in results:
+                    results[lei_code] = self._not_found_result(lei_code)
+            return results
+            
+        except requests.exceptions.Timeout as e:
+            logger.warning("GLEIF API timeout", timeout=timeout, error=str(e))
+            raise DataSourceUnavailable(f"GLEIF API timeout after {timeout}s")
+        except requests.exceptions.RequestException as e:
+            logger.warning("GLEIF API bulk request failed", error=str(e))
+            raise DataSourceUnavailable(f"GLEIF API request failed: {str(e)}")
+    
+    def _not_found_result(self, lei_code: str) -> Dict[str, Any]:
+        return {
+            'identifier': lei_code,
+            'status': 'not_found',
+            'valid': False,
+            'error': 'LEI code not found in GLEIF database',
+            'lei_code': lei_code
+        }
+    
+    def _raise_for_status(self, status_code: int) -> None:
+        """Raise the adapter exception for an unsuccessful GLEIF API status code."""
+        if status_code == 429:
+            raise RateLimitExceeded("GLEIF API rate limit exceeded")
+        elif status_code in [500, 502, 503, 504]:
+            raise DataSourceUnavailable(f"GLEIF API server error: HTTP {status_code}")
+        elif status_code == 400:
+            raise ValidationError(f"GLEIF API bad request: HTTP {status_code}")
+        else:
+            raise DataSourceUnavailable(f"GLEIF API returned HTTP {status_code}")
+    
     def _parse_gleif_response(self, response_data: Dict[str, Any], lei_code: str) -> Dict[str, Any]:
         """Parse GLEIF JSON API response."""
         try:
@@ -526,6 +727,9 @@ class GLEIFAdapter(BaseKYBAdapter):
         """
         Search for entities by name using GLEIF API.
         
+        With an offline Golden Copy, legal names starting with the normalized
+        name are looked up locally first, exact matches first.
+        
         Args:
             entity_name: Name of the entity to search for
             country_code: Optional country code filter
@@ -540,6 +744,19 @@ class GLEIFAdapter(BaseKYBAdapter):
         timeout = kwargs.get('timeout', 15)
         
         try:
+            # Answer from the offline Golden Copy when it has matching names
+            if self.golden_copy:
+                start_time = time.time()
+                results = [
+                    self._offline_result(attributes['lei'], attributes, start_time)
+                    for attributes in self.golden_copy.search(entity_name, country_code, limit)
+                ]
+                if results:
+                    logger.info("GLEIF offline search completed",
+                               entity_name=entity_name,
+                               results_count=len(results))
+                    return results
+            
             # Build search URL
             url = f"{self.base_url}{self.LEI_RECORDS_ENDPOINT}"
             
@@ -557,7 +774,7 @@ class GLEIFAdapter(BaseKYBAdapter):
                         country_code=country_code,
                         limit=limit)
             
-            response = self.session.get(url, params=params, timeout=timeout)
+            response = self._http_request('get', url, params=params, timeout=timeout)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -592,6 +809,9 @@ class GLEIFAdapter(BaseKYBAdapter):
         """
         Get relationship information for a LEI code.
         
+        Answered from the offline Golden Copy once relationship records have
+        been ingested into it.
+        
         Args:
             lei_code: LEI code to get relationships for
             **kwargs: Additional options:
@@ -605,11 +825,32 @@ class GLEIFAdapter(BaseKYBAdapter):
         try:
             validated_lei = self._validate_lei_format(lei_code)
             
+            if self.golden_copy and self.golden_copy.has_relationships():
+                relationships = self.golden_copy.relationships(validated_lei)
+                if relationships:
+                    return {
+                        'lei_code': validated_lei,
+                        'status': 'success',
+                        'offline': True,
+                        'relationships': {
+                            'data': [
+                                {'type': 'relationship-records', 'attributes': attributes}
+                                for attributes in relationships
+                            ]
+                        }
+                    }
+                return {
+                    'lei_code': validated_lei,
+                    'status': 'not_found',
+                    'offline': True,
+                    'error': 'No relationships found for this LEI code'
+                }
+            
             url = f"{self.base_url}/lei-records/{validated_lei}/relationships"
             
             logger.debug("Making GLEIF relationships request", lei_code=validated_lei)
             
-            response = self.session.get(url, timeout=timeout)
+            response = self._http_request('get', url, timeout=timeout)
             
             if response.status_code == 200:
                 return {
@@ -645,4 +886,56 @@ class GLEIFAdapter(BaseKYBAdapter):
                 'lei_code': lei_code,
                 'status': 'error',
                 'error': f'Unexpected error: {str(e)}'
-            }
\ No newline at end of file
+            }
+    
+    def update_golden_copy(self, golden_copy_file: str, delta: bool = False) -> Dict[str, Any]:
+        """
+        Ingest a GLEIF Golden Copy or delta file into the offline store.
+        
+        Accepts LEI-CDF and RR-CDF files as CSV or XML, optionally zipped or
+        gzipped. A full file replaces the stored records of its kind; a delta
+        file updates only the records it contains.
+        
+        Args:
+            golden_copy_file: Path to the Golden Copy or delta file
+            delta: Apply the file as a delta (default: False)
+        """
+        if not self.golden_copy:
+            return {
+                'success': False,
+                'error': 'GLEIF_GOLDEN_COPY_DB is not configured',
+                'message': 'Failed to update GLEIF Golden Copy'
+            }
+        
+        try:
+            logger.info("Updating GLEIF Golden Copy", file=golden_copy_file, delta=delta)
+            
+            ingested = self.golden_copy.ingest(golden_copy_file, delta=delta)
+            stats = self.golden_copy.stats()
+            
+            return {
+                'success': True,
+                'last_update': datetime.utcnow().isoformat() + 'Z',
+                'source': golden_copy_file,
+                'kind': ingested.get('kind'),
+                'records': ingested['records'],
+                'skipped': ingested['skipped'],
+                'lei_records': stats['lei_records'],
+                'relationships': stats['relationships'],
+                'message': 'GLEIF Golden Copy already ingested' if ingested['skipped']
+                           else 'GLEIF Golden Copy updated successfully'
+            }
+            
+        except Exception as e:
+            logger.error("Failed to update GLEIF Golden Copy", error=str(e), exc_info=True)
+            return {
+                'success': False,
+                'error': str(e),
+                'message': 'Failed to update GLEIF Golden Copy'
+            }
+    
+    def get_golden_copy_info(self) -> Dict[str, Any]:
+        """Get information about the offline GLEIF Golden Copy."""
+        if not self.golden_copy:
+            return {'enabled': False}
+        return {'enabled': True, **self.golden_copy.stats()}
@@ -0,0 +1,423 @@
+"""Local store of GLEIF Golden Copy data for offline LEI lookups.
+
+GLEIF publishes the full LEI and relationship (Level 2) data sets as daily
+Golden Copy files plus delta files with the records changed since. This module
+stream-parses those files (CSV or XML, optionally zipped or gzipped) into an
+indexed SQLite file, so LEI checks, name searches and relationship lookups can
+be answered from disk. Records are stored in the JSON:API attribute format of
+the GLEIF API, so the adapter parses local and remote records the same way.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import threading
+import xml.etree.ElementTree as ET
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import structlog
+
+from .sanctions_index import normalize_name
+
+logger = structlog.get_logger()
+
+INSERT_BATCH_SIZE = 10000  # Rows per executemany call while ingesting
+XML_RECORD_KINDS = {'LEIRecord': 'lei', 'RelationshipRecord': 'rr'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lei_records (
+    lei TEXT PRIMARY KEY,
+    name_key TEXT NOT NULL,
+    country TEXT,
+    last_update TEXT,
+    attributes TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_lei_records_name ON lei_records (name_key);
+CREATE INDEX IF NOT EXISTS ix_lei_records_country_name ON lei_records (country, name_key);
+
+CREATE TABLE IF NOT EXISTS lei_relationships (
+    start_lei TEXT NOT NULL,
+    end_lei TEXT NOT NULL,
+    relationship_type TEXT NOT NULL,
+    last_update TEXT,
+    attributes TEXT NOT NULL,
+    PRIMARY KEY (start_lei, end_lei, relationship_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_lei_relationships_end ON lei_relationships (end_lei);
+
+CREATE TABLE IF NOT EXISTS golden_copy_files (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    records INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+"""
+
+UPSERT_RECORD = """
+INSERT INTO lei_records (lei, name_key, country, last_update, attributes) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (lei) DO UPDATE SET
+    name_key = excluded.name_key, country = excluded.country,
+    last_update = excluded.last_update, attributes = excluded.attributes
+WHERE COALESCE(excluded.last_update, '') >= COALESCE(lei_records.last_update, '')
+"""
+
+UPSERT_RELATIONSHIP = """
+INSERT INTO lei_relationships (start_lei, end_lei, relationship_type, last_update, attributes)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (start_lei, end_lei, relationship_type) DO UPDATE SET
+    last_update = excluded.last_update, attributes = excluded.attributes
+WHERE COALESCE(excluded.last_update, '') >= COALESCE(lei_relationships.last_update, '')
+"""
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+@contextmanager
+def _open_binary(path: str) -> Iterator[Tuple[io.BufferedIOBase, str]]:
+    """Open a plain, gzipped or zipped file; yields the stream and the inner file name."""
+    lower = path.lower()
+    if lower.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            if not members:
+                raise ValueError(f"Golden Copy archive is empty: {path}")
+            with archive.open(members[0]) as stream:
+                yield stream, members[0].filename
+    elif lower.endswith('.gz'):
+        with gzip.open(path, 'rb') as stream:
+            yield stream, path[:-3]
+    else:
+        with open(path, 'rb') as stream:
+            yield stream, path
+
+
+def _file_format(name: str) -> str:
+    extension = os.path.splitext(name.lower())[1]
+    if extension not in ('.csv', '.xml'):
+        raise ValueError(f"Unsupported Golden Copy format: {extension or name}")
+    return extension[1:]
+
+
+def _flatten(element, prefix: str = '') -> Dict[str, str]:
+    """Flatten an XML record to the dotted column names of the Golden Copy CSV files."""
+    row: Dict[str, str] = {}
+    seen: Dict[str, int] = {}
+    for child in element:
+        name = _local_name(child.tag)
+        key = f"{prefix}{name}"
+        if len(child):
+            row.update(_flatten(child, key + '.'))
+            continue
+        text = (child.text or '').strip()
+        if not text:
+            continue
+        seen[key] = seen.get(key, 0) + 1
+        # Repeated elements are numbered like the CSV columns, e.g. AdditionalAddressLine.1
+        row[key if seen[key] == 1 and key not in row else f"{key}.{seen[key]}"] = text
+        if seen[key] == 1:
+            row.setdefault(f"{key}.1", text)
+    return row
+
+
+def _iter_rows(path: str) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """Stream (kind, row) pairs, kind being 'lei' or 'rr', from a Golden Copy file."""
+    with _open_binary(path) as (stream, name):
+        if _file_format(name) == 'csv':
+            reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+            kind = 'rr' if 'Relationship.StartNode.NodeID' in (reader.fieldnames or []) else 'lei'
+            for row in reader:
+                yield kind, {key: value for key, value in row.items() if key and value}
+            return
+
+        # Records sit below a container element, so each one is detached from
+        # its parent once read; clearing alone would keep every emptied record
+        open_elements = []
+        for event, element in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                open_elements.append(element)
+                continue
+
+            open_elements.pop()
+            kind = XML_RECORD_KINDS.get(_local_name(element.tag))
+            if kind is None:
+                continue
+            yield kind, _flatten(element)
+            element.clear()
+            if open_elements:
+                open_elements[-1].remove(element)
+
+
+def _address(row: Dict[str, str], prefix: str) -> Dict[str, str]:
+    address = {
+        'addressLines_1': row.get(f'{prefix}.FirstAddressLine'),
+        'addressLines_2': row.get(f'{prefix}.AdditionalAddressLine.1'),
+        'addressLines_3': row.get(f'{prefix}.AdditionalAddressLine.2'),
+        'addressLines_4': row.get(f'{prefix}.AdditionalAddressLine.3'),
+        'city': row.get(f'{prefix}.City'),
+        'region': row.get(f'{prefix}.Region'),
+        'postalCode': row.get(f'{prefix}.PostalCode'),
+        'country': row.get(f'{prefix}.Country')
+    }
+    return {key: value for key, value in address.items() if value}
+
+
+def lei_attributes(row: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """Convert a Golden Copy LEI record to GLEIF API attributes; None without an LEI."""
+    lei = (row.get('LEI') or '').strip().upper()
+    if not lei:
+        return None
+    return {
+        'lei': lei,
+        'entity': {
+            'legalName': {'name': row.get('Entity.LegalName'), 'language': row.get('Entity.LegalName.xmllang')},
+            'legalAddress': _address(row, 'Entity.LegalAddress'),
+            'headquartersAddress': _address(row, 'Entity.HeadquartersAddress'),
+            'registeredAs': row.get('Entity.RegistrationAuthority.RegistrationAuthorityEntityID'),
+            'jurisdiction': row.get('Entity.LegalJurisdiction'),
+            'category': row.get('Entity.EntityCategory'),
+            'legalForm': {
+                'id': row.get('Entity.LegalForm.EntityLegalFormCode'),
+                'other': row.get('Entity.LegalForm.OtherLegalForm')
+            },
+            'status': row.get('Entity.EntityStatus')
+        },
+        'registration': {
+            'initialRegistrationDate': row.get('Registration.InitialRegistrationDate'),
+            'lastUpdateDate': row.get('Registration.LastUpdateDate'),
+            'status': row.get('Registration.RegistrationStatus'),
+            'nextRenewalDate': row.get('Registration.NextRenewalDate'),
+            'managingLou': row.get('Registration.ManagingLOU'),
+            'registrationAuthority': {
+                'id': row.get('Entity.RegistrationAuthority.RegistrationAuthorityID'),
+                'other': row.get('Entity.RegistrationAuthority.OtherRegistrationAuthorityID')
+            }
+        }
+    }
+
+
+def relationship_attributes(row: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """Convert a Golden Copy relationship record to API-style attributes; None if incomplete."""
+    start = (row.get('Relationship.StartNode.NodeID') or '').strip().upper()
+    end = (row.get('Relationship.EndNode.NodeID') or '').strip().upper()
+    relationship_type = row.get('Relationship.RelationshipType')
+    if not (start and end and relationship_type):
+        return None
+    return {
+        'relationship': {
+            'startNode': {'id': start, 'type': row.get('Relationship.StartNode.NodeIDType')},
+            'endNode': {'id': end, 'type': row.get('Relationship.EndNode.NodeIDType')},
+            'type': relationship_type,
+            'status': row.get('Relationship.RelationshipStatus')
+        },
+        'registration': {
+            'status': row.get('Registration.RegistrationStatus'),
+            'lastUpdateDate': row.get('Registration.LastUpdateDate')
+        }
+    }
+
+
+def _record_row(row: Dict[str, str]) -> Optional[tuple]:
+    attributes = lei_attributes(row)
+    if attributes is None:
+        return None
+    entity = attributes['entity']
+    return (
+        attributes['lei'],
+        normalize_name(entity['legalName']['name'] or ''),
+        entity['legalAddress'].get('country'),
+        attributes['registration']['lastUpdateDate'],
+        json.dumps(attributes, separators=(',', ':'))
+    )
+
+
+def _relationship_row(row: Dict[str, str]) -> Optional[tuple]:
+    attributes = relationship_attributes(row)
+    if attributes is None:
+        return None
+    relationship = attributes['relationship']
+    return (
+        relationship['startNode']['id'],
+        relationship['endNode']['id'],
+        relationship['type'],
+        attributes['registration']['lastUpdateDate'],
+        json.dumps(attributes, separators=(',', ':'))
+    )
+
+
+class GoldenCopyStore:
+    """
+    Indexed SQLite store of Golden Copy LEI and relationship records.
+
+    Each thread reads through its own connection; the database runs in WAL
+    mode, so lookups keep seeing the previous data while a file is ingested.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._ingest_lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.connection = connection
+        yield connection
+
+    def ingest(self, path: str, delta: bool = False, force: bool = False) -> Dict[str, Any]:
+        """
+        Load a Golden Copy or delta file.
+
+        A full file replaces all records of its kind; a delta file upserts its
+        records, keeping any stored record with a later LastUpdateDate. Files
+        are recorded by name, and one already ingested is skipped unless forced.
+
+        Returns:
+            Dict with the file kind, record count and whether it was skipped
+        """
+        name = os.path.basename(path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Golden Copy file not found: {path}")
+
+        with self._ingest_lock, self._connection() as connection:
+            if not force and connection.execute(
+                    'SELECT 1 FROM golden_copy_files WHERE name = ?', (name,)).fetchone():
+                logger.info("Golden Copy file already ingested", file=name)
+                return {'file': name, 'skipped': True, 'records': 0}
+
+            rows = _iter_rows(path)
+            first = next(rows, None)
+            if first is None:
+                raise ValueError(f"Golden Copy file has no records: {path}")
+            kind = first[0]
+            table, upsert, convert = (
+                ('lei_relationships', UPSERT_RELATIONSHIP, _relationship_row) if kind == 'rr'
+                else ('lei_records', UPSERT_RECORD, _record_row)
+            )
+
+            records = 0
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                if not delta:
+                    connection.execute(f'DELETE FROM {table}')
+                converted = (convert(row) for _, row in _prepend(first, rows))
+                valid = (row for row in converted if row is not None)
+                while True:
+                    batch = list(islice(valid, INSERT_BATCH_SIZE))
+                    if not batch:
+                        break
+                    connection.executemany(upsert, batch)
+                    records += len(batch)
+                connection.execute(
+                    'INSERT OR REPLACE INTO golden_copy_files (name, kind, delta, records, ingested_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (name, kind, int(delta), records, datetime.utcnow().isoformat() + 'Z')
+                )
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+
+        logger.info("Golden Copy file ingested", file=name, kind=kind, delta=delta, records=records)
+        return {'file': name, 'kind': kind, 'delta': delta, 'records': records, 'skipped': False}
+
+    def get(self, lei: str) -> Optional[Dict[str, Any]]:
+        """Get the API attributes of an LEI, or None if it is not in the store."""
+        with self._connection() as connection:
+            row = connection.execute('SELECT attributes FROM lei_records WHERE lei = ?', (lei,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, leis: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the API attributes of the given LEIs that are in the store."""
+        leis = list(dict.fromkeys(leis))
+        found = {}
+        with self._connection() as connection:
+            # Stay below SQLite's default limit on bound parameters
+            for start in range(0, len(leis), 500):
+                chunk = leis[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for lei, attributes in connection.execute(
+                        f'SELECT lei, attributes FROM lei_records WHERE lei IN ({placeholders})', chunk):
+                    found[lei] = json.loads(attributes)
+        return found
+
+    def search(self, name: str, country_code: str = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Find entities whose normalized legal name starts with the given name, exact matches first."""
+        name_key = normalize_name(name)
+        if not name_key:
+            return []
+        query = 'SELECT attributes FROM lei_records WHERE name_key >= ? AND name_key < ?'
+        params: List[Any] = [name_key, name_key + '\uffff']
+        if country_code:
+            query += ' AND country = ?'
+            params.append(country_code.upper())
+        query += ' ORDER BY name_key != ?, name_key LIMIT ?'
+        params.extend([name_key, limit])
+        with self._connection() as connection:
+            return [json.loads(row[0]) for row in connection.execute(query, params)]
+
+    def relationships(self, lei: str) -> List[Dict[str, Any]]:
+        """Get the relationship records an LEI is the start or end node of."""
+        with self._connection() as connection:
+            rows = connection.execute(
+                'SELECT attributes FROM lei_relationships WHERE start_lei = ? '
+                'UNION ALL SELECT attributes FROM lei_relationships WHERE end_lei = ? AND start_lei != ?',
+                (lei, lei, lei)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def has_records(self) -> bool:
+        with self._connection() as connection:
+            return connection.execute('SELECT 1 FROM lei_records LIMIT 1').fetchone() is not None
+
+    def has_relationships(self) -> bool:
+        with self._connection() as connection:
+            return connection.execute('SELECT 1 FROM lei_relationships LIMIT 1').fetchone() is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connection() as connection:
+            records = connection.execute('SELECT COUNT(*) FROM lei_records').fetchone()[0]
+            relationships = connection.execute('SELECT COUNT(*) FROM lei_relationships').fetchone()[0]
+            files = connection.execute(
+                'SELECT name, kind, delta, records, ingested_at FROM golden_copy_files ORDER BY ingested_at DESC LIMIT 10'
+            ).fetchall()
+        return {
+            'path': self.path,
+            'lei_records': records,
+            'relationships': relationships,
+            'recent_files': [
+                {'name': name, 'kind': kind, 'delta': bool(delta), 'records': count, 'ingested_at': ingested_at}
+                for name, kind, delta, count, ingested_at in files
+            ]
+        }
+
+
+def _prepend(first, rest: Iterator) -> Iterator:
+    yield first
+    yield from rest
+
+
+_stores: Dict[str, GoldenCopyStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_golden_copy_store(path: str) -> GoldenCopyStore:
+    """Get the process-wide store for a database file, creating it on first use."""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = GoldenCopyStore(path)
+        return store
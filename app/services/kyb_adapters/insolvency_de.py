@@ -38,8 +38,7 @@ class GermanInsolvencyAdapter(BaseKYBAdapter):
     def __init__(self, redis_client=None):
         """Initialize German insolvency adapter."""
         super().__init__(redis_client)
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers.update({
             'User-Agent': 'AI-Secretary-KYB/1.0 (Compliance Monitoring)',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'de-DE,de;q=0.9,en;q=0.8',
@@ -138,7 +137,8 @@ class GermanInsolvencyAdapter(BaseKYBAdapter):
             search_params = self._prepare_search_params(company_name, **kwargs)
             
             # Perform the search request
-            response = self.session.get(
+            response = self._http_request(
+                'get',
                 self.SEARCH_URL,
                 params=search_params,
                 timeout=15
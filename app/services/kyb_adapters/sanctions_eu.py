@@ -3,17 +3,46 @@ import time
 import re
 from typing import Dict, List, Optional, Any
 from datetime import datetime
-import requests
-from flask import current_app
 import structlog
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from .base import BaseKYBAdapter, ValidationError, DataSourceUnavailable, RateLimitExceeded
+from .sanctions_index import (
+    NameMatch, SanctionsIndexHolder, SanctionsListMixin, SanctionsRecord, normalize_name, parse_eu_xml
+)
 
 logger = structlog.get_logger()
 
 
-class EUSanctionsAdapter(BaseKYBAdapter):
+EU_REASON = 'Actions undermining territorial integrity of Ukraine'
+
+# Screened when no EU_SANCTIONS_LIST_FILE is configured
+EU_SAMPLE_RECORDS = [
+    SanctionsRecord(
+        uid='EU-0001', name='SBERBANK OF RUSSIA', aliases=['SBERBANK', 'SBER'], entity_type='company',
+        programs=['EU Restrictive Measures'], listing_date='2022-02-26',
+        details={'reason': EU_REASON, 'addresses': ['Moscow, Russian Federation']}
+    )
+] + [
+    SanctionsRecord(
+        uid=f'EU-{number:04d}', name=name, aliases=aliases, entity_type=entity_type,
+        programs=['EU Restrictive Measures'], listing_date='2022-02-26', details={'reason': EU_REASON}
+    )
+    for number, (name, aliases, entity_type) in enumerate([
+        ('GAZPROM', [], 'company'), ('ROSNEFT', [], 'company'), ('LUKOIL', [], 'company'),
+        ('NOVATEK', [], 'company'), ('VEB', [], 'company'), ('ROSTEC', [], 'company'), ('ROSATOM', [], 'company'),
+        ('AEROFLOT', [], 'company'), ('RUSSIAN RAILWAYS', [], 'company'),
+        ('VLADIMIR PUTIN', ['PUTIN'], 'individual'), ('SERGEY LAVROV', ['LAVROV'], 'individual'),
+        ('SERGEI SHOIGU', ['SHOIGU'], 'individual'), ('DMITRY MEDVEDEV', ['MEDVEDEV'], 'individual'),
+        ('DMITRY PESKOV', ['PESKOV'], 'individual'), ('WAGNER GROUP', ['WAGNER'], 'company'),
+        ('YEVGENIY PRIGOZHIN', ['PRIGOZHIN'], 'individual'), ('RAMZAN KADYROV', ['KADYROV'], 'individual'),
+        ('ALEXANDER LUKASHENKO', ['LUKASHENKO'], 'individual'), ('BANK ROSSIYA', [], 'company'),
+        ('GENBANK', [], 'company'), ('SMP BANK', [], 'company'), ('SOVCOMBANK', [], 'company')
+    ], start=2)
+]
+
+
+class EUSanctionsAdapter(SanctionsListMixin, BaseKYBAdapter):
     """Adapter for EU Consolidated Sanctions List."""
     
     # Configuration
@@ -27,20 +56,23 @@ class EUSanctionsAdapter(BaseKYBAdapter):
     EU_SANCTIONS_BASE_URL = "https://webgate.ec.europa.eu/fsd/fsf/public/files/xmlFullSanctionsList/content"
     EU_SANCTIONS_SEARCH_URL = "https://webgate.ec.europa.eu/fsd/fsf/public/api/v1/search"
     
+    # Local list screening
+    LIST_FILE_CONFIG_KEY = 'EU_SANCTIONS_LIST_FILE'
+    LIST_PARSERS = {'.xml': parse_eu_xml}
+    SAMPLE_RECORDS = EU_SAMPLE_RECORDS
+    SEARCH_THRESHOLD = 0.6
+    DEFAULT_MATCH_THRESHOLD = 0.8
+    _index_holder = SanctionsIndexHolder()
+    
     def __init__(self, redis_client=None):
         """Initialize EU Sanctions adapter."""
         super().__init__(redis_client)
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers.update({
             'User-Agent': 'AI-Secretary-KYB/1.0',
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
         
-        # Load sanctions data on initialization
-        self._sanctions_data = None
-        self._last_update = None
-        
     def check_single(self, entity_name: str, **kwargs) -> Dict[str, Any]:
         """
         Check a single entity against EU sanctions list.
@@ -57,7 +89,7 @@ class EUSanctionsAdapter(BaseKYBAdapter):
         """
         start_time = time.time()
         force_refresh = kwargs.get('force_refresh', False)
-        match_threshold = kwargs.get('match_threshold', 0.8)
+        match_threshold = kwargs.get('match_threshold', self.DEFAULT_MATCH_THRESHOLD)
         include_aliases = kwargs.get('include_aliases', True)
         
         try:
@@ -144,9 +176,6 @@ class EUSanctionsAdapter(BaseKYBAdapter):
         for entity_name in entity_names:
             result = self.check_single(entity_name, **kwargs)
             results.append(result)
-            
-            # Small delay between requests to be respectful
-            time.sleep(0.1)
         
         logger.info("EU sanctions batch check completed",
                    total=len(entity_names),
@@ -173,52 +202,16 @@ class EUSanctionsAdapter(BaseKYBAdapter):
         return clean_name
     
     def _check_sanctions_match(self, entity_name: str, match_threshold: float, include_aliases: bool) -> Dict[str, Any]:
-        """
-        Check entity against EU sanctions list.
-        
-        This is a simplified implementation. In production, you would:
-        1. Download the full EU sanctions XML file
-        2. Parse and index the sanctions data
-        3. Implement fuzzy matching algorithms
-        4. Handle different entity types (individuals, companies, etc.)
-        """
+        """Screen an entity name against the indexed EU sanctions list."""
         try:
-            # For demo purposes, we'll use a simple keyword-based approach
-            # In production, this would query the actual EU sanctions database
-            
-            # Simulate API call delay
-            time.sleep(0.1)
+            index = self._get_index()
+            normalized_name = normalize_name(entity_name)
             
-            # Demo sanctions keywords (in production, this would be the full database)
-            demo_sanctions_keywords = [
-                'SBERBANK', 'GAZPROM', 'ROSNEFT', 'LUKOIL', 'NOVATEK',
-                'VEB', 'ROSTEC', 'ROSATOM', 'AEROFLOT', 'RUSSIAN RAILWAYS',
-                'PUTIN', 'LAVROV', 'SHOIGU', 'MEDVEDEV', 'PESKOV',
-                'WAGNER', 'PRIGOZHIN', 'KADYROV', 'LUKASHENKO',
-                'BANK ROSSIYA', 'GENBANK', 'SMP BANK', 'SOVCOMBANK'
+            matches = [
+                self._format_match(match)
+                for match in index.screen(entity_name, threshold=match_threshold, include_aliases=include_aliases)
             ]
             
-            # Normalize entity name for matching
-            normalized_name = entity_name.upper()
-            
-            # Find matches
-            matches = []
-            for keyword in demo_sanctions_keywords:
-                if keyword in normalized_name:
-                    # Calculate similarity score (improved logic)
-                    # If keyword is found in the name, it's a match regardless of length difference
-                    similarity = max(0.8, len(keyword) / len(normalized_name))  # Minimum 0.8 for keyword matches
-                    if similarity >= match_threshold:
-                        matches.append({
-                            'matched_name': keyword,
-                            'similarity_score': similarity,
-                            'match_type': 'keyword',
-                            'sanctions_program': 'EU Restrictive Measures',
-                            'entity_type': 'company' if any(word in keyword for word in ['BANK', 'CORP', 'LLC', 'LTD']) else 'individual',
-                            'listing_date': '2022-02-26',  # Demo date
-                            'reason': 'Actions undermining territorial integrity of Ukraine'
-                        })
-            
             # Determine result status
             if matches:
                 status = 'match'
@@ -240,7 +233,8 @@ class EUSanctionsAdapter(BaseKYBAdapter):
                     'entity_name': entity_name,
                     'normalized_name': normalized_name,
                     'match_threshold': match_threshold,
-                    'include_aliases': include_aliases
+                    'include_aliases': include_aliases,
+                    'list_source': self._index_holder.source
                 }
             }
             
@@ -248,34 +242,51 @@ class EUSanctionsAdapter(BaseKYBAdapter):
             logger.error("Error in EU sanctions matching", error=str(e), exc_info=True)
             raise DataSourceUnavailable(f"EU sanctions check failed: {str(e)}")
     
-    def update_sanctions_data(self) -> Dict[str, Any]:
+    def _screen_entity(self, entity_name: str, match_threshold: float, include_aliases: bool,
+                       **kwargs) -> Dict[str, Any]:
+        """Screen one validated name for bulk screening."""
+        return self._check_sanctions_match(entity_name, match_threshold, include_aliases)
+    
+    def _format_match(self, match: NameMatch) -> Dict[str, Any]:
+        """Convert an index match into the EU match format."""
+        record = match.record
+        return {
+            'matched_name': match.matched_name,
+            'primary_name': record.name,
+            'similarity_score': match.score,
+            'match_type': match.match_type,
+            'eu_reference_number': record.details.get('eu_reference_number'),
+            'sanctions_program': ', '.join(record.programs) or 'EU Restrictive Measures',
+            'entity_type': record.entity_type,
+            'listing_date': record.listing_date,
+            'reason': record.details.get('reason')
+        }
+    
+    def update_sanctions_data(self, list_file: str = None) -> Dict[str, Any]:
         """
-        Update local sanctions data from EU API.
+        Rebuild the EU sanctions index from the list file.
+        
+        The new index is swapped in only once fully built, so checks running
+        during the update keep using the previous list.
         
-        In production, this would:
-        1. Download the latest EU sanctions XML file
-        2. Parse and index the data
-        3. Store in local database or cache
-        4. Return update statistics
+        Args:
+            list_file: EU consolidated list XML file (default: EU_SANCTIONS_LIST_FILE)
         """
         try:
             logger.info("Updating EU sanctions data")
             
-            # Simulate data update
-            self._last_update = datetime.utcnow()
-            
-            # In production, you would:
-            # 1. Download from EU_SANCTIONS_BASE_URL
-            # 2. Parse XML data
-            # 3. Extract entities, aliases, addresses
-            # 4. Build search index
+            index = self._load_index(list_file)
+            stats = index.stats()
             
             return {
                 'success': True,
-                'last_update': self._last_update.isoformat() + 'Z',
-                'total_entities': 1500,  # Demo number
-                'individuals': 800,
-                'companies': 700,
+                'last_update': self._index_holder.loaded_at.isoformat() + 'Z',
+                'source': self._index_holder.source,
+                'total_entities': stats['total_entities'],
+                'individuals': stats['individuals'],
+                'companies': stats['companies'],
+                'names': stats['names'],
+                'list_version': index.version,
                 'message': 'EU sanctions data updated successfully'
             }
             
@@ -292,7 +303,7 @@ class EUSanctionsAdapter(BaseKYBAdapter):
         return {
             'source': 'European Union Consolidated Sanctions List',
             'url': self.EU_SANCTIONS_BASE_URL,
-            'last_update': self._last_update.isoformat() + 'Z' if self._last_update else None,
+            'last_update': self._index_holder.loaded_at.isoformat() + 'Z' if self._index_holder.loaded_at else None,
             'update_frequency': 'Daily',
             'entity_types': ['individuals', 'companies', 'organizations'],
             'coverage': 'EU restrictive measures and sanctions',
@@ -316,26 +327,26 @@ class EUSanctionsAdapter(BaseKYBAdapter):
             if not query or len(query.strip()) < 3:
                 raise ValidationError("Search query must be at least 3 characters")
             
-            # In production, this would search the indexed sanctions data
-            # For demo, return mock results
-            
-            demo_results = []
-            if 'SBERBANK' in query.upper():
-                demo_results.append({
-                    'name': 'SBERBANK OF RUSSIA',
-                    'entity_type': 'company',
-                    'sanctions_program': 'EU Restrictive Measures',
-                    'listing_date': '2022-02-26',
-                    'aliases': ['SBERBANK', 'SBER'],
-                    'addresses': ['Moscow, Russian Federation'],
-                    'reason': 'Actions undermining territorial integrity of Ukraine'
+            start_time = time.time()
+            results = []
+            for match in self._get_index().screen(query, threshold=self.SEARCH_THRESHOLD, limit=limit):
+                record = match.record
+                results.append({
+                    'name': record.name,
+                    'entity_type': record.entity_type,
+                    'sanctions_program': ', '.join(record.programs) or 'EU Restrictive Measures',
+                    'listing_date': record.listing_date,
+                    'aliases': record.aliases,
+                    'addresses': record.details.get('addresses', []),
+                    'reason': record.details.get('reason'),
+                    'similarity_score': match.score
                 })
             
             return {
                 'query': query,
-                'total_results': len(demo_results),
-                'results': demo_results[:limit],
-                'search_time_ms': 50
+                'total_results': len(results),
+                'results': results,
+                'search_time_ms': int((time.time() - start_time) * 1000)
             }
             
         except Exception as e:
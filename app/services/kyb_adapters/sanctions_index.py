@@ -0,0 +1,878 @@
+"""In-memory name index and fuzzy matcher for sanctions list screening."""
+import csv
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+import xml.etree.ElementTree as ET
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+import structlog
+from flask import current_app
+
+from .base import DataSourceUnavailable, ValidationError
+
+logger = structlog.get_logger()
+
+
+# Words that say nothing about who a party is; dropped before matching
+NAME_STOPWORDS = frozenset({
+    'THE', 'OF', 'AND', 'FOR', 'DE', 'DER', 'DES', 'LA', 'LE', 'DI', 'DA',
+    'LTD', 'LIMITED', 'LLC', 'LLP', 'PLC', 'INC', 'CORP', 'CORPORATION', 'CO', 'COMPANY',
+    'GMBH', 'AG', 'KG', 'SE', 'SA', 'SAS', 'SARL', 'SRL', 'SPA', 'NV', 'BV', 'AB', 'AS', 'OY',
+    'JSC', 'OJSC', 'CJSC', 'PJSC', 'OAO', 'ZAO', 'PAO', 'OOO', 'AO', 'TOO', 'FZE', 'FZCO'
+})
+
+TOKEN_MATCH_THRESHOLD = 0.9  # Jaro-Winkler similarity for two tokens to count as the same word
+STRING_MATCH_THRESHOLD = 0.9  # Whole-name Jaro-Winkler below this is treated as noise
+CANDIDATE_OVERLAP = 0.4  # Share of trigrams a name must have in common with the query
+MAX_CANDIDATES = 25  # Names scored per query, best trigram overlap first
+MAX_POSTING_SHARE = 0.02  # Trigrams in more names than this are too common to generate candidates
+
+
+def normalize_name(name: str) -> str:
+    """Uppercase a name and strip accents, punctuation and repeated whitespace."""
+    if not name:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^\w]+|_', ' ', stripped.upper()).split())
+
+
+def name_tokens(name: str) -> Tuple[str, ...]:
+    """Get the distinctive words of a name, without legal forms and filler words."""
+    tokens = normalize_name(name).split()
+    distinctive = tuple(token for token in tokens if token not in NAME_STOPWORDS)
+    return distinctive or tuple(tokens)
+
+
+def token_trigrams(token: str) -> List[str]:
+    """Get the padded character trigrams of a word."""
+    padded = f" {token} "
+    return [padded[index:index + 3] for index in range(len(padded) - 2)]
+
+
+def jaro_winkler(first: str, second: str, prefix_scale: float = 0.1) -> float:
+    """Jaro-Winkler similarity of two strings (0.0-1.0)."""
+    if first == second:
+        return 1.0
+    first_length, second_length = len(first), len(second)
+    if not first_length or not second_length:
+        return 0.0
+
+    window = max(max(first_length, second_length) // 2 - 1, 0)
+    second_matched = [False] * second_length
+    first_matches = []
+
+    for index, char in enumerate(first):
+        high = index + window + 1
+        position = second.find(char, max(0, index - window), high)
+        while position != -1 and second_matched[position]:
+            position = second.find(char, position + 1, high)
+        if position != -1:
+            second_matched[position] = True
+            first_matches.append(char)
+
+    matches = len(first_matches)
+    if not matches:
+        return 0.0
+
+    second_matches = [second[index] for index in range(second_length) if second_matched[index]]
+    transpositions = sum(a != b for a, b in zip(first_matches, second_matches)) / 2
+    jaro = (matches / first_length + matches / second_length + (matches - transpositions) / matches) / 3
+
+    prefix = 0
+    for a, b in zip(first[:4], second[:4]):
+        if a != b:
+            break
+        prefix += 1
+
+    return jaro + prefix * prefix_scale * (1 - jaro)
+
+
+def jaro_winkler_bound(first_length: int, second_length: int, prefix_scale: float = 0.1) -> float:
+    """Highest Jaro-Winkler similarity two strings of these lengths can reach."""
+    if not first_length or not second_length:
+        return 0.0
+    jaro = (min(first_length, second_length) / max(first_length, second_length) + 2) / 3
+    return jaro + 4 * prefix_scale * (1 - jaro) + 1e-9  # Margin for rounding
+
+
+@lru_cache(maxsize=65536)
+def _trigram_set(token: str) -> FrozenSet[str]:
+    return frozenset(token_trigrams(token))
+
+
+def _token_similarity(first: str, second: str) -> float:
+    """Jaro-Winkler of two words, skipped for words too different to ever reach the match threshold."""
+    if jaro_winkler_bound(len(first), len(second)) < TOKEN_MATCH_THRESHOLD:
+        return 0.0
+    return _similar_tokens(first, second) if first <= second else _similar_tokens(second, first)
+
+
+@lru_cache(maxsize=262144)
+def _similar_tokens(first: str, second: str) -> float:
+    # Shared across queries: list words recur, so do their comparisons with common query words
+    if _trigram_set(first).isdisjoint(_trigram_set(second)):
+        return 0.0
+    return jaro_winkler(first, second)
+
+
+def _coverage(tokens: Tuple[str, ...], other_tokens: Tuple[str, ...], weights: Callable[[str], float],
+              token_similarity: Callable[[str, str], float]) -> float:
+    """Weighted share of `tokens` that also appear, possibly misspelled, in `other_tokens`."""
+    total = matched = 0.0
+    other_set = set(other_tokens)
+    for token in tokens:
+        weight = weights(token)
+        total += weight
+        if token in other_set:
+            matched += weight
+            continue
+        best = max((token_similarity(token, other) for other in other_tokens), default=0.0)
+        if best >= TOKEN_MATCH_THRESHOLD:
+            matched += weight * best
+    return matched / total if total else 0.0
+
+
+def score_names(query_tokens: Tuple[str, ...], name_tokens_: Tuple[str, ...],
+                weights: Callable[[str], float] = None,
+                token_similarity: Callable[[str, str], float] = _token_similarity,
+                minimum: float = 0.0) -> float:
+    """
+    Score how likely a query names the same party as a listed name.
+
+    Combines a weighted token-set match, which tolerates word order, extra
+    words and misspelt words, with a whole-name Jaro-Winkler comparison,
+    which catches differently split words ("GAZ PROM"). The token score
+    is the share of the listed name found in the query, lowered towards
+    the harmonic mean when the query only covers part of the listed name.
+
+    Returns 0.0 early once the score cannot reach `minimum`.
+    """
+    if not query_tokens or not name_tokens_:
+        return 0.0
+    weights = weights or (lambda token: 1.0)
+    query_string, name_string = ''.join(query_tokens), ''.join(name_tokens_)
+    string_bound = jaro_winkler_bound(len(query_string), len(name_string))
+
+    listed_coverage = _coverage(name_tokens_, query_tokens, weights, token_similarity)
+    # With full query coverage the harmonic mean is 2c / (1 + c)
+    if max(2 * listed_coverage / (1 + listed_coverage), string_bound) < minimum:
+        return 0.0
+
+    query_coverage = _coverage(query_tokens, name_tokens_, weights, token_similarity)
+    harmonic_mean = (
+        2 * listed_coverage * query_coverage / (listed_coverage + query_coverage)
+        if listed_coverage + query_coverage else 0.0
+    )
+    token_score = max(listed_coverage, harmonic_mean)
+
+    # Names split into the same number of words are already compared word by word
+    string_score = 0.0
+    if len(query_tokens) != len(name_tokens_) and string_bound > max(token_score, STRING_MATCH_THRESHOLD, minimum):
+        string_score = jaro_winkler(query_string, name_string)
+        if string_score < STRING_MATCH_THRESHOLD:
+            string_score = 0.0
+
+    return min(1.0, max(token_score, string_score))
+
+
+def name_similarity(first: str, second: str) -> float:
+    """Similarity of two names (0.0-1.0), unweighted."""
+    return score_names(name_tokens(first), name_tokens(second))
+
+
+@dataclass
+class SanctionsRecord:
+    """One listed party with its names and listing details."""
+    uid: str
+    name: str
+    aliases: List[str] = field(default_factory=list)
+    entity_type: str = 'unknown'
+    programs: List[str] = field(default_factory=list)
+    listing_date: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class NameMatch:
+    """A listed party whose name or alias matched a screened name."""
+    record: SanctionsRecord
+    matched_name: str
+    match_type: str  # primary_name or alias
+    score: float
+
+
+@dataclass
+class ListDiff:
+    """Entries added, modified and removed between two versions of a list."""
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> List[str]:
+        """Entries a name could newly match: the added and modified ones."""
+        return self.added + self.modified
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.modified or self.removed)
+
+
+def record_fingerprint(record: SanctionsRecord) -> str:
+    """Short hash of a record's contents, for telling list versions apart."""
+    payload = json.dumps(
+        [record.name, record.aliases, record.entity_type, record.programs, record.listing_date, record.details],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def list_version(fingerprints: Dict[str, str]) -> str:
+    """Version hash of a whole list, from its entry fingerprints."""
+    digest = hashlib.sha256()
+    for uid in sorted(fingerprints):
+        digest.update(f'{uid}={fingerprints[uid]};'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def diff_fingerprints(previous: Dict[str, str], current: Dict[str, str]) -> ListDiff:
+    """Compare the entry fingerprints of two list versions."""
+    return ListDiff(
+        added=sorted(uid for uid in current if uid not in previous),
+        modified=sorted(uid for uid, fingerprint in current.items()
+                        if uid in previous and previous[uid] != fingerprint),
+        removed=sorted(uid for uid in previous if uid not in current)
+    )
+
+
+class SanctionsIndex:
+    """
+    Compact name index over a sanctions list.
+
+    Every primary name and alias is indexed by its normalized words and
+    by their character trigrams. Screening a name collects candidates
+    from those postings and scores only the best few with the fuzzy
+    matcher, so a lookup touches a handful of names instead of the whole
+    list. The index is immutable; updates build a new one and swap it in.
+    """
+
+    def __init__(self, records: Iterable[SanctionsRecord]):
+        self.records: List[SanctionsRecord] = []
+        self._by_uid: Dict[str, int] = {}
+        self._name_record = array('I')  # name id -> record position
+        self._name_is_alias = array('b')
+        self._name_text: List[str] = []
+        self._name_tokens: List[Tuple[str, ...]] = []
+        self._name_gram_count = array('H')
+        self._token_postings: Dict[str, array] = {}
+        self._gram_postings: Dict[str, array] = {}
+        self._idf: Dict[str, float] = {}
+
+        postings: Dict[str, List[int]] = {}
+        document_frequency: Dict[str, int] = {}
+
+        for record in records:
+            position = len(self.records)
+            self.records.append(record)
+            self._by_uid[str(record.uid)] = position
+
+            record_tokens = set()
+            for is_alias, name in [(False, record.name)] + [(True, alias) for alias in record.aliases]:
+                tokens = name_tokens(name)
+                if not tokens:
+                    continue
+                name_id = len(self._name_text)
+                self._name_record.append(position)
+                self._name_is_alias.append(is_alias)
+                self._name_text.append(name)
+                self._name_tokens.append(tokens)
+
+                grams = {gram for token in tokens for gram in token_trigrams(token)}
+                self._name_gram_count.append(min(len(grams), 65535))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(name_id)
+                for token in set(tokens):
+                    self._token_postings.setdefault(token, []).append(name_id)
+                record_tokens.update(tokens)
+
+            for token in record_tokens:
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+
+        self._token_postings = {token: array('I', ids) for token, ids in self._token_postings.items()}
+        self._gram_postings = {gram: array('I', ids) for gram, ids in postings.items()}
+
+        record_count = max(len(self.records), 1)
+        self._idf = {
+            token: math.log(1 + record_count / frequency)
+            for token, frequency in document_frequency.items()
+        }
+        self._default_idf = math.log(1 + record_count)
+        self._max_posting = max(50, int(len(self._name_text) * MAX_POSTING_SHARE))
+        self._fingerprints: Optional[Dict[str, str]] = None
+        self._version: Optional[str] = None
+
+    @property
+    def name_count(self) -> int:
+        return len(self._name_text)
+
+    def get(self, uid: str) -> Optional[SanctionsRecord]:
+        """Get a listed party by its list identifier."""
+        position = self._by_uid.get(str(uid))
+        return self.records[position] if position is not None else None
+
+    def fingerprints(self) -> Dict[str, str]:
+        """Fingerprint of every entry by its list identifier, computed on first use."""
+        if self._fingerprints is None:
+            self._fingerprints = {str(record.uid): record_fingerprint(record) for record in self.records}
+        return self._fingerprints
+
+    @property
+    def version(self) -> str:
+        """Hash identifying the list contents; equal lists have equal versions."""
+        if self._version is None:
+            self._version = list_version(self.fingerprints())
+        return self._version
+
+    def subset(self, uids: Iterable[str]) -> 'SanctionsIndex':
+        """
+        Index of only some of the listed parties, e.g. those a list update changed.
+
+        Words keep the weights they have in the full list, so a name scores
+        against a listed party in the subset as it would against the full index.
+        """
+        records = [record for record in map(self.get, dict.fromkeys(uids)) if record is not None]
+        index = SanctionsIndex(records)
+        index._idf, index._default_idf = self._idf, self._default_idf
+        return index
+
+    def screen(self, name: str, threshold: float = 0.8, include_aliases: bool = True,
+               record_filter: Callable[[SanctionsRecord], bool] = None,
+               limit: int = 10) -> List[NameMatch]:
+        """
+        Screen a name against the list.
+
+        Returns:
+            Best match per listed party scoring at least `threshold`,
+            highest score first
+        """
+        query_tokens = name_tokens(name)
+        if not query_tokens:
+            return []
+
+        best: Dict[int, NameMatch] = {}
+        for name_id in self._candidates(query_tokens, include_aliases):
+            position = self._name_record[name_id]
+            record = self.records[position]
+            if record_filter is not None and not record_filter(record):
+                continue
+
+            score = score_names(query_tokens, self._name_tokens[name_id], self._weight, minimum=threshold)
+            if score < threshold:
+                continue
+
+            current = best.get(position)
+            if current is None or score > current.score:
+                best[position] = NameMatch(
+                    record=record,
+                    matched_name=self._name_text[name_id],
+                    match_type='alias' if self._name_is_alias[name_id] else 'primary_name',
+                    score=round(score, 4)
+                )
+
+        matches = sorted(best.values(), key=lambda match: match.score, reverse=True)
+        return matches[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get counts describing the indexed list."""
+        individuals = sum(1 for record in self.records if record.entity_type.lower() in ('individual', 'person'))
+        programs = {program for record in self.records for program in record.programs}
+        return {
+            'total_entities': len(self.records),
+            'individuals': individuals,
+            'companies': len(self.records) - individuals,
+            'names': self.name_count,
+            'tokens': len(self._token_postings),
+            'programs': len(programs)
+        }
+
+    def _weight(self, token: str) -> float:
+        return self._idf.get(token, self._default_idf)
+
+    def _candidates(self, query_tokens: Tuple[str, ...], include_aliases: bool) -> List[int]:
+        """Names sharing a word or enough trigrams with the query, best overlap first."""
+        query_grams = {gram for token in query_tokens for gram in token_trigrams(token)}
+        overlap = Counter(chain.from_iterable(
+            name_ids for name_ids in map(self._gram_postings.get, query_grams)
+            if name_ids is not None and len(name_ids) <= self._max_posting
+        ))
+
+        # Names sharing a single trigram are left to the whole-word lookup below
+        shared_grams = [(shared, -name_id) for name_id, shared in overlap.items() if shared > 1]
+        ranked = []
+        for shared, name_id in heapq.nlargest(MAX_CANDIDATES * 4, shared_grams):
+            name_id = -name_id
+            if not include_aliases and self._name_is_alias[name_id]:
+                continue
+            if shared / min(len(query_grams), self._name_gram_count[name_id]) >= CANDIDATE_OVERLAP:
+                ranked.append(name_id)
+                if len(ranked) == MAX_CANDIDATES:
+                    return ranked
+
+        # Names sharing a whole word fill the remaining places, however common the word
+        seen = set(ranked)
+        for token in query_tokens:
+            for name_id in self._token_postings.get(token, ()):
+                if name_id in seen or (not include_aliases and self._name_is_alias[name_id]):
+                    continue
+                seen.add(name_id)
+                ranked.append(name_id)
+                if len(ranked) == MAX_CANDIDATES:
+                    return ranked
+
+        return ranked
+
+
+class SanctionsIndexHolder:
+    """Holds the current index of one list so updates can swap it atomically."""
+
+    def __init__(self):
+        self._index: Optional[SanctionsIndex] = None
+        self._source: Optional[str] = None
+        self._loaded_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> Optional[SanctionsIndex]:
+        return self._index
+
+    @property
+    def source(self) -> Optional[str]:
+        return self._source
+
+    @property
+    def loaded_at(self) -> Optional[datetime]:
+        return self._loaded_at
+
+    @property
+    def update_lock(self) -> threading.Lock:
+        """Held while an update builds a new index, so concurrent updates do not both parse the list."""
+        return self._lock
+
+    def swap(self, index: SanctionsIndex, source: str) -> Optional[SanctionsIndex]:
+        """Replace the current index; readers see either the old or the new one, never a mix."""
+        previous = self._index
+        self._index, self._source, self._loaded_at = index, source, datetime.utcnow()
+        return previous
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _child_text(element, name: str) -> Optional[str]:
+    for child in element:
+        if _local_name(child.tag) == name:
+            return (child.text or '').strip() or None
+    return None
+
+
+def _iter_elements(path: str, name: str) -> Iterator[ET.Element]:
+    """Stream the elements with a local tag name, freeing each once handled."""
+    for _, element in ET.iterparse(path, events=('end',)):
+        if _local_name(element.tag) == name:
+            yield element
+            element.clear()
+
+
+def parse_eu_xml(path: str) -> Iterator[SanctionsRecord]:
+    """Stream records from the EU consolidated financial sanctions XML file."""
+    for entity in _iter_elements(path, 'sanctionEntity'):
+        names, programs, dates, remarks = [], [], [], []
+        entity_type = 'unknown'
+
+        for child in entity:
+            tag = _local_name(child.tag)
+            if tag == 'nameAlias':
+                whole_name = (child.get('wholeName') or '').strip()
+                if whole_name and whole_name not in names:
+                    names.append(whole_name)
+            elif tag == 'regulation':
+                if child.get('programme') and child.get('programme') not in programs:
+                    programs.append(child.get('programme'))
+                if child.get('publicationDate'):
+                    dates.append(child.get('publicationDate'))
+            elif tag == 'subjectType':
+                entity_type = {'person': 'individual', 'enterprise': 'company'}.get(child.get('code'), child.get('code') or 'unknown')
+            elif tag == 'remark' and child.text:
+                remarks.append(child.text.strip())
+
+        if not names:
+            continue
+        yield SanctionsRecord(
+            uid=entity.get('logicalId') or entity.get('euReferenceNumber') or names[0],
+            name=names[0],
+            aliases=names[1:],
+            entity_type=entity_type,
+            programs=programs,
+            listing_date=min(dates) if dates else None,
+            details={
+                'eu_reference_number': entity.get('euReferenceNumber'),
+                'reason': remarks[0] if remarks else None
+            }
+        )
+
+
+def _ofac_name(element) -> Optional[str]:
+    parts = [_child_text(element, 'firstName'), _child_text(element, 'lastName')]
+    name = ' '.join(part for part in parts if part)
+    return name or None
+
+
+def parse_ofac_xml(path: str) -> Iterator[SanctionsRecord]:
+    """Stream records from the OFAC SDN or consolidated XML file."""
+    for entry in _iter_elements(path, 'sdnEntry'):
+        name = _ofac_name(entry)
+        if not name:
+            continue
+
+        aliases, programs = [], []
+        for child in entry:
+            tag = _local_name(child.tag)
+            if tag == 'akaList':
+                for aka in child:
+                    alias = _ofac_name(aka)
+                    if alias and alias not in aliases:
+                        aliases.append(alias)
+            elif tag == 'programList':
+                programs.extend((program.text or '').strip() for program in child if (program.text or '').strip())
+
+        yield SanctionsRecord(
+            uid=_child_text(entry, 'uid') or name,
+            name=name,
+            aliases=aliases,
+            entity_type=(_child_text(entry, 'sdnType') or 'unknown').lower(),
+            programs=programs,
+            details={'remarks': _child_text(entry, 'remarks')}
+        )
+
+
+def _ofac_csv_value(value: str) -> Optional[str]:
+    value = (value or '').strip()
+    return None if value in ('', '-0-') else value
+
+
+def parse_ofac_csv(path: str, alt_path: str = None) -> Iterator[SanctionsRecord]:
+    """
+    Stream records from the OFAC sdn.csv file.
+
+    Aliases are read from alt.csv next to it (or `alt_path`) when present.
+    """
+    alt_path = alt_path or os.path.join(os.path.dirname(path), 'alt.csv')
+    aliases: Dict[str, List[str]] = {}
+    if os.path.exists(alt_path):
+        with open(alt_path, newline='', encoding='utf-8', errors='replace') as alt_file:
+            for row in csv.reader(alt_file):
+                if len(row) >= 4 and _ofac_csv_value(row[3]):
+                    aliases.setdefault(row[0].strip(), []).append(_ofac_csv_value(row[3]))
+
+    with open(path, newline='', encoding='utf-8', errors='replace') as sdn_file:
+        for row in csv.reader(sdn_file):
+            if len(row) < 4 or not _ofac_csv_value(row[1]):
+                continue
+            uid = row[0].strip()
+            programs = [program.strip() for program in (_ofac_csv_value(row[3]) or '').strip('[]').split('] [') if program.strip()]
+            yield SanctionsRecord(
+                uid=uid,
+                name=_ofac_csv_value(row[1]),
+                aliases=aliases.get(uid, []),
+                entity_type=_ofac_csv_value(row[2]) or 'entity',
+                programs=programs,
+                details={'remarks': _ofac_csv_value(row[11]) if len(row) > 11 else None}
+            )
+
+
+def _uk_date(value: Optional[str]) -> Optional[str]:
+    value = (value or '').strip()
+    for date_format in ('%d/%m/%Y', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return value or None
+
+
+def _uk_records(rows: Iterable[Dict[str, Optional[str]]]) -> Iterator[SanctionsRecord]:
+    """Group UK list rows, one per name, into records by group ID."""
+    groups: Dict[str, SanctionsRecord] = {}
+    for row in rows:
+        name = ' '.join(
+            (row.get(column) or '').strip()
+            for column in ('name1', 'name2', 'name3', 'name4', 'name5', 'name6')
+            if (row.get(column) or '').strip()
+        )
+        group_id = (row.get('group_id') or '').strip()
+        if not name or not group_id:
+            continue
+
+        record = groups.get(group_id)
+        if record is None:
+            record = groups[group_id] = SanctionsRecord(
+                uid=(row.get('list_ref') or '').strip() or group_id,
+                name=name,
+                entity_type=(row.get('group_type') or 'unknown').strip(),
+                listing_date=_uk_date(row.get('listed_on')),
+                details={'group_id': group_id, 'sanctions_imposed': []}
+            )
+        elif (row.get('alias_type') or '').strip().lower() == 'primary name':
+            record.aliases.append(record.name)
+            record.name = name
+        elif name != record.name and name not in record.aliases:
+            record.aliases.append(name)
+
+        regime = (row.get('regime') or '').strip()
+        if regime and regime not in record.programs:
+            record.programs.append(regime)
+
+    yield from groups.values()
+
+
+UK_CSV_COLUMNS = {
+    'Name 1': 'name1', 'Name 2': 'name2', 'Name 3': 'name3', 'Name 4': 'name4', 'Name 5': 'name5',
+    'Name 6': 'name6', 'Group Type': 'group_type', 'Alias Type': 'alias_type', 'Regime': 'regime',
+    'Listed On': 'listed_on', 'Group ID': 'group_id', 'UK Sanctions List Ref': 'list_ref'
+}
+
+UK_XML_FIELDS = {
+    'Name1': 'name1', 'Name2': 'name2', 'Name3': 'name3', 'Name4': 'name4', 'Name5': 'name5',
+    'Name6': 'name6', 'GroupTypeDescription': 'group_type', 'AliasType': 'alias_type',
+    'RegimeName': 'regime', 'DateListed': 'listed_on', 'GroupID': 'group_id',
+    'UKSanctionsListRef': 'list_ref'
+}
+
+
+def parse_uk_csv(path: str) -> Iterator[SanctionsRecord]:
+    """Stream records from the UK HM Treasury consolidated list CSV file."""
+    def rows():
+        with open(path, newline='', encoding='utf-8-sig', errors='replace') as list_file:
+            reader = csv.reader(list_file)
+            header = None
+            for row in reader:
+                if header is None:
+                    # The file starts with a "Last Updated" line before the header
+                    if 'Name 6' in row:
+                        header = [UK_CSV_COLUMNS.get(column.strip()) for column in row]
+                    continue
+                yield {key: value for key, value in zip(header, row) if key}
+
+    return _uk_records(rows())
+
+
+def parse_uk_xml(path: str) -> Iterator[SanctionsRecord]:
+    """Stream records from the UK HM Treasury consolidated list XML file."""
+    def rows():
+        for target in _iter_elements(path, 'FinancialSanctionsTarget'):
+            row = {}
+            for child in target:
+                key = UK_XML_FIELDS.get(_local_name(child.tag))
+                if key:
+                    row[key] = child.text
+            yield row
+
+    return _uk_records(rows())
+
+
+def load_sanctions_index(path: str, parsers: Dict[str, Callable[[str], Iterable[SanctionsRecord]]]) -> SanctionsIndex:
+    """
+    Build an index from a local list file.
+
+    Args:
+        path: List file; its extension selects the parser
+        parsers: Parser per file extension, e.g. {'.xml': parse_eu_xml}
+    """
+    extension = os.path.splitext(path)[1].lower()
+    parser = parsers.get(extension)
+    if parser is None:
+        raise ValueError(f"Unsupported sanctions list format: {extension or path}")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Sanctions list file not found: {path}")
+
+    index = SanctionsIndex(parser(path))
+    logger.info("Sanctions list indexed", path=path, entities=len(index.records), names=index.name_count)
+    return index
+
+
+class SanctionsListMixin:
+    """
+    Shared list loading for the sanctions adapters.
+
+    Adapters set LIST_FILE_CONFIG_KEY, LIST_PARSERS, SAMPLE_RECORDS and
+    their own class-level `_index_holder`, so every adapter instance of a
+    list screens against the same index. The list file named by the config
+    key is indexed on first use; without one the built-in sample records
+    are indexed instead.
+    """
+
+    LIST_FILE_CONFIG_KEY: str = None
+    LIST_PARSERS: Dict[str, Callable[[str], Iterable[SanctionsRecord]]] = {}
+    SAMPLE_RECORDS: List[SanctionsRecord] = []
+    DEFAULT_MATCH_THRESHOLD = 0.8
+    _index_holder: SanctionsIndexHolder
+
+    def screen_names(self, entity_names: Iterable[str], **kwargs) -> Dict[str, Dict[str, Any]]:
+        """
+        Screen many names against the loaded list in one pass.
+
+        Meant for bulk screening of whole portfolios: each distinct name is
+        screened once, straight against the index, without the per-name
+        cache lookups and rate limiting of check_single.
+
+        Args:
+            entity_names: Names to screen; duplicates are screened once
+            **kwargs: Same options as check_single, except force_refresh
+
+        Returns:
+            Check result per distinct name, in the check_single format
+        """
+        match_threshold = kwargs.get('match_threshold', self.DEFAULT_MATCH_THRESHOLD)
+        include_aliases = kwargs.get('include_aliases', True)
+        checked_at = datetime.utcnow().isoformat() + 'Z'
+        self._get_index()  # Load the list before the loop so a failure surfaces once
+
+        results = {}
+        for entity_name in dict.fromkeys(entity_names):
+            try:
+                clean_name = self._validate_entity_name(entity_name)
+                result = self._screen_entity(clean_name, match_threshold, include_aliases, **kwargs)
+            except ValidationError as e:
+                results[entity_name] = self._create_error_result(entity_name, str(e), 'validation_error')
+                continue
+            except DataSourceUnavailable as e:
+                results[entity_name] = self._create_error_result(entity_name, str(e), 'unavailable')
+                continue
+
+            result.update({
+                'checked_at': checked_at,
+                'source': self.source_name,
+                'cached': False,
+                'identifier': clean_name,
+                'match_threshold': match_threshold
+            })
+            results[entity_name] = result
+
+        return results
+
+    def find_matching_names(self, entity_names: Iterable[str], record_uids: Iterable[str],
+                            **kwargs) -> List[str]:
+        """
+        Find the names that match any of some listed parties.
+
+        Used for delta re-screening: screening a portfolio against only the
+        entries a list update added or changed costs little, and just the
+        names found need a full check. Adapter filters such as programs are
+        not applied here, so the result is never narrower than a full check.
+
+        Args:
+            entity_names: Names to screen; duplicates are screened once
+            record_uids: List identifiers of the parties to screen against
+            **kwargs: match_threshold and include_aliases as for check_single
+
+        Returns:
+            Distinct names with at least one match, invalid names left out
+        """
+        match_threshold = kwargs.get('match_threshold', self.DEFAULT_MATCH_THRESHOLD)
+        include_aliases = kwargs.get('include_aliases', True)
+        index = self._get_index().subset(record_uids)
+        if not index.records:
+            return []
+
+        matching = []
+        for entity_name in dict.fromkeys(entity_names):
+            try:
+                clean_name = self._validate_entity_name(entity_name)
+            except ValidationError:
+                continue
+            if index.screen(clean_name, threshold=match_threshold, include_aliases=include_aliases, limit=1):
+                matching.append(entity_name)
+        return matching
+
+    def get_list_index(self) -> SanctionsIndex:
+        """Get the index currently screened against, loading the list on first use."""
+        return self._get_index()
+
+    def ensure_list_version(self, version: str) -> bool:
+        """
+        Make sure this process screens against a given list version.
+
+        Each worker process holds its own index, so one that loaded the list
+        before an update reloads it here.
+
+        Returns:
+            Whether the loaded list now has that version
+        """
+        if self._get_index().version == version:
+            return True
+        index = self._load_index()
+        if index.version != version:
+            logger.warning("Sanctions list version differs from the expected one",
+                           config_key=self.LIST_FILE_CONFIG_KEY, expected=version, loaded=index.version)
+            return False
+        return True
+
+    def _screen_entity(self, entity_name: str, match_threshold: float, include_aliases: bool,
+                       **kwargs) -> Dict[str, Any]:
+        """Screen one validated name against the index; implemented by each adapter."""
+        raise NotImplementedError
+
+    def _get_list_file(self) -> Optional[str]:
+        try:
+            return current_app.config.get(self.LIST_FILE_CONFIG_KEY) or None
+        except RuntimeError:
+            # Outside an application context
+            return None
+
+    def _get_index(self) -> SanctionsIndex:
+        """Get the current index, loading the list on first use."""
+        index = self._index_holder.index
+        if index is None:
+            index = self._load_index(force=False)
+        return index
+
+    def _load_index(self, list_file: str = None, force: bool = True) -> SanctionsIndex:
+        """
+        Build a new index and swap it in.
+
+        Raises:
+            ValueError, FileNotFoundError or a parse error; the current
+            index stays in place when loading fails
+        """
+        holder = self._index_holder
+        with holder.update_lock:
+            # Another thread may have loaded the list while we waited
+            if holder.index is not None and not force:
+                return holder.index
+
+            list_file = list_file or self._get_list_file()
+            if list_file:
+                index = load_sanctions_index(list_file, self.LIST_PARSERS)
+                source = list_file
+            else:
+                logger.warning("No sanctions list file configured, screening against sample records",
+                               config_key=self.LIST_FILE_CONFIG_KEY)
+                index = SanctionsIndex(self.SAMPLE_RECORDS)
+                source = 'sample'
+
+            holder.swap(index, source)
+            return index
@@ -3,17 +3,39 @@ import time
 import re
 from typing import Dict, List, Optional, Any
 from datetime import datetime
-import requests
-from flask import current_app
 import structlog
-import xml.etree.ElementTree as ET
 
 from .base import BaseKYBAdapter, ValidationError, DataSourceUnavailable, RateLimitExceeded
+from .sanctions_index import (
+    NameMatch, SanctionsIndexHolder, SanctionsListMixin, SanctionsRecord,
+    name_similarity, normalize_name, parse_ofac_csv, parse_ofac_xml
+)
 
 logger = structlog.get_logger()
 
 
-class OFACSanctionsAdapter(BaseKYBAdapter):
+# Screened when no OFAC_SANCTIONS_LIST_FILE is configured
+OFAC_SAMPLE_RECORDS = [
+    SanctionsRecord(
+        uid='36418', name='SBERBANK OF RUSSIA', aliases=['SBERBANK', 'SBER'], entity_type='company',
+        programs=['UKRAINE-EO13662'], listing_date='2014-07-16'
+    ),
+    SanctionsRecord(
+        uid='36419', name='GAZPROM', aliases=['GAZPROM OAO', 'GAZPROM PJSC'], entity_type='company',
+        programs=['UKRAINE-EO13662'], listing_date='2014-07-16'
+    ),
+    SanctionsRecord(
+        uid='36420', name='VLADIMIR VLADIMIROVICH PUTIN', aliases=['PUTIN', 'VLADIMIR PUTIN'],
+        entity_type='individual', programs=['UKRAINE-EO13661'], listing_date='2014-04-28'
+    ),
+    SanctionsRecord(
+        uid='36421', name='ROSNEFT OIL COMPANY', aliases=['ROSNEFT', 'ROSNEFT PJSC'], entity_type='company',
+        programs=['UKRAINE-EO13662'], listing_date='2014-09-12'
+    )
+]
+
+
+class OFACSanctionsAdapter(SanctionsListMixin, BaseKYBAdapter):
     """Adapter for OFAC Specially Designated Nationals (SDN) List."""
     
     # Configuration
@@ -28,19 +50,21 @@ class OFACSanctionsAdapter(BaseKYBAdapter):
     OFAC_CONSOLIDATED_URL = "https://www.treasury.gov/ofac/downloads/consolidated/consolidated.xml"
     OFAC_SEARCH_URL = "https://sanctionssearch.ofac.treas.gov/api/PublicationPreview/exports/XML"
     
+    # Local list screening
+    LIST_FILE_CONFIG_KEY = 'OFAC_SANCTIONS_LIST_FILE'
+    LIST_PARSERS = {'.xml': parse_ofac_xml, '.csv': parse_ofac_csv}
+    SAMPLE_RECORDS = OFAC_SAMPLE_RECORDS
+    DEFAULT_MATCH_THRESHOLD = 0.85
+    _index_holder = SanctionsIndexHolder()
+    
     def __init__(self, redis_client=None):
         """Initialize OFAC Sanctions adapter."""
         super().__init__(redis_client)
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers.update({
             'User-Agent': 'AI-Secretary-KYB/1.0',
             'Accept': 'application/xml, application/json',
             'Content-Type': 'application/json'
         })
-        
-        # OFAC sanctions data cache
-        self._sanctions_data = None
-        self._last_update = None
     
     def check_single(self, entity_name: str, **kwargs) -> Dict[str, Any]:
         """
@@ -59,7 +83,7 @@ class OFACSanctionsAdapter(BaseKYBAdapter):
         """
         start_time = time.time()
         force_refresh = kwargs.get('force_refresh', False)
-        match_threshold = kwargs.get('match_threshold', 0.85)
+        match_threshold = kwargs.get('match_threshold', self.DEFAULT_MATCH_THRESHOLD)
         include_aliases = kwargs.get('include_aliases', True)
         programs = kwargs.get('programs', None)  # None means all programs
         
@@ -150,9 +174,6 @@ class OFACSanctionsAdapter(BaseKYBAdapter):
         for entity_name in entity_names:
             result = self.check_single(entity_name, **kwargs)
             results.append(result)
-            
-            # Small delay between requests
-            time.sleep(0.2)
         
         logger.info("OFAC sanctions batch check completed",
                    total=len(entity_names),
@@ -180,105 +201,21 @@ class OFACSanctionsAdapter(BaseKYBAdapter):
     
     def _check_ofac_sanctions(self, entity_name: str, match_threshold: float, 
                              include_aliases: bool, programs: Optional[List[str]]) -> Dict[str, Any]:
-        """
-        Check entity against OFAC sanctions list.
-        
-        This is a simplified implementation. In production, you would:
-        1. Download and parse the OFAC SDN XML file
-        2. Implement sophisticated matching algorithms
-        3. Handle different entity types and programs
-        4. Process aliases and alternate spellings
-        """
+        """Screen an entity name against the indexed OFAC SDN list."""
         try:
-            # Simulate API call delay
-            time.sleep(0.15)
-            
-            # Demo OFAC sanctions keywords (in production, this would be the full SDN list)
-            demo_ofac_sanctions = [
-                {
-                    'name': 'SBERBANK OF RUSSIA',
-                    'aliases': ['SBERBANK', 'SBER'],
-                    'program': 'UKRAINE-EO13662',
-                    'entity_type': 'company',
-                    'uid': '36418',
-                    'listing_date': '2014-07-16'
-                },
-                {
-                    'name': 'GAZPROM',
-                    'aliases': ['GAZPROM OAO', 'GAZPROM PJSC'],
-                    'program': 'UKRAINE-EO13662',
-                    'entity_type': 'company',
-                    'uid': '36419',
-                    'listing_date': '2014-07-16'
-                },
-                {
-                    'name': 'VLADIMIR VLADIMIROVICH PUTIN',
-                    'aliases': ['PUTIN', 'VLADIMIR PUTIN'],
-                    'program': 'UKRAINE-EO13661',
-                    'entity_type': 'individual',
-                    'uid': '36420',
-                    'listing_date': '2014-04-28'
-                },
-                {
-                    'name': 'ROSNEFT OIL COMPANY',
-                    'aliases': ['ROSNEFT', 'ROSNEFT PJSC'],
-                    'program': 'UKRAINE-EO13662',
-                    'entity_type': 'company',
-                    'uid': '36421',
-                    'listing_date': '2014-09-12'
-                }
-            ]
+            index = self._get_index()
+            normalized_name = normalize_name(entity_name)
             
-            # Normalize entity name for matching
-            normalized_name = entity_name.upper()
+            record_filter = None
+            if programs:
+                requested = set(programs)
+                record_filter = lambda record: not requested.isdisjoint(record.programs)
             
-            # Find matches
-            matches = []
-            for entry in demo_ofac_sanctions:
-                # Check if specific programs are requested
-                if programs and entry['program'] not in programs:
-                    continue
-                
-                # Check main name
-                if entry['name'] in normalized_name or normalized_name in entry['name']:
-                    similarity = self._calculate_similarity(normalized_name, entry['name'])
-                    if similarity >= match_threshold:
-                        matches.append({
-                            'matched_name': entry['name'],
-                            'similarity_score': similarity,
-                            'match_type': 'primary_name',
-                            'ofac_uid': entry['uid'],
-                            'sanctions_program': entry['program'],
-                            'entity_type': entry['entity_type'],
-                            'listing_date': entry['listing_date'],
-                            'aliases': entry['aliases']
-                        })
-                
-                # Check aliases if enabled
-                if include_aliases:
-                    for alias in entry['aliases']:
-                        if alias in normalized_name or normalized_name in alias:
-                            similarity = self._calculate_similarity(normalized_name, alias)
-                            if similarity >= match_threshold:
-                                matches.append({
-                                    'matched_name': alias,
-                                    'primary_name': entry['name'],
-                                    'similarity_score': similarity,
-                                    'match_type': 'alias',
-                                    'ofac_uid': entry['uid'],
-                                    'sanctions_program': entry['program'],
-                                    'entity_type': entry['entity_type'],
-                                    'listing_date': entry['listing_date']
-                                })
-            
-            # Remove duplicates based on OFAC UID
-            unique_matches = []
-            seen_uids = set()
-            for match in matches:
-                uid = match['ofac_uid']
-                if uid not in seen_uids:
-                    unique_matches.append(match)
-                    seen_uids.add(uid)
+            unique_matches = [
+                self._format_match(match)
+                for match in index.screen(entity_name, threshold=match_threshold,
+                                          include_aliases=include_aliases, record_filter=record_filter)
+            ]
             
             # Determine result status
             if unique_matches:
@@ -302,7 +239,8 @@ class OFACSanctionsAdapter(BaseKYBAdapter):
                     'entity_name': entity_name,
                     'normalized_name': normalized_name,
                     'match_threshold': match_threshold,
-                    'include_aliases': include_aliases
+                    'include_aliases': include_aliases,
+                    'list_source': self._index_holder.source
                 }
             }
             
@@ -310,59 +248,56 @@ class OFACSanctionsAdapter(BaseKYBAdapter):
             logger.error("Error in OFAC sanctions matching", error=str(e), exc_info=True)
             raise DataSourceUnavailable(f"OFAC sanctions check failed: {str(e)}")
     
+    def _screen_entity(self, entity_name: str, match_threshold: float, include_aliases: bool,
+                       **kwargs) -> Dict[str, Any]:
+        """Screen one validated name for bulk screening."""
+        return self._check_ofac_sanctions(entity_name, match_threshold, include_aliases, kwargs.get('programs'))
+    
+    def _format_match(self, match: NameMatch) -> Dict[str, Any]:
+        """Convert an index match into the OFAC match format."""
+        record = match.record
+        return {
+            'matched_name': match.matched_name,
+            'primary_name': record.name,
+            'similarity_score': match.score,
+            'match_type': match.match_type,
+            'ofac_uid': record.uid,
+            'sanctions_program': ', '.join(record.programs),
+            'entity_type': record.entity_type,
+            'listing_date': record.listing_date,
+            'aliases': record.aliases
+        }
+    
     def _calculate_similarity(self, name1: str, name2: str) -> float:
-        """
-        Calculate similarity between two names.
-        
-        This is a simplified implementation. In production, you would use
-        more sophisticated algorithms like Levenshtein distance, Jaro-Winkler, etc.
-        """
-        # Simple containment-based similarity
-        shorter = min(name1, name2, key=len)
-        longer = max(name1, name2, key=len)
-        
-        if shorter in longer:
-            return len(shorter) / len(longer)
-        
-        # Count common words
-        words1 = set(name1.split())
-        words2 = set(name2.split())
-        common_words = words1.intersection(words2)
-        
-        if not words1 or not words2:
-            return 0.0
-        
-        return len(common_words) / max(len(words1), len(words2))
+        """Calculate similarity between two names (0.0-1.0)."""
+        return name_similarity(name1, name2)
     
-    def update_sanctions_data(self) -> Dict[str, Any]:
+    def update_sanctions_data(self, list_file: str = None) -> Dict[str, Any]:
         """
-        Update local OFAC sanctions data.
+        Rebuild the OFAC sanctions index from the list file.
         
-        In production, this would:
-        1. Download the latest OFAC SDN XML file
-        2. Parse and index the data
-        3. Store in local database or cache
-        4. Return update statistics
+        The new index is swapped in only once fully built, so checks running
+        during the update keep using the previous list.
+        
+        Args:
+            list_file: OFAC sdn.xml or sdn.csv file (default: OFAC_SANCTIONS_LIST_FILE)
         """
         try:
             logger.info("Updating OFAC sanctions data")
             
-            # Simulate data update
-            self._last_update = datetime.utcnow()
-            
-            # In production, you would:
-            # 1. Download from OFAC_SDN_URL or OFAC_CONSOLIDATED_URL
-            # 2. Parse XML data using ElementTree
-            # 3. Extract entities, aliases, addresses, programs
-            # 4. Build search index
+            index = self._load_index(list_file)
+            stats = index.stats()
             
             return {
                 'success': True,
-                'last_update': self._last_update.isoformat() + 'Z',
-                'total_entities': 8500,  # Demo number
-                'individuals': 6000,
-                'companies': 2500,
-                'programs': 45,
+                'last_update': self._index_holder.loaded_at.isoformat() + 'Z',
+                'source': self._index_holder.source,
+                'total_entities': stats['total_entities'],
+                'individuals': stats['individuals'],
+                'companies': stats['companies'],
+                'names': stats['names'],
+                'list_version': index.version,
+                'programs': stats['programs'],
                 'message': 'OFAC sanctions data updated successfully'
             }
             
@@ -375,9 +310,8 @@ class OFACSanctionsAdapter(BaseKYBAdapter):
             }
     
     def get_sanctions_programs(self) -> List[Dict[str, Any]]:
-        """Get list of OFAC sanctions programs."""
-        # Demo programs - in production, this would be extracted from the SDN data
-        return [
+        """Get list of OFAC sanctions programs, including any others found in the loaded list."""
+        programs = [
             {
                 'code': 'UKRAINE-EO13661',
                 'name': 'Ukraine-Related Sanctions (EO 13661)',
@@ -409,13 +343,21 @@ class OFACSanctionsAdapter(BaseKYBAdapter):
                 'description': 'Terrorism-related sanctions'
             }
         ]
+        
+        index = self._index_holder.index
+        if index is not None:
+            known = {program['code'] for program in programs}
+            listed = sorted({code for record in index.records for code in record.programs} - known)
+            programs.extend({'code': code, 'name': code, 'description': f'OFAC {code} program'} for code in listed)
+        
+        return programs
     
     def get_sanctions_info(self) -> Dict[str, Any]:
         """Get information about the OFAC sanctions list."""
         return {
             'source': 'US Treasury OFAC Specially Designated Nationals List',
             'url': self.OFAC_SDN_URL,
-            'last_update': self._last_update.isoformat() + 'Z' if self._last_update else None,
+            'last_update': self._index_holder.loaded_at.isoformat() + 'Z' if self._index_holder.loaded_at else None,
             'update_frequency': 'Weekly (typically Wednesday)',
             'entity_types': ['individuals', 'companies', 'organizations', 'vessels', 'aircraft'],
             'coverage': 'US sanctions and embargoes',
@@ -435,33 +377,24 @@ class OFACSanctionsAdapter(BaseKYBAdapter):
             Search results for the program
         """
         try:
-            # In production, this would search the indexed OFAC data
-            # For demo, return mock results
-            
-            demo_results = []
-            if program_code == 'UKRAINE-EO13662':
-                demo_results = [
-                    {
-                        'name': 'SBERBANK OF RUSSIA',
-                        'entity_type': 'company',
-                        'ofac_uid': '36418',
-                        'listing_date': '2014-07-16',
-                        'aliases': ['SBERBANK', 'SBER']
-                    },
-                    {
-                        'name': 'GAZPROM',
-                        'entity_type': 'company',
-                        'ofac_uid': '36419',
-                        'listing_date': '2014-07-16',
-                        'aliases': ['GAZPROM OAO', 'GAZPROM PJSC']
-                    }
-                ]
+            start_time = time.time()
+            results = [
+                {
+                    'name': record.name,
+                    'entity_type': record.entity_type,
+                    'ofac_uid': record.uid,
+                    'listing_date': record.listing_date,
+                    'aliases': record.aliases
+                }
+                for record in self._get_index().records
+                if program_code in record.programs
+            ]
             
             return {
                 'program_code': program_code,
-                'total_results': len(demo_results),
-                'results': demo_results[:limit],
-                'search_time_ms': 25
+                'total_results': len(results),
+                'results': results[:limit],
+                'search_time_ms': int((time.time() - start_time) * 1000)
             }
             
         except Exception as e:
@@ -3,17 +3,48 @@ import time
 import re
 from typing import Dict, List, Optional, Any
 from datetime import datetime
-import requests
-from flask import current_app
 import structlog
 import json
 
 from .base import BaseKYBAdapter, ValidationError, DataSourceUnavailable, RateLimitExceeded
+from .sanctions_index import (
+    NameMatch, SanctionsIndexHolder, SanctionsListMixin, SanctionsRecord,
+    name_similarity, normalize_name, parse_uk_csv, parse_uk_xml
+)
 
 logger = structlog.get_logger()
 
 
-class UKSanctionsAdapter(BaseKYBAdapter):
+# Screened when no UK_SANCTIONS_LIST_FILE is configured
+UK_SAMPLE_RECORDS = [
+    SanctionsRecord(
+        uid='RUS0001', name='SBERBANK OF RUSSIA', aliases=['SBERBANK', 'SBER', 'SBERBANK ROSSII'],
+        entity_type='Entity', programs=['Russia'], listing_date='2022-02-26',
+        details={
+            'sanctions_imposed': ['Asset freeze', 'Investment ban'],
+            'addresses': [{'address': '19 Vavilova Street, Moscow 117997, Russia', 'country': 'Russia'}],
+            'other_information': 'Major Russian state-owned bank'
+        }
+    ),
+    SanctionsRecord(
+        uid='RUS0002', name='GAZPROM PJSC', aliases=['GAZPROM', 'GAZPROM OAO'], entity_type='Entity',
+        programs=['Russia'], listing_date='2022-02-26',
+        details={'sanctions_imposed': ['Asset freeze', 'Investment ban']}
+    ),
+    SanctionsRecord(
+        uid='RUS0003', name='VLADIMIR VLADIMIROVICH PUTIN', aliases=['PUTIN', 'VLADIMIR PUTIN', 'V. PUTIN'],
+        entity_type='Individual', programs=['Russia'], listing_date='2022-02-25',
+        details={'sanctions_imposed': ['Asset freeze', 'Travel ban']}
+    ),
+    SanctionsRecord(
+        uid='RUS0004', name='ROSNEFT OIL COMPANY', aliases=['ROSNEFT', 'ROSNEFT PJSC'], entity_type='Entity',
+        programs=['Russia'], listing_date='2022-02-26',
+        details={'sanctions_imposed': ['Asset freeze', 'Investment ban']}
+    )
+]
+
+
+class UKSanctionsAdapter(SanctionsListMixin, BaseKYBAdapter):
     """Adapter for UK HM Treasury Consolidated Sanctions List."""
     
     # Configuration
@@ -28,19 +59,21 @@ class UKSanctionsAdapter(BaseKYBAdapter):
     UK_CONSOLIDATED_LIST_URL = f"{UK_SANCTIONS_BASE_URL}/ConList.json"
     UK_FINANCIAL_SANCTIONS_URL = "https://assets.publishing.service.gov.uk/government/uploads/system/uploads/attachment_data/file/current/ConList.json"
     
+    # Local list screening
+    LIST_FILE_CONFIG_KEY = 'UK_SANCTIONS_LIST_FILE'
+    LIST_PARSERS = {'.csv': parse_uk_csv, '.xml': parse_uk_xml}
+    SAMPLE_RECORDS = UK_SAMPLE_RECORDS
+    DEFAULT_MATCH_THRESHOLD = 0.8
+    _index_holder = SanctionsIndexHolder()
+    
     def __init__(self, redis_client=None):
         """Initialize UK Sanctions adapter."""
         super().__init__(redis_client)
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers.update({
             'User-Agent': 'AI-Secretary-KYB/1.0',
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
-        
-        # UK sanctions data cache
-        self._sanctions_data = None
-        self._last_update = None
     
     def check_single(self, entity_name: str, **kwargs) -> Dict[str, Any]:
         """
@@ -59,7 +92,7 @@ class UKSanctionsAdapter(BaseKYBAdapter):
         """
         start_time = time.time()
         force_refresh = kwargs.get('force_refresh', False)
-        match_threshold = kwargs.get('match_threshold', 0.8)
+        match_threshold = kwargs.get('match_threshold', self.DEFAULT_MATCH_THRESHOLD)
         include_aliases = kwargs.get('include_aliases', True)
         regimes = kwargs.get('regimes', None)  # None means all regimes
         
@@ -150,9 +183,6 @@ class UKSanctionsAdapter(BaseKYBAdapter):
         for entity_name in entity_names:
             result = self.check_single(entity_name, **kwargs)
             results.append(result)
-            
-            # Small delay between requests
-            time.sleep(0.1)
         
         logger.info("UK sanctions batch check completed",
                    total=len(entity_names),
@@ -180,117 +210,21 @@ class UKSanctionsAdapter(BaseKYBAdapter):
     
     def _check_uk_sanctions(self, entity_name: str, match_threshold: float, 
                            include_aliases: bool, regimes: Optional[List[str]]) -> Dict[str, Any]:
-        """
-        Check entity against UK sanctions list.
-        
-        This is a simplified implementation. In production, you would:
-        1. Download and parse the UK Consolidated List JSON
-        2. Implement sophisticated matching algorithms
-        3. Handle different entity types and regimes
-        4. Process aliases and alternate spellings
-        """
+        """Screen an entity name against the indexed UK consolidated list."""
         try:
-            # Simulate API call delay
-            time.sleep(0.12)
+            index = self._get_index()
+            normalized_name = normalize_name(entity_name)
             
-            # Demo UK sanctions data (in production, this would be the full consolidated list)
-            demo_uk_sanctions = [
-                {
-                    'name': 'SBERBANK OF RUSSIA',
-                    'aliases': ['SBERBANK', 'SBER', 'SBERBANK ROSSII'],
-                    'regime': 'Russia',
-                    'entity_type': 'Entity',
-                    'unique_id': 'RUS0001',
-                    'listing_date': '2022-02-26',
-                    'uk_sanctions_list_ref': 'RUS0001',
-                    'sanctions_imposed': ['Asset freeze', 'Investment ban']
-                },
-                {
-                    'name': 'GAZPROM PJSC',
-                    'aliases': ['GAZPROM', 'GAZPROM OAO'],
-                    'regime': 'Russia',
-                    'entity_type': 'Entity',
-                    'unique_id': 'RUS0002',
-                    'listing_date': '2022-02-26',
-                    'uk_sanctions_list_ref': 'RUS0002',
-                    'sanctions_imposed': ['Asset freeze', 'Investment ban']
-                },
-                {
-                    'name': 'VLADIMIR VLADIMIROVICH PUTIN',
-                    'aliases': ['PUTIN', 'VLADIMIR PUTIN', 'V. PUTIN'],
-                    'regime': 'Russia',
-                    'entity_type': 'Individual',
-                    'unique_id': 'RUS0003',
-                    'listing_date': '2022-02-25',
-                    'uk_sanctions_list_ref': 'RUS0003',
-                    'sanctions_imposed': ['Asset freeze', 'Travel ban']
-                },
-                {
-                    'name': 'ROSNEFT OIL COMPANY',
-                    'aliases': ['ROSNEFT', 'ROSNEFT PJSC'],
-                    'regime': 'Russia',
-                    'entity_type': 'Entity',
-                    'unique_id': 'RUS0004',
-                    'listing_date': '2022-02-26',
-                    'uk_sanctions_list_ref': 'RUS0004',
-                    'sanctions_imposed': ['Asset freeze', 'Investment ban']
-                }
-            ]
-            
-            # Normalize entity name for matching
-            normalized_name = entity_name.upper()
+            record_filter = None
+            if regimes:
+                requested = set(regimes)
+                record_filter = lambda record: not requested.isdisjoint(record.programs)
             
-            # Find matches
-            matches = []
-            for entry in demo_uk_sanctions:
-                # Check if specific regimes are requested
-                if regimes and entry['regime'] not in regimes:
-                    continue
-                
-                # Check main name
-                if entry['name'] in normalized_name or normalized_name in entry['name']:
-                    similarity = self._calculate_similarity(normalized_name, entry['name'])
-                    if similarity >= match_threshold:
-                        matches.append({
-                            'matched_name': entry['name'],
-                            'similarity_score': similarity,
-                            'match_type': 'primary_name',
-                            'uk_unique_id': entry['unique_id'],
-                            'sanctions_regime': entry['regime'],
-                            'entity_type': entry['entity_type'],
-                            'listing_date': entry['listing_date'],
-                            'sanctions_list_ref': entry['uk_sanctions_list_ref'],
-                            'sanctions_imposed': entry['sanctions_imposed'],
-                            'aliases': entry['aliases']
-                        })
-                
-                # Check aliases if enabled
-                if include_aliases:
-                    for alias in entry['aliases']:
-                        if alias in normalized_name or normalized_name in alias:
-                            similarity = self._calculate_similarity(normalized_name, alias)
-                            if similarity >= match_threshold:
-                                matches.append({
-                                    'matched_name': alias,
-                                    'primary_name': entry['name'],
-                                    'similarity_score': similarity,
-                                    'match_type': 'alias',
-                                    'uk_unique_id': entry['unique_id'],
-                                    'sanctions_regime': entry['regime'],
-                                    'entity_type': entry['entity_type'],
-                                    'listing_date': entry['listing_date'],
-                                    'sanctions_list_ref': entry['uk_sanctions_list_ref'],
-                                    'sanctions_imposed': entry['sanctions_imposed']
-                                })
-            
-            # Remove duplicates based on UK unique ID
-            unique_matches = []
-            seen_ids = set()
-            for match in matches:
-                uid = match['uk_unique_id']
-                if uid not in seen_ids:
-                    unique_matches.append(match)
-                    seen_ids.add(uid)
+            unique_matches = [
+                self._format_match(match)
+                for match in index.screen(entity_name, threshold=match_threshold,
+                                          include_aliases=include_aliases, record_filter=record_filter)
+            ]
             
             # Determine result status
             if unique_matches:
@@ -314,7 +248,8 @@ class UKSanctionsAdapter(BaseKYBAdapter):
                     'entity_name': entity_name,
                     'normalized_name': normalized_name,
                     'match_threshold': match_threshold,
-                    'include_aliases': include_aliases
+                    'include_aliases': include_aliases,
+                    'list_source': self._index_holder.source
                 }
             }
             
@@ -322,59 +257,58 @@ class UKSanctionsAdapter(BaseKYBAdapter):
             logger.error("Error in UK sanctions matching", error=str(e), exc_info=True)
             raise DataSourceUnavailable(f"UK sanctions check failed: {str(e)}")
     
+    def _screen_entity(self, entity_name: str, match_threshold: float, include_aliases: bool,
+                       **kwargs) -> Dict[str, Any]:
+        """Screen one validated name for bulk screening."""
+        return self._check_uk_sanctions(entity_name, match_threshold, include_aliases, kwargs.get('regimes'))
+    
+    def _format_match(self, match: NameMatch) -> Dict[str, Any]:
+        """Convert an index match into the UK match format."""
+        record = match.record
+        return {
+            'matched_name': match.matched_name,
+            'primary_name': record.name,
+            'similarity_score': match.score,
+            'match_type': match.match_type,
+            'uk_unique_id': record.uid,
+            'sanctions_regime': ', '.join(record.programs),
+            'entity_type': record.entity_type,
+            'listing_date': record.listing_date,
+            'sanctions_list_ref': record.uid,
+            'sanctions_imposed': record.details.get('sanctions_imposed', []),
+            'aliases': record.aliases
+        }
+    
     def _calculate_similarity(self, name1: str, name2: str) -> float:
-        """
-        Calculate similarity between two names.
-        
-        This is a simplified implementation. In production, you would use
-        more sophisticated algorithms like Levenshtein distance, Jaro-Winkler, etc.
-        """
-        # Simple containment-based similarity
-        shorter = min(name1, name2, key=len)
-        longer = max(name1, name2, key=len)
-        
-        if shorter in longer:
-            return len(shorter) / len(longer)
-        
-        # Count common words
-        words1 = set(name1.split())
-        words2 = set(name2.split())
-        common_words = words1.intersection(words2)
-        
-        if not words1 or not words2:
-            return 0.0
-        
-        return len(common_words) / max(len(words1), len(words2))
+        """Calculate similarity between two names (0.0-1.0)."""
+        return name_similarity(name1, name2)
     
-    def update_sanctions_data(self) -> Dict[str, Any]:
+    def update_sanctions_data(self, list_file: str = None) -> Dict[str, Any]:
         """
-        Update local UK sanctions data.
+        Rebuild the UK sanctions index from the list file.
         
-        In production, this would:
-        1. Download the latest UK Consolidated List JSON
-        2. Parse and index the data
-        3. Store in local database or cache
-        4. Return update statistics
+        The new index is swapped in only once fully built, so checks running
+        during the update keep using the previous list.
+        
+        Args:
+            list_file: UK consolidated list CSV or XML file (default: UK_SANCTIONS_LIST_FILE)
         """
         try:
             logger.info("Updating UK sanctions data")
             
-            # Simulate data update
-            self._last_update = datetime.utcnow()
-            
-            # In production, you would:
-            # 1. Download from UK_CONSOLIDATED_LIST_URL
-            # 2. Parse JSON data
-            # 3. Extract entities, aliases, addresses, regimes
-            # 4. Build search index
+            index = self._load_index(list_file)
+            stats = index.stats()
             
             return {
                 'success': True,
-                'last_update': self._last_update.isoformat() + 'Z',
-                'total_entities': 1800,  # Demo number
-                'individuals': 1200,
-                'entities': 600,
-                'regimes': 25,
+                'last_update': self._index_holder.loaded_at.isoformat() + 'Z',
+                'source': self._index_holder.source,
+                'total_entities': stats['total_entities'],
+                'individuals': stats['individuals'],
+                'entities': stats['companies'],
+                'names': stats['names'],
+                'list_version': index.version,
+                'regimes': stats['programs'],
                 'message': 'UK sanctions data updated successfully'
             }
             
@@ -387,9 +321,8 @@ class UKSanctionsAdapter(BaseKYBAdapter):
             }
     
     def get_sanctions_regimes(self) -> List[Dict[str, Any]]:
-        """Get list of UK sanctions regimes."""
-        # Demo regimes - in production, this would be extracted from the consolidated list
-        return [
+        """Get list of UK sanctions regimes, including any others found in the loaded list."""
+        regimes = [
             {
                 'code': 'Russia',
                 'name': 'Russia',
@@ -431,13 +364,21 @@ class UKSanctionsAdapter(BaseKYBAdapter):
                 'description': 'Global Human Rights sanctions'
             }
         ]
+        
+        index = self._index_holder.index
+        if index is not None:
+            known = {regime['code'] for regime in regimes}
+            listed = sorted({code for record in index.records for code in record.programs} - known)
+            regimes.extend({'code': code, 'name': code, 'description': f'Sanctions relating to {code}'} for code in listed)
+        
+        return regimes
     
     def get_sanctions_info(self) -> Dict[str, Any]:
         """Get information about the UK sanctions list."""
         return {
             'source': 'UK HM Treasury Consolidated Sanctions List',
             'url': self.UK_CONSOLIDATED_LIST_URL,
-            'last_update': self._last_update.isoformat() + 'Z' if self._last_update else None,
+            'last_update': self._index_holder.loaded_at.isoformat() + 'Z' if self._index_holder.loaded_at else None,
             'update_frequency': 'Weekly (typically Thursday)',
             'entity_types': ['Individual', 'Entity', 'Ship', 'Aircraft'],
             'coverage': 'UK financial sanctions and asset freezes',
@@ -458,35 +399,25 @@ class UKSanctionsAdapter(BaseKYBAdapter):
             Search results for the regime
         """
         try:
-            # In production, this would search the indexed UK sanctions data
-            # For demo, return mock results
-            
-            demo_results = []
-            if regime_code == 'Russia':
-                demo_results = [
-                    {
-                        'name': 'SBERBANK OF RUSSIA',
-                        'entity_type': 'Entity',
-                        'uk_unique_id': 'RUS0001',
-                        'listing_date': '2022-02-26',
-                        'sanctions_imposed': ['Asset freeze', 'Investment ban'],
-                        'aliases': ['SBERBANK', 'SBER']
-                    },
-                    {
-                        'name': 'VLADIMIR VLADIMIROVICH PUTIN',
-                        'entity_type': 'Individual',
-                        'uk_unique_id': 'RUS0003',
-                        'listing_date': '2022-02-25',
-                        'sanctions_imposed': ['Asset freeze', 'Travel ban'],
-                        'aliases': ['PUTIN', 'VLADIMIR PUTIN']
-                    }
-                ]
+            start_time = time.time()
+            results = [
+                {
+                    'name': record.name,
+                    'entity_type': record.entity_type,
+                    'uk_unique_id': record.uid,
+                    'listing_date': record.listing_date,
+                    'sanctions_imposed': record.details.get('sanctions_imposed', []),
+                    'aliases': record.aliases
+                }
+                for record in self._get_index().records
+                if regime_code in record.programs
+            ]
             
             return {
                 'regime_code': regime_code,
-                'total_results': len(demo_results),
-                'results': demo_results[:limit],
-                'search_time_ms': 30
+                'total_results': len(results),
+                'results': results[:limit],
+                'search_time_ms': int((time.time() - start_time) * 1000)
             }
             
         except Exception as e:
@@ -509,26 +440,19 @@ class UKSanctionsAdapter(BaseKYBAdapter):
             Detailed entity information
         """
         try:
-            # In production, this would query the full entity record
-            # For demo, return mock detailed data
-            
-            if uk_unique_id == 'RUS0001':
+            record = self._get_index().get(uk_unique_id)
+            if record is not None:
                 return {
-                    'uk_unique_id': 'RUS0001',
-                    'name': 'SBERBANK OF RUSSIA',
-                    'entity_type': 'Entity',
-                    'regime': 'Russia',
-                    'listing_date': '2022-02-26',
-                    'sanctions_imposed': ['Asset freeze', 'Investment ban'],
-                    'aliases': ['SBERBANK', 'SBER', 'SBERBANK ROSSII'],
-                    'addresses': [
-                        {
-                            'address': '19 Vavilova Street, Moscow 117997, Russia',
-                            'country': 'Russia'
-                        }
-                    ],
-                    'other_information': 'Major Russian state-owned bank',
-                    'last_updated': '2022-02-26'
+                    'uk_unique_id': record.uid,
+                    'name': record.name,
+                    'entity_type': record.entity_type,
+                    'regime': ', '.join(record.programs),
+                    'listing_date': record.listing_date,
+                    'sanctions_imposed': record.details.get('sanctions_imposed', []),
+                    'aliases': record.aliases,
+                    'addresses': record.details.get('addresses', []),
+                    'other_information': record.details.get('other_information'),
+                    'group_id': record.details.get('group_id')
                 }
             
             return {
@@ -0,0 +1,462 @@
+"""Shared HTTP transport for KYB data sources.
+
+All adapters send their requests through one process-wide ``requests`` session so
+keep-alive connections to VIES, GLEIF and the insolvency portal are reused across
+adapter instances and worker threads. Each source gets a circuit breaker (state in
+Redis when available, so every worker sees an outage at once), jittered retries
+bounded by the caller's timeout, optional hedging of slow idempotent requests and
+a latency histogram reported through ``BaseKYBAdapter.get_stats()``.
+"""
+import random
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+import structlog
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+from .base import CircuitOpenError
+
+logger = structlog.get_logger()
+
+
+def _config(key: str, default=None):
+    """Read a KYB transport setting from the current app, if any."""
+    try:
+        value = current_app.config.get(key)
+    except RuntimeError:
+        value = None
+    return default if value is None else value
+
+
+def _close_response(future) -> None:
+    """Release the connection held by the losing side of a hedged request."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket latency histogram in milliseconds."""
+
+    BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self._total = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+
+    def record(self, elapsed_ms: float) -> None:
+        index = bisect_left(self.BUCKETS_MS, elapsed_ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._total += 1
+            self._sum_ms += elapsed_ms
+            self._max_ms = max(self._max_ms, elapsed_ms)
+
+    @property
+    def count(self) -> int:
+        return self._total
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given percentile."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._total
+            max_ms = self._max_ms
+        if not total:
+            return None
+
+        rank = total * percent / 100.0
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank and count:
+                return float(self.BUCKETS_MS[index]) if index < len(self.BUCKETS_MS) else max_ms
+        return max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._total
+            mean = self._sum_ms / total if total else None
+            max_ms = self._max_ms
+        buckets = {f"le_{bound}": count for bound, count in zip(self.BUCKETS_MS, counts)}
+        buckets['inf'] = counts[-1]
+        return {
+            'count': total,
+            'mean_ms': round(mean, 1) if mean is not None else None,
+            'max_ms': round(max_ms, 1),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'buckets': buckets
+        }
+
+
+class CircuitBreaker:
+    """
+    Per-source circuit breaker.
+
+    After ``failure_threshold`` consecutive failed requests the circuit opens and
+    requests fail fast with CircuitOpenError. Once ``reset_timeout`` seconds have
+    passed it is half-open: a single probe request is let through and its outcome
+    closes or re-opens the circuit. State lives in Redis when a client is given so
+    that all workers share it; otherwise it is kept per process.
+    """
+
+    _local_state: Dict[str, Dict[str, Any]] = {}
+    _local_lock = threading.Lock()
+
+    def __init__(self, source: str, redis_client=None, failure_threshold: int = None,
+                 reset_timeout: float = None):
+        self.source = source
+        self.redis_client = redis_client
+        self.failure_threshold = int(failure_threshold or _config('KYB_CIRCUIT_FAILURE_THRESHOLD', 5))
+        self.reset_timeout = float(reset_timeout or _config('KYB_CIRCUIT_RESET_TIMEOUT', 60))
+
+        self._failures_key = f"kyb_circuit:{source}:failures"
+        self._opened_key = f"kyb_circuit:{source}:opened_at"
+        self._probe_key = f"kyb_circuit:{source}:probe"
+
+    def before_request(self) -> None:
+        """Raise CircuitOpenError unless a request may be sent now."""
+        opened_at = self._opened_at()
+        if opened_at is None:
+            return
+
+        remaining = opened_at + self.reset_timeout - time.time()
+        if remaining > 0:
+            raise CircuitOpenError(
+                f"{self.source} circuit is open after repeated failures - retry in {int(remaining) + 1}s"
+            )
+        if not self._acquire_probe():
+            raise CircuitOpenError(f"{self.source} circuit is half-open and a probe request is in flight")
+        logger.info("KYB circuit half-open, sending probe", source=self.source)
+
+    def record_success(self) -> None:
+        if self.redis_client:
+            try:
+                self.redis_client.delete(self._failures_key, self._opened_key, self._probe_key)
+            except Exception as e:
+                logger.warning("Circuit breaker state write failed", source=self.source, error=str(e))
+            return
+
+        with self._local_lock:
+            state = self._local_state.pop(self.source, None)
+        if state and state.get('opened_at') is not None:
+            logger.info("KYB circuit closed", source=self.source)
+
+    def record_failure(self) -> None:
+        now = time.time()
+        if self.redis_client:
+            try:
+                opened_at = self._opened_at()
+                if opened_at is not None:
+                    # A failed half-open probe re-opens the circuit
+                    self._open(now)
+                    return
+                failures = int(self.redis_client.incr(self._failures_key))
+                self.redis_client.expire(self._failures_key, max(1, int(self.reset_timeout)))
+                if failures >= self.failure_threshold:
+                    self._open(now, failures)
+            except Exception as e:
+                logger.warning("Circuit breaker state write failed", source=self.source, error=str(e))
+            return
+
+        with self._local_lock:
+            state = self._local_state.setdefault(self.source, {'failures': 0, 'opened_at': None})
+            if state['opened_at'] is not None:
+                state['opened_at'] = now
+                state['probing'] = False
+                return
+            state['failures'] += 1
+            failures = state['failures']
+            if failures >= self.failure_threshold:
+                state['opened_at'] = now
+                state['probing'] = False
+        if failures >= self.failure_threshold:
+            logger.warning("KYB circuit opened", source=self.source, failures=failures)
+
+    def state(self) -> Dict[str, Any]:
+        opened_at = self._opened_at()
+        if opened_at is None:
+            status = 'closed'
+        elif time.time() - opened_at < self.reset_timeout:
+            status = 'open'
+        else:
+            status = 'half_open'
+        return {
+            'state': status,
+            'failures': self._failures(),
+            'failure_threshold': self.failure_threshold,
+            'reset_timeout': self.reset_timeout
+        }
+
+    def _open(self, now: float, failures: int = None) -> None:
+        self.redis_client.set(self._opened_key, now, ex=max(1, int(self.reset_timeout * 10)))
+        self.redis_client.delete(self._probe_key)
+        logger.warning("KYB circuit opened", source=self.source, failures=failures)
+
+    def _opened_at(self) -> Optional[float]:
+        if self.redis_client:
+            try:
+                value = self.redis_client.get(self._opened_key)
+                return float(value) if value is not None else None
+            except Exception as e:
+                logger.warning("Circuit breaker state read failed", source=self.source, error=str(e))
+                return None
+
+        with self._local_lock:
+            state = self._local_state.get(self.source)
+            return state['opened_at'] if state else None
+
+    def _failures(self) -> int:
+        if self.redis_client:
+            try:
+                return int(self.redis_client.get(self._failures_key) or 0)
+            except Exception:
+                return 0
+
+        with self._local_lock:
+            state = self._local_state.get(self.source)
+            return state['failures'] if state else 0
+
+    def _acquire_probe(self) -> bool:
+        if self.redis_client:
+            try:
+                return bool(self.redis_client.set(self._probe_key, 1, nx=True, ex=max(1, int(self.reset_timeout))))
+            except Exception as e:
+                logger.warning("Circuit breaker state read failed", source=self.source, error=str(e))
+                return True
+
+        with self._local_lock:
+            state = self._local_state.get(self.source)
+            if state is None:
+                return True
+            if state.get('probing'):
+                return False
+            state['probing'] = True
+            return True
+
+
+class KYBTransport:
+    """
+    Pooled, retrying HTTP transport shared by all KYB adapters.
+
+    Connection pools are mounted per origin on first use and sized per source, so
+    concurrent checks reuse warm keep-alive connections instead of opening a new
+    TLS session per adapter. Requests still go through ``requests.Session.get`` and
+    ``requests.Session.post``.
+    """
+
+    DEFAULT_POOL_SIZE = 10
+    DEFAULT_MAX_RETRIES = 2
+    DEFAULT_RETRY_DELAY = 0.25  # Seconds before the first retry
+    DEFAULT_HEDGE_MIN_SAMPLES = 50
+    DEFAULT_HEDGE_WORKERS = 16
+    RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+    def __init__(self, pool_size: int = None, pool_sizes: Dict[str, int] = None, max_retries: int = None,
+                 retry_delay: float = None, hedge: bool = True, hedge_min_samples: int = None,
+                 hedge_workers: int = None):
+        self.pool_size = pool_size or self.DEFAULT_POOL_SIZE
+        self.pool_sizes = {key.upper(): value for key, value in (pool_sizes or {}).items()}
+        self.max_retries = self.DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_delay = self.DEFAULT_RETRY_DELAY if retry_delay is None else retry_delay
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples or self.DEFAULT_HEDGE_MIN_SAMPLES
+
+        self.session = requests.Session()
+        self._mounted = set()
+        self._mount_lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._histograms_lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+        hedge_workers = hedge_workers or self.DEFAULT_HEDGE_WORKERS
+        self._hedge_executor = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix='kyb-http')
+        # Each hedged request may occupy two executor threads
+        self._hedge_slots = threading.BoundedSemaphore(max(1, hedge_workers // 2))
+
+    @classmethod
+    def from_config(cls) -> 'KYBTransport':
+        """Create a transport using the KYB_HTTP_* settings of the current app."""
+        return cls(
+            pool_size=_config('KYB_HTTP_POOL_SIZE'),
+            pool_sizes=_config('KYB_HTTP_POOL_SIZES'),
+            max_retries=_config('KYB_HTTP_MAX_RETRIES'),
+            retry_delay=_config('KYB_HTTP_RETRY_DELAY'),
+            hedge=bool(_config('KYB_HTTP_HEDGE', True)),
+            hedge_min_samples=_config('KYB_HTTP_HEDGE_MIN_SAMPLES')
+        )
+
+    def request(self, source: str, method: str, url: str, timeout: float = 15,
+                breaker: CircuitBreaker = None, idempotent: bool = None, **kwargs) -> requests.Response:
+        """
+        Send a request for a KYB source.
+
+        ``timeout`` bounds the whole call including retries. Connection errors,
+        timeouts and 5xx responses are retried with jittered exponential backoff
+        while budget remains; the last response or exception is returned/raised
+        so adapters keep their own status handling. Raises CircuitOpenError when
+        the source's circuit is open.
+        """
+        method = method.lower()
+        if idempotent is None:
+            idempotent = method in ('get', 'head', 'options')
+        if breaker:
+            breaker.before_request()
+        self._mount(source, url)
+
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            remaining = max(deadline - time.monotonic(), 0.1)
+            try:
+                response = self._send(source, method, url, remaining, idempotent, kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if self._should_retry(source, attempt, deadline, idempotent):
+                    logger.warning("Retrying KYB request", source=source, attempt=attempt + 1, error=str(e))
+                    attempt += 1
+                    continue
+                self._count(source, 'failures')
+                if breaker:
+                    breaker.record_failure()
+                raise
+
+            if response.status_code in self.RETRY_STATUSES:
+                if self._should_retry(source, attempt, deadline, idempotent):
+                    logger.warning("Retrying KYB request", source=source, attempt=attempt + 1,
+                                   status_code=response.status_code)
+                    attempt += 1
+                    continue
+                self._count(source, 'failures')
+                if breaker:
+                    breaker.record_failure()
+            elif breaker:
+                breaker.record_success()
+            return response
+
+    def get(self, source: str, url: str, **kwargs) -> requests.Response:
+        return self.request(source, 'get', url, **kwargs)
+
+    def post(self, source: str, url: str, **kwargs) -> requests.Response:
+        return self.request(source, 'post', url, **kwargs)
+
+    def histogram(self, source: str) -> LatencyHistogram:
+        with self._histograms_lock:
+            histogram = self._histograms.get(source)
+            if histogram is None:
+                histogram = self._histograms[source] = LatencyHistogram()
+                self._counters[source] = {'requests': 0, 'retries': 0, 'hedged': 0, 'failures': 0}
+            return histogram
+
+    def get_stats(self, source: str) -> Dict[str, Any]:
+        """Latency histogram and request counters for a source."""
+        latency = self.histogram(source).snapshot()
+        with self._histograms_lock:
+            counters = dict(self._counters[source])
+        return {**counters, 'latency': latency, 'pool_size': self._pool_size(source)}
+
+    def _send(self, source: str, method: str, url: str, timeout: float, idempotent: bool,
+              kwargs: Dict[str, Any]) -> requests.Response:
+        hedge_after = self._hedge_delay(source, timeout) if idempotent else None
+        if hedge_after is None or not self._hedge_slots.acquire(blocking=False):
+            return self._timed_send(source, method, url, timeout, kwargs)
+
+        try:
+            primary = self._hedge_executor.submit(self._timed_send, source, method, url, timeout, kwargs)
+            done, _ = wait([primary], timeout=hedge_after)
+            if done:
+                return primary.result()
+
+            self._count(source, 'hedged')
+            logger.debug("Hedging slow KYB request", source=source, hedge_after_s=hedge_after)
+            hedge = self._hedge_executor.submit(self._timed_send, source, method, url,
+                                                max(timeout - hedge_after, 0.1), kwargs)
+            pending = {primary, hedge}
+            while True:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                if future.exception() is None or not pending:
+                    for loser in pending:
+                        loser.add_done_callback(_close_response)
+                    return future.result()
+        finally:
+            self._hedge_slots.release()
+
+    def _timed_send(self, source: str, method: str, url: str, timeout: float,
+                    kwargs: Dict[str, Any]) -> requests.Response:
+        self._count(source, 'requests')
+        started = time.perf_counter()
+        try:
+            return getattr(self.session, method)(url, timeout=timeout, **kwargs)
+        finally:
+            self.histogram(source).record((time.perf_counter() - started) * 1000)
+
+    def _hedge_delay(self, source: str, timeout: float) -> Optional[float]:
+        """Seconds to wait before hedging, once enough latency samples exist."""
+        if not self.hedge:
+            return None
+        histogram = self.histogram(source)
+        if histogram.count < self.hedge_min_samples:
+            return None
+        p95 = histogram.percentile(95)
+        if p95 is None or p95 / 1000.0 >= timeout / 2:
+            return None
+        return p95 / 1000.0
+
+    def _should_retry(self, source: str, attempt: int, deadline: float, idempotent: bool) -> bool:
+        if not idempotent or attempt >= self.max_retries:
+            return False
+        delay = self.retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5)  # Jittered backoff
+        if time.monotonic() + delay >= deadline:
+            return False
+        self._count(source, 'retries')
+        time.sleep(delay)
+        return True
+
+    def _count(self, source: str, counter: str) -> None:
+        self.histogram(source)
+        with self._histograms_lock:
+            self._counters[source][counter] += 1
+
+    def _pool_size(self, source: str) -> int:
+        return int(self.pool_sizes.get(source.upper()) or self.pool_size)
+
+    def _mount(self, source: str, url: str) -> None:
+        """Mount a keep-alive pool sized for the source on the URL's origin."""
+        parts = urlsplit(url)
+        prefix = f"{parts.scheme}://{parts.netloc}/"
+        if prefix in self._mounted:
+            return
+        with self._mount_lock:
+            if prefix in self._mounted:
+                return
+            size = self._pool_size(source)
+            # Retries are handled here, not by urllib3
+            self.session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=size,
+                                                   max_retries=0, pool_block=False))
+            self._mounted.add(prefix)
+            logger.debug("Mounted KYB connection pool", source=source, origin=prefix, pool_size=size)
+
+
+_transport: Optional[KYBTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> KYBTransport:
+    """Return the process-wide KYB transport, creating it on first use."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = KYBTransport.from_config()
+    return _transport
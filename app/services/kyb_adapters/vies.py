@@ -68,8 +68,7 @@ class VIESAdapter(BaseKYBAdapter):
     def __init__(self, redis_client=None):
         """Initialize VIES adapter."""
         super().__init__(redis_client)
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers.update({
             'User-Agent': 'AI-Secretary-KYB/1.0',
             'Content-Type': 'text/xml; charset=utf-8',
             'SOAPAction': ''
@@ -108,47 +107,13 @@ class VIESAdapter(BaseKYBAdapter):
                     logger.debug("VIES cache hit", vat_number=full_vat)
                     return cached_result
             
-            # Check rate limit before making API call
-            if not self._check_rate_limit():
-                # If rate limited, try to return cached result even if stale
-                stale_result = self._get_cached_result(cache_key)
-                if stale_result:
-                    stale_result['cached'] = True
-                    stale_result['stale'] = True
-                    stale_result['warning'] = 'Rate limited - returning cached result'
-                    logger.warning("Rate limited, returning stale cache", vat_number=full_vat)
-                    return stale_result
-                
-                raise RateLimitExceeded(f"Rate limit exceeded for {self.source_name}")
-            
-            # Make API request with retry logic
-            result = self._execute_with_retry(
-                self._make_vies_request, 
-                parsed_country, 
-                parsed_vat,
-                timeout=request_timeout
+            # Identical concurrent lookups share one upstream request
+            result = self._single_flight(
+                cache_key,
+                lambda: self._lookup_vat(cache_key, parsed_country, parsed_vat, request_timeout, start_time)
             )
-            
-            # Enhance result with metadata
-            result['response_time_ms'] = int((time.time() - start_time) * 1000)
-            result['checked_at'] = datetime.utcnow().isoformat() + 'Z'
-            result['source'] = self.source_name
-            result['cached'] = False
-            result['identifier'] = full_vat
-            
-            # Cache successful and invalid results (but not errors)
-            if result['status'] in ['valid', 'invalid']:
-                self._cache_result(cache_key, result)
-                logger.info("VIES check completed and cached", 
-                           vat_number=full_vat,
-                           status=result['status'],
-                           response_time=result['response_time_ms'])
-            else:
-                logger.warning("VIES check completed with error - not caching", 
-                              vat_number=full_vat,
-                              status=result['status'],
-                              error=result.get('error'))
-            
+            if result.get('coalesced'):
+                result['response_time_ms'] = int((time.time() - start_time) * 1000)
             return result
             
         except ValidationError as e:
@@ -170,6 +135,54 @@ class VIESAdapter(BaseKYBAdapter):
             error_result['response_time_ms'] = int((time.time() - start_time) * 1000)
             return error_result
     
+    def _lookup_vat(self, cache_key: str, country_code: str, vat_number: str,
+                    timeout: int, start_time: float) -> Dict[str, Any]:
+        """Query VIES for a parsed VAT number and cache the result."""
+        full_vat = f"{country_code}{vat_number}"
+        
+        # Check rate limit before making API call
+        if not self._check_rate_limit():
+            # If rate limited, try to return cached result even if stale
+            stale_result = self._get_cached_result(cache_key)
+            if stale_result:
+                stale_result['cached'] = True
+                stale_result['stale'] = True
+                stale_result['warning'] = 'Rate limited - returning cached result'
+                logger.warning("Rate limited, returning stale cache", vat_number=full_vat)
+                return stale_result
+            
+            raise RateLimitExceeded(f"Rate limit exceeded for {self.source_name}")
+        
+        # Make API request with retry logic
+        result = self._execute_with_retry(
+            self._make_vies_request, 
+            country_code, 
+            vat_number,
+            timeout=timeout
+        )
+        
+        # Enhance result with metadata
+        result['response_time_ms'] = int((time.time() - start_time) * 1000)
+        result['checked_at'] = datetime.utcnow().isoformat() + 'Z'
+        result['source'] = self.source_name
+        result['cached'] = False
+        result['identifier'] = full_vat
+        
+        # Cache successful and invalid results (but not errors)
+        if result['status'] in ['valid', 'invalid']:
+            self._cache_result(cache_key, result)
+            logger.info("VIES check completed and cached", 
+                       vat_number=full_vat,
+                       status=result['status'],
+                       response_time=result['response_time_ms'])
+        else:
+            logger.warning("VIES check completed with error - not caching", 
+                          vat_number=full_vat,
+                          status=result['status'],
+                          error=result.get('error'))
+        
+        return result
+    
     def check_batch(self, vat_numbers: List[str], country_code: str = None, **kwargs) -> List[Dict[str, Any]]:
         """
         Check multiple VAT numbers with optimized batch processing.
@@ -268,17 +281,7 @@ class VIESAdapter(BaseKYBAdapter):
             Validation result dictionary
         """
         try:
-            # Set timeout for this specific request
-            original_timeout = getattr(self.session, 'timeout', None)
-            self.session.timeout = timeout
-            
-            result = self.check_single(vat_number, country_code)
-            
-            # Restore original timeout
-            if original_timeout:
-                self.session.timeout = original_timeout
-            
-            return result
+            return self.check_single(vat_number, country_code, timeout=timeout)
             
         except RateLimitExceeded as e:
             logger.warning("Rate limit hit during batch processing", vat_number=vat_number)
@@ -366,10 +369,13 @@ class VIESAdapter(BaseKYBAdapter):
                         vat_number=vat_number,
                         timeout=timeout)
             
-            response = self.session.post(
+            # checkVat is a read-only lookup, so it is safe to retry and hedge
+            response = self._http_request(
+                'post',
                 self.VIES_URL,
                 data=soap_body,
                 timeout=timeout,
+                idempotent=True,
                 headers={
                     'Content-Type': 'text/xml; charset=utf-8',
                     'SOAPAction': '',
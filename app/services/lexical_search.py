@@ -0,0 +1,262 @@
+"""Full-text search over knowledge chunks."""
+import re
+import math
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, text
+
+from app import db
+from app.models.knowledge import Chunk, Document
+
+
+logger = logging.getLogger(__name__)
+
+
+class LexicalSearchIndex:
+    """
+    Ranked keyword search over chunk content.
+
+    PostgreSQL uses a GIN index on ``to_tsvector(content)`` ranked with
+    ``ts_rank_cd``. SQLite uses an FTS5 table kept in sync by triggers and
+    ranked with ``bm25()``. Without either, chunks containing a query term
+    are scored with BM25 in Python.
+    """
+
+    TEXT_SEARCH_CONFIG = 'simple'  # No stemming; documents are multilingual
+    PG_INDEX_NAME = 'ix_chunks_content_fts'
+    FTS_TABLE = 'chunks_fts'
+    MAX_QUERY_TERMS = 32
+    FALLBACK_SCAN_LIMIT = 20000  # Chunks scored in Python per query
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    _TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+    _fts_available: Dict[str, bool] = {}
+
+    @classmethod
+    def tokenize(cls, text_value: str) -> List[str]:
+        """Split text into lowercase word tokens."""
+        return cls._TERM_PATTERN.findall((text_value or '').lower())
+
+    @classmethod
+    def query_terms(cls, query: str) -> List[str]:
+        """Distinct query terms in order of appearance."""
+        return list(dict.fromkeys(cls.tokenize(query)))[:cls.MAX_QUERY_TERMS]
+
+    @classmethod
+    def backend(cls) -> str:
+        """Name of the backend used for the current database."""
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            return 'postgresql'
+        if dialect == 'sqlite' and cls._has_fts_table():
+            return 'fts5'
+        return 'bm25'
+
+    @classmethod
+    def search(cls, tenant_id: int, query: str, limit: int = 10,
+               source_ids: List[int] = None) -> List[Tuple[int, float]]:
+        """
+        Find chunks matching any query term.
+
+        Returns:
+            (chunk_id, score) pairs, best match first
+        """
+        terms = cls.query_terms(query)
+        if not terms:
+            return []
+
+        backend = cls.backend()
+        if backend == 'postgresql':
+            return cls._search_postgresql(tenant_id, terms, limit, source_ids)
+        if backend == 'fts5':
+            return cls._search_fts5(tenant_id, terms, limit, source_ids)
+        return cls._search_bm25(tenant_id, terms, limit, source_ids)
+
+    @classmethod
+    def _base_query(cls, columns: tuple, tenant_id: int, source_ids: List[int] = None):
+        query = db.session.query(*columns).filter(
+            Chunk.tenant_id == tenant_id,
+            Chunk.deleted_at.is_(None)
+        )
+        if source_ids:
+            query = query.join(Document, Chunk.document_id == Document.id)\
+                         .filter(Document.source_id.in_(source_ids))
+        return query
+
+    @classmethod
+    def _search_postgresql(cls, tenant_id: int, terms: List[str], limit: int,
+                           source_ids: List[int] = None) -> List[Tuple[int, float]]:
+        # Must match the indexed expression exactly for the GIN index to be used
+        document_vector = func.to_tsvector(cls.TEXT_SEARCH_CONFIG, Chunk.content)
+        ts_query = func.to_tsquery(cls.TEXT_SEARCH_CONFIG, ' | '.join(terms))
+        score = func.ts_rank_cd(document_vector, ts_query).label('score')
+
+        rows = cls._base_query((Chunk.id, score), tenant_id, source_ids)\
+            .filter(document_vector.op('@@')(ts_query))\
+            .order_by(score.desc(), Chunk.id)\
+            .limit(limit).all()
+
+        return [(row.id, float(row.score)) for row in rows]
+
+    @classmethod
+    def _search_fts5(cls, tenant_id: int, terms: List[str], limit: int,
+                     source_ids: List[int] = None) -> List[Tuple[int, float]]:
+        match = ' OR '.join(f'"{term}"' for term in terms)
+        source_filter = ''
+        params = {'match': match, 'tenant_id': tenant_id, 'limit': limit}
+
+        if source_ids:
+            placeholders = ', '.join(f':source_{i}' for i in range(len(source_ids)))
+            source_filter = (
+                f" AND chunks.document_id IN (SELECT id FROM {Document.__table__.fullname}"
+                f" WHERE source_id IN ({placeholders}))"
+            )
+            params.update({f'source_{i}': source_id for i, source_id in enumerate(source_ids)})
+
+        rows = db.session.execute(text(
+            f"SELECT chunks.id AS id, bm25({cls.FTS_TABLE}) AS rank"
+            f" FROM {cls.FTS_TABLE} JOIN {Chunk.__table__.fullname} AS chunks"
+            f" ON chunks.id = {cls.FTS_TABLE}.rowid"
+            f" WHERE {cls.FTS_TABLE} MATCH :match AND chunks.tenant_id = :tenant_id"
+            f" AND chunks.deleted_at IS NULL{source_filter}"
+            f" ORDER BY rank, chunks.id LIMIT :limit"
+        ), params).all()
+
+        # bm25() is lower for better matches
+        return [(row.id, -float(row.rank)) for row in rows]
+
+    @classmethod
+    def _search_bm25(cls, tenant_id: int, terms: List[str], limit: int,
+                     source_ids: List[int] = None) -> List[Tuple[int, float]]:
+        total = cls._base_query((func.count(Chunk.id),), tenant_id, source_ids).scalar() or 0
+        if not total:
+            return []
+
+        # Only chunks containing a term can score; substring matching is a superset of token matching
+        rows = cls._base_query((Chunk.id, Chunk.content), tenant_id, source_ids)\
+            .filter(or_(*[Chunk.content.ilike(f'%{term}%') for term in terms]))\
+            .order_by(Chunk.id)\
+            .limit(cls.FALLBACK_SCAN_LIMIT).all()
+        if not rows:
+            return []
+
+        query_terms = set(terms)
+        documents = []
+        document_frequency = Counter()
+        for row in rows:
+            tokens = cls.tokenize(row.content)
+            counts = Counter(token for token in tokens if token in query_terms)
+            documents.append((row.id, len(tokens), counts))
+            document_frequency.update(counts.keys())
+
+        average_length = sum(length for _, length, _ in documents) / len(documents) or 1.0
+        idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+        scored = []
+        for chunk_id, length, counts in documents:
+            if not counts:
+                continue
+            norm = cls.BM25_K1 * (1 - cls.BM25_B + cls.BM25_B * length / average_length)
+            score = sum(
+                idf[term] * count * (cls.BM25_K1 + 1) / (count + norm)
+                for term, count in counts.items()
+            )
+            scored.append((chunk_id, score))
+
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+    @classmethod
+    def _has_fts_table(cls) -> bool:
+        key = str(db.engine.url)
+        if key not in cls._fts_available:
+            cls._fts_available[key] = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': cls.FTS_TABLE}
+            ).first() is not None
+        return cls._fts_available[key]
+
+    @classmethod
+    def create_index(cls, connection, rebuild: bool = False) -> Optional[str]:
+        """
+        Create the full-text index for the connection's database.
+
+        Existing chunks are indexed by the PostgreSQL index build; for FTS5
+        pass rebuild=True to index chunks created before the table existed.
+
+        Returns:
+            Backend name, or None if the database has no full-text support
+        """
+        chunks_table = Chunk.__table__.fullname
+        dialect = connection.dialect.name
+
+        if dialect == 'postgresql':
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {cls.PG_INDEX_NAME} ON {chunks_table} "
+                f"USING GIN (to_tsvector('{cls.TEXT_SEARCH_CONFIG}', content))"
+            ))
+            return 'postgresql'
+
+        if dialect != 'sqlite':
+            return None
+
+        try:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {cls.FTS_TABLE} USING fts5("
+                f"content, content='{chunks_table}', content_rowid='id', tokenize='unicode61')"
+            ))
+        except Exception as e:
+            logger.warning(f"SQLite FTS5 is not available, using BM25 fallback: {str(e)}")
+            return None
+
+        fts = cls.FTS_TABLE
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {chunks_table} BEGIN "
+            f"INSERT INTO {fts}(rowid, content) VALUES (new.id, new.content); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {chunks_table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.id, old.content); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF content ON {chunks_table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.id, old.content); "
+            f"INSERT INTO {fts}(rowid, content) VALUES (new.id, new.content); END"
+        ))
+        if rebuild:
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+        cls._fts_available.clear()
+        return 'fts5'
+
+    @classmethod
+    def drop_index(cls, connection):
+        """Drop the SQLite FTS5 table; PostgreSQL drops the index with the table."""
+        if connection.dialect.name == 'sqlite':
+            connection.execute(text(f"DROP TABLE IF EXISTS {cls.FTS_TABLE}"))
+            cls._fts_available.clear()
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], key: str = 'chunk_id',
+                           k: int = 60) -> List[Tuple[Any, float]]:
+    """
+    Combine ranked result lists by summing 1 / (k + rank) per item.
+
+    Returns:
+        (key value, fused score) pairs, best first
+    """
+    scores: Dict[Any, float] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            item_key = result.get(key)
+            if item_key is None:
+                continue
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + rank)
+
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
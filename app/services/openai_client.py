@@ -0,0 +1,114 @@
+"""Shared asynchronous OpenAI clients and helpers for async callers."""
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict
+
+import httpx
+from openai import AsyncOpenAI
+from flask import current_app
+
+
+logger = logging.getLogger(__name__)
+
+
+def _config(key: str, default=None):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        return os.environ.get(key, default)
+
+
+class AsyncOpenAIClientPool:
+    """
+    One pooled ``AsyncOpenAI`` client per event loop and API key.
+
+    httpx async connection pools are bound to the loop that created them,
+    so clients are shared by every coroutine on a loop (for example all
+    chats handled by a bot worker) and dropped when the loop goes away.
+    """
+
+    DEFAULT_TIMEOUT = 30.0  # Seconds per request
+    DEFAULT_MAX_CONNECTIONS = 100
+    DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+    DEFAULT_MAX_RETRIES = 2
+
+    def __init__(self):
+        self._clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncOpenAI]]' = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get_client(self, api_key: str = None) -> AsyncOpenAI:
+        """Get the shared client for the running event loop."""
+        api_key = api_key or _config('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OpenAI API key not configured")
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.setdefault(loop, {})
+            client = clients.get(api_key)
+            if client is None:
+                client = self._create_client(api_key)
+                clients[api_key] = client
+            return client
+
+    def _create_client(self, api_key: str) -> AsyncOpenAI:
+        timeout = float(_config('OPENAI_TIMEOUT') or self.DEFAULT_TIMEOUT)
+        http_client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=int(_config('OPENAI_MAX_CONNECTIONS') or self.DEFAULT_MAX_CONNECTIONS),
+                max_keepalive_connections=int(
+                    _config('OPENAI_MAX_KEEPALIVE_CONNECTIONS') or self.DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
+        )
+        max_retries = _config('OPENAI_MAX_RETRIES')
+        return AsyncOpenAI(
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=self.DEFAULT_MAX_RETRIES if max_retries is None else int(max_retries),
+            http_client=http_client
+        )
+
+    def request_timeout(self) -> float:
+        """Configured per-request timeout in seconds."""
+        return float(_config('OPENAI_TIMEOUT') or self.DEFAULT_TIMEOUT)
+
+    async def close(self):
+        """Close the clients of the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.pop(loop, {})
+        for client in clients.values():
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close OpenAI client: {str(e)}")
+
+
+async_openai_clients = AsyncOpenAIClientPool()
+
+
+async def run_in_app_context(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run blocking code in a worker thread without blocking the event loop.
+
+    The thread gets its own application context, and with it its own
+    database session, so concurrent calls do not share a session.
+    """
+    try:
+        app = current_app._get_current_object()
+    except RuntimeError:
+        app = None
+
+    def call():
+        if app is None:
+            return func(*args, **kwargs)
+        with app.app_context():
+            return func(*args, **kwargs)
+
+    return await asyncio.get_running_loop().run_in_executor(None, call)
@@ -5,56 +5,62 @@ import logging
 from typing import Dict, List, Tuple, Optional, Any
 from datetime import datetime
 
+from app.utils.text_scanner import PatternScanner, ScanMatch
+
 logger = logging.getLogger(__name__)
 
 
 class PIIDetector:
     """Service for detecting and handling PII in text and data."""
     
-    # PII patterns with confidence levels
+    # PII patterns with confidence levels, in match priority order: where
+    # two patterns match the same text the first one wins
     PII_PATTERNS = {
         'email': {
             'pattern': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
             'confidence': 'high',
             'description': 'Email address'
         },
-        'phone': {
-            'pattern': r'(?:\+?1[-.\s]?)?\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}',
-            'confidence': 'medium',
-            'description': 'Phone number'
-        },
-        'ssn': {
-            'pattern': r'\b\d{3}-?\d{2}-?\d{4}\b',
+        'iban': {
+            'pattern': r'\b[A-Z]{2}\d{2}[A-Z0-9]{4}\d{7}([A-Z0-9]?){0,16}\b',
             'confidence': 'high',
-            'description': 'Social Security Number'
+            'description': 'IBAN number'
         },
         'credit_card': {
             'pattern': r'\b(?:\d{4}[-\s]?){3}\d{4}\b',
             'confidence': 'medium',
             'description': 'Credit card number'
         },
-        'iban': {
-            'pattern': r'\b[A-Z]{2}\d{2}[A-Z0-9]{4}\d{7}([A-Z0-9]?){0,16}\b',
+        'ssn': {
+            'pattern': r'\b\d{3}-?\d{2}-?\d{4}\b',
             'confidence': 'high',
-            'description': 'IBAN number'
+            'description': 'Social Security Number'
+        },
+        'phone': {
+            'pattern': r'(?:\+?1[-.\s]?)?\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}',
+            'confidence': 'medium',
+            'description': 'Phone number'
         },
         'ip_address': {
             'pattern': r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b',
             'confidence': 'medium',
             'description': 'IP address'
         },
-        'passport': {
-            'pattern': r'\b[A-Z]{1,2}\d{6,9}\b',
-            'confidence': 'medium',
-            'description': 'Passport number'
-        },
         'vat_number': {
             'pattern': r'\b[A-Z]{2}\d{8,12}\b',
             'confidence': 'medium',
             'description': 'VAT number'
+        },
+        'passport': {
+            'pattern': r'\b[A-Z]{1,2}\d{6,9}\b',
+            'confidence': 'medium',
+            'description': 'Passport number'
         }
     }
     
+    # Matches start at a word or at the ( or + of a phone number
+    MATCH_START = r'\b|(?=[(+])'
+    
     def __init__(self):
         """Initialize PII detector."""
         self.compiled_patterns = {}
@@ -64,6 +70,10 @@ class PIIDetector:
                 'confidence': config['confidence'],
                 'description': config['description']
             }
+        self.scanner = PatternScanner(
+            {pii_type: config['pattern'] for pii_type, config in self.PII_PATTERNS.items()},
+            start=self.MATCH_START
+        )
     
     def detect_pii_in_text(self, text: str) -> List[Dict[str, Any]]:
         """
@@ -80,19 +90,17 @@ class PIIDetector:
         
         detected_pii = []
         
-        for pii_type, config in self.compiled_patterns.items():
-            matches = config['regex'].finditer(text)
-            
-            for match in matches:
-                detected_pii.append({
-                    'type': pii_type,
-                    'value': match.group(),
-                    'confidence': config['confidence'],
-                    'description': config['description'],
-                    'start': match.start(),
-                    'end': match.end(),
-                    'context': self._get_context(text, match.start(), match.end())
-                })
+        for match in self.scanner.finditer(text):
+            config = self.compiled_patterns[match.type]
+            detected_pii.append({
+                'type': match.type,
+                'value': match.value,
+                'confidence': config['confidence'],
+                'description': config['description'],
+                'start': match.start,
+                'end': match.end,
+                'context': self._get_context(text, match.start, match.end)
+            })
         
         return detected_pii
     
@@ -155,29 +163,20 @@ class PIIDetector:
         if not text:
             return text, []
         
-        detected_pii = self.detect_pii_in_text(text)
-        masked_text = text
         masked_items = []
         
-        # Sort by position in reverse order to avoid index shifting
-        detected_pii.sort(key=lambda x: x['start'], reverse=True)
-        
-        for pii_item in detected_pii:
-            original_value = pii_item['value']
-            masked_value = self._mask_value(original_value, mask_char, preserve_chars)
-            
-            # Replace in text
-            masked_text = (masked_text[:pii_item['start']] + 
-                          masked_value + 
-                          masked_text[pii_item['end']:])
-            
+        def mask_match(match: ScanMatch) -> str:
+            masked_value = self._mask_value(match.value, mask_char, preserve_chars)
             masked_items.append({
-                'type': pii_item['type'],
-                'original_value': original_value,
+                'type': match.type,
+                'original_value': match.value,
                 'masked_value': masked_value,
-                'confidence': pii_item['confidence'],
-                'position': (pii_item['start'], pii_item['end'])
+                'confidence': self.compiled_patterns[match.type]['confidence'],
+                'position': (match.start, match.end)
             })
+            return masked_value
+        
+        masked_text, _ = self.scanner.mask(text, mask_match)
         
         return masked_text, masked_items
     
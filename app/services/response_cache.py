@@ -0,0 +1,367 @@
+"""Per-tenant semantic cache for validated agent responses."""
+import time
+import asyncio
+import logging
+import itertools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from flask import current_app
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResponseCacheKey:
+    """Where a response for a message would be cached; returned by a lookup miss."""
+    tenant_id: str
+    intent: str
+    language: str
+    vector: np.ndarray
+    generation: int
+
+
+@dataclass
+class CachedResponse:
+    """A supervisor-validated answer and the query embedding it answered."""
+    content: str
+    confidence: float
+    intent: str
+    language: str
+    vector: np.ndarray
+    expires_at: float
+    suggested_actions: List[str] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    hits: int = 0
+
+
+class _TenantEntries:
+    """Entries, similarity matrices and counters of one tenant."""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.entries: 'OrderedDict[int, CachedResponse]' = OrderedDict()  # Least recently used first
+        self.matrices: Dict[Tuple[str, str], Tuple[List[int], np.ndarray]] = {}
+        self.stats = dict.fromkeys(SemanticResponseCache.STAT_KEYS, 0)
+
+    def drop(self, entry_id: int):
+        entry = self.entries.pop(entry_id)
+        self.matrices.pop((entry.intent, entry.language), None)
+
+    def clear(self):
+        self.entries.clear()
+        self.matrices.clear()
+
+
+class SemanticResponseCache:
+    """
+    Reuse answers to questions a tenant's customers ask over and over.
+
+    Entries are grouped by tenant, intent and language and matched by
+    cosine similarity of the query embedding, so rephrasings of the same
+    question hit. Each tenant has a generation number that is bumped when
+    its knowledge sources change; entries from an older generation are
+    dropped. With Redis configured the generation is shared, so knowledge
+    changes made by a worker process invalidate every process.
+    """
+
+    DEFAULT_TTL = 3600  # Seconds
+    DEFAULT_SIMILARITY = 0.95  # Minimum cosine similarity for a hit
+    DEFAULT_MAX_ENTRIES = 1000  # Per tenant
+    DEFAULT_MIN_CONFIDENCE = 0.7  # Responses below this are not cached
+    DEFAULT_MAX_MESSAGE_CHARS = 500  # Longer messages are rarely repeated verbatim
+    GENERATION_KEY_PREFIX = 'response_cache:generation'
+    REDIS_RETRY_INTERVAL = 60  # Seconds to skip Redis after a connection failure
+    STAT_KEYS = ('hits', 'misses', 'stores', 'evictions', 'invalidations', 'errors')
+
+    def __init__(self, ttl: int = None, similarity: float = None, max_entries: int = None,
+                 embed: Callable = None, redis_client=None):
+        self._ttl = ttl
+        self._similarity = similarity
+        self._max_entries = max_entries
+        self._embed = embed
+        self._tenants: Dict[str, _TenantEntries] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._redis_client = redis_client
+        self._redis_configured = redis_client is not None
+        self._redis_retry_at = 0.0
+
+    def _config(self, key: str, default=None):
+        try:
+            return current_app.config.get(key, default)
+        except RuntimeError:
+            return default
+
+    def is_enabled(self) -> bool:
+        """Check whether response caching is enabled for the current app."""
+        return bool(self._config('RESPONSE_CACHE_ENABLED', False))
+
+    @property
+    def ttl(self) -> int:
+        return self._ttl or int(self._config('RESPONSE_CACHE_TTL', self.DEFAULT_TTL))
+
+    @property
+    def similarity(self) -> float:
+        return self._similarity or float(self._config('RESPONSE_CACHE_SIMILARITY', self.DEFAULT_SIMILARITY))
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries or int(self._config('RESPONSE_CACHE_MAX_ENTRIES', self.DEFAULT_MAX_ENTRIES))
+
+    @property
+    def min_confidence(self) -> float:
+        return float(self._config('RESPONSE_CACHE_MIN_CONFIDENCE', self.DEFAULT_MIN_CONFIDENCE))
+
+    def is_cacheable_message(self, message: str) -> bool:
+        """Check whether a message is short enough to be worth caching."""
+        max_chars = int(self._config('RESPONSE_CACHE_MAX_MESSAGE_CHARS', self.DEFAULT_MAX_MESSAGE_CHARS))
+        return bool(message and message.strip()) and len(message) <= max_chars
+
+    async def lookup(self, tenant_id, message: str, intent: str,
+                     language: str) -> Tuple[Optional[CachedResponse], Optional[ResponseCacheKey]]:
+        """
+        Find a cached answer to a message.
+
+        Returns:
+            (cached response, None) on a hit, (None, key for store()) on a
+            miss, or (None, None) if the message cannot be cached
+        """
+        if not self.is_cacheable_message(message):
+            return None, None
+
+        try:
+            vector = await self._embed_message(message)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {str(e)}")
+            with self._lock:
+                self._tenant(str(tenant_id)).stats['errors'] += 1
+            return None, None
+
+        generation = await self._shared_generation_async(str(tenant_id))
+        return self._find(str(tenant_id), intent, language, vector, generation)
+
+    def find(self, tenant_id, intent: str, language: str,
+             vector) -> Tuple[Optional[CachedResponse], Optional[ResponseCacheKey]]:
+        """Find the most similar cached answer for a query embedding."""
+        tenant_id = str(tenant_id)
+        return self._find(tenant_id, intent, language, vector, self._shared_generation(tenant_id))
+
+    def _find(self, tenant_id: str, intent: str, language: str, vector,
+              generation: Optional[int]) -> Tuple[Optional[CachedResponse], Optional[ResponseCacheKey]]:
+        vector = self._normalize(vector)
+        now = time.monotonic()
+
+        with self._lock:
+            tenant = self._sync_generation(tenant_id, generation)
+            bucket = (intent, language)
+            entry_ids, matrix = self._bucket_matrix(tenant, bucket)
+
+            # Drop expired answers first so they cannot shadow a live one
+            expired = [entry_id for entry_id in entry_ids if tenant.entries[entry_id].expires_at <= now]
+            if expired:
+                for entry_id in expired:
+                    tenant.drop(entry_id)
+                entry_ids, matrix = self._bucket_matrix(tenant, bucket)
+
+            if entry_ids:
+                similarities = matrix @ vector
+                best = int(similarities.argmax())
+                if similarities[best] >= self.similarity:
+                    entry_id = entry_ids[best]
+                    entry = tenant.entries[entry_id]
+                    tenant.entries.move_to_end(entry_id)
+                    entry.hits += 1
+                    tenant.stats['hits'] += 1
+                    return entry, None
+
+            tenant.stats['misses'] += 1
+            return None, ResponseCacheKey(tenant_id, intent, language, vector, tenant.generation)
+
+    def store(self, key: ResponseCacheKey, content: str, confidence: float,
+              suggested_actions: List[str] = None, metadata: Dict[str, Any] = None) -> bool:
+        """
+        Cache a validated answer under a key from a lookup miss.
+
+        Returns:
+            False if the answer is not confident enough or the tenant's
+            knowledge changed since the lookup
+        """
+        if not content or confidence < self.min_confidence:
+            return False
+        return self._store(key, content, confidence, suggested_actions, metadata,
+                           self._shared_generation(key.tenant_id))
+
+    async def store_async(self, key: ResponseCacheKey, content: str, confidence: float,
+                          suggested_actions: List[str] = None, metadata: Dict[str, Any] = None) -> bool:
+        """Like store(), reading the shared generation off the event loop."""
+        if not content or confidence < self.min_confidence:
+            return False
+        generation = await self._shared_generation_async(key.tenant_id)
+        return self._store(key, content, confidence, suggested_actions, metadata, generation)
+
+    def _store(self, key: ResponseCacheKey, content: str, confidence: float,
+               suggested_actions: Optional[List[str]], metadata: Optional[Dict[str, Any]],
+               generation: Optional[int]) -> bool:
+        with self._lock:
+            tenant = self._sync_generation(key.tenant_id, generation)
+            if tenant.generation != key.generation:
+                return False
+
+            tenant.entries[next(self._ids)] = CachedResponse(
+                content=content,
+                confidence=confidence,
+                intent=key.intent,
+                language=key.language,
+                vector=key.vector,
+                expires_at=time.monotonic() + self.ttl,
+                suggested_actions=list(suggested_actions or []),
+                metadata=dict(metadata or {})
+            )
+            tenant.matrices.pop((key.intent, key.language), None)
+            tenant.stats['stores'] += 1
+
+            while len(tenant.entries) > self.max_entries:
+                tenant.drop(next(iter(tenant.entries)))
+                tenant.stats['evictions'] += 1
+            return True
+
+    def invalidate_tenant(self, tenant_id):
+        """Drop a tenant's answers, in every process when Redis is configured."""
+        tenant_id = str(tenant_id)
+        generation = self._bump_shared_generation(tenant_id)
+
+        with self._lock:
+            tenant = self._tenant(tenant_id)
+            tenant.clear()
+            tenant.generation = generation if generation is not None else tenant.generation + 1
+            tenant.stats['invalidations'] += 1
+
+    def clear(self):
+        """Drop all in-process entries and counters."""
+        with self._lock:
+            self._tenants.clear()
+
+    def get_stats(self, tenant_id=None) -> Dict[str, Any]:
+        """Get hit-rate metrics for one tenant, or totals over all tenants."""
+        with self._lock:
+            if tenant_id is not None:
+                tenants = [self._tenants[str(tenant_id)]] if str(tenant_id) in self._tenants else []
+            else:
+                tenants = list(self._tenants.values())
+
+            stats = {key: sum(tenant.stats[key] for tenant in tenants) for key in self.STAT_KEYS}
+            stats['size'] = sum(len(tenant.entries) for tenant in tenants)
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        if tenant_id is None:
+            stats['tenants'] = len(tenants)
+        return stats
+
+    async def _embed_message(self, message: str) -> np.ndarray:
+        if self._embed is not None:
+            return await self._embed(message)
+
+        # Same model as knowledge search, so the query embedding is cached for both
+        from app.services.embedding_service import EmbeddingService
+        return await EmbeddingService().generate_embedding_async(message)
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _tenant(self, tenant_id: str) -> _TenantEntries:
+        tenant = self._tenants.get(tenant_id)
+        if tenant is None:
+            tenant = _TenantEntries(generation=0)
+            self._tenants[tenant_id] = tenant
+        return tenant
+
+    def _sync_generation(self, tenant_id: str, generation: Optional[int]) -> _TenantEntries:
+        """Get a tenant's entries, dropping them if another process invalidated them."""
+        tenant = self._tenant(tenant_id)
+        if generation is not None and generation != tenant.generation:
+            tenant.clear()
+            tenant.generation = generation
+        return tenant
+
+    @staticmethod
+    def _bucket_matrix(tenant: _TenantEntries, bucket: Tuple[str, str]) -> Tuple[List[int], np.ndarray]:
+        """Stacked vectors of one intent and language, rebuilt after changes."""
+        cached = tenant.matrices.get(bucket)
+        if cached is None:
+            entry_ids = [
+                entry_id for entry_id, entry in tenant.entries.items()
+                if (entry.intent, entry.language) == bucket
+            ]
+            matrix = np.vstack([tenant.entries[entry_id].vector for entry_id in entry_ids]) if entry_ids else None
+            cached = (entry_ids, matrix)
+            tenant.matrices[bucket] = cached
+        return cached
+
+    def _get_redis(self):
+        """Get the Redis client used for shared generations, connecting lazily."""
+        if self._redis_client is not None or self._redis_configured:
+            return self._redis_client
+
+        if not self._config('RESPONSE_CACHE_REDIS_ENABLED', False):
+            return None
+
+        redis_url = self._config('RESPONSE_CACHE_REDIS_URL') or self._config('REDIS_URL')
+        if not redis_url or time.monotonic() < self._redis_retry_at:
+            return None
+
+        try:
+            import redis
+            client = redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+            client.ping()
+        except Exception as e:
+            logger.warning(f"Response cache Redis generations unavailable: {str(e)}")
+            self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_INTERVAL
+            return None
+
+        self._redis_client = client
+        self._redis_configured = True
+        return client
+
+    async def _shared_generation_async(self, tenant_id: str) -> Optional[int]:
+        """Read the shared generation in a worker thread so Redis I/O never blocks the loop."""
+        may_use_redis = self._redis_client is not None or (
+            not self._redis_configured and self._config('RESPONSE_CACHE_REDIS_ENABLED', False)
+        )
+        if not may_use_redis:
+            return None
+        return await asyncio.to_thread(self._shared_generation, tenant_id)
+
+    def _shared_generation(self, tenant_id: str) -> Optional[int]:
+        client = self._get_redis()
+        if client is None:
+            return None
+
+        try:
+            value = client.get(f"{self.GENERATION_KEY_PREFIX}:{tenant_id}")
+            return int(value) if value is not None else 0
+        except Exception as e:
+            logger.warning(f"Response cache Redis read failed: {str(e)}")
+            return None
+
+    def _bump_shared_generation(self, tenant_id: str) -> Optional[int]:
+        client = self._get_redis()
+        if client is None:
+            return None
+
+        try:
+            return int(client.incr(f"{self.GENERATION_KEY_PREFIX}:{tenant_id}"))
+        except Exception as e:
+            logger.warning(f"Response cache Redis invalidation failed: {str(e)}")
+            return None
+
+
+response_cache = SemanticResponseCache()
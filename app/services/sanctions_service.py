@@ -4,15 +4,28 @@ from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from flask import current_app
 from redis import Redis
+from sqlalchemy import insert, or_, update
 import structlog
 
-from app.models.kyb_monitoring import Counterparty, CounterpartySnapshot, CounterpartyDiff, KYBAlert, KYBMonitoringConfig
+from app.models.kyb_monitoring import (
+    Counterparty, CounterpartySnapshot, CounterpartyDiff, KYBAlert, KYBMonitoringConfig, SanctionsListVersion
+)
 from app.services.kyb_adapters import EUSanctionsAdapter, OFACSanctionsAdapter, UKSanctionsAdapter
 from app.services.kyb_adapters.base import DataSourceUnavailable, RateLimitExceeded, ValidationError
+from app.services.kyb_adapters.sanctions_index import diff_fingerprints
 from app import db
 
 logger = structlog.get_logger()
 
+# Rows per multi-row INSERT when writing bulk screening results
+BULK_INSERT_BATCH_SIZE = 500
+
+# IDs per IN (...) clause, below SQLite's default bound parameter limit
+ID_QUERY_BATCH_SIZE = 900
+
+# Risk score given to counterparties with a sanctions match
+SANCTIONS_MATCH_RISK_SCORE = 95.0
+
 
 class SanctionsMonitoringService:
     """Service for comprehensive sanctions monitoring across multiple jurisdictions."""
@@ -192,32 +205,50 @@ class SanctionsMonitoringService:
         """
         Check multiple counterparties against sanctions sources.
         
+        Counterparties are screened in bulk per tenant with screen_portfolio.
+        
         Args:
             counterparty_ids: List of counterparty IDs to check
             **kwargs: Additional options for adapters
             
         Returns:
-            List of sanctions check results
+            List of sanctions check results, in the order of counterparty_ids
         """
         logger.info("Starting batch sanctions check", count=len(counterparty_ids))
         
-        results = []
-        for counterparty_id in counterparty_ids:
+        tenant_by_counterparty = {}
+        for chunk in self._chunks(counterparty_ids, ID_QUERY_BATCH_SIZE):
+            tenant_by_counterparty.update(
+                db.session.query(Counterparty.id, Counterparty.tenant_id).filter(Counterparty.id.in_(chunk)).all()
+            )
+        
+        results_by_id = {}
+        for tenant_id in set(tenant_by_counterparty.values()):
+            tenant_counterparty_ids = [
+                counterparty_id for counterparty_id in counterparty_ids
+                if tenant_by_counterparty.get(counterparty_id) == tenant_id
+            ]
             try:
-                result = self.check_counterparty_sanctions(counterparty_id, **kwargs)
-                results.append(result)
-                
-                # Small delay between checks to be respectful to APIs
-                time.sleep(0.5)
-                
+                for result in self.screen_portfolio(tenant_id, tenant_counterparty_ids, **kwargs):
+                    results_by_id[result['counterparty_id']] = result
             except Exception as e:
-                logger.error("Batch check failed for counterparty", 
-                           counterparty_id=counterparty_id, error=str(e))
-                results.append({
-                    'counterparty_id': counterparty_id,
-                    'status': 'error',
-                    'error': str(e)
-                })
+                logger.error("Batch check failed for tenant", 
+                           tenant_id=tenant_id, error=str(e))
+                for counterparty_id in tenant_counterparty_ids:
+                    results_by_id[counterparty_id] = {
+                        'counterparty_id': counterparty_id,
+                        'status': 'error',
+                        'error': str(e)
+                    }
+        
+        results = [
+            results_by_id.get(counterparty_id) or {
+                'counterparty_id': counterparty_id,
+                'status': 'error',
+                'error': f"Counterparty {counterparty_id} not found"
+            }
+            for counterparty_id in counterparty_ids
+        ]
         
         logger.info("Batch sanctions check completed", 
                    total=len(counterparty_ids),
@@ -225,6 +256,124 @@ class SanctionsMonitoringService:
         
         return results
     
+    def screen_portfolio(self, tenant_id: int, counterparty_ids: Optional[List[int]] = None,
+                         **kwargs) -> List[Dict[str, Any]]:
+        """
+        Screen a tenant's counterparties against all enabled sanctions lists in one pass.
+        
+        Names are loaded with one query and each distinct name is screened
+        once per list against the adapters' in-memory indexes. Snapshots,
+        alerts and risk updates for the whole portfolio are then written
+        with bulk statements in a single transaction.
+        
+        Args:
+            tenant_id: Tenant ID
+            counterparty_ids: Counterparties to screen (default: all monitored ones)
+            **kwargs: Additional options for adapters
+            
+        Returns:
+            Sanctions check result per counterparty, in the
+            check_entity_all_sources format plus counterparty_id
+        """
+        start_time = time.time()
+        
+        config = self._get_tenant_config(tenant_id)
+        sources_to_check = self._get_enabled_sources(config)
+        
+        query = db.session.query(Counterparty.id, Counterparty.name).filter(Counterparty.tenant_id == tenant_id)
+        if counterparty_ids is None:
+            counterparties = query.filter(Counterparty.monitoring_enabled == True).all()
+        else:
+            counterparties = []
+            for chunk in self._chunks(counterparty_ids, ID_QUERY_BATCH_SIZE):
+                counterparties.extend(query.filter(Counterparty.id.in_(chunk)).all())
+        
+        logger.info("Starting bulk sanctions screening",
+                   tenant_id=tenant_id, counterparties=len(counterparties), sources=sources_to_check)
+        
+        # Screen each distinct name once per list
+        names = [name for _, name in counterparties]
+        results_by_source = {}
+        for source_name in sources_to_check:
+            try:
+                results_by_source[source_name] = self.adapters[source_name].screen_names(names, **kwargs)
+            except Exception as e:
+                logger.error(f"Error screening {source_name} sanctions", tenant_id=tenant_id, error=str(e))
+                results_by_source[source_name] = {
+                    name: {'status': 'error', 'error': str(e), 'source': source_name} for name in names
+                }
+        
+        screened_at = datetime.utcnow()
+        checked_at = screened_at.isoformat() + 'Z'
+        results = []
+        snapshot_rows = []
+        alert_rows = []
+        matched_ids = []
+        screened_rows = []
+        
+        for counterparty_id, name in counterparties:
+            all_results = {}
+            all_matches = []
+            total_errors = 0
+            
+            for source_name in sources_to_check:
+                result = results_by_source[source_name][name]
+                all_results[source_name] = result
+                if result.get('status') == 'error':
+                    total_errors += 1
+                
+                # Counterparties sharing a name share the result, so matches are copied
+                source_matches = [dict(match, source=source_name) for match in result.get('matches') or []]
+                all_matches.extend(source_matches)
+                
+                snapshot_rows.append(self._snapshot_values(counterparty_id, source_name, result, tenant_id))
+                if source_matches:
+                    alert_rows.append(self._alert_values(counterparty_id, name, source_name, source_matches, tenant_id))
+            
+            if all_matches:
+                matched_ids.append(counterparty_id)
+            
+            # Fully screened names are only re-screened against list changes until renamed
+            if sources_to_check and not any(result.get('status') in ('error', 'unavailable')
+                                            for result in all_results.values()):
+                screened_rows.append({
+                    'id': counterparty_id,
+                    'sanctions_screened_name': name,
+                    'sanctions_screened_at': screened_at
+                })
+            
+            if not sources_to_check:
+                status, message = 'skipped', 'No sanctions sources enabled'
+            else:
+                status = self._determine_overall_status(all_results, all_matches)
+                message = self._generate_summary_message(all_matches, total_errors)
+            
+            results.append({
+                'counterparty_id': counterparty_id,
+                'entity_name': name,
+                'status': status,
+                'risk_level': self._calculate_risk_level(all_matches),
+                'message': message,
+                'sources_checked': list(sources_to_check),
+                'sources_results': all_results,
+                'total_matches': len(all_matches),
+                'matches': all_matches,
+                'alerts_generated': len({match['source'] for match in all_matches}),
+                'checked_at': checked_at
+            })
+        
+        self._write_screening_results(snapshot_rows, alert_rows, matched_ids, screened_rows)
+        
+        logger.info("Bulk sanctions screening completed",
+                   tenant_id=tenant_id,
+                   counterparties=len(counterparties),
+                   distinct_names=len(set(names)),
+                   matched=len(matched_ids),
+                   alerts_generated=len(alert_rows),
+                   duration_ms=int((time.time() - start_time) * 1000))
+        
+        return results
+    
     def update_all_sanctions_data(self) -> Dict[str, Any]:
         """Update sanctions data for all adapters."""
         logger.info("Updating all sanctions data sources")
@@ -233,6 +382,8 @@ class SanctionsMonitoringService:
         for source_name, adapter in self.adapters.items():
             try:
                 result = adapter.update_sanctions_data()
+                if result.get('success'):
+                    result['changes'] = self._record_list_version(source_name, adapter, result.get('source'))
                 results[source_name] = result
                 logger.info(f"{source_name} sanctions data update completed", 
                            success=result.get('success', False))
@@ -249,6 +400,108 @@ class SanctionsMonitoringService:
             'updated_at': datetime.utcnow().isoformat() + 'Z'
         }
     
+    def rescreen_list_changes(self, tenant_id: int, **kwargs) -> Dict[str, Any]:
+        """
+        Re-screen a tenant's portfolio for what changed since its last re-screening.
+        
+        Counterparties already screened under their current name are screened
+        only against the entries the list updates since then added or modified,
+        so the cost follows list churn rather than portfolio size. Counterparties
+        matching one of those entries, and new or renamed counterparties, get a
+        full check with screen_portfolio. Without an earlier re-screening, or
+        when the list history is incomplete, the whole portfolio is checked.
+        Sources whose current list cannot be loaded are skipped and keep their
+        screened version.
+        
+        Args:
+            tenant_id: Tenant ID
+            **kwargs: Additional options for adapters
+            
+        Returns:
+            Dict with re-screening counts and the full check results
+        """
+        start_time = time.time()
+        
+        config = self._get_tenant_config(tenant_id)
+        sources_to_check = self._get_enabled_sources(config)
+        screened_versions = dict(config.sanctions_list_versions or {})
+        
+        counterparties = db.session.query(
+            Counterparty.id, Counterparty.name, Counterparty.sanctions_screened_name
+        ).filter(
+            Counterparty.tenant_id == tenant_id,
+            Counterparty.monitoring_enabled == True
+        ).all()
+        
+        new_or_renamed = {counterparty_id for counterparty_id, name, screened_name in counterparties
+                          if screened_name != name}
+        screened = [(counterparty_id, name) for counterparty_id, name, _ in counterparties
+                    if counterparty_id not in new_or_renamed]
+        
+        to_check = set(new_or_renamed)
+        list_versions = {}
+        changed_entries = {}
+        
+        for source_name in sources_to_check:
+            adapter = self.adapters[source_name]
+            current = self._latest_list_version(source_name)
+            if current is None:
+                # Lists never updated through update_all_sanctions_data yet
+                self._record_list_version(source_name, adapter, None)
+                current = self._latest_list_version(source_name)
+            
+            try:
+                loaded = adapter.ensure_list_version(current.version)
+            except Exception as e:
+                logger.error("Failed to load sanctions list for re-screening",
+                            source=source_name, error=str(e), exc_info=True)
+                loaded = False
+            if not loaded:
+                # Screening against an older list would miss the changes; keep the
+                # screened version so the next re-screening covers them
+                changed_entries[source_name] = 'unavailable'
+                continue
+            list_versions[source_name] = current.id
+            
+            changed = self._changed_entries_since(source_name, screened_versions.get(source_name), current.id)
+            if changed is None:
+                changed_entries[source_name] = 'all'
+                to_check.update(counterparty_id for counterparty_id, _ in screened)
+                continue
+            
+            changed_entries[source_name] = len(changed)
+            if changed and len(to_check) < len(counterparties):
+                matching = set(adapter.find_matching_names([name for _, name in screened], changed, **kwargs))
+                to_check.update(counterparty_id for counterparty_id, name in screened if name in matching)
+        
+        results = self.screen_portfolio(tenant_id, sorted(to_check), **kwargs) if to_check else []
+        
+        config.sanctions_list_versions = dict(screened_versions, **list_versions)
+        db.session.commit()
+        
+        matched = [result['counterparty_id'] for result in results if result.get('total_matches', 0) > 0]
+        
+        logger.info("Sanctions delta re-screening completed",
+                   tenant_id=tenant_id,
+                   counterparties=len(counterparties),
+                   new_or_renamed=len(new_or_renamed),
+                   rescreened=len(to_check),
+                   changed_entries=changed_entries,
+                   matched=len(matched),
+                   duration_ms=int((time.time() - start_time) * 1000))
+        
+        return {
+            'tenant_id': tenant_id,
+            'total_counterparties': len(counterparties),
+            'new_or_renamed': len(new_or_renamed),
+            'changed_entries': changed_entries,
+            'rescreened': len(to_check),
+            'matched_counterparty_ids': matched,
+            'results': results,
+            'list_versions': list_versions,
+            'checked_at': datetime.utcnow().isoformat() + 'Z'
+        }
+    
     def get_sanctions_statistics(self, tenant_id: int, days: int = 30) -> Dict[str, Any]:
         """
         Get sanctions monitoring statistics for a tenant.
@@ -341,34 +594,110 @@ class SanctionsMonitoringService:
         
         return enabled_sources
     
+    def _latest_list_version(self, source_name: str) -> Optional[SanctionsListVersion]:
+        """Get the most recently recorded version of a sanctions list."""
+        return SanctionsListVersion.query.filter_by(source=source_name).order_by(
+            SanctionsListVersion.id.desc()
+        ).first()
+    
+    def _record_list_version(self, source_name: str, adapter, list_source: Optional[str]) -> Dict[str, Any]:
+        """
+        Record the list an adapter has loaded, with its changes since the last recorded version.
+        
+        Nothing is recorded when the list is unchanged. Only the newest version
+        keeps its entry fingerprints, which the next version is diffed against.
+        """
+        index = adapter.get_list_index()
+        latest = self._latest_list_version(source_name)
+        
+        if latest is not None and latest.version == index.version:
+            return {
+                'version_id': latest.id,
+                'version': latest.version,
+                'changed': False,
+                'added': 0,
+                'modified': 0,
+                'removed': 0
+            }
+        
+        fingerprints = index.fingerprints()
+        initial = latest is None or not latest.entries
+        diff = diff_fingerprints({} if initial else latest.entries, fingerprints)
+        
+        try:
+            version = SanctionsListVersion(
+                source=source_name,
+                version=index.version,
+                list_source=list_source,
+                total_entities=len(fingerprints),
+                added_count=len(diff.added),
+                modified_count=len(diff.modified),
+                removed_count=len(diff.removed),
+                # Without a previous version there is nothing to re-screen selectively
+                changes=None if initial else {
+                    'added': diff.added,
+                    'modified': diff.modified,
+                    'removed': diff.removed
+                },
+                entries=fingerprints
+            )
+            db.session.add(version)
+            if latest is not None:
+                latest.entries = None
+            db.session.commit()
+            
+        except Exception as e:
+            logger.error("Failed to record sanctions list version", source=source_name, error=str(e))
+            db.session.rollback()
+            raise
+        
+        logger.info("Sanctions list version recorded",
+                   source=source_name,
+                   version=version.version,
+                   added=version.added_count,
+                   modified=version.modified_count,
+                   removed=version.removed_count)
+        
+        return {
+            'version_id': version.id,
+            'version': version.version,
+            'changed': True,
+            'added': version.added_count,
+            'modified': version.modified_count,
+            'removed': version.removed_count
+        }
+    
+    def _changed_entries_since(self, source_name: str, since_version_id: Optional[int],
+                               current_version_id: int) -> Optional[List[str]]:
+        """
+        Entries added or modified in a list after a given version.
+        
+        Returns:
+            Entry uids, or None when everything has to be treated as changed
+        """
+        if since_version_id is None:
+            return None
+        if since_version_id == current_version_id:
+            return []
+        
+        versions = SanctionsListVersion.query.filter(
+            SanctionsListVersion.source == source_name,
+            SanctionsListVersion.id > since_version_id,
+            SanctionsListVersion.id <= current_version_id
+        ).order_by(SanctionsListVersion.id).all()
+        
+        changed = {}
+        for version in versions:
+            if not version.changes:
+                return None
+            changed.update(dict.fromkeys(version.changes.get('added', []) + version.changes.get('modified', [])))
+        return list(changed)
+    
     def _store_sanctions_snapshot(self, counterparty_id: int, source: str, 
                                  result: Dict[str, Any], tenant_id: int) -> CounterpartySnapshot:
         """Store sanctions check result as a snapshot."""
         try:
-            # Determine check type based on source
-            check_type_map = {
-                'EU': 'sanctions_eu',
-                'OFAC': 'sanctions_ofac',
-                'UK': 'sanctions_uk'
-            }
-            check_type = check_type_map.get(source, 'sanctions')
-            
-            # Create snapshot
-            snapshot = CounterpartySnapshot(
-                tenant_id=tenant_id,
-                counterparty_id=counterparty_id,
-                source=source,
-                check_type=check_type,
-                data_hash=self._calculate_data_hash(result),
-                raw_data=result,
-                processed_data={
-                    'matches': result.get('matches', []),
-                    'total_matches': result.get('total_matches', 0),
-                    'risk_level': result.get('risk_level', 'low')
-                },
-                status=result.get('status', 'unknown'),
-                response_time_ms=result.get('response_time_ms', 0)
-            )
+            snapshot = CounterpartySnapshot(**self._snapshot_values(counterparty_id, source, result, tenant_id))
             
             db.session.add(snapshot)
             db.session.commit()
@@ -388,6 +717,87 @@ class SanctionsMonitoringService:
             db.session.rollback()
             raise
     
+    def _snapshot_values(self, counterparty_id: int, source: str, 
+                         result: Dict[str, Any], tenant_id: int) -> Dict[str, Any]:
+        """Build the column values of a sanctions snapshot."""
+        check_type_map = {
+            'EU': 'sanctions_eu',
+            'OFAC': 'sanctions_ofac',
+            'UK': 'sanctions_uk'
+        }
+        
+        return {
+            'tenant_id': tenant_id,
+            'counterparty_id': counterparty_id,
+            'source': source,
+            'check_type': check_type_map.get(source, 'sanctions'),
+            'data_hash': self._calculate_data_hash(result),
+            'raw_data': result,
+            'processed_data': {
+                'matches': result.get('matches', []),
+                'total_matches': result.get('total_matches', 0),
+                'risk_level': result.get('risk_level', 'low')
+            },
+            'status': result.get('status', 'unknown'),
+            'response_time_ms': result.get('response_time_ms', 0)
+        }
+    
+    def _alert_values(self, counterparty_id: int, counterparty_name: str, source: str,
+                      matches: List[Dict[str, Any]], tenant_id: int) -> Dict[str, Any]:
+        """Build the column values of a sanctions match alert."""
+        return {
+            'tenant_id': tenant_id,
+            'counterparty_id': counterparty_id,
+            'alert_type': 'sanctions_match',
+            'severity': 'critical',
+            'title': f'Sanctions Match Found - {source}',
+            'message': f'Counterparty "{counterparty_name}" matches {len(matches)} entries in {source} sanctions list',
+            'alert_data': {
+                'source': source,
+                'matches': matches,
+                'total_matches': len(matches),
+                'counterparty_name': counterparty_name
+            },
+            'source': f'SanctionsMonitor_{source}'
+        }
+    
+    def _write_screening_results(self, snapshot_rows: List[Dict[str, Any]], alert_rows: List[Dict[str, Any]],
+                                 matched_ids: List[int], screened_rows: List[Dict[str, Any]] = None) -> None:
+        """Write bulk screening snapshots, alerts, screened names and risk updates in one transaction."""
+        try:
+            for model, rows in ((CounterpartySnapshot, snapshot_rows), (KYBAlert, alert_rows)):
+                for chunk in self._chunks(rows, BULK_INSERT_BATCH_SIZE):
+                    db.session.execute(insert(model), chunk)
+            
+            # Bulk UPDATE by primary key, one parameter set per counterparty
+            for chunk in self._chunks(screened_rows or [], BULK_INSERT_BATCH_SIZE):
+                db.session.execute(update(Counterparty), chunk)
+            
+            # Same effect as _update_counterparty_risk, for all matched counterparties at once
+            for chunk in self._chunks(matched_ids, ID_QUERY_BATCH_SIZE):
+                db.session.execute(
+                    update(Counterparty)
+                    .where(Counterparty.id.in_(chunk))
+                    .where(or_(Counterparty.risk_score < SANCTIONS_MATCH_RISK_SCORE, Counterparty.risk_score.is_(None)))
+                    .values(risk_score=SANCTIONS_MATCH_RISK_SCORE, risk_level='critical', status='under_review',
+                            updated_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+            
+            db.session.commit()
+            
+        except Exception as e:
+            logger.error("Failed to store bulk sanctions results", 
+                        snapshots=len(snapshot_rows), alerts=len(alert_rows), error=str(e))
+            db.session.rollback()
+            raise
+    
+    @staticmethod
+    def _chunks(items: List[Any], size: int):
+        """Yield consecutive slices of at most size items."""
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+    
     def _generate_sanctions_alerts(self, counterparty_id: int, matches: List[Dict[str, Any]], 
                                   tenant_id: int) -> List[KYBAlert]:
         """Generate alerts for sanctions matches."""
@@ -409,21 +819,9 @@ class SanctionsMonitoringService:
             
             # Create alert for each source with matches
             for source, source_matches in matches_by_source.items():
-                alert = KYBAlert(
-                    tenant_id=tenant_id,
-                    counterparty_id=counterparty_id,
-                    alert_type='sanctions_match',
-                    severity='critical',
-                    title=f'Sanctions Match Found - {source}',
-                    message=f'Counterparty "{counterparty.name}" matches {len(source_matches)} entries in {source} sanctions list',
-                    alert_data={
-                        'source': source,
-                        'matches': source_matches,
-                        'total_matches': len(source_matches),
-                        'counterparty_name': counterparty.name
-                    },
-                    source=f'SanctionsMonitor_{source}'
-                )
+                alert = KYBAlert(**self._alert_values(
+                    counterparty_id, counterparty.name, source, source_matches, tenant_id
+                ))
                 
                 db.session.add(alert)
                 alerts.append(alert)
@@ -451,7 +849,7 @@ class SanctionsMonitoringService:
                 return
             
             # High risk for any sanctions match
-            new_risk_score = 95.0  # Critical risk for sanctions matches
+            new_risk_score = SANCTIONS_MATCH_RISK_SCORE  # Critical risk for sanctions matches
             
             if counterparty.risk_score < new_risk_score:
                 counterparty.risk_score = new_risk_score
@@ -0,0 +1,616 @@
+"""Concurrent site crawler with per-host politeness and conditional re-fetches."""
+import re
+import gzip
+import time
+import queue
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+from flask import current_app
+
+from app.utils.exceptions import ProcessingError
+
+if TYPE_CHECKING:
+    from app.services.web_scraper import WebScraper
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', '_hsenc', '_hsmi'}
+PATH_SAFE_CHARS = "/:@!$&'()*+,;=-._~%"
+
+
+def _remove_dot_segments(path: str) -> str:
+    segments = []
+    for segment in path.split('/')[1:]:
+        if segment == '..':
+            if segments:
+                segments.pop()
+        elif segment != '.':
+            segments.append(segment)
+    # A trailing dot segment still names a directory
+    if path.endswith(('/.', '/..')):
+        segments.append('')
+    return '/' + '/'.join(segments)
+
+
+def canonicalize_url(url: str, base: str = None) -> Optional[str]:
+    """
+    Normalize a URL so that equivalent spellings compare equal.
+
+    Resolves it against `base`, lowercases scheme and host, drops default
+    ports, fragments and tracking parameters, resolves dot segments,
+    normalizes percent-escapes and sorts the query.
+
+    Returns:
+        Canonical URL, or None for URLs that are not http(s)
+    """
+    try:
+        url = url.strip()
+        if base:
+            url = urljoin(base, url)
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if scheme not in DEFAULT_PORTS or not host:
+        return None
+
+    if ':' in host:
+        host = f'[{host}]'
+    netloc = host if port is None or port == DEFAULT_PORTS[scheme] else f'{host}:{port}'
+
+    path = _remove_dot_segments(parts.path or '/')
+    path = re.sub(r'%[0-9a-fA-F]{2}', lambda match: match.group().upper(), quote(path, safe=PATH_SAFE_CHARS))
+
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')
+    ]
+    query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+class _LinkParser(HTMLParser):
+    """Collect link targets, the <base> href and meta robots nofollow."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links: List[str] = []
+        self.base: Optional[str] = None
+        self.nofollow = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or '' for name, value in attrs}
+
+        if tag == 'base' and attrs.get('href') and self.base is None:
+            self.base = attrs['href']
+        elif tag in ('a', 'area') and attrs.get('href'):
+            if 'nofollow' not in attrs.get('rel', '').lower().split():
+                self.links.append(attrs['href'])
+        elif tag in ('frame', 'iframe') and attrs.get('src'):
+            self.links.append(attrs['src'])
+        elif tag == 'meta' and attrs.get('name', '').lower() == 'robots':
+            if 'nofollow' in attrs.get('content', '').lower():
+                self.nofollow = True
+
+
+def extract_links(html: str, url: str) -> List[str]:
+    """
+    Get the canonical URLs a page links to, in document order.
+
+    Honors <base href>, rel="nofollow" links and <meta name="robots"
+    content="nofollow">.
+    """
+    parser = _LinkParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        logger.debug(f"Stopped parsing links of {url}: {str(e)}")
+
+    if parser.nofollow:
+        return []
+
+    base = urljoin(url, parser.base) if parser.base else url
+    links = (canonicalize_url(link, base) for link in parser.links)
+    return list(dict.fromkeys(link for link in links if link))
+
+
+def parse_sitemap(content: bytes) -> Tuple[List[str], List[str]]:
+    """
+    Parse a sitemap or sitemap index, gzipped or not.
+
+    Returns:
+        Tuple of (page URLs, nested sitemap URLs)
+    """
+    if content[:2] == b'\x1f\x8b':
+        content = gzip.decompress(content)
+
+    root = ET.fromstring(content)
+    kind = root.tag.rsplit('}', 1)[-1]
+
+    locations = [
+        element.text.strip() for element in root.iter()
+        if element.tag.rsplit('}', 1)[-1] == 'loc' and element.text and element.text.strip()
+    ]
+
+    if kind == 'sitemapindex':
+        return [], locations
+    return locations, []
+
+
+class RobotsCache:
+    """
+    robots.txt rules per site, fetched once and shared by all crawls.
+
+    Files are fetched through the crawler's own session and kept for
+    `ttl` seconds, so concurrent workers never fetch the same file twice.
+    """
+
+    DEFAULT_TTL = 3600
+
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl or self.DEFAULT_TTL
+        self._entries: Dict[str, Tuple[float, RobotFileParser]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, origin: str, session: requests.Session, timeout: float = 30) -> RobotFileParser:
+        """Get the parsed robots.txt of an origin like https://example.com."""
+        with self._lock:
+            entry = self._entries.get(origin)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            origin_lock = self._locks.setdefault(origin, threading.Lock())
+
+        with origin_lock:
+            with self._lock:
+                entry = self._entries.get(origin)
+                if entry and entry[0] > time.monotonic():
+                    return entry[1]
+
+            parser = RobotFileParser(f'{origin}/robots.txt')
+            try:
+                response = session.get(parser.url, timeout=timeout)
+                if response.status_code in (401, 403):
+                    parser.disallow_all = True
+                elif response.status_code >= 400:
+                    parser.allow_all = True
+                else:
+                    parser.parse(response.text.splitlines())
+            except requests.RequestException as e:
+                # If we can't fetch robots.txt, assume we can crawl
+                logger.warning(f"Failed to fetch robots.txt from {parser.url}: {str(e)}")
+                parser.allow_all = True
+
+            with self._lock:
+                self._entries[origin] = (time.monotonic() + self.ttl, parser)
+            return parser
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+robots_cache = RobotsCache()
+
+
+class HostBudget:
+    """
+    Politeness budget for one host.
+
+    Limits the requests in flight and spaces request starts at least
+    `delay` seconds apart. Only the crawl dispatcher touches it, so it
+    needs no lock.
+    """
+
+    def __init__(self, concurrency: int, delay: float):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.in_flight = 0
+        self.next_start = 0.0
+
+    def ready_at(self) -> Optional[float]:
+        """Monotonic time the next request may start, or None while the host is saturated."""
+        if self.in_flight >= self.concurrency:
+            return None
+        return self.next_start
+
+    def start(self, now: float):
+        self.in_flight += 1
+        self.next_start = now + self.delay
+
+    def finish(self):
+        self.in_flight -= 1
+
+
+@dataclass
+class CrawlPage:
+    """
+    Outcome of fetching one page.
+
+    `status` is 'fetched', 'not_modified' (the server answered 304 to the
+    known validators) or 'error'. `content` is the scraped content of a
+    fetched page, or None when the page had nothing to index.
+    """
+
+    url: str
+    depth: int
+    status: str
+    content: Optional[Dict[str, Any]] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    links: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+_DONE = object()
+
+
+class SiteCrawler:
+    """
+    Crawl a site breadth-first with a bounded pool of fetch workers.
+
+    A single dispatcher thread owns the frontier. It hands URLs to the
+    worker pool only when their host's politeness budget allows, so
+    workers never sleep for rate limiting; robots.txt Crawl-delay raises
+    a host's delay. The start page and any sitemap.xml pages seed the
+    frontier, every URL is canonicalized and fetched at most once, and
+    pages listed in `known_pages` are re-fetched conditionally with their
+    ETag and Last-Modified so unchanged pages cost a 304 and nothing more.
+
+    Pages are yielded as soon as they are fetched. The crawl stays on the
+    start page's origin and below its directory.
+    """
+
+    DEFAULT_MAX_PAGES = 2000
+    DEFAULT_WORKERS = 8
+    DEFAULT_HOST_CONCURRENCY = 4  # Requests in flight per host
+    DEFAULT_HOST_DELAY = 0.25  # Seconds between request starts per host
+    MAX_SITEMAPS = 20  # Sitemap files read per crawl, indexes included
+    RESULT_BUFFER = 64  # Pages fetched ahead of the consumer
+
+    def __init__(self, scraper: 'WebScraper', max_depth: int = 2, max_pages: int = None,
+                 workers: int = None, host_concurrency: int = None, host_delay: float = None,
+                 known_pages: Dict[str, Dict[str, Any]] = None, use_sitemaps: bool = True,
+                 robots: RobotsCache = None):
+        """
+        Initialize site crawler.
+
+        Args:
+            scraper: Scraper providing the HTTP session and content extraction
+            max_depth: Maximum link depth (1 = start page only)
+            max_pages: Maximum pages fetched
+            workers: Concurrent fetches
+            host_concurrency: Concurrent fetches per host
+            host_delay: Minimum seconds between request starts per host
+            known_pages: Canonical URL -> {'etag', 'last_modified', 'links'} from an earlier crawl
+            use_sitemaps: Whether to seed the frontier from sitemap.xml
+            robots: robots.txt cache, shared by default
+        """
+        self.scraper = scraper
+        self.max_depth = max(1, max_depth)
+        self.max_pages = max_pages or self.DEFAULT_MAX_PAGES
+        self.workers = workers or self.DEFAULT_WORKERS
+        self.host_concurrency = host_concurrency or self.DEFAULT_HOST_CONCURRENCY
+        self.host_delay = self.DEFAULT_HOST_DELAY if host_delay is None else host_delay
+        self.known_pages = known_pages or {}
+        self.use_sitemaps = use_sitemaps
+        self.robots = robots or robots_cache
+
+        self._stop = threading.Event()
+        self._results: 'queue.Queue' = queue.Queue(maxsize=self.RESULT_BUFFER)
+        self._frontier: Dict[str, deque] = {}
+        self._budgets: Dict[str, HostBudget] = {}
+        self._seen: set = set()
+        self._fetched: set = set()
+        self._scopes: List[str] = []
+        self._pages_queued = 0
+        self._sitemaps_queued = 0
+        self.stats = {'fetched': 0, 'not_modified': 0, 'errors': 0, 'duplicates': 0}
+
+    @classmethod
+    def from_config(cls, scraper: 'WebScraper', **kwargs) -> 'SiteCrawler':
+        """Create a crawler using the CRAWLER_* settings of the current app."""
+        def config(key):
+            try:
+                return current_app.config.get(key)
+            except RuntimeError:
+                return None
+
+        settings = {
+            'max_pages': config('CRAWLER_MAX_PAGES'),
+            'workers': config('CRAWLER_WORKERS'),
+            'host_concurrency': config('CRAWLER_HOST_CONCURRENCY'),
+            'host_delay': config('CRAWLER_HOST_DELAY')
+        }
+        settings.update(kwargs)
+        return cls(scraper, **settings)
+
+    def crawl(self, start_url: str) -> Iterator[CrawlPage]:
+        """
+        Crawl from a URL, yielding pages as they are fetched.
+
+        Closing the generator early stops the crawl.
+
+        Raises:
+            ProcessingError: If the start URL is invalid or cannot be fetched
+        """
+        start_url = canonicalize_url(start_url)
+        if not start_url:
+            raise ProcessingError("Invalid URL for crawling")
+
+        self._scopes.append(self._scope_of(start_url))
+        dispatcher = threading.Thread(
+            target=self._run, args=(start_url,), name='crawler-dispatcher', daemon=True
+        )
+        dispatcher.start()
+
+        try:
+            while True:
+                item = self._results.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self._stop.set()
+            dispatcher.join()
+
+    # Dispatcher
+
+    def _run(self, start_url: str):
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='crawler') as executor:
+                self._crawl(executor, start_url)
+        except BaseException as e:
+            self._emit(e)
+        finally:
+            self._emit(_DONE)
+
+    def _crawl(self, executor: ThreadPoolExecutor, start_url: str):
+        if not self._enqueue_page(start_url, 0):
+            raise ProcessingError(f"Robots.txt disallows crawling: {start_url}")
+
+        if self.use_sitemaps and self.max_depth > 1:
+            self._seed_sitemaps(start_url)
+
+        in_flight: Dict[Any, Tuple[str, str, int, str]] = {}
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+            next_start = self._dispatch(executor, in_flight, now)
+
+            if not in_flight:
+                if next_start is None:
+                    break
+                # Every queued host is waiting out its delay
+                self._stop.wait(max(0.0, next_start - now))
+                continue
+
+            timeout = None if next_start is None else max(0.0, next_start - now)
+            done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                kind, url, depth, host = in_flight.pop(future)
+                self._budgets[host].finish()
+                if kind == 'page':
+                    self._handle_page(future.result())
+                else:
+                    self._handle_sitemap(url, future.result())
+
+        if self._stop.is_set():
+            for future in in_flight:
+                future.cancel()
+
+    def _dispatch(self, executor: ThreadPoolExecutor, in_flight: Dict, now: float) -> Optional[float]:
+        """Start every fetch the budgets allow; return when the next one may start."""
+        next_start = None
+
+        for host, pending in self._frontier.items():
+            budget = self._budgets[host]
+
+            while pending and len(in_flight) < self.workers:
+                ready_at = budget.ready_at()
+                if ready_at is None or ready_at > now:
+                    break
+                kind, url, depth = pending.popleft()
+                fetch = self._fetch_page if kind == 'page' else self._fetch_sitemap
+                in_flight[executor.submit(fetch, url, depth)] = (kind, url, depth, host)
+                budget.start(now)
+
+            if pending:
+                ready_at = budget.ready_at()
+                if ready_at is not None and len(in_flight) < self.workers:
+                    next_start = ready_at if next_start is None else min(next_start, ready_at)
+
+        return next_start
+
+    def _emit(self, item):
+        while not self._stop.is_set():
+            try:
+                self._results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _handle_page(self, page: CrawlPage):
+        if page.status == 'error':
+            self.stats['errors'] += 1
+            if page.depth == 0:
+                raise ProcessingError(f"Failed to crawl {page.url}: {page.error}")
+            self._emit(page)
+            return
+
+        if page.url in self._fetched:
+            # Redirected onto a page that was already crawled
+            self.stats['duplicates'] += 1
+            return
+        self._fetched.add(page.url)
+        self._seen.add(page.url)
+        if page.depth == 0:
+            scope = self._scope_of(page.url)
+            if scope not in self._scopes:
+                self._scopes.append(scope)
+
+        self.stats['fetched' if page.status == 'fetched' else 'not_modified'] += 1
+        self._emit(page)
+
+        if page.depth + 1 < self.max_depth:
+            for link in page.links:
+                self._enqueue_page(link, page.depth + 1)
+
+    def _handle_sitemap(self, url: str, locations: Tuple[List[str], List[str]]):
+        pages, sitemaps = locations
+        for sitemap_url in sitemaps:
+            self._enqueue_sitemap(sitemap_url)
+        for page_url in pages:
+            page_url = canonicalize_url(page_url)
+            if page_url:
+                self._enqueue_page(page_url, 1)
+
+    def _seed_sitemaps(self, start_url: str):
+        origin = self._origin_of(start_url)
+        sitemaps = [f'{origin}/sitemap.xml']
+        if self.scraper.respect_robots:
+            parser = self.robots.get(origin, self.scraper.session, self.scraper.DEFAULT_TIMEOUT)
+            sitemaps = (parser.site_maps() or []) + sitemaps
+        for sitemap_url in sitemaps:
+            self._enqueue_sitemap(sitemap_url)
+
+    # Frontier
+
+    def _enqueue_page(self, url: str, depth: int) -> bool:
+        if url in self._seen or not self._in_scope(url) or self._pages_queued >= self.max_pages:
+            return False
+        self._seen.add(url)
+
+        if not self._allowed(url):
+            return False
+
+        self._pages_queued += 1
+        self._pending(url).append(('page', url, depth))
+        return True
+
+    def _enqueue_sitemap(self, url: str):
+        url = canonicalize_url(url)
+        if not url or url in self._seen or self._sitemaps_queued >= self.MAX_SITEMAPS:
+            return
+        if self._origin_of(url) not in (self._origin_of(scope) for scope in self._scopes):
+            return
+        self._seen.add(url)
+        self._sitemaps_queued += 1
+        self._pending(url).append(('sitemap', url, 0))
+
+    def _pending(self, url: str) -> deque:
+        host = urlsplit(url).netloc
+        if host not in self._frontier:
+            delay = self.host_delay
+            if self.scraper.respect_robots:
+                parser = self.robots.get(self._origin_of(url), self.scraper.session, self.scraper.DEFAULT_TIMEOUT)
+                delay = max(delay, float(parser.crawl_delay(self.scraper.USER_AGENT) or 0))
+            self._frontier[host] = deque()
+            self._budgets[host] = HostBudget(self.host_concurrency, delay)
+        return self._frontier[host]
+
+    def _allowed(self, url: str) -> bool:
+        if not self.scraper.respect_robots:
+            return True
+        parser = self.robots.get(self._origin_of(url), self.scraper.session, self.scraper.DEFAULT_TIMEOUT)
+        return parser.can_fetch(self.scraper.USER_AGENT, url)
+
+    def _in_scope(self, url: str) -> bool:
+        return any(url.startswith(scope) for scope in self._scopes)
+
+    @staticmethod
+    def _scope_of(url: str) -> str:
+        parts = urlsplit(url)
+        return urlunsplit((parts.scheme, parts.netloc, parts.path.rsplit('/', 1)[0] + '/', '', ''))
+
+    @staticmethod
+    def _origin_of(url: str) -> str:
+        parts = urlsplit(url)
+        return f'{parts.scheme}://{parts.netloc}'
+
+    # Workers
+
+    def _fetch_page(self, url: str, depth: int) -> CrawlPage:
+        known = self.known_pages.get(url) or {}
+        headers = {}
+        if known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+        if known.get('last_modified'):
+            headers['If-Modified-Since'] = known['last_modified']
+
+        try:
+            response = self.scraper.session.get(
+                url,
+                headers=headers,
+                timeout=self.scraper.DEFAULT_TIMEOUT,
+                stream=True,
+                allow_redirects=True
+            )
+            try:
+                if response.status_code == 304:
+                    return CrawlPage(
+                        url, depth, 'not_modified',
+                        etag=known.get('etag'),
+                        last_modified=known.get('last_modified'),
+                        links=list(known.get('links') or [])
+                    )
+
+                response.raise_for_status()
+
+                final_url = canonicalize_url(response.url or url) or url
+                page = CrawlPage(
+                    final_url, depth, 'fetched',
+                    etag=response.headers.get('etag'),
+                    last_modified=response.headers.get('last-modified')
+                )
+
+                content_type = response.headers.get('content-type', '').lower()
+                if not self.scraper._is_accepted_content_type(content_type):
+                    logger.debug(f"Skipping unsupported content type: {content_type} for {final_url}")
+                    return page
+
+                content_bytes = self.scraper._read_content(response)
+                if 'html' in content_type:
+                    html = content_bytes.decode(response.encoding or 'utf-8', errors='ignore')
+                    page.links = extract_links(html, final_url)
+                page.content = self.scraper._process_content(
+                    content_bytes, final_url, content_type, response.encoding
+                )
+                return page
+            finally:
+                response.close()
+
+        except Exception as e:
+            logger.warning(f"Failed to crawl {url}: {str(e)}")
+            return CrawlPage(url, depth, 'error', error=str(e))
+
+    def _fetch_sitemap(self, url: str, depth: int) -> Tuple[List[str], List[str]]:
+        try:
+            response = self.scraper.session.get(url, timeout=self.scraper.DEFAULT_TIMEOUT)
+            if response.status_code != 200:
+                return [], []
+            return parse_sitemap(response.content)
+        except Exception as e:
+            logger.warning(f"Failed to read sitemap {url}: {str(e)}")
+            return [], []
@@ -1,7 +1,7 @@
 """Text chunking service for creating overlapping chunks for RAG system."""
 import re
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 from dataclasses import dataclass
 
 try:
@@ -33,6 +33,9 @@ class TextChunker:
     # Default encoding for token counting
     DEFAULT_ENCODING = "cl100k_base"  # GPT-3.5/4 encoding
     
+    # Characters of text buffered per window when chunking a stream
+    STREAM_WINDOW_CHARS = 200000
+    
     # Sentence boundary patterns
     SENTENCE_ENDINGS = re.compile(r'[.!?]+\s+')
     PARAGRAPH_BREAKS = re.compile(r'\n\s*\n')
@@ -155,124 +158,166 @@ class TextChunker:
             logger.error(f"Failed to chunk document content: {str(e)}")
             raise ProcessingError(f"Failed to chunk document content: {str(e)}")
     
-    def _chunk_by_paragraphs(self, text: str, config: ChunkConfig) -> List[Dict[str, Any]]:
-        """Chunk text by paragraphs, respecting token limits."""
-        paragraphs = self.PARAGRAPH_BREAKS.split(text)
-        chunks = []
-        current_chunk = ""
-        current_tokens = 0
-        position = 0
+    def chunk_document_stream(self, sections: Iterable[str], metadata: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Chunk document content incrementally from an iterable of text sections.
         
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
+        Sections are buffered into windows of STREAM_WINDOW_CHARS characters.
+        Every chunk of a window except the last is yielded; the last one is
+        carried into the next window so chunks never end at a window boundary.
+        Memory use is bounded by the window size, not the document size.
+        
+        Args:
+            sections: Text sections (e.g. pages) in document order
+            metadata: Document metadata for context-aware chunking
+            
+        Yields:
+            Chunk dictionaries, as returned by chunk_document_content
+        """
+        config = self._create_document_config(metadata or {})
+        buffer = []
+        buffered = 0
+        pending = None
+        index = 0
+        
+        for section in sections:
+            if not section or not section.strip():
                 continue
             
-            para_tokens = self._count_tokens(paragraph)
+            buffer.append(section)
+            buffered += len(section)
+            if buffered < self.STREAM_WINDOW_CHARS:
+                continue
             
-            # If paragraph alone exceeds chunk size, split it further
-            if para_tokens > config.chunk_size:
-                # Save current chunk if it has content
-                if current_chunk:
-                    chunks.append(self._create_chunk(
-                        current_chunk, position, current_tokens, config
-                    ))
-                    position += 1
-                    current_chunk = ""
-                    current_tokens = 0
-                
-                # Split large paragraph by sentences
-                para_chunks = self._chunk_by_sentences(paragraph, config)
-                for para_chunk in para_chunks:
-                    para_chunk['position'] = position
-                    chunks.append(para_chunk)
-                    position += 1
-                
-            # If adding paragraph would exceed limit, save current chunk
-            elif current_tokens + para_tokens > config.chunk_size and current_chunk:
-                chunks.append(self._create_chunk(
-                    current_chunk, position, current_tokens, config
-                ))
-                position += 1
-                
-                # Start new chunk with overlap
-                overlap_text = self._get_overlap_text(current_chunk, config.overlap)
-                current_chunk = overlap_text + "\n\n" + paragraph if overlap_text else paragraph
-                current_tokens = self._count_tokens(current_chunk)
-                
-            else:
-                # Add paragraph to current chunk
-                if current_chunk:
-                    current_chunk += "\n\n" + paragraph
-                else:
-                    current_chunk = paragraph
-                current_tokens = self._count_tokens(current_chunk)
+            chunks = self.chunk_text('\n\n'.join(buffer), config)
+            if len(chunks) < 2:
+                # Not enough text for a chunk boundary yet
+                continue
+            
+            for chunk in chunks[:-1]:
+                if pending is not None:
+                    yield self._finalize_stream_chunk(pending, index, config, metadata, is_last=False)
+                    index += 1
+                pending = chunk
+            
+            # Carry the last chunk into the next window
+            buffer = [chunks[-1]['content']]
+            buffered = len(buffer[0])
         
-        # Add final chunk
-        if current_chunk:
-            chunks.append(self._create_chunk(
-                current_chunk, position, current_tokens, config
-            ))
+        chunks = self.chunk_text('\n\n'.join(buffer), config) if buffer else []
+        if pending is not None:
+            yield self._finalize_stream_chunk(pending, index, config, metadata, is_last=not chunks)
+            index += 1
         
-        return chunks
+        for i, chunk in enumerate(chunks):
+            yield self._finalize_stream_chunk(chunk, index, config, metadata, is_last=i == len(chunks) - 1)
+            index += 1
+    
+    def _finalize_stream_chunk(self, chunk: Dict[str, Any], index: int, config: ChunkConfig,
+                               metadata: Dict[str, Any], is_last: bool) -> Dict[str, Any]:
+        """Renumber a chunk from a stream window by its position in the whole document."""
+        chunk['position'] = index
+        chunk['chunk_index'] = index
+        chunk['chunk_id'] = f"chunk_{index}"
+        chunk['is_first'] = index == 0
+        chunk['is_last'] = is_last
+        chunk['overlap_start'] = config.overlap if index > 0 else 0
+        chunk['overlap_end'] = 0 if is_last else config.overlap
+        chunk['document_metadata'] = metadata
+        
+        # Add content type specific metadata
+        if metadata:
+            chunk['source_type'] = metadata.get('format', 'unknown')
+            chunk['source_title'] = metadata.get('title', '')
+        
+        return chunk
+    
+    def _chunk_by_paragraphs(self, text: str, config: ChunkConfig) -> List[Dict[str, Any]]:
+        """Chunk text by paragraphs, respecting token limits."""
+        paragraphs = self.PARAGRAPH_BREAKS.split(text)
+        
+        # Paragraphs that exceed the chunk size are split by sentences
+        return self._chunk_by_segments(paragraphs, "\n\n", config, self._chunk_by_sentences)
     
     def _chunk_by_sentences(self, text: str, config: ChunkConfig) -> List[Dict[str, Any]]:
         """Chunk text by sentences, respecting token limits."""
         sentences = self._split_sentences(text)
+        
+        # Sentences that exceed the chunk size are split by tokens
+        return self._chunk_by_segments(sentences, " ", config, self._chunk_by_tokens)
+    
+    def _chunk_by_segments(self, segments: List[str], separator: str, config: ChunkConfig,
+                           split_segment) -> List[Dict[str, Any]]:
+        """
+        Pack paragraphs or sentences into chunks, respecting token limits.
+        
+        The size of the current chunk is kept as a running total: each appended
+        segment is measured together with the segment before it instead of
+        re-encoding the whole growing chunk, so chunking is linear in the
+        length of the text.
+        """
         chunks = []
-        current_chunk = ""
-        current_tokens = 0
+        parts = []  # Texts joined with separator form the current chunk
+        part_sizes = []  # Size each part adds to the current chunk
+        last_part_size = 0  # Size of the last part on its own
+        current_size = 0
         position = 0
         
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
+        for segment in segments:
+            segment = segment.strip()
+            if not segment:
                 continue
             
-            sentence_tokens = self._count_tokens(sentence)
+            segment_size = self._measure(segment)
+            segment_tokens = self._size_to_tokens(segment_size)
             
-            # If sentence alone exceeds chunk size, split by tokens
-            if sentence_tokens > config.chunk_size:
+            # If segment alone exceeds chunk size, split it further
+            if segment_tokens > config.chunk_size:
                 # Save current chunk if it has content
-                if current_chunk:
+                if parts:
                     chunks.append(self._create_chunk(
-                        current_chunk, position, current_tokens, config
+                        separator.join(parts), position, self._size_to_tokens(current_size), config
                     ))
                     position += 1
-                    current_chunk = ""
-                    current_tokens = 0
+                    parts, part_sizes, current_size = [], [], 0
                 
-                # Split large sentence by tokens
-                sentence_chunks = self._chunk_by_tokens(sentence, config)
-                for sent_chunk in sentence_chunks:
-                    sent_chunk['position'] = position
-                    chunks.append(sent_chunk)
+                for segment_chunk in split_segment(segment, config):
+                    segment_chunk['position'] = position
+                    chunks.append(segment_chunk)
                     position += 1
-                
-            # If adding sentence would exceed limit, save current chunk
-            elif current_tokens + sentence_tokens > config.chunk_size and current_chunk:
+                continue
+            
+            # If adding segment would exceed limit, save current chunk
+            if parts and self._size_to_tokens(current_size) + segment_tokens > config.chunk_size:
                 chunks.append(self._create_chunk(
-                    current_chunk, position, current_tokens, config
+                    separator.join(parts), position, self._size_to_tokens(current_size), config
                 ))
                 position += 1
                 
                 # Start new chunk with overlap
-                overlap_text = self._get_overlap_text(current_chunk, config.overlap)
-                current_chunk = overlap_text + " " + sentence if overlap_text else sentence
-                current_tokens = self._count_tokens(current_chunk)
-                
+                overlap_text = self._get_overlap_from_parts(parts, part_sizes, separator, config.overlap)
+                parts, part_sizes, current_size = [], [], 0
+                if overlap_text:
+                    last_part_size = self._measure(overlap_text)
+                    parts.append(overlap_text)
+                    part_sizes.append(last_part_size)
+                    current_size = last_part_size
+            
+            # Add segment to current chunk
+            if parts:
+                added_size = self._measure(parts[-1] + separator + segment) - last_part_size
             else:
-                # Add sentence to current chunk
-                if current_chunk:
-                    current_chunk += " " + sentence
-                else:
-                    current_chunk = sentence
-                current_tokens = self._count_tokens(current_chunk)
+                added_size = segment_size
+            
+            parts.append(segment)
+            part_sizes.append(added_size)
+            last_part_size = segment_size
+            current_size += added_size
         
         # Add final chunk
-        if current_chunk:
+        if parts:
             chunks.append(self._create_chunk(
-                current_chunk, position, current_tokens, config
+                separator.join(parts), position, self._size_to_tokens(current_size), config
             ))
         
         return chunks
@@ -316,7 +361,7 @@ class TextChunker:
             chunk_index += 1
             
             # Prevent infinite loop
-            if position <= 0:
+            if position <= 0 or end_position >= len(tokens):
                 break
         
         return chunks
@@ -363,7 +408,7 @@ class TextChunker:
             chunk_index += 1
             
             # Prevent infinite loop
-            if position <= 0:
+            if position <= 0 or end_position >= len(words):
                 break
         
         return chunks
@@ -517,6 +562,38 @@ class TextChunker:
             
             return ' '.join(words[-overlap_words:])
     
+    def _get_overlap_from_parts(self, parts: List[str], part_sizes: List[int], separator: str,
+                                overlap_tokens: int) -> str:
+        """Get overlap text from the end of a chunk without encoding all of it."""
+        if overlap_tokens <= 0:
+            return ""
+        
+        overlap_size = overlap_tokens if self.encoding else int(overlap_tokens / 1.3)
+        
+        # Take trailing parts covering the overlap, plus one more so the
+        # tokenization of the tail matches that of the whole chunk
+        start = len(parts) - 1
+        covered = 0
+        while start > 0 and covered <= overlap_size:
+            covered += part_sizes[start]
+            start -= 1
+        
+        return self._get_overlap_text(separator.join(parts[start:]), overlap_tokens)
+    
+    def _measure(self, text: str) -> int:
+        """Measure text in additive units: tokens, or words without a tokenizer."""
+        if self.encoding:
+            try:
+                return len(self.encoding.encode(text))
+            except Exception:
+                pass
+        
+        return len(text.split())
+    
+    def _size_to_tokens(self, size: int) -> int:
+        """Convert a size from _measure to a token count."""
+        return size if self.encoding else int(size * 1.3)
+    
     def _count_tokens(self, text: str) -> int:
         """Count tokens in text."""
         if not text:
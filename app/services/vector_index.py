@@ -0,0 +1,558 @@
+"""In-process approximate nearest neighbour index for knowledge embeddings."""
+import os
+import atexit
+import re
+import time
+import logging
+import threading
+from dataclasses import dataclass, replace
+from itertools import islice
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+import numpy as np
+from flask import current_app
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """Row arrays of a vector index, replaced as a whole on every change."""
+    vectors: np.ndarray
+    embedding_ids: np.ndarray
+    chunk_ids: np.ndarray
+    source_ids: np.ndarray
+    centroids: Optional[np.ndarray]
+    assignments: np.ndarray
+
+
+class VectorIndex:
+    """
+    IVF-flat cosine index over a contiguous float32 matrix.
+
+    Vectors are L2-normalised on insert so cosine similarity reduces to a
+    single matrix-vector product. Small indexes are searched exhaustively;
+    once the index grows past ``EXACT_SEARCH_THRESHOLD`` rows it is
+    partitioned with k-means and only the ``nprobe`` closest inverted
+    lists are scanned per query.
+
+    Writers build a new ``IndexSnapshot`` and swap it in with a single
+    assignment, so searches running alongside an update never see arrays
+    from two different versions of the index.
+    """
+
+    EXACT_SEARCH_THRESHOLD = 20000  # Below this, brute force beats probing
+    DEFAULT_NPROBE = 8
+    KMEANS_ITERATIONS = 10
+    KMEANS_SAMPLE_SIZE = 50000
+    RETRAIN_GROWTH_FACTOR = 2.0  # Retrain centroids when index doubles
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.snapshot = IndexSnapshot(
+            vectors=np.empty((0, dimension), dtype=np.float32),
+            embedding_ids=np.empty(0, dtype=np.int64),
+            chunk_ids=np.empty(0, dtype=np.int64),
+            source_ids=np.empty(0, dtype=np.int64),
+            centroids=None,
+            assignments=np.empty(0, dtype=np.int32)
+        )
+        self.trained_size = 0
+        self.max_embedding_id = 0
+
+    def __len__(self):
+        return int(self.snapshot.embedding_ids.shape[0])
+
+    @property
+    def centroids(self) -> Optional[np.ndarray]:
+        return self.snapshot.centroids
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Return L2-normalised float32 copy of a 2-D array."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, embedding_ids: Iterable[int], chunk_ids: Iterable[int],
+            source_ids: Iterable[Optional[int]], vectors: np.ndarray, retrain: bool = True):
+        """
+        Add vectors to the index, replacing any rows with the same embedding id.
+
+        Pass ``retrain=False`` when the caller trains the index itself afterwards.
+        """
+        embedding_ids = np.asarray(list(embedding_ids), dtype=np.int64)
+        if embedding_ids.size == 0:
+            return self
+
+        vectors = self._normalize(np.asarray(vectors).reshape(len(embedding_ids), -1))
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {vectors.shape[1]} does not match index dimension {self.dimension}")
+
+        current = self._without(self.snapshot, embedding_ids)
+        self.snapshot = IndexSnapshot(
+            vectors=np.concatenate([current.vectors, vectors]),
+            embedding_ids=np.concatenate([current.embedding_ids, embedding_ids]),
+            chunk_ids=np.concatenate([current.chunk_ids, np.asarray(list(chunk_ids), dtype=np.int64)]),
+            source_ids=np.concatenate([
+                current.source_ids,
+                np.asarray([sid if sid is not None else -1 for sid in source_ids], dtype=np.int64)
+            ]),
+            centroids=current.centroids,
+            assignments=current.assignments if current.centroids is None else np.concatenate([
+                current.assignments, self._assign(vectors, current.centroids)
+            ])
+        )
+        self.max_embedding_id = max(self.max_embedding_id, int(embedding_ids.max()))
+
+        if retrain and len(self) >= self.EXACT_SEARCH_THRESHOLD and \
+                len(self) >= self.trained_size * self.RETRAIN_GROWTH_FACTOR:
+            self.train()
+
+        return self
+
+    def remove(self, embedding_ids: Iterable[int]):
+        """Remove rows by embedding id."""
+        self.snapshot = self._without(self.snapshot, np.asarray(list(embedding_ids), dtype=np.int64))
+        return self
+
+    @staticmethod
+    def _without(snapshot: IndexSnapshot, embedding_ids: np.ndarray) -> IndexSnapshot:
+        """Return a snapshot with the given embedding ids dropped."""
+        if embedding_ids.size == 0 or snapshot.embedding_ids.size == 0:
+            return snapshot
+
+        keep = ~np.isin(snapshot.embedding_ids, embedding_ids)
+        if keep.all():
+            return snapshot
+
+        return replace(
+            snapshot,
+            vectors=snapshot.vectors[keep],
+            embedding_ids=snapshot.embedding_ids[keep],
+            chunk_ids=snapshot.chunk_ids[keep],
+            source_ids=snapshot.source_ids[keep],
+            assignments=snapshot.assignments[keep] if snapshot.centroids is not None else snapshot.assignments
+        )
+
+    def train(self):
+        """Partition the index into inverted lists with spherical k-means."""
+        current = self.snapshot
+        size = int(current.embedding_ids.shape[0])
+        if size < self.EXACT_SEARCH_THRESHOLD:
+            self.snapshot = replace(current, centroids=None, assignments=np.empty(0, dtype=np.int32))
+            self.trained_size = 0
+            return self
+
+        nlist = int(np.sqrt(size))
+        rng = np.random.default_rng(0)
+        sample_size = min(size, self.KMEANS_SAMPLE_SIZE)
+        sample = current.vectors[rng.choice(size, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = sample[labels == cluster]
+                if members.shape[0]:
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = self._normalize(centroids)
+
+        self.snapshot = replace(current, centroids=centroids, assignments=self._assign(current.vectors, centroids))
+        self.trained_size = size
+
+        logger.info(f"Trained vector index with {nlist} lists over {size} vectors")
+        return self
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Assign normalised vectors to their nearest centroid."""
+        assignments = np.empty(vectors.shape[0], dtype=np.int32)
+        # Assign in blocks to bound the temporary similarity matrix
+        for start in range(0, vectors.shape[0], 8192):
+            block = vectors[start:start + 8192]
+            assignments[start:start + 8192] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    def search(self, query_vector: np.ndarray, k: int = 10, min_similarity: float = -1.0,
+               source_ids: List[int] = None, nprobe: int = None) -> List[Tuple[int, int, float]]:
+        """
+        Find the nearest vectors to a query.
+
+        Args:
+            query_vector: Query embedding
+            k: Maximum number of results
+            min_similarity: Minimum cosine similarity
+            source_ids: Restrict results to these knowledge sources
+            nprobe: Number of inverted lists to scan (IVF mode only)
+
+        Returns:
+            List of (embedding_id, chunk_id, similarity) tuples, best first
+        """
+        snapshot = self.snapshot  # Read once; writers swap in a new snapshot
+        if snapshot.embedding_ids.shape[0] == 0 or k <= 0:
+            return []
+
+        query = self._normalize(np.asarray(query_vector).reshape(1, -1))[0]
+        if query.shape[0] != self.dimension:
+            raise ValueError(f"Query dimension {query.shape[0]} does not match index dimension {self.dimension}")
+
+        rows = None
+        if source_ids:
+            # Source filters can be very selective, so scan the filtered subset exactly
+            rows = np.flatnonzero(np.isin(snapshot.source_ids, np.asarray(source_ids, dtype=np.int64)))
+        elif snapshot.centroids is not None:
+            nprobe = min(nprobe or self.DEFAULT_NPROBE, snapshot.centroids.shape[0])
+            probe = np.argpartition(snapshot.centroids @ query, -nprobe)[-nprobe:]
+            rows = np.flatnonzero(np.isin(snapshot.assignments, probe))
+
+        candidates = snapshot.vectors if rows is None else snapshot.vectors[rows]
+        if candidates.shape[0] == 0:
+            return []
+
+        scores = candidates @ query
+        passing = np.flatnonzero(scores >= min_similarity)
+        if passing.size > k:
+            passing = passing[np.argpartition(scores[passing], -k)[-k:]]
+        passing = passing[np.argsort(-scores[passing], kind='stable')]
+
+        results = []
+        for idx in passing:
+            row = idx if rows is None else rows[idx]
+            results.append((int(snapshot.embedding_ids[row]), int(snapshot.chunk_ids[row]), float(scores[idx])))
+
+        return results
+
+    def save(self, path: str):
+        """Persist index to disk atomically."""
+        snapshot = self.snapshot
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                dimension=np.int64(self.dimension),
+                vectors=snapshot.vectors,
+                embedding_ids=snapshot.embedding_ids,
+                chunk_ids=snapshot.chunk_ids,
+                source_ids=snapshot.source_ids,
+                centroids=snapshot.centroids if snapshot.centroids is not None else np.empty((0, self.dimension), dtype=np.float32),
+                assignments=snapshot.assignments,
+                trained_size=np.int64(self.trained_size),
+                max_embedding_id=np.int64(self.max_embedding_id)
+            )
+        os.replace(tmp_path, path)
+        return self
+
+    @classmethod
+    def load(cls, path: str) -> 'VectorIndex':
+        """Load index from disk."""
+        with np.load(path) as data:
+            index = cls(int(data['dimension']))
+            index.snapshot = IndexSnapshot(
+                vectors=data['vectors'],
+                embedding_ids=data['embedding_ids'],
+                chunk_ids=data['chunk_ids'],
+                source_ids=data['source_ids'],
+                centroids=data['centroids'] if data['centroids'].shape[0] else None,
+                assignments=data['assignments']
+            )
+            index.trained_size = int(data['trained_size'])
+            index.max_embedding_id = int(data['max_embedding_id'])
+        return index
+
+
+class VectorIndexManager:
+    """Per-tenant, per-model registry of vector indexes backed by the embeddings table."""
+
+    DEFAULT_FOLDER = os.path.join('instance', 'vector_indexes')
+    DEFAULT_SYNC_INTERVAL = 10  # Seconds between consistency checks against the database
+    DEFAULT_PERSIST_INTERVAL = 30  # Minimum seconds between rewrites of an index file
+    LOAD_BATCH_SIZE = 1000
+
+    def __init__(self):
+        self._indexes: Dict[Tuple[int, str], VectorIndex] = {}
+        self._synced_at: Dict[Tuple[int, str], float] = {}
+        self._persisted_at: Dict[Tuple[int, str], float] = {}
+        self._dirty: Dict[Tuple[int, str], str] = {}  # Index key -> path of unsaved changes
+        self._lock = threading.RLock()
+
+    def is_enabled(self) -> bool:
+        """Check whether the vector index is enabled for the current app."""
+        try:
+            return bool(current_app.config.get('VECTOR_INDEX_ENABLED', True))
+        except RuntimeError:
+            return False
+
+    def _index_path(self, tenant_id: int, model_name: str) -> str:
+        folder = current_app.config.get('VECTOR_INDEX_FOLDER') or self.DEFAULT_FOLDER
+        safe_model = re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)
+        return os.path.join(folder, f"tenant_{tenant_id}", f"{safe_model}.npz")
+
+    def get_index(self, tenant_id: int, model_name: str) -> Optional[VectorIndex]:
+        """Get an up-to-date index, loading or building it on first use."""
+        key = (tenant_id, model_name)
+
+        with self._lock:
+            index = self._indexes.get(key)
+
+            if index is None:
+                path = self._index_path(tenant_id, model_name)
+                if os.path.exists(path):
+                    try:
+                        index = VectorIndex.load(path)
+                    except Exception as e:
+                        logger.warning(f"Failed to load vector index {path}, rebuilding: {str(e)}")
+                        index = None
+
+                if index is None:
+                    index = self._build(tenant_id, model_name)
+                    if index is None:
+                        return None
+
+                self._indexes[key] = index
+                self._synced_at.pop(key, None)
+
+            sync_interval = current_app.config.get('VECTOR_INDEX_SYNC_INTERVAL', self.DEFAULT_SYNC_INTERVAL)
+            if time.monotonic() - self._synced_at.get(key, 0) >= sync_interval:
+                index = self._sync(tenant_id, model_name, index)
+                self._synced_at[key] = time.monotonic()
+
+            if index is not None:
+                self._persist_if_due(key, index)
+
+            return index
+
+    def search(self, tenant_id: int, model_name: str, query_vector: np.ndarray, k: int,
+               min_similarity: float = -1.0, source_ids: List[int] = None) -> Optional[List[Tuple[int, int, float]]]:
+        """Search a tenant index. Returns None when no index is available."""
+        index = self.get_index(tenant_id, model_name)
+        if index is None:
+            return None
+
+        nprobe = current_app.config.get('VECTOR_INDEX_NPROBE', VectorIndex.DEFAULT_NPROBE)
+        return index.search(query_vector, k, min_similarity=min_similarity,
+                            source_ids=source_ids, nprobe=nprobe)
+
+    def add_embeddings(self, tenant_id: int, model_name: str, embeddings: List[Any]):
+        """Incrementally add freshly created Embedding rows to a loaded index."""
+        if not embeddings:
+            return
+
+        key = (tenant_id, model_name)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                # Index not loaded in this process; it will catch up on next sync
+                return
+
+            chunk_ids = [embedding.chunk_id for embedding in embeddings]
+            source_map = self._source_ids_for_chunks(chunk_ids)
+            vectors = np.stack([np.asarray(embedding.get_vector(), dtype=np.float32) for embedding in embeddings])
+
+            index.add(
+                [embedding.id for embedding in embeddings],
+                chunk_ids,
+                [source_map.get(chunk_id) for chunk_id in chunk_ids],
+                vectors
+            )
+            self._mark_dirty(tenant_id, model_name, index)
+
+    def remove_embeddings(self, tenant_id: int, model_name: str, embedding_ids: List[int]):
+        """Remove deleted Embedding rows from a loaded index."""
+        if not embedding_ids:
+            return
+
+        key = (tenant_id, model_name)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                return
+
+            index.remove(embedding_ids)
+            self._mark_dirty(tenant_id, model_name, index)
+
+    def invalidate(self, tenant_id: int, model_name: str = None):
+        """Drop cached and persisted indexes so they are rebuilt on next search."""
+        with self._lock:
+            for key in list(self._indexes.keys()):
+                if key[0] == tenant_id and (model_name is None or key[1] == model_name):
+                    self._indexes.pop(key, None)
+                    self._synced_at.pop(key, None)
+                    self._dirty.pop(key, None)
+                    try:
+                        os.remove(self._index_path(*key))
+                    except OSError:
+                        pass
+
+    def flush(self):
+        """Write every index with unsaved incremental changes to disk."""
+        with self._lock:
+            for key, path in list(self._dirty.items()):
+                index = self._indexes.get(key)
+                if index is None:
+                    self._dirty.pop(key, None)
+                    continue
+                self._persist(*key, index, path=path)
+
+    def _mark_dirty(self, tenant_id: int, model_name: str, index: VectorIndex):
+        """Record an incremental change and persist it once the persist interval has passed."""
+        key = (tenant_id, model_name)
+        self._dirty[key] = self._index_path(tenant_id, model_name)
+        self._persist_if_due(key, index)
+
+    def _persist_if_due(self, key: Tuple[int, str], index: VectorIndex):
+        path = self._dirty.get(key)
+        if path is None:
+            return
+
+        interval = current_app.config.get('VECTOR_INDEX_PERSIST_INTERVAL', self.DEFAULT_PERSIST_INTERVAL)
+        if time.monotonic() - self._persisted_at.get(key, 0) >= interval:
+            self._persist(*key, index, path=path)
+
+    def _persist(self, tenant_id: int, model_name: str, index: VectorIndex, path: str = None):
+        key = (tenant_id, model_name)
+        try:
+            index.save(path or self._index_path(tenant_id, model_name))
+        except Exception as e:
+            logger.warning(f"Failed to persist vector index for tenant {tenant_id}: {str(e)}")
+        self._dirty.pop(key, None)
+        self._persisted_at[key] = time.monotonic()
+
+    def _live_state(self, tenant_id: int, model_name: str) -> Tuple[int, int]:
+        """Return (row count, max id) of the embeddings table for a tenant/model."""
+        from sqlalchemy import func
+        from app import db
+        from app.models.knowledge import Embedding
+
+        count, max_id = db.session.query(
+            func.count(Embedding.id), func.max(Embedding.id)
+        ).filter(
+            Embedding.tenant_id == tenant_id,
+            Embedding.model_name == model_name
+        ).one()
+
+        return int(count or 0), int(max_id or 0)
+
+    def _sync(self, tenant_id: int, model_name: str, index: VectorIndex) -> Optional[VectorIndex]:
+        """Bring an index in line with the embeddings table."""
+        count, max_id = self._live_state(tenant_id, model_name)
+
+        if count == len(index) and max_id == index.max_embedding_id:
+            return index
+
+        if max_id > index.max_embedding_id:
+            self._load_rows(tenant_id, model_name, index, after_id=index.max_embedding_id)
+
+        if count != len(index):
+            # Rows were deleted elsewhere; incremental catch-up is not possible
+            rebuilt = self._build(tenant_id, model_name)
+            if rebuilt is None:
+                self._indexes.pop((tenant_id, model_name), None)
+                return None
+            index = rebuilt
+            self._indexes[(tenant_id, model_name)] = index
+        else:
+            self._mark_dirty(tenant_id, model_name, index)
+
+        return index
+
+    def _build(self, tenant_id: int, model_name: str) -> Optional[VectorIndex]:
+        """Build an index from scratch from the embeddings table."""
+        started = time.monotonic()
+        index = self._load_rows(tenant_id, model_name, None)
+        if index is None:
+            return None
+
+        index.train()
+        self._persist(tenant_id, model_name, index)
+
+        logger.info(
+            f"Built vector index for tenant {tenant_id} model {model_name}: "
+            f"{len(index)} vectors in {time.monotonic() - started:.2f}s"
+        )
+        return index
+
+    def _load_rows(self, tenant_id: int, model_name: str, index: Optional[VectorIndex],
+                   after_id: int = 0) -> Optional[VectorIndex]:
+        """Stream embedding rows from the database and add them to an index in one step."""
+        from app import db
+        from app.models.knowledge import Embedding, Chunk, Document
+
+        query = db.session.query(
+            Embedding.id, Embedding.chunk_id, Document.source_id, Embedding.vector_data
+        ).join(
+            Chunk, Embedding.chunk_id == Chunk.id
+        ).outerjoin(
+            Document, Chunk.document_id == Document.id
+        ).filter(
+            Embedding.tenant_id == tenant_id,
+            Embedding.model_name == model_name,
+            Embedding.id > after_id
+        ).order_by(Embedding.id).yield_per(self.LOAD_BATCH_SIZE)
+
+        # Decode batch by batch but add once, so a cold build copies the matrix
+        # a single time and leaves k-means to the caller
+        fresh = index is None
+        dimension = index.dimension if index is not None else None
+        embedding_ids, chunk_ids, source_ids, matrices = [], [], [], []
+        rows = iter(query)
+        while True:
+            batch = list(islice(rows, self.LOAD_BATCH_SIZE))
+            if not batch:
+                break
+            batch, matrix = self._decode_rows(batch, dimension)
+            if matrix is None:
+                continue
+            dimension = matrix.shape[1]
+            embedding_ids.extend(row.id for row in batch)
+            chunk_ids.extend(row.chunk_id for row in batch)
+            source_ids.extend(row.source_id for row in batch)
+            matrices.append(matrix)
+
+        if not matrices:
+            return index
+
+        if index is None:
+            index = VectorIndex(dimension)
+
+        matrix = matrices[0] if len(matrices) == 1 else np.concatenate(matrices)
+        index.add(embedding_ids, chunk_ids, source_ids, matrix, retrain=not fresh)
+        return index
+
+    @staticmethod
+    def _decode_rows(rows: List[Any], dimension: Optional[int]) -> Tuple[List[Any], Optional[np.ndarray]]:
+        """Decode a batch of rows, dropping rows whose dimension differs from ``dimension``."""
+        from app.utils.vector_codec import decode_vector, decode_vectors
+
+        try:
+            return rows, decode_vectors([row.vector_data for row in rows], dimension)
+        except ValueError:
+            # Mixed dimensions within the batch: keep only rows matching the index
+            vectors = [np.asarray(decode_vector(row.vector_data), dtype=np.float32) for row in rows]
+            dimension = dimension or vectors[0].shape[0]
+            valid = [i for i, vector in enumerate(vectors) if vector.shape[0] == dimension]
+            logger.warning(f"Skipping {len(rows) - len(valid)} embeddings with mismatched dimension")
+            if not valid:
+                return [], None
+            return [rows[i] for i in valid], np.stack([vectors[i] for i in valid])
+
+    @staticmethod
+    def _source_ids_for_chunks(chunk_ids: List[int]) -> Dict[int, int]:
+        from app import db
+        from app.models.knowledge import Chunk, Document
+
+        rows = db.session.query(Chunk.id, Document.source_id).outerjoin(
+            Document, Chunk.document_id == Document.id
+        ).filter(Chunk.id.in_(chunk_ids)).all()
+
+        return {chunk_id: source_id for chunk_id, source_id in rows}
+
+
+# Global vector index manager instance
+vector_index_manager = VectorIndexManager()
+
+# Incremental changes are persisted lazily; write any that are pending on shutdown
+atexit.register(vector_index_manager.flush)
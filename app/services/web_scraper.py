@@ -18,6 +18,7 @@ except ImportError:
     HAS_BS4 = False
 from urllib3.util.retry import Retry
 
+from app.services.site_crawler import SiteCrawler
 from app.utils.exceptions import ProcessingError
 
 
@@ -101,15 +102,12 @@ class WebScraper:
             if self.respect_robots and not self._can_fetch(url):
                 raise ProcessingError(f"Robots.txt disallows crawling: {url}")
             
+            if max_depth > 1:
+                crawler = SiteCrawler(self, max_depth=max_depth)
+                return [page.content for page in crawler.crawl(url) if page.content]
+            
             # Scrape single page
             content = self._scrape_single_page(url)
-            
-            if max_depth <= 1:
-                return [content] if content else []
-            
-            # TODO: Implement multi-depth crawling
-            # For now, just return single page
-            logger.warning(f"Multi-depth crawling not yet implemented (max_depth={max_depth})")
             return [content] if content else []
             
         except ProcessingError:
@@ -135,34 +133,13 @@ class WebScraper:
             
             # Check content type
             content_type = response.headers.get('content-type', '').lower()
-            if not any(accepted in content_type for accepted in self.ACCEPTED_CONTENT_TYPES):
+            if not self._is_accepted_content_type(content_type):
                 logger.warning(f"Unsupported content type: {content_type} for {url}")
                 return None
             
-            # Check content length
-            content_length = response.headers.get('content-length')
-            if content_length and int(content_length) > self.MAX_CONTENT_SIZE:
-                raise ProcessingError(f"Content too large: {content_length} bytes")
-            
-            # Read content with size limit
-            content_bytes = b''
-            for chunk in response.iter_content(chunk_size=8192):
-                content_bytes += chunk
-                if len(content_bytes) > self.MAX_CONTENT_SIZE:
-                    raise ProcessingError("Content too large")
-            
-            # Process content based on type
-            if 'text/html' in content_type or 'application/xhtml+xml' in content_type:
-                return self._process_html_content(content_bytes, url, response.encoding)
-            elif 'text/plain' in content_type:
-                return self._process_text_content(content_bytes, url, response.encoding)
-            elif 'text/markdown' in content_type:
-                return self._process_markdown_content(content_bytes, url, response.encoding)
-            elif 'application/pdf' in content_type:
-                return self._process_pdf_content(content_bytes, url)
-            else:
-                logger.warning(f"Unhandled content type: {content_type} for {url}")
-                return None
+            content_bytes = self._read_content(response)
+            
+            return self._process_content(content_bytes, url, content_type, response.encoding)
                 
         except requests.RequestException as e:
             logger.error(f"HTTP error for {url}: {str(e)}")
@@ -171,6 +148,41 @@ class WebScraper:
             logger.error(f"Error processing {url}: {str(e)}")
             raise ProcessingError(f"Failed to process content: {str(e)}")
     
+    def _is_accepted_content_type(self, content_type: str) -> bool:
+        """Check whether a response content type is one the scraper can process."""
+        return any(accepted in content_type for accepted in self.ACCEPTED_CONTENT_TYPES)
+    
+    def _read_content(self, response) -> bytes:
+        """Read a streamed response body, enforcing the content size limit."""
+        # Check content length
+        content_length = response.headers.get('content-length')
+        if content_length and int(content_length) > self.MAX_CONTENT_SIZE:
+            raise ProcessingError(f"Content too large: {content_length} bytes")
+        
+        # Read content with size limit
+        content_bytes = b''
+        for chunk in response.iter_content(chunk_size=8192):
+            content_bytes += chunk
+            if len(content_bytes) > self.MAX_CONTENT_SIZE:
+                raise ProcessingError("Content too large")
+        
+        return content_bytes
+    
+    def _process_content(self, content_bytes: bytes, url: str, content_type: str,
+                         encoding: str = None) -> Optional[Dict[str, Any]]:
+        """Extract text from a response body based on its content type."""
+        if 'text/html' in content_type or 'application/xhtml+xml' in content_type:
+            return self._process_html_content(content_bytes, url, encoding)
+        elif 'text/plain' in content_type:
+            return self._process_text_content(content_bytes, url, encoding)
+        elif 'text/markdown' in content_type:
+            return self._process_markdown_content(content_bytes, url, encoding)
+        elif 'application/pdf' in content_type:
+            return self._process_pdf_content(content_bytes, url)
+        else:
+            logger.warning(f"Unhandled content type: {content_type} for {url}")
+            return None
+    
     def _process_html_content(self, content_bytes: bytes, url: str, encoding: str = None) -> Dict[str, Any]:
         """Process HTML content and extract text."""
         if not HAS_BS4:
@@ -0,0 +1,108 @@
+"""Single-pass scanning and masking of many named text patterns."""
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ScanMatch:
+    """A match of one named pattern in a scanned text."""
+    type: str
+    value: str
+    start: int
+    end: int
+
+
+def word_list_pattern(words: Iterable[str]) -> str:
+    """
+    Build a pattern matching any of the given words as a whole word.
+
+    Longer words come first so a word is never cut short by one of its
+    prefixes (e.g. "fucking" before "fuck").
+    """
+    unique_words = sorted(set(words), key=lambda word: (-len(word), word))
+    return r'\b(?:' + '|'.join(re.escape(word) for word in unique_words) + r')\b'
+
+
+class PatternScanner:
+    """
+    Find matches of many named patterns in a single pass over a text.
+
+    All patterns are compiled into one alternation of named groups, so a
+    text is scanned once no matter how many patterns there are, and every
+    match comes back with its type and span. Matches never overlap: where
+    several patterns match at the same position the one listed first wins,
+    so patterns should be given in priority order.
+
+    ``start`` optionally restricts where matches may begin (e.g. ``\\b``).
+    It is checked once per position before any alternative is tried, which
+    keeps positions inside words from being attempted by every pattern.
+    """
+
+    def __init__(self, patterns: Dict[str, str], flags: int = re.IGNORECASE,
+                 start: Optional[str] = None):
+        invalid = [name for name in patterns if not name.isidentifier()]
+        if invalid:
+            raise ValueError(f"Pattern names must be identifiers: {', '.join(invalid)}")
+
+        alternation = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in patterns.items())
+        if start:
+            alternation = f'(?:{start})(?:{alternation})'
+
+        self.types = list(patterns)
+        self.regex = re.compile(alternation, flags)
+
+    def finditer(self, text: str) -> Iterator[ScanMatch]:
+        """Yield the matches in a text from left to right."""
+        if not text:
+            return
+
+        for match in self.regex.finditer(text):
+            # The pattern's own named group closes last, so lastgroup names it
+            # even when the pattern has capturing groups of its own
+            yield ScanMatch(match.lastgroup, match.group(), match.start(), match.end())
+
+    def scan(self, text: str) -> List[ScanMatch]:
+        """Get all matches in a text, in text order."""
+        return list(self.finditer(text))
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Count the matches of each pattern type in a text."""
+        counts: Dict[str, int] = {}
+        for match in self.finditer(text):
+            counts[match.type] = counts.get(match.type, 0) + 1
+        return counts
+
+    def mask(self, text: str,
+             replace: Callable[[ScanMatch], Optional[str]]) -> Tuple[str, List[ScanMatch]]:
+        """
+        Rewrite every match in one pass.
+
+        Args:
+            text: Text to mask
+            replace: Returns the replacement for a match, or None to keep it
+
+        Returns:
+            Tuple of (masked text, matches that were replaced)
+        """
+        if not text:
+            return text, []
+
+        pieces = []
+        replaced = []
+        position = 0
+
+        for match in self.finditer(text):
+            replacement = replace(match)
+            if replacement is None:
+                continue
+            pieces.append(text[position:match.start])
+            pieces.append(replacement)
+            replaced.append(match)
+            position = match.end
+
+        if not replaced:
+            return text, []
+
+        pieces.append(text[position:])
+        return ''.join(pieces), replaced
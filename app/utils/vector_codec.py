@@ -0,0 +1,137 @@
+"""Binary storage format for embedding vectors.
+
+Vectors are stored as a fixed 8-byte header followed by a raw little-endian
+payload, so float32 rows can be viewed with ``np.frombuffer`` without
+copying and a whole tenant can be decoded into one contiguous matrix.
+
+Header layout (``<2sBBI``)::
+
+    magic (b'EV') | format version | dtype code | dimension
+
+int8 payloads are prefixed with a float32 scale factor. Rows written
+before this format existed are pickled numpy arrays and are still decoded.
+"""
+import pickle
+import struct
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+VECTOR_MAGIC = b'EV'
+VECTOR_FORMAT_VERSION = 1
+HEADER = struct.Struct('<2sBBI')
+
+DTYPE_FLOAT32 = 1
+DTYPE_FLOAT16 = 2
+DTYPE_INT8 = 3
+
+DTYPE_CODES = {
+    'float32': DTYPE_FLOAT32,
+    'float16': DTYPE_FLOAT16,
+    'int8': DTYPE_INT8
+}
+
+_NUMPY_DTYPES = {
+    DTYPE_FLOAT32: np.dtype('<f4'),
+    DTYPE_FLOAT16: np.dtype('<f2'),
+    DTYPE_INT8: np.dtype('i1')
+}
+
+_SCALE = struct.Struct('<f')
+
+
+def encode_vector(vector, dtype: str = 'float32') -> bytes:
+    """Encode a vector into the versioned binary format."""
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported vector storage dtype: {dtype}")
+
+    code = DTYPE_CODES[dtype]
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    header = HEADER.pack(VECTOR_MAGIC, VECTOR_FORMAT_VERSION, code, vector.shape[0])
+
+    if code == DTYPE_INT8:
+        max_abs = float(np.abs(vector).max()) if vector.size else 0.0
+        scale = max_abs / 127.0 if max_abs > 0 else 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        return header + _SCALE.pack(scale) + quantized.tobytes()
+
+    return header + vector.astype(_NUMPY_DTYPES[code]).tobytes()
+
+
+def is_legacy_vector(data: bytes) -> bool:
+    """Check whether stored bytes use the legacy pickle format."""
+    return bytes(data[:2]) != VECTOR_MAGIC
+
+
+def decode_vector(data: bytes) -> np.ndarray:
+    """
+    Decode stored vector bytes.
+
+    float32 payloads are returned as a read-only view over ``data``;
+    float16 and int8 payloads are dequantized to float32.
+    """
+    if is_legacy_vector(data):
+        return pickle.loads(data)
+
+    magic, version, code, dimension = HEADER.unpack_from(data, 0)
+    if version != VECTOR_FORMAT_VERSION:
+        raise ValueError(f"Unsupported vector format version: {version}")
+
+    if code == DTYPE_INT8:
+        scale = _SCALE.unpack_from(data, HEADER.size)[0]
+        quantized = np.frombuffer(data, dtype=_NUMPY_DTYPES[code], count=dimension,
+                                  offset=HEADER.size + _SCALE.size)
+        return quantized.astype(np.float32) * np.float32(scale)
+
+    vector = np.frombuffer(data, dtype=_NUMPY_DTYPES[code], count=dimension, offset=HEADER.size)
+    if code == DTYPE_FLOAT32:
+        return vector
+    return vector.astype(np.float32)
+
+
+def decode_vectors(rows: Sequence[bytes], dimension: Optional[int] = None) -> np.ndarray:
+    """
+    Decode many stored vectors into one contiguous float32 matrix.
+
+    Args:
+        rows: Stored vector bytes
+        dimension: Expected dimension (defaults to the first row's)
+
+    Returns:
+        Array of shape (len(rows), dimension)
+    """
+    if not rows:
+        return np.empty((0, dimension or 0), dtype=np.float32)
+
+    first = decode_vector(rows[0])
+    dimension = dimension or first.shape[0]
+
+    # Fast path: every row is float32 in the current format with the same dimension,
+    # so the payloads can be concatenated and viewed as a single matrix
+    expected = HEADER.pack(VECTOR_MAGIC, VECTOR_FORMAT_VERSION, DTYPE_FLOAT32, dimension)
+    if all(bytes(row[:HEADER.size]) == expected for row in rows):
+        payload = b''.join(memoryview(row)[HEADER.size:] for row in rows)
+        return np.frombuffer(payload, dtype='<f4').reshape(len(rows), dimension)
+
+    matrix = np.empty((len(rows), dimension), dtype=np.float32)
+    for i, row in enumerate(rows):
+        vector = first if i == 0 else decode_vector(row)
+        if vector.shape[0] != dimension:
+            raise ValueError(f"Vector {i} has dimension {vector.shape[0]}, expected {dimension}")
+        matrix[i] = vector
+
+    return matrix
+
+
+def stored_dtype(data: bytes) -> Optional[str]:
+    """Return the storage dtype name, or None for legacy pickles."""
+    if is_legacy_vector(data):
+        return None
+
+    code = HEADER.unpack_from(data, 0)[2]
+    for name, value in DTYPE_CODES.items():
+        if value == code:
+            return name
+    return None
+
@@ -57,6 +57,10 @@ from app.workers.notifications import (
     process_scheduled_notifications
 )
 
+from app.workers.knowledge import (
+    ingest_document
+)
+
 from app.workers.data_retention import (
     cleanup_expired_data,
     check_expired_consents,
@@ -120,6 +124,9 @@ __all__ = [
     'daily_notification_cleanup',
     'process_scheduled_notifications',
     
+    # Knowledge workers
+    'ingest_document',
+    
     # Data retention workers
     'cleanup_expired_data',
     'check_expired_consents',
@@ -0,0 +1,27 @@
+"""Knowledge base ingestion workers."""
+import logging
+from app.workers.base import create_task_decorator
+
+logger = logging.getLogger(__name__)
+
+
+@create_task_decorator(queue='knowledge', max_retries=2)
+def ingest_document(self, tenant_id: int, document_id: int):
+    """
+    Extract, chunk and embed an uploaded document.
+    
+    Args:
+        tenant_id: Tenant owning the document
+        document_id: Document to ingest
+    """
+    from app.services.document_ingestion import DocumentIngestionPipeline
+    
+    logger.info(f"Starting ingestion of document {document_id} for tenant {tenant_id}")
+    
+    progress = DocumentIngestionPipeline(tenant_id).run(document_id)
+    
+    return {
+        'tenant_id': tenant_id,
+        'document_id': document_id,
+        'progress': progress
+    }
@@ -3,6 +3,8 @@ import logging
 import hashlib
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 from flask import current_app
@@ -21,6 +23,23 @@ logger = logging.getLogger(__name__)
 # Create task decorator for KYB monitoring queue
 kyb_task = create_task_decorator('kyb_monitoring', max_retries=3, default_retry_delay=300)
 
+# External source queried for each check type; each source is queried once per collection
+CHECK_TYPE_SOURCES = {
+    'vat': 'vies',
+    'lei': 'gleif',
+    'sanctions_eu': 'sanctions',
+    'sanctions_ofac': 'sanctions',
+    'sanctions_uk': 'sanctions',
+    'insolvency_de': 'insolvency'
+}
+
+# Seconds each source may take per counterparty (KYB_SOURCE_DEADLINES overrides)
+SOURCE_DEADLINES = {'vies': 20.0, 'gleif': 20.0, 'sanctions': 30.0, 'insolvency': 30.0}
+DEFAULT_SOURCE_DEADLINE = 30.0
+
+# Counterparty fields the source checks read
+COLLECTED_FIELDS = ('name', 'vat_number', 'country_code', 'lei_code', 'registration_number', 'city', 'postal_code')
+
 
 @kyb_task
 def collect_counterparty_data(counterparty_id: int, check_types: List[str] = None) -> Dict[str, Any]:
@@ -64,29 +83,27 @@ def collect_counterparty_data(counterparty_id: int, check_types: List[str] = Non
         # Determine which checks to perform
         if not check_types:
             check_types = _determine_check_types(counterparty, config)
+            
+            # Once screened under its current name, sanctions are re-screened when the lists change
+            if counterparty.sanctions_screened_name and counterparty.sanctions_screened_name == counterparty.name:
+                check_types = [check_type for check_type in check_types if not check_type.startswith('sanctions')]
         
         collection_results = []
         snapshots_created = []
         
-        # Perform each check type
+        # Query the sources concurrently, then store all snapshots in one transaction
+        started_at = time.monotonic()
+        check_results, source_latency_ms = _collect_check_results(counterparty, check_types)
+        
         for check_type in check_types:
-            try:
-                result = _perform_data_check(counterparty, check_type, config)
-                if result:
-                    collection_results.append(result)
-                    
-                    # Create snapshot
-                    snapshot = _create_snapshot(counterparty, check_type, result)
-                    if snapshot:
-                        snapshots_created.append(snapshot.id)
-                        
-            except Exception as e:
-                logger.error(f"Error performing {check_type} check for counterparty {counterparty_id}: {e}")
-                collection_results.append({
-                    'check_type': check_type,
-                    'status': 'error',
-                    'error': str(e)
-                })
+            result = check_results.get(check_type)
+            if result:
+                collection_results.append(result)
+                
+                # Create snapshot
+                snapshot = _create_snapshot(counterparty, check_type, result)
+                if snapshot:
+                    snapshots_created.append(snapshot.id)
         
         # Update counterparty last checked time
         counterparty.last_checked = datetime.utcnow()
@@ -99,6 +116,8 @@ def collect_counterparty_data(counterparty_id: int, check_types: List[str] = Non
             'check_types': check_types,
             'collection_results': collection_results,
             'snapshots_created': snapshots_created,
+            'source_latency_ms': source_latency_ms,
+            'collection_time_ms': int((time.monotonic() - started_at) * 1000),
             'collected_at': datetime.utcnow().isoformat()
         }
         
@@ -466,19 +485,7 @@ def _perform_data_check(counterparty: Counterparty, check_type: str,
             )
         
         elif check_type == 'lei':
-            result = KYBService.check_lei_code(counterparty.lei_code)
-            
-            # Enhance result with additional LEI-specific data
-            if result.get('status') == 'valid':
-                result['lei_code'] = counterparty.lei_code
-                result['entity_status'] = result.get('entity_status')
-                result['legal_name'] = result.get('legal_name')
-                result['legal_form'] = result.get('legal_form')
-                result['registration_authority'] = result.get('registration_authority')
-                result['legal_address'] = result.get('legal_address')
-                result['headquarters_address'] = result.get('headquarters_address')
-            
-            return result
+            return _lei_result(KYBService.check_lei_code(counterparty.lei_code), counterparty.lei_code)
         
         elif check_type.startswith('sanctions'):
             # For sanctions, we get a list of matches
@@ -487,21 +494,7 @@ def _perform_data_check(counterparty: Counterparty, check_type: str,
                 counterparty.country_code
             )
             
-            # Filter matches based on check type
-            if check_type == 'sanctions_eu':
-                matches = [m for m in matches if 'EU' in m.get('list', '')]
-            elif check_type == 'sanctions_ofac':
-                matches = [m for m in matches if 'OFAC' in m.get('list', '')]
-            elif check_type == 'sanctions_uk':
-                matches = [m for m in matches if 'UK' in m.get('list', '')]
-            
-            return {
-                'status': 'checked',
-                'matches': matches,
-                'match_count': len(matches),
-                'source': check_type.upper(),
-                'checked_at': datetime.utcnow().isoformat()
-            }
+            return _sanctions_result(check_type, matches)
         
         elif check_type == 'insolvency_de':
             # German insolvency check using InsolvencyMonitoringService
@@ -510,19 +503,7 @@ def _perform_data_check(counterparty: Counterparty, check_type: str,
             insolvency_service = InsolvencyMonitoringService()
             result = insolvency_service.check_counterparty_insolvency(counterparty.id)
             
-            # Extract the check result from the service response
-            check_result = result.get('check_result', {})
-            
-            return {
-                'status': check_result.get('status', 'checked'),
-                'proceedings_found': check_result.get('proceedings_found', False),
-                'proceedings_count': check_result.get('proceedings_count', 0),
-                'proceedings': check_result.get('proceedings', []),
-                'risk_analysis': check_result.get('risk_analysis', {}),
-                'source': 'INSOLVENCY_DE',
-                'checked_at': datetime.utcnow().isoformat(),
-                'response_time_ms': check_result.get('response_time_ms')
-            }
+            return _insolvency_result(result)
         
         else:
             logger.warning(f"Unknown check type: {check_type}")
@@ -530,12 +511,194 @@ def _perform_data_check(counterparty: Counterparty, check_type: str,
             
     except Exception as e:
         logger.error(f"Error performing {check_type} check: {e}")
-        return {
-            'status': 'error',
-            'error': str(e),
-            'source': check_type.upper(),
-            'checked_at': datetime.utcnow().isoformat()
-        }
+        return _check_error(check_type, str(e))
+
+
+def _collect_check_results(counterparty: Counterparty,
+                           check_types: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
+    """
+    Run the checks of each data source concurrently.
+    
+    Each source runs on its own thread within its deadline, so a
+    counterparty takes as long as its slowest source instead of the sum of
+    all of them. The threads only make the external calls, working from a
+    plain copy of the counterparty fields; anything stored in the database
+    is written afterwards on the task's own session. A source that misses
+    its deadline gets error results and is left to finish in the background.
+    
+    Returns:
+        Tuple of (result per check type, latency in ms per source)
+    """
+    checks_by_source: Dict[str, List[str]] = {}
+    for check_type in check_types:
+        source = CHECK_TYPE_SOURCES.get(check_type)
+        if source:
+            checks_by_source.setdefault(source, []).append(check_type)
+        else:
+            logger.warning(f"Unknown check type: {check_type}")
+    
+    if not checks_by_source:
+        return {}, {}
+    
+    subject = {field: getattr(counterparty, field) for field in COLLECTED_FIELDS}
+    
+    try:
+        app = current_app._get_current_object()
+        deadlines = {**SOURCE_DEADLINES, **(app.config.get('KYB_SOURCE_DEADLINES') or {})}
+    except RuntimeError:
+        app = None
+        deadlines = SOURCE_DEADLINES
+    
+    started_at = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=len(checks_by_source), thread_name_prefix='kyb-collect')
+    futures = {
+        source: executor.submit(_fetch_source_in_context, app, source, subject, source_check_types)
+        for source, source_check_types in checks_by_source.items()
+    }
+    # Don't wait for sources that overrun their deadline
+    executor.shutdown(wait=False)
+    
+    results = {}
+    latency_ms = {}
+    failed_sources = set()
+    
+    for source, future in futures.items():
+        deadline = float(deadlines.get(source) or DEFAULT_SOURCE_DEADLINE)
+        try:
+            source_results, elapsed, failed = future.result(
+                timeout=max(0.0, started_at + deadline - time.monotonic())
+            )
+        except FuturesTimeoutError:
+            logger.warning(f"{source} did not respond within {deadline:g}s for counterparty {counterparty.id}")
+            error = f"{source} did not respond within {deadline:g}s"
+            source_results = {check_type: _check_error(check_type, error) for check_type in checks_by_source[source]}
+            elapsed, failed = deadline, True
+        
+        if failed:
+            failed_sources.add(source)
+        latency_ms[source] = int(elapsed * 1000)
+        results.update(source_results)
+    
+    # Insolvency results are also kept by the insolvency service, in the same transaction
+    insolvency_result = results.get('insolvency_de')
+    if insolvency_result and 'insolvency' not in failed_sources:
+        try:
+            from app.services.insolvency_service import InsolvencyMonitoringService
+            
+            recorded = InsolvencyMonitoringService().record_insolvency_check(
+                counterparty, insolvency_result, commit=False
+            )
+            results['insolvency_de'] = _insolvency_result(recorded)
+        except Exception as e:
+            logger.error(f"Error recording insolvency check for counterparty {counterparty.id}: {e}")
+            results['insolvency_de'] = _check_error('insolvency_de', str(e))
+    
+    return results, latency_ms
+
+
+def _fetch_source_in_context(app, source: str, subject: Dict[str, Any],
+                             check_types: List[str]) -> Tuple[Dict[str, Dict[str, Any]], float, bool]:
+    """Run one source's checks on a worker thread; returns results, seconds taken and whether it failed."""
+    started_at = time.monotonic()
+    failed = False
+    try:
+        if app is None:
+            results = _fetch_source(source, subject, check_types)
+        else:
+            with app.app_context():
+                results = _fetch_source(source, subject, check_types)
+    except Exception as e:
+        logger.error(f"Error performing {source} checks: {e}")
+        results = {check_type: _check_error(check_type, str(e)) for check_type in check_types}
+        failed = True
+    
+    return results, time.monotonic() - started_at, failed
+
+
+def _fetch_source(source: str, subject: Dict[str, Any], check_types: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Call one external source for the given check types of a counterparty."""
+    if source == 'vies':
+        return {'vat': KYBService.check_vat_number(subject['vat_number'], subject['country_code'])}
+    
+    if source == 'gleif':
+        return {'lei': _lei_result(KYBService.check_lei_code(subject['lei_code']), subject['lei_code'])}
+    
+    if source == 'sanctions':
+        # One lookup serves every sanctions list check
+        matches = KYBService.check_sanctions(subject['name'], subject['country_code'])
+        return {check_type: _sanctions_result(check_type, matches) for check_type in check_types}
+    
+    if source == 'insolvency':
+        from app.services.insolvency_service import InsolvencyMonitoringService
+        
+        insolvency_service = InsolvencyMonitoringService()
+        search_params = insolvency_service.search_params(
+            subject['registration_number'], subject['city'], subject['postal_code']
+        )
+        # The raw adapter result; it is recorded once back on the task's session
+        return {'insolvency_de': insolvency_service.adapter.check_single(subject['name'], **search_params)}
+    
+    raise ValueError(f"Unknown data source: {source}")
+
+
+def _lei_result(result: Dict[str, Any], lei_code: str) -> Dict[str, Any]:
+    """Enhance a GLEIF result with additional LEI-specific data."""
+    if result.get('status') == 'valid':
+        result['lei_code'] = lei_code
+        result['entity_status'] = result.get('entity_status')
+        result['legal_name'] = result.get('legal_name')
+        result['legal_form'] = result.get('legal_form')
+        result['registration_authority'] = result.get('registration_authority')
+        result['legal_address'] = result.get('legal_address')
+        result['headquarters_address'] = result.get('headquarters_address')
+    
+    return result
+
+
+def _sanctions_result(check_type: str, matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build a sanctions check result from the matches of the check type's list."""
+    # Filter matches based on check type
+    if check_type == 'sanctions_eu':
+        matches = [m for m in matches if 'EU' in m.get('list', '')]
+    elif check_type == 'sanctions_ofac':
+        matches = [m for m in matches if 'OFAC' in m.get('list', '')]
+    elif check_type == 'sanctions_uk':
+        matches = [m for m in matches if 'UK' in m.get('list', '')]
+    
+    return {
+        'status': 'checked',
+        'matches': matches,
+        'match_count': len(matches),
+        'source': check_type.upper(),
+        'checked_at': datetime.utcnow().isoformat()
+    }
+
+
+def _insolvency_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Build an insolvency check result from an insolvency service response."""
+    # Extract the check result from the service response
+    check_result = result.get('check_result', {})
+    
+    return {
+        'status': check_result.get('status', 'checked'),
+        'proceedings_found': check_result.get('proceedings_found', False),
+        'proceedings_count': check_result.get('proceedings_count', 0),
+        'proceedings': check_result.get('proceedings', []),
+        'risk_analysis': check_result.get('risk_analysis', {}),
+        'source': 'INSOLVENCY_DE',
+        'checked_at': datetime.utcnow().isoformat(),
+        'response_time_ms': check_result.get('response_time_ms')
+    }
+
+
+def _check_error(check_type: str, error: str) -> Dict[str, Any]:
+    """Build the result of a check that failed."""
+    return {
+        'status': 'error',
+        'error': error,
+        'source': check_type.upper(),
+        'checked_at': datetime.utcnow().isoformat()
+    }
 
 
 def _create_snapshot(counterparty: Counterparty, check_type: str, 
@@ -1035,6 +1198,9 @@ def daily_kyb_monitoring(self) -> Dict[str, Any]:
     try:
         logger.info("Starting daily KYB monitoring")
         
+        # Refresh the sanctions lists; portfolios are then re-screened against what changed
+        sanctions_update = update_sanctions_data.apply_async(countdown=0)
+        
         # Get all tenants with KYB monitoring enabled
         tenants_with_kyb = db.session.query(KYBMonitoringConfig.tenant_id).distinct().all()
         
@@ -1065,6 +1231,7 @@ def daily_kyb_monitoring(self) -> Dict[str, Any]:
             'tasks_scheduled': len([r for r in results if 'error' not in r]),
             'errors': len([r for r in results if 'error' in r]),
             'results': results,
+            'sanctions_update_task_id': sanctions_update.id,
             'executed_at': datetime.utcnow().isoformat()
         }
         
@@ -1216,7 +1383,8 @@ def batch_check_sanctions(self, counterparty_ids: List[int], **kwargs) -> Dict[s
             matches = result.get('total_matches', 0)
             total_matches += matches
             
-            if matches > 0:
+            # Bulk screening already wrote its alerts
+            if matches > 0 and 'alerts_generated' not in result:
                 counterparty_id = result.get('counterparty_id')
                 if counterparty_id:
                     generate_sanctions_alerts.apply_async(
@@ -1244,6 +1412,47 @@ def batch_check_sanctions(self, counterparty_ids: List[int], **kwargs) -> Dict[s
         raise
 
 
+@kyb_task
+def screen_tenant_sanctions(self, tenant_id: int, **kwargs) -> Dict[str, Any]:
+    """
+    Screen a tenant's whole monitored portfolio against sanctions sources in one pass.
+    
+    Args:
+        tenant_id: Tenant ID
+        **kwargs: Additional options for sanctions adapters
+    
+    Returns:
+        Dict with portfolio screening summary
+    """
+    try:
+        logger.info(f"Starting portfolio sanctions screening for tenant {tenant_id}")
+        
+        sanctions_service = SanctionsMonitoringService()
+        results = sanctions_service.screen_portfolio(tenant_id, **kwargs)
+        
+        matched = [result['counterparty_id'] for result in results if result.get('total_matches', 0) > 0]
+        
+        summary = {
+            'tenant_id': tenant_id,
+            'total_checked': len(results),
+            'counterparties_matched': len(matched),
+            'matched_counterparty_ids': matched,
+            'total_matches': sum(result.get('total_matches', 0) for result in results),
+            'alerts_generated': sum(result.get('alerts_generated', 0) for result in results),
+            'errors': len([result for result in results if result.get('status') == 'error']),
+            'checked_at': datetime.utcnow().isoformat()
+        }
+        
+        logger.info(f"Completed portfolio sanctions screening for tenant {tenant_id}: "
+                   f"{len(results)} checked, {len(matched)} matched")
+        
+        return summary
+        
+    except Exception as e:
+        logger.error(f"Error in screen_tenant_sanctions: {e}")
+        raise
+
+
 @kyb_task
 def generate_sanctions_alerts(self, counterparty_id: int, matches: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -1332,7 +1541,10 @@ def generate_sanctions_alerts(self, counterparty_id: int, matches: List[Dict[str
 @kyb_task
 def update_sanctions_data(self) -> Dict[str, Any]:
     """
-    Update sanctions data for all sources.
+    Update sanctions data for all sources and re-screen every tenant against the changes.
+    
+    Tenants are re-screened even when no list changed, which picks up new
+    and renamed counterparties.
     
     Returns:
         Dict with update results
@@ -1346,7 +1558,14 @@ def update_sanctions_data(self) -> Dict[str, Any]:
         # Update all sanctions data
         result = sanctions_service.update_all_sanctions_data()
         
-        logger.info("Completed sanctions data update")
+        # Each tenant is re-screened from its own last list versions, see rescreen_list_changes
+        rescreens = []
+        for (tenant_id,) in db.session.query(KYBMonitoringConfig.tenant_id).distinct().all():
+            task = rescreen_sanctions_changes.apply_async(args=[tenant_id])
+            rescreens.append({'tenant_id': tenant_id, 'task_id': task.id})
+        result['rescreens_scheduled'] = rescreens
+        
+        logger.info(f"Completed sanctions data update, {len(rescreens)} tenant re-screenings scheduled")
         
         return result
         
@@ -1355,6 +1574,40 @@ def update_sanctions_data(self) -> Dict[str, Any]:
         raise
 
 
+@kyb_task
+def rescreen_sanctions_changes(self, tenant_id: int, **kwargs) -> Dict[str, Any]:
+    """
+    Re-screen a tenant's portfolio against the sanctions list changes since its last re-screening.
+    
+    Args:
+        tenant_id: Tenant ID
+        **kwargs: Additional options for sanctions adapters
+    
+    Returns:
+        Dict with re-screening summary
+    """
+    try:
+        logger.info(f"Starting sanctions delta re-screening for tenant {tenant_id}")
+        
+        sanctions_service = SanctionsMonitoringService()
+        result = sanctions_service.rescreen_list_changes(tenant_id, **kwargs)
+        
+        results = result.pop('results')
+        result['total_matches'] = sum(item.get('total_matches', 0) for item in results)
+        result['alerts_generated'] = sum(item.get('alerts_generated', 0) for item in results)
+        result['errors'] = len([item for item in results if item.get('status') == 'error'])
+        
+        logger.info(f"Completed sanctions delta re-screening for tenant {tenant_id}: "
+                   f"{result['rescreened']} of {result['total_counterparties']} re-screened, "
+                   f"{len(result['matched_counterparty_ids'])} matched")
+        
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error in rescreen_sanctions_changes: {e}")
+        raise
+
+
 @kyb_task
 def schedule_sanctions_monitoring(self, tenant_id: int = None) -> Dict[str, Any]:
     """
@@ -1385,44 +1638,39 @@ def schedule_sanctions_monitoring(self, tenant_id: int = None) -> Dict[str, Any]
         # - High risk counterparties (checked more frequently)
         # - New counterparties
         
-        counterparties = query.all()
+        counterparties = query.with_entities(Counterparty.id, Counterparty.risk_level).all()
         
-        # Filter based on last sanctions check
-        counterparties_to_check = []
-        for cp in counterparties:
-            # Check if we have recent sanctions snapshots
-            recent_sanctions_check = CounterpartySnapshot.query.filter(
-                and_(
-                    CounterpartySnapshot.counterparty_id == cp.id,
-                    CounterpartySnapshot.check_type.in_(['sanctions_eu', 'sanctions_ofac', 'sanctions_uk']),
-                    CounterpartySnapshot.created_at >= now - timedelta(hours=24)
-                )
-            ).first()
-            
-            # Schedule if no recent check or high risk
-            if not recent_sanctions_check or cp.risk_level in ['high', 'critical']:
-                counterparties_to_check.append(cp)
+        # Counterparties with a sanctions snapshot in the last 24 hours, in one query
+        recent_query = db.session.query(CounterpartySnapshot.counterparty_id).filter(
+            CounterpartySnapshot.check_type.in_(['sanctions_eu', 'sanctions_ofac', 'sanctions_uk']),
+            CounterpartySnapshot.created_at >= now - timedelta(hours=24)
+        )
+        if tenant_id:
+            recent_query = recent_query.filter(CounterpartySnapshot.tenant_id == tenant_id)
+        recently_checked = {counterparty_id for (counterparty_id,) in recent_query.distinct()}
+        
+        # Schedule if no recent check or high risk
+        counterparties_to_check = [
+            cp for cp in counterparties
+            if cp.id not in recently_checked or cp.risk_level in ['high', 'critical']
+        ]
         
         # Schedule sanctions checks
         scheduled_tasks = []
         
-        # Process in batches to avoid overwhelming the system
-        batch_size = 10
+        # Each batch is screened in bulk; large portfolios are split so several workers share them
+        batch_size = current_app.config.get('SANCTIONS_BULK_BATCH_SIZE', 5000)
         for i in range(0, len(counterparties_to_check), batch_size):
             batch = counterparties_to_check[i:i + batch_size]
             batch_ids = [cp.id for cp in batch]
             
-            # Schedule batch check with staggered timing
-            task = batch_check_sanctions.apply_async(
-                args=[batch_ids],
-                countdown=i * 30  # 30 second delay between batches
-            )
+            task = batch_check_sanctions.apply_async(args=[batch_ids])
             
             scheduled_tasks.append({
                 'batch_number': i // batch_size + 1,
                 'counterparty_ids': batch_ids,
                 'task_id': task.id,
-                'scheduled_for': (now + timedelta(seconds=i * 30)).isoformat()
+                'scheduled_for': now.isoformat()
             })
         
         result = {
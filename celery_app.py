@@ -57,6 +57,7 @@ def create_celery_app(app=None):
             'app.workers.billing.*': {'queue': 'billing'},
             'app.workers.kyb.*': {'queue': 'kyb'},
             'app.workers.notifications.*': {'queue': 'notifications'},
+            'app.workers.knowledge.*': {'queue': 'knowledge'},
             'app.workers.dead_letter.*': {'queue': 'dead_letter'},
         },
         
@@ -83,6 +84,11 @@ def create_celery_app(app=None):
                 'exchange_type': 'direct',
                 'routing_key': 'notifications',
             },
+            'knowledge': {
+                'exchange': 'knowledge',
+                'exchange_type': 'direct',
+                'routing_key': 'knowledge',
+            },
             'dead_letter': {
                 'exchange': 'dead_letter',
                 'exchange_type': 'direct',
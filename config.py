@@ -159,6 +159,16 @@ class Config:
     # OpenAI Configuration
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     OPENAI_MODEL = os.environ.get('OPENAI_MODEL') or 'gpt-4-turbo-preview'
+    OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT') or 30.0)  # seconds per async request
+    OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES') or 2)
+    OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS') or 100)  # per event loop
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('OPENAI_MAX_KEEPALIVE_CONNECTIONS') or 20)
+    
+    # Intent routing: local tiers answer clear messages before the LLM is asked
+    INTENT_FAST_PATH_ENABLED = os.environ.get('INTENT_FAST_PATH_ENABLED', 'true').lower() == 'true'
+    INTENT_KEYWORD_THRESHOLD = float(os.environ.get('INTENT_KEYWORD_THRESHOLD') or 0.85)
+    INTENT_CLASSIFIER_THRESHOLD = float(os.environ.get('INTENT_CLASSIFIER_THRESHOLD') or 0.8)
+    INTENT_CLASSIFIER_PATH = os.environ.get('INTENT_CLASSIFIER_PATH') or 'instance/intent_classifier.pkl'
     
     # Stripe Configuration
     STRIPE_PUBLISHABLE_KEY = os.environ.get('STRIPE_PUBLISHABLE_KEY')
@@ -464,6 +474,57 @@ class Config:
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or 16 * 1024 * 1024)  # 16MB
     
+    # Knowledge Vector Index
+    EMBEDDING_STORAGE_DTYPE = os.environ.get('EMBEDDING_STORAGE_DTYPE') or 'float32'  # float32, float16, int8
+    VECTOR_INDEX_ENABLED = os.environ.get('VECTOR_INDEX_ENABLED', 'true').lower() == 'true'
+    VECTOR_INDEX_FOLDER = os.environ.get('VECTOR_INDEX_FOLDER') or os.path.join('instance', 'vector_indexes')
+    VECTOR_INDEX_NPROBE = int(os.environ.get('VECTOR_INDEX_NPROBE') or 8)
+    VECTOR_INDEX_SYNC_INTERVAL = int(os.environ.get('VECTOR_INDEX_SYNC_INTERVAL') or 10)  # seconds
+    VECTOR_INDEX_PERSIST_INTERVAL = int(os.environ.get('VECTOR_INDEX_PERSIST_INTERVAL') or 30)  # seconds between index file rewrites
+    
+    # Document Ingestion
+    KNOWLEDGE_ASYNC_INGESTION = os.environ.get('KNOWLEDGE_ASYNC_INGESTION', 'true').lower() == 'true'  # needs a Celery broker
+    KNOWLEDGE_INGESTION_BATCH_SIZE = int(os.environ.get('KNOWLEDGE_INGESTION_BATCH_SIZE') or 64)  # chunks per insert/embedding batch
+    KNOWLEDGE_DOCUMENT_CONTENT_LIMIT = int(os.environ.get('KNOWLEDGE_DOCUMENT_CONTENT_LIMIT') or 1000000)  # characters kept on Document.content
+    
+    # URL Crawling
+    CRAWLER_MAX_PAGES = int(os.environ.get('CRAWLER_MAX_PAGES') or 2000)  # pages fetched per crawl
+    CRAWLER_WORKERS = int(os.environ.get('CRAWLER_WORKERS') or 8)  # concurrent fetches
+    CRAWLER_HOST_CONCURRENCY = int(os.environ.get('CRAWLER_HOST_CONCURRENCY') or 4)  # concurrent fetches per host
+    CRAWLER_HOST_DELAY = float(os.environ.get('CRAWLER_HOST_DELAY') or 0.25)  # seconds between requests to a host; a longer robots.txt Crawl-delay wins
+    
+    # Embedding Batch Executor
+    EMBEDDING_MAX_WORKERS = int(os.environ.get('EMBEDDING_MAX_WORKERS') or 4)  # concurrent API requests
+    EMBEDDING_BATCH_MAX_SIZE = int(os.environ.get('EMBEDDING_BATCH_MAX_SIZE') or 100)  # inputs per request
+    EMBEDDING_BATCH_MAX_TOKENS = int(os.environ.get('EMBEDDING_BATCH_MAX_TOKENS') or 50000)  # tokens per request
+    EMBEDDING_REQUESTS_PER_MINUTE = int(os.environ.get('EMBEDDING_REQUESTS_PER_MINUTE') or 3000)
+    EMBEDDING_TOKENS_PER_MINUTE = int(os.environ.get('EMBEDDING_TOKENS_PER_MINUTE') or 1000000)
+    EMBEDDING_MAX_RETRIES = int(os.environ.get('EMBEDDING_MAX_RETRIES') or 3)  # attempts per request
+    EMBEDDING_RETRY_DELAY = float(os.environ.get('EMBEDDING_RETRY_DELAY') or 1.0)  # seconds, doubled per retry
+    
+    # Query Embedding Cache
+    EMBEDDING_CACHE_ENABLED = os.environ.get('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+    EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE') or 5000)  # vectors held in-process
+    EMBEDDING_CACHE_TTL = int(os.environ.get('EMBEDDING_CACHE_TTL') or 86400)  # seconds
+    EMBEDDING_CACHE_REDIS_ENABLED = os.environ.get('EMBEDDING_CACHE_REDIS_ENABLED', 'false').lower() == 'true'
+    EMBEDDING_CACHE_REDIS_URL = os.environ.get('EMBEDDING_CACHE_REDIS_URL')  # defaults to REDIS_URL
+    
+    # Semantic Response Cache
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL') or 3600)  # seconds
+    RESPONSE_CACHE_SIMILARITY = float(os.environ.get('RESPONSE_CACHE_SIMILARITY') or 0.95)  # minimum cosine similarity
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES') or 1000)  # answers per tenant
+    RESPONSE_CACHE_MIN_CONFIDENCE = float(os.environ.get('RESPONSE_CACHE_MIN_CONFIDENCE') or 0.7)
+    RESPONSE_CACHE_MAX_MESSAGE_CHARS = int(os.environ.get('RESPONSE_CACHE_MAX_MESSAGE_CHARS') or 500)
+    RESPONSE_CACHE_REDIS_ENABLED = os.environ.get('RESPONSE_CACHE_REDIS_ENABLED', 'false').lower() == 'true'
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL')  # defaults to REDIS_URL
+    
+    # Agent Conversation State
+    CONVERSATION_STATE_BACKEND = os.environ.get('CONVERSATION_STATE_BACKEND') or 'memory'  # memory or redis
+    CONVERSATION_STATE_REDIS_URL = os.environ.get('CONVERSATION_STATE_REDIS_URL')  # defaults to REDIS_URL
+    CONVERSATION_STATE_TTL = int(os.environ.get('CONVERSATION_STATE_TTL') or 86400)  # seconds of inactivity
+    CONVERSATION_STATE_MAX_CONVERSATIONS = int(os.environ.get('CONVERSATION_STATE_MAX_CONVERSATIONS') or 10000)  # in-process backend
+    
     # Rate Limiting
     RATE_LIMIT_STORAGE_URL = os.environ.get('RATE_LIMIT_STORAGE_URL') or 'redis://localhost:6379/3'
     
@@ -535,7 +596,38 @@ class Config:
     EU_SANCTIONS_API_URL = os.environ.get('EU_SANCTIONS_API_URL')
     OFAC_API_URL = os.environ.get('OFAC_API_URL')
     UK_SANCTIONS_API_URL = os.environ.get('UK_SANCTIONS_API_URL')
-    
+
+    # Local sanctions list files indexed for screening (EU XML, OFAC sdn.xml/sdn.csv, UK CSV/XML)
+    EU_SANCTIONS_LIST_FILE = os.environ.get('EU_SANCTIONS_LIST_FILE')
+    OFAC_SANCTIONS_LIST_FILE = os.environ.get('OFAC_SANCTIONS_LIST_FILE')
+    UK_SANCTIONS_LIST_FILE = os.environ.get('UK_SANCTIONS_LIST_FILE')
+    # Counterparties per bulk sanctions screening task
+    SANCTIONS_BULK_BATCH_SIZE = int(os.environ.get('SANCTIONS_BULK_BATCH_SIZE') or 5000)
+    # SQLite file holding an ingested GLEIF Golden Copy; LEI lookups answer from it when set
+    GLEIF_GOLDEN_COPY_DB = os.environ.get('GLEIF_GOLDEN_COPY_DB')
+    GLEIF_BULK_BATCH_SIZE = int(os.environ.get('GLEIF_BULK_BATCH_SIZE') or 200)  # LEIs per filter[lei] request
+    # Seconds each source may take per counterparty before its checks are recorded as timed out
+    KYB_SOURCE_DEADLINES = {
+        'vies': float(os.environ.get('KYB_VIES_DEADLINE') or 20),
+        'gleif': float(os.environ.get('KYB_GLEIF_DEADLINE') or 20),
+        'sanctions': float(os.environ.get('KYB_SANCTIONS_DEADLINE') or 30),
+        'insolvency': float(os.environ.get('KYB_INSOLVENCY_DEADLINE') or 30)
+    }
+    # Shared KYB HTTP transport: keep-alive connections per source host, retries and hedging
+    KYB_HTTP_POOL_SIZE = int(os.environ.get('KYB_HTTP_POOL_SIZE') or 10)
+    KYB_HTTP_POOL_SIZES = {
+        'VIES': int(os.environ.get('KYB_VIES_POOL_SIZE') or 20),
+        'GLEIF': int(os.environ.get('KYB_GLEIF_POOL_SIZE') or 20),
+        'GERMANINSOLVENCY': int(os.environ.get('KYB_INSOLVENCY_POOL_SIZE') or 4)
+    }
+    KYB_HTTP_MAX_RETRIES = int(os.environ.get('KYB_HTTP_MAX_RETRIES') or 2)
+    KYB_HTTP_RETRY_DELAY = float(os.environ.get('KYB_HTTP_RETRY_DELAY') or 0.25)  # Seconds before the first retry
+    KYB_HTTP_HEDGE = os.environ.get('KYB_HTTP_HEDGE', 'true').lower() == 'true'  # Re-send requests slower than p95
+    KYB_HTTP_HEDGE_MIN_SAMPLES = int(os.environ.get('KYB_HTTP_HEDGE_MIN_SAMPLES') or 50)
+    # Consecutive failures that open a source's circuit, and seconds before a probe is allowed
+    KYB_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('KYB_CIRCUIT_FAILURE_THRESHOLD') or 5)
+    KYB_CIRCUIT_RESET_TIMEOUT = int(os.environ.get('KYB_CIRCUIT_RESET_TIMEOUT') or 60)
+
     # CORS Settings
     CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000']
     
@@ -579,6 +671,19 @@ class TestingConfig(Config):
     CELERY_RESULT_BACKEND = None
     RATE_LIMIT_STORAGE_URL = None
     
+    # Don't persist vector indexes to disk during tests
+    VECTOR_INDEX_ENABLED = False
+    
+    # Keep mocked embedding calls isolated between tests
+    EMBEDDING_CACHE_ENABLED = False
+    RESPONSE_CACHE_ENABLED = False
+    
+    # Retry failed embedding requests without waiting
+    EMBEDDING_RETRY_DELAY = 0.0
+    
+    # Fail fast instead of retrying unreachable OpenAI endpoints
+    OPENAI_MAX_RETRIES = 0
+    
     @classmethod
     def get_sqlite_engine_options(cls) -> Dict[str, Any]:
         """Get SQLite-specific engine options for testing."""
@@ -680,6 +785,11 @@ class ProductionConfig(Config):
         }
     }
     
+    # Share conversation state between workers whenever Redis is available
+    CONVERSATION_STATE_BACKEND = os.environ.get('CONVERSATION_STATE_BACKEND') or (
+        'redis' if Config.REDIS_URL else 'memory'
+    )
+    
     # Render.com specific settings
     @staticmethod
     def init_app(app):
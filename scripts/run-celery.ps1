@@ -8,7 +8,7 @@
     It supports different worker types and provides options for development and production environments.
 
 .PARAMETER WorkerType
-    Type of worker to start: 'all', 'default', 'billing', 'kyb', 'notifications', 'dead_letter'
+    Type of worker to start: 'all', 'default', 'billing', 'kyb', 'notifications', 'knowledge', 'dead_letter'
 
 .PARAMETER LogLevel
     Celery log level: 'debug', 'info', 'warning', 'error', 'critical'
@@ -34,7 +34,7 @@
 
 param(
     [Parameter()]
-    [ValidateSet('all', 'default', 'billing', 'kyb', 'notifications', 'dead_letter')]
+    [ValidateSet('all', 'default', 'billing', 'kyb', 'notifications', 'knowledge', 'dead_letter')]
     [string]$WorkerType = 'all',
     
     [Parameter()]
@@ -111,12 +111,16 @@ try {
             $celeryCmd += @('-Q', 'notifications')
             Write-Host "Starting notifications queue workers..." -ForegroundColor Cyan
         }
+        'knowledge' {
+            $celeryCmd += @('-Q', 'knowledge')
+            Write-Host "Starting knowledge ingestion queue workers..." -ForegroundColor Cyan
+        }
         'dead_letter' {
             $celeryCmd += @('-Q', 'dead_letter')
             Write-Host "Starting dead letter queue workers..." -ForegroundColor Cyan
         }
         'all' {
-            $celeryCmd += @('-Q', 'default,billing,kyb,notifications,dead_letter')
+            $celeryCmd += @('-Q', 'default,billing,kyb,notifications,knowledge,dead_letter')
             Write-Host "Starting all queue workers..." -ForegroundColor Cyan
         }
     }
@@ -135,7 +139,7 @@ try {
     
     # Display worker information
     Write-Host "`nWorker Configuration:" -ForegroundColor Yellow
-    Write-Host "  Queues: $(if ($WorkerType -eq 'all') { 'default, billing, kyb, notifications, dead_letter' } else { $WorkerType })" -ForegroundColor Gray
+    Write-Host "  Queues: $(if ($WorkerType -eq 'all') { 'default, billing, kyb, notifications, knowledge, dead_letter' } else { $WorkerType })" -ForegroundColor Gray
     Write-Host "  Concurrency: $Concurrency processes" -ForegroundColor Gray
     Write-Host "  Log Level: $LogLevel" -ForegroundColor Gray
     Write-Host "  Beat Scheduler: $(if ($Beat) { 'Enabled' } else { 'Disabled' })" -ForegroundColor Gray
@@ -8,7 +8,7 @@ from datetime import datetime, timedelta
 from app.secretary.agents.orchestrator import (
     AgentOrchestrator, ConversationContext, AgentPerformanceMetrics, HandoffDecision
 )
-from app.secretary.agents.base_agent import AgentContext, AgentResponse
+from app.secretary.agents.base_agent import AgentContext, AgentResponse, AgentStreamEvent
 
 
 class TestAgentOrchestrator:
@@ -103,6 +103,170 @@ class TestAgentOrchestrator:
         assert response.requires_handoff is True
         assert "blocked" in response.content.lower()
     
+    @pytest.mark.asyncio
+    async def test_filter_and_route_run_concurrently(self, orchestrator, agent_context):
+        """Test input filtering and intent detection overlap."""
+        started = []
+        both_started = asyncio.Event()
+        
+        mock_filter_result = Mock()
+        mock_filter_result.is_safe = True
+        mock_filter_result.filtered_content = "Call me at test@example.com"
+        
+        async def stage(name, result):
+            started.append(name)
+            if len(started) == 2:
+                both_started.set()
+            await asyncio.wait_for(both_started.wait(), timeout=1)
+            return result
+        
+        routing_result = AgentResponse(content="Routed", confidence=0.8, intent="sales")
+        stage_timings = {}
+        
+        async def filter_input(message, context):
+            return await stage('filter', mock_filter_result)
+        
+        async def detect_intent(message, context):
+            return await stage('route', routing_result)
+        
+        with patch.object(orchestrator.supervisor, 'filter_input', side_effect=filter_input):
+            with patch.object(orchestrator.router, 'detect_intent', side_effect=detect_intent) as mock_detect:
+                filter_result, result = await orchestrator._filter_and_route(
+                    "Call me at test@example.com", agent_context, stage_timings
+                )
+        
+        assert filter_result is mock_filter_result
+        assert result is routing_result
+        assert sorted(started) == ['filter', 'route']
+        assert set(stage_timings) == {'input_filter', 'intent_detection'}
+        # Intent detection never sees unmasked PII
+        assert 'test@example.com' not in mock_detect.call_args.args[0]
+    
+    @pytest.mark.asyncio
+    async def test_blocked_message_cancels_intent_detection(self, orchestrator, agent_context):
+        """Test intent detection is cancelled when the supervisor blocks the message."""
+        cancelled = asyncio.Event()
+        
+        mock_filter_result = Mock()
+        mock_filter_result.is_safe = False
+        mock_filter_result.response_message = "Content blocked due to policy violation"
+        mock_filter_result.requires_human_review = False
+        mock_filter_result.to_dict.return_value = {"blocked": True}
+        
+        async def slow_detect(message, context):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        
+        with patch.object(orchestrator.supervisor, 'filter_input', return_value=mock_filter_result):
+            with patch.object(orchestrator.router, 'detect_intent', side_effect=slow_detect):
+                response = await orchestrator.process_message("Blocked message", agent_context)
+                await asyncio.sleep(0)
+        
+        assert response.intent == "safety_violation"
+        assert cancelled.is_set()
+        assert 'input_filter' in response.metadata["stage_timings"]
+    
+    @pytest.mark.asyncio
+    async def test_process_message_records_stage_timings(self, orchestrator, agent_context):
+        """Test per-stage timings are added to the response and agent metrics."""
+        mock_filter_result = Mock()
+        mock_filter_result.is_safe = True
+        mock_filter_result.filtered_content = "What does the pro plan cost?"
+        
+        mock_router_response = AgentResponse(content="Routed to sales", confidence=0.8, intent="sales")
+        mock_agent_response = AgentResponse(content="The pro plan costs...", confidence=0.9, intent="sales")
+        mock_validation_response = AgentResponse(content="The pro plan costs...", confidence=0.9)
+        
+        with patch.object(orchestrator.supervisor, 'filter_input', return_value=mock_filter_result), \
+             patch.object(orchestrator.router, 'detect_intent', return_value=mock_router_response), \
+             patch.object(orchestrator, '_evaluate_handoff_need', return_value=HandoffDecision(
+                 should_handoff=False, target_agent="sales", confidence=0.8)), \
+             patch.object(orchestrator.agents['sales'], 'generate_response', return_value=mock_agent_response), \
+             patch.object(orchestrator.supervisor, 'validate_response', return_value=mock_validation_response):
+            response = await orchestrator.process_message("What does the pro plan cost?", agent_context)
+        
+        stages = {'input_filter', 'intent_detection', 'handoff_evaluation',
+                  'response_generation', 'output_validation'}
+        assert set(response.metadata["stage_timings"]) == stages
+        
+        metrics = orchestrator.performance_metrics["sales"]
+        assert set(metrics.stage_timings) == stages
+        assert all(count == 1 for count in metrics.stage_counts.values())
+    
+    @pytest.mark.asyncio
+    async def test_process_message_stream(self, orchestrator, agent_context):
+        """Test the reply is streamed in sentence windows and finished with the validated response."""
+        mock_filter_result = Mock()
+        mock_filter_result.is_safe = True
+        mock_filter_result.filtered_content = "What are your hours?"
+        
+        mock_router_response = AgentResponse(content="Routed", confidence=0.8, intent="operations")
+        final_response = AgentResponse(
+            content="We are open 9 to 5. Write to info@example.com for more.",
+            confidence=0.9,
+            intent="operations"
+        )
+        mock_validation_response = AgentResponse(
+            content="We are open 9 to 5. Write to [EMAIL_REDACTED] for more.",
+            confidence=0.9,
+            metadata={"is_safe": False}
+        )
+        
+        async def process_stream(message, context):
+            for delta in ["We are ", "open 9 to 5. Write to info@", "example.com for more."]:
+                yield AgentStreamEvent(delta=delta)
+            yield AgentStreamEvent(done=True, response=final_response)
+        
+        with patch.object(orchestrator.supervisor, 'filter_input', return_value=mock_filter_result), \
+             patch.object(orchestrator.router, 'detect_intent', return_value=mock_router_response), \
+             patch.object(orchestrator, '_evaluate_handoff_need', return_value=HandoffDecision(
+                 should_handoff=False, target_agent="operations", confidence=0.8)), \
+             patch.object(orchestrator.agents['operations'], 'process_stream', side_effect=process_stream), \
+             patch.object(orchestrator.supervisor, 'validate_response', return_value=mock_validation_response):
+            events = [event async for event in orchestrator.process_message_stream("What are your hours?", agent_context)]
+        
+        deltas = [event.delta for event in events if not event.done]
+        assert deltas == ["We are open 9 to 5. ", "Write to [EMAIL_REDACTED] for more."]
+        
+        assert events[-1].done
+        response = events[-1].response
+        assert response.content == mock_validation_response.content
+        assert response.metadata["supervisor_intervention"] is True
+        assert "first_token" in response.metadata["stage_timings"]
+        assert orchestrator.performance_metrics["operations"].total_requests == 1
+    
+    @pytest.mark.asyncio
+    async def test_process_message_stream_blocked(self, orchestrator, agent_context):
+        """Test a blocked message ends the stream with only the final event."""
+        mock_filter_result = Mock()
+        mock_filter_result.is_safe = False
+        mock_filter_result.response_message = "Content blocked due to policy violation"
+        mock_filter_result.requires_human_review = True
+        mock_filter_result.to_dict.return_value = {"blocked": True}
+        
+        with patch.object(orchestrator.supervisor, 'filter_input', return_value=mock_filter_result), \
+             patch.object(orchestrator.router, 'detect_intent', return_value=Mock()):
+            events = [event async for event in orchestrator.process_message_stream("Blocked", agent_context)]
+        
+        assert len(events) == 1
+        assert events[0].done
+        assert events[0].response.intent == "safety_violation"
+    
+    def test_split_stream_window(self, orchestrator):
+        """Test streamed text is released at sentence ends."""
+        assert orchestrator._split_stream_window("Hello there. How") == ("Hello there. ", "How")
+        assert orchestrator._split_stream_window("Line one\nLine") == ("Line one\n", "Line")
+        assert orchestrator._split_stream_window("no boundary yet") == ("", "no boundary yet")
+        
+        orchestrator.stream_window_max_chars = 20
+        orchestrator.stream_window_holdback = 5
+        window, rest = orchestrator._split_stream_window("word " * 6)
+        assert window + rest == "word " * 6
+        assert len(rest) >= 5
+    
     @pytest.mark.asyncio
     async def test_evaluate_handoff_human_request(self, orchestrator, agent_context):
         """Test handoff evaluation for human agent request."""
@@ -181,7 +345,8 @@ class TestAgentOrchestrator:
         context2 = orchestrator._get_or_create_conversation_context(agent_context)
         assert context1 is context2
     
-    def test_update_performance_metrics(self, orchestrator):
+    @pytest.mark.asyncio
+    async def test_update_performance_metrics(self, orchestrator):
         """Test performance metrics updating."""
         response = AgentResponse(
             content="Test response",
@@ -190,7 +355,7 @@ class TestAgentOrchestrator:
             requires_handoff=False
         )
         
-        orchestrator._update_performance_metrics("sales", response, 1.5)
+        await orchestrator._update_performance_metrics("sales", response, 1.5)
         
         metrics = orchestrator.performance_metrics["sales"]
         assert metrics.total_requests == 1
@@ -200,7 +365,23 @@ class TestAgentOrchestrator:
         assert len(metrics.confidence_scores) == 1
         assert metrics.confidence_scores[0] == 0.8
     
-    def test_update_performance_metrics_failed_response(self, orchestrator):
+    @pytest.mark.asyncio
+    async def test_update_performance_metrics_stage_timings(self, orchestrator):
+        """Test stage timings are averaged per stage."""
+        response = AgentResponse(content="Test response", confidence=0.8, intent="sales")
+        
+        await orchestrator._update_performance_metrics("sales", response, 1.5, {"input_filter": 0.2})
+        await orchestrator._update_performance_metrics(
+            "sales", response, 1.0, {"input_filter": 0.4, "response_generation": 0.6}
+        )
+        
+        metrics = orchestrator.performance_metrics["sales"]
+        assert metrics.stage_timings["input_filter"] == pytest.approx(0.3)
+        assert metrics.stage_timings["response_generation"] == pytest.approx(0.6)
+        assert metrics.stage_counts == {"input_filter": 2, "response_generation": 1}
+    
+    @pytest.mark.asyncio
+    async def test_update_performance_metrics_failed_response(self, orchestrator):
         """Test performance metrics for failed responses."""
         response = AgentResponse(
             content="Error response",
@@ -209,7 +390,7 @@ class TestAgentOrchestrator:
             requires_handoff=True
         )
         
-        orchestrator._update_performance_metrics("support", response, 2.0)
+        await orchestrator._update_performance_metrics("support", response, 2.0)
         
         metrics = orchestrator.performance_metrics["support"]
         assert metrics.total_requests == 1
@@ -217,24 +398,26 @@ class TestAgentOrchestrator:
         assert metrics.failed_responses == 1
         assert metrics.handoff_requests == 1
     
-    def test_get_performance_metrics_single_agent(self, orchestrator):
+    @pytest.mark.asyncio
+    async def test_get_performance_metrics_single_agent(self, orchestrator):
         """Test getting performance metrics for single agent."""
         # Add some test data
         response = AgentResponse(content="Test", confidence=0.8, intent="sales")
-        orchestrator._update_performance_metrics("sales", response, 1.0)
+        await orchestrator._update_performance_metrics("sales", response, 1.0)
         
         metrics = orchestrator.get_performance_metrics("sales")
         assert metrics["agent_name"] == "sales"
         assert metrics["total_requests"] == 1
     
-    def test_get_performance_metrics_all_agents(self, orchestrator):
+    @pytest.mark.asyncio
+    async def test_get_performance_metrics_all_agents(self, orchestrator):
         """Test getting performance metrics for all agents."""
         # Add test data for multiple agents
         response1 = AgentResponse(content="Test1", confidence=0.8, intent="sales")
         response2 = AgentResponse(content="Test2", confidence=0.7, intent="support")
         
-        orchestrator._update_performance_metrics("sales", response1, 1.0)
-        orchestrator._update_performance_metrics("support", response2, 1.5)
+        await orchestrator._update_performance_metrics("sales", response1, 1.0)
+        await orchestrator._update_performance_metrics("support", response2, 1.5)
         
         all_metrics = orchestrator.get_performance_metrics()
         assert "sales" in all_metrics
@@ -291,6 +474,25 @@ class TestAgentOrchestrator:
         assert health["agents"]["operations"] == "healthy"
         assert "conversation_contexts" in health
         assert "performance_metrics" in health
+        assert health["conversation_state"] == "healthy"
+    
+    @pytest.mark.asyncio
+    async def test_health_check_reports_unavailable_state_store(self):
+        """Test a Redis outage is reported instead of failing the health check."""
+        from app.secretary.agents.conversation_state import RedisConversationStore
+        
+        redis_client = Mock()
+        for command in ('pipeline', 'zcount', 'smembers', 'ping'):
+            getattr(redis_client, command).side_effect = ConnectionError("Redis down")
+        orchestrator = AgentOrchestrator(state_store=RedisConversationStore(redis_client))
+        
+        health = await orchestrator.health_check()
+        status = await orchestrator.get_agent_status()
+        
+        assert health["conversation_state"] == "unhealthy: Redis down"
+        assert health["conversation_contexts"] == 0
+        assert set(health["performance_metrics"]) == set(orchestrator.agents)
+        assert status["orchestrator"]["conversation_contexts"] == 0
 
 
 class TestConversationContext:
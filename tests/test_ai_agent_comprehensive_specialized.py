@@ -48,7 +48,7 @@ class TestSalesAgentComprehensive:
                 "Thank you for your interest in our AI Secretary platform! Based on your requirements for a 500-employee organization with Salesforce integration, I can see this is a significant enterprise implementation. Given your timeline and budget considerations, I'd like to connect you immediately with our Enterprise Sales team who can provide detailed pricing, arrange a comprehensive demo, and discuss integration specifics. They'll be able to address your $50k budget and ensure we meet your next week demo timeline."
             ]
             
-            with patch('app.services.knowledge_service.KnowledgeService.search_knowledge') as mock_search:
+            with patch('app.services.knowledge_service.KnowledgeService.search_knowledge_async') as mock_search:
                 mock_search.return_value = [
                     {
                         'content_preview': 'Enterprise pricing starts at $45k annually for 500+ employees with Salesforce integration...',
@@ -90,7 +90,7 @@ class TestSalesAgentComprehensive:
                 "I'd be happy to help you evaluate our AI Secretary solution! For small businesses, we offer several pricing tiers:\n\n- Starter Plan: $29/month (up to 5 users)\n- Professional Plan: $79/month (up to 25 users)\n- Business Plan: $149/month (up to 100 users)\n\nKey features include multi-channel communication, CRM integration, and AI-powered responses. Since you're comparing options, I can send you a detailed comparison guide. What specific features are most important for your business needs?"
             ]
             
-            with patch('app.services.knowledge_service.KnowledgeService.search_knowledge') as mock_search:
+            with patch('app.services.knowledge_service.KnowledgeService.search_knowledge_async') as mock_search:
                 mock_search.return_value = [
                     {
                         'content_preview': 'Small business pricing: Starter $29/month, Professional $79/month...',
@@ -179,7 +179,7 @@ lass TestSupportAgentComprehensive:
                 "I understand this is a critical system outage affecting your entire operation. This requires immediate escalation to our technical team. I'm creating a Priority 1 incident ticket and our on-call engineers will be notified immediately.\n\nImmediate steps:\n1. I've escalated this as a critical incident\n2. Our technical team will contact you within 15 minutes\n3. Please check our status page at status.example.com for real-time updates\n4. We'll provide updates every 30 minutes until resolved\n\nIncident ID: INC-2024-001234. You'll receive a call from our senior engineer shortly."
             ]
             
-            with patch('app.services.knowledge_service.KnowledgeService.search_knowledge') as mock_search:
+            with patch('app.services.knowledge_service.KnowledgeService.search_knowledge_async') as mock_search:
                 mock_search.return_value = [
                     {
                         'content_preview': 'Critical incident response: Immediate escalation, 15-minute response time...',
@@ -220,7 +220,7 @@ lass TestSupportAgentComprehensive:
                 "I understand how frustrating login issues can be, especially when they're blocking your work. Let's troubleshoot this step by step:\n\n1. **Clear your browser cache and cookies** - Old cached data can cause authentication issues\n2. **Try logging in using an incognito/private browser window** - This eliminates browser-related issues\n3. **Verify you're using the correct email address** - Sometimes similar email addresses get confused\n4. **Check if Caps Lock is on** - Passwords are case-sensitive\n5. **Try a different browser** - Sometimes browser-specific issues occur\n\nIf these steps don't resolve the issue, I'll escalate this to our account team who can check your account status directly. Please try these steps and let me know the results."
             ]
             
-            with patch('app.services.knowledge_service.KnowledgeService.search_knowledge') as mock_search:
+            with patch('app.services.knowledge_service.KnowledgeService.search_knowledge_async') as mock_search:
                 mock_search.return_value = [
                     {
                         'content_preview': 'Login troubleshooting: Clear cache, try incognito mode, verify credentials...',
@@ -303,7 +303,7 @@ class TestBillingAgentComprehensive:
                 "I understand how concerning this payment issue must be, especially with your service suspended. Payment discrepancies combined with service interruptions require immediate attention from our billing specialists.\n\n**Immediate Actions:**\n1. I'm escalating this as a priority billing issue\n2. Our billing team will investigate the payment status discrepancy\n3. We'll review the late fee application\n4. Service restoration will be prioritized once payment status is verified\n\nFor security reasons, I cannot access your specific payment details, but our billing team will contact you within 30 minutes to resolve this. Please have your account information and payment confirmation ready.\n\nTicket ID: BILL-PAY-2024-9876"
             ]
             
-            with patch('app.services.knowledge_service.KnowledgeService.search_knowledge') as mock_search:
+            with patch('app.services.knowledge_service.KnowledgeService.search_knowledge_async') as mock_search:
                 mock_search.return_value = [
                     {
                         'content_preview': 'Payment dispute resolution: Verify payment status, investigate discrepancies...',
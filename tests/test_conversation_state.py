@@ -0,0 +1,303 @@
+"""Tests for the orchestrator conversation-state stores."""
+import pytest
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from app.secretary.agents.base_agent import AgentContext
+from app.secretary.agents.conversation_state import (
+    InMemoryConversationStore, RedisConversationStore, create_conversation_store
+)
+
+
+class FakePipeline:
+    """Queues commands and runs them on execute()."""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((getattr(self.client, name), args))
+
+    def execute(self):
+        results = [command(*args) for command, args in self.commands]
+        self.commands = []
+        return results
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the Redis commands used by the store; ignores expiry."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def expire(self, key, ttl):
+        return key in self.data
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def hsetnx(self, key, field, value):
+        return self.data.setdefault(key, {}).setdefault(field, value) == value
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+
+    def hincrby(self, key, field, amount):
+        values = self.data.setdefault(key, {})
+        values[field] = int(values.get(field, 0)) + amount
+        return values[field]
+
+    def hincrbyfloat(self, key, field, amount):
+        values = self.data.setdefault(key, {})
+        values[field] = float(values.get(field, 0)) + amount
+        return values[field]
+
+    def hgetall(self, key):
+        return {name.encode(): str(value).encode() for name, value in self.data.get(key, {}).items()}
+
+    def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value)
+
+    def lpush(self, key, value):
+        self.data.setdefault(key, []).insert(0, value)
+
+    def ltrim(self, key, start, end):
+        values = self.data.get(key, [])
+        self.data[key] = values[start:None if end == -1 else end + 1]
+
+    def lrange(self, key, start, end):
+        return [str(value).encode() for value in self.data.get(key, [])]
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        return self.data.get(key, {}).pop(member, None) is not None
+
+    def zcount(self, key, low, high):
+        return sum(1 for score in self.data.get(key, {}).values() if score >= float(low))
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.data.get(key, {})
+        expired = [member for member, score in members.items() if score <= high]
+        for member in expired:
+            del members[member]
+        return len(expired)
+
+    def sadd(self, key, member):
+        self.data.setdefault(key, set()).add(member)
+
+    def smembers(self, key):
+        return {member.encode() for member in self.data.get(key, set())}
+
+
+def make_context(conversation_id="conv-1"):
+    return AgentContext(
+        tenant_id="tenant-1",
+        channel_type="telegram",
+        conversation_id=conversation_id,
+        customer_id="customer-1"
+    )
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def store(request):
+    """Create each store backend."""
+    if request.param == 'redis':
+        return RedisConversationStore(FakeRedis(), ttl=3600)
+    return InMemoryConversationStore(ttl=3600)
+
+
+class TestConversationStateStore:
+    """Behaviour shared by all store backends."""
+
+    def test_record_message_counts_messages(self, store):
+        """Test messages are counted per conversation."""
+        store.record_message(make_context())
+        conversation = store.record_message(make_context())
+        store.record_message(make_context("conv-2"))
+
+        assert conversation.message_count == 2
+        assert conversation.tenant_id == "tenant-1"
+        assert conversation.customer_id == "customer-1"
+        assert store.get("conv-1").message_count == 2
+        assert store.count() == 2
+
+    def test_intent_history_is_bounded(self, store):
+        """Test only the most recent intents are kept."""
+        store.record_message(make_context())
+        for index in range(12):
+            conversation = store.record_intent("conv-1", f"intent-{index}")
+
+        assert len(conversation.intent_history) == store.MAX_INTENT_HISTORY
+        assert conversation.intent_history[0] == "intent-2"
+        assert conversation.intent_history[-1] == "intent-11"
+
+    def test_current_agent_and_delete(self, store):
+        """Test the current agent is stored and conversations can be deleted."""
+        store.record_message(make_context())
+        store.set_current_agent("conv-1", "billing")
+
+        assert store.get("conv-1").current_agent == "billing"
+        assert store.delete("conv-1") is True
+        assert store.get("conv-1") is None
+
+    def test_agent_metrics_aggregate(self, store):
+        """Test responses are aggregated into agent metrics."""
+        store.record_agent_response("sales", 0.9, False, 1.0, {"input_filter": 0.2})
+        store.record_agent_response("sales", 0.3, True, 2.0, {"input_filter": 0.4, "response_generation": 0.6})
+
+        metrics = store.get_agent_metrics("sales")
+        assert metrics.total_requests == 2
+        assert metrics.successful_responses == 1
+        assert metrics.failed_responses == 1
+        assert metrics.handoff_requests == 1
+        assert metrics.average_response_time == pytest.approx(1.5)
+        assert metrics.confidence_scores == [0.9, 0.3]
+        assert metrics.stage_timings["input_filter"] == pytest.approx(0.3)
+        assert metrics.stage_counts == {"input_filter": 2, "response_generation": 1}
+        assert store.agent_names() == ["sales"]
+        assert store.get_agent_metrics("support").total_requests == 0
+
+
+class TestInMemoryConversationStore:
+    """Test cases for InMemoryConversationStore."""
+
+    def test_expiry_only_scans_oldest(self):
+        """Test expired conversations are dropped from the least recently active end."""
+        store = InMemoryConversationStore(ttl=3600)
+        old = store.record_message(make_context("old"))
+        store.record_message(make_context("fresh"))
+        old.last_activity = datetime.now() - timedelta(hours=2)
+
+        assert store.cleanup_expired() == 1
+        assert store.get("old") is None
+        assert store.get("fresh") is not None
+
+    def test_size_bound_evicts_least_recently_active(self):
+        """Test the store keeps at most max_conversations."""
+        store = InMemoryConversationStore(max_conversations=2)
+        store.record_message(make_context("a"))
+        store.record_message(make_context("b"))
+        store.record_message(make_context("a"))
+        store.record_message(make_context("c"))
+
+        assert store.get("b") is None
+        assert store.get("a") is not None
+        assert store.count() == 2
+
+
+class TestRedisConversationStore:
+    """Test cases for RedisConversationStore."""
+
+    def test_state_is_shared_between_workers(self):
+        """Test two workers on one Redis see each other's updates."""
+        redis_client = FakeRedis()
+        web = RedisConversationStore(redis_client)
+        bot = RedisConversationStore(redis_client)
+
+        web.record_message(make_context())
+        conversation = bot.record_message(make_context())
+        web.record_agent_response("support", 0.8, False, 1.0)
+        bot.record_agent_response("support", 0.8, False, 3.0)
+
+        assert conversation.message_count == 2
+        assert web.get_agent_metrics("support").total_requests == 2
+        assert bot.get_agent_metrics("support").average_response_time == pytest.approx(2.0)
+
+    def test_cleanup_trims_activity_index(self):
+        """Test inactive conversations stop counting as active."""
+        store = RedisConversationStore(FakeRedis(), ttl=60)
+        store.record_message(make_context())
+
+        with patch('app.secretary.agents.conversation_state.time.time', return_value=10 ** 12):
+            assert store.count() == 0
+            assert store.cleanup_expired() == 1
+
+    def test_redis_errors_fall_back_to_memory(self):
+        """Test a failing Redis serves request-path updates from the in-process store."""
+        redis_client = Mock()
+        redis_client.pipeline.side_effect = ConnectionError("Redis down")
+        redis_client.hset.side_effect = ConnectionError("Redis down")
+        store = RedisConversationStore(redis_client)
+
+        conversation = store.record_message(make_context())
+        store.record_intent("conv-1", "sales")
+        store.set_current_agent("conv-1", "sales")
+        store.record_agent_response("sales", 0.8, False, 1.0)
+
+        assert conversation.message_count == 1
+        assert store.get("conv-1").intent_history == ["sales"]
+        assert store.get("conv-1").current_agent == "sales"
+        assert store.fallback.get_agent_metrics("sales").total_requests == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_fall_back_for_reads_and_maintenance(self):
+        """Test counts, metrics, cleanup and deletes keep working while Redis is down."""
+        redis_client = Mock()
+        for command in ('pipeline', 'hset', 'zcount', 'zremrangebyscore', 'smembers', 'ping'):
+            getattr(redis_client, command).side_effect = ConnectionError("Redis down")
+        store = RedisConversationStore(redis_client)
+        store.record_message(make_context())
+        store.record_agent_response("sales", 0.8, False, 1.0)
+
+        assert store.count() == 1
+        assert await store.count_async() == 1
+        assert store.agent_names() == ["sales"]
+        assert store.get_agent_metrics("sales").total_requests == 1
+        assert (await store.all_agent_metrics_async(["support"]))["sales"].total_requests == 1
+        assert store.cleanup_expired() == 0
+        assert store.delete("conv-1") is True
+        with pytest.raises(ConnectionError):
+            await store.health_check()
+
+    def test_all_agent_metrics_read_in_one_pipeline(self):
+        """Test metrics of every agent are fetched in a single round-trip."""
+        redis_client = FakeRedis()
+        store = RedisConversationStore(redis_client)
+        store.record_agent_response("sales", 0.8, False, 1.0)
+        store.record_agent_response("billing", 0.4, True, 2.0)
+
+        with patch.object(redis_client, 'pipeline', wraps=redis_client.pipeline) as pipeline:
+            metrics = store.all_agent_metrics(["sales", "support"])
+
+        assert pipeline.call_count == 1
+        assert list(metrics) == ["sales", "support", "billing"]
+        assert metrics["billing"].handoff_requests == 1
+        assert metrics["support"].total_requests == 0
+
+    @pytest.mark.asyncio
+    async def test_async_updates_run_off_the_event_loop(self):
+        """Test the orchestrator's async calls do their Redis round-trips in worker threads."""
+        threads = []
+
+        class RecordingRedis(FakeRedis):
+            def pipeline(self, transaction=True):
+                threads.append(threading.current_thread())
+                return super().pipeline(transaction)
+
+            def hset(self, key, field, value):
+                threads.append(threading.current_thread())
+                return super().hset(key, field, value)
+
+        store = RedisConversationStore(RecordingRedis())
+        conversation = await store.record_message_async(make_context())
+        await store.record_intent_async("conv-1", "support")
+        await store.set_current_agent_async("conv-1", "support")
+        await store.record_agent_response_async("support", 0.8, False, 1.0)
+
+        assert threads and threading.main_thread() not in threads
+        assert conversation.message_count == 1
+        assert store.get("conv-1").current_agent == "support"
+
+    def test_create_store_falls_back_to_memory(self):
+        """Test an unreachable Redis falls back to the in-process store."""
+        app = Mock(config={'CONVERSATION_STATE_BACKEND': 'redis', 'REDIS_URL': 'redis://127.0.0.1:1/0'})
+        with patch('app.secretary.agents.conversation_state.current_app', app):
+            store = create_conversation_store()
+
+        assert isinstance(store, InMemoryConversationStore)
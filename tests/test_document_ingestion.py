@@ -0,0 +1,147 @@
+"""Tests for the streaming document ingestion pipeline."""
+import hashlib
+import pytest
+from unittest.mock import Mock, MagicMock, patch
+from app.services.document_ingestion import DocumentIngestionPipeline
+from app.utils.exceptions import ProcessingError
+
+
+class TestDocumentIngestionPipeline:
+    """Test cases for DocumentIngestionPipeline."""
+
+    @pytest.fixture
+    def pipeline(self, app):
+        """Create a pipeline with mocked embedding and cleanup steps."""
+        with app.app_context():
+            pipeline = DocumentIngestionPipeline(tenant_id=1, batch_size=2)
+            pipeline._embedding_service = Mock()
+            pipeline._embedding_service.create_chunk_embeddings.side_effect = \
+                lambda tenant_id, chunks: [Mock() for _ in chunks]
+            pipeline._delete_chunks = Mock()
+            with patch('app.models.knowledge.Chunk.bulk_create',
+                       side_effect=lambda rows: list(range(1, len(rows) + 1))):
+                yield pipeline
+
+    @pytest.fixture
+    def document(self):
+        """Create a mock document."""
+        document = MagicMock()
+        document.id = 1
+        document.tenant_id = 1
+        document.title = "report.pdf"
+        document.filename = "report.pdf"
+        return document
+
+    def _chunk_stream(self, count):
+        """Chunker stub that consumes all sections and yields `count` chunks."""
+        def chunk_document_stream(sections, metadata=None):
+            for _ in sections:
+                pass
+            for position in range(count):
+                yield {
+                    'content': f"Chunk {position} content",
+                    'position': position,
+                    'token_count': 10,
+                    'overlap_start': 0,
+                    'overlap_end': 0,
+                    'chunk_type': 'semantic',
+                    'is_first': position == 0,
+                    'is_last': position == count - 1
+                }
+        return chunk_document_stream
+
+    def test_ingest_stores_chunks_in_batches(self, pipeline, document):
+        """Test chunks are inserted and embedded one batch at a time."""
+        sections = ["[Page 1]\nFirst page.", "[Page 2]\nSecond page."]
+        pipeline.chunker.chunk_document_stream = self._chunk_stream(5)
+
+        with patch('app.models.knowledge.Chunk.bulk_create',
+                   side_effect=lambda rows: list(range(len(rows)))) as mock_bulk:
+            pipeline.ingest(document, iter(sections), {'pages': 2, 'format': 'pdf'})
+
+            batch_sizes = [len(call.args[0]) for call in mock_bulk.call_args_list]
+            assert batch_sizes == [2, 2, 1]
+
+        embedded = pipeline._embedding_service.create_chunk_embeddings.call_args_list
+        assert [len(call.args[1]) for call in embedded] == [2, 2, 1]
+        assert [chunk.position for chunk in embedded[2].args[1]] == [4]
+
+        pipeline._delete_chunks.assert_called_once_with(document)
+        document.mark_as_processing.assert_called_once()
+        document.mark_as_completed.assert_called_once()
+
+        final_progress = document.update_progress.call_args.kwargs
+        assert final_progress['stage'] == 'completed'
+        assert final_progress['sections_processed'] == 2
+        assert final_progress['chunks_created'] == 5
+        assert final_progress['embeddings_created'] == 5
+
+        expected_hash = hashlib.sha256("\n\n".join(sections).encode('utf-8')).hexdigest()
+        assert document.content_hash == expected_hash
+        assert document.content == "\n\n".join(sections)
+
+    def test_ingest_keeps_chunks_when_embedding_fails(self, pipeline, document):
+        """Test embedding failures are recorded without failing ingestion."""
+        pipeline.chunker.chunk_document_stream = self._chunk_stream(3)
+        pipeline._embedding_service.create_chunk_embeddings.side_effect = Exception("API down")
+
+        with patch('app.services.document_ingestion.db'):
+            pipeline.ingest(document, iter(["Some text."]))
+
+        final_progress = document.update_progress.call_args.kwargs
+        assert final_progress['stage'] == 'completed'
+        assert final_progress['chunks_created'] == 3
+        assert final_progress['embedding_errors'] == 3
+        document.mark_as_completed.assert_called_once()
+
+    def test_ingest_caps_stored_content(self, pipeline, document):
+        """Test only the first content_limit characters are kept on the document."""
+        pipeline.content_limit = 10
+        pipeline.chunker.chunk_document_stream = self._chunk_stream(1)
+
+        with patch('app.services.document_ingestion.db'):
+            pipeline.ingest(document, iter(["0123456789abcdef", "more text"]))
+
+        assert document.content == "0123456789"
+
+    def test_ingest_without_text_raises(self, pipeline, document):
+        """Test a document without chunkable text is rejected."""
+        pipeline.chunker.chunk_document_stream = self._chunk_stream(0)
+
+        with patch('app.services.document_ingestion.db'):
+            with pytest.raises(ProcessingError, match="No text content found"):
+                pipeline.ingest(document, iter([]))
+
+    def test_run_marks_document_error(self, pipeline, document):
+        """Test extraction failures are recorded on the document."""
+        with patch('app.models.knowledge.Document.get_by_id', return_value=document), \
+             patch('app.services.document_ingestion.DocumentProcessor.stream_text_from_file',
+                   side_effect=ProcessingError("Unsupported file")), \
+             patch('app.services.document_ingestion.db'):
+            with pytest.raises(ProcessingError, match="Unsupported file"):
+                pipeline.run(1)
+
+        document.mark_as_error.assert_called_once()
+        assert document.update_progress.call_args.kwargs['stage'] == 'error'
+
+    def test_run_uses_metadata_title_for_placeholder(self, pipeline, document):
+        """Test the extracted title replaces the filename placeholder."""
+        metadata = {'title': 'Annual Report', 'pages': 1}
+
+        with patch('app.models.knowledge.Document.get_by_id', return_value=document), \
+             patch('app.services.document_ingestion.DocumentProcessor.stream_text_from_file',
+                   return_value=(metadata, iter(["Text"]))), \
+             patch.object(pipeline, 'ingest') as mock_ingest:
+            pipeline.run(1)
+
+        assert document.title == 'Annual Report'
+        mock_ingest.assert_called_once()
+
+    def test_run_document_not_found(self, pipeline):
+        """Test ingesting a document of another tenant fails."""
+        other_document = MagicMock()
+        other_document.tenant_id = 2
+
+        with patch('app.models.knowledge.Document.get_by_id', return_value=other_document):
+            with pytest.raises(ProcessingError, match="Document not found"):
+                pipeline.run(1)
@@ -157,6 +157,72 @@ class TestDocumentProcessor:
             except (OSError, PermissionError):
                 pass
     
+    @patch('PyPDF2.PdfReader')
+    def test_stream_text_from_pdf_file(self, mock_pdf_reader):
+        """Test PDF text is streamed one page at a time."""
+        pages = []
+        for text in ["Page one content.", "", "Page three content."]:
+            page = MagicMock()
+            page.extract_text.return_value = text
+            pages.append(page)
+        
+        mock_reader_instance = MagicMock()
+        mock_reader_instance.pages = pages
+        mock_reader_instance.metadata = {'/Title': 'Test PDF'}
+        mock_pdf_reader.return_value = mock_reader_instance
+        
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            f.write(b'fake pdf content')
+            temp_path = f.name
+        
+        try:
+            metadata, sections = DocumentProcessor.stream_text_from_file(temp_path, 'application/pdf')
+            
+            assert metadata['pages'] == 3
+            assert metadata['title'] == 'Test PDF'
+            
+            # Pages are only extracted while iterating
+            pages[0].extract_text.assert_not_called()
+            
+            assert list(sections) == [
+                "[Page 1]\nPage one content.",
+                "[Page 3]\nPage three content."
+            ]
+            
+        finally:
+            try:
+                os.unlink(temp_path)
+            except (OSError, PermissionError):
+                pass
+    
+    def test_stream_text_from_plain_text_file(self):
+        """Test plain text is streamed in blocks of whole lines."""
+        lines = [f"Line {i} of the document.\n" for i in range(5000)]
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+            f.writelines(lines)
+            temp_path = f.name
+        
+        try:
+            metadata, sections = DocumentProcessor.stream_text_from_file(temp_path)
+            blocks = list(sections)
+            
+            assert metadata['format'] == 'plain_text'
+            assert len(blocks) > 1
+            assert all(block.endswith('\n') for block in blocks)
+            assert ''.join(blocks) == ''.join(lines)
+            
+        finally:
+            try:
+                os.unlink(temp_path)
+            except (OSError, PermissionError):
+                pass
+    
+    def test_stream_text_file_not_found(self):
+        """Test streaming error handling for non-existent file."""
+        with pytest.raises(ProcessingError, match="File not found"):
+            DocumentProcessor.stream_text_from_file("/nonexistent/file.txt")
+    
     def test_extract_text_file_not_found(self):
         """Test error handling for non-existent file."""
         with pytest.raises(ProcessingError, match="File not found"):
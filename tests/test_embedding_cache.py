@@ -0,0 +1,162 @@
+"""Tests for the query-embedding cache."""
+import pytest
+import numpy as np
+from unittest.mock import Mock, patch
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_service import EmbeddingService
+
+
+class FakeRedis:
+    """Minimal dict-backed Redis stand-in."""
+
+    def __init__(self):
+        self.store = {}
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    def execute(self):
+        return []
+
+
+class TestEmbeddingCache:
+    """Test cases for EmbeddingCache."""
+
+    def test_key_normalizes_whitespace(self):
+        """Test that whitespace differences share a key but models do not."""
+        key = EmbeddingCache.make_key("model-a", "What are  your\nopening hours? ")
+
+        assert key == EmbeddingCache.make_key("model-a", "What are your opening hours?")
+        assert key != EmbeddingCache.make_key("model-b", "What are your opening hours?")
+        assert key.startswith("embedding:model-a:")
+
+    def test_hit_miss_and_lru_eviction(self):
+        """Test hit/miss counting and least-recently-used eviction."""
+        cache = EmbeddingCache(max_size=2, ttl=60)
+
+        assert cache.get("m", "a") is None
+        cache.set("m", "a", [1.0, 0.0])
+        cache.set("m", "b", [0.0, 1.0])
+        assert cache.get("m", "a") is not None  # "a" is now most recent
+
+        cache.set("m", "c", [1.0, 1.0])
+
+        assert cache.get("m", "b") is None
+        np.testing.assert_array_equal(cache.get("m", "a"), [1.0, 0.0])
+
+        stats = cache.get_stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 2
+        assert stats['evictions'] == 1
+        assert stats['size'] == 2
+        assert stats['hit_rate'] == 0.5
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the TTL."""
+        cache = EmbeddingCache(max_size=10, ttl=30)
+
+        with patch('app.services.embedding_cache.time.monotonic', return_value=100.0):
+            cache.set("m", "query", [1.0, 2.0])
+        with patch('app.services.embedding_cache.time.monotonic', return_value=129.0):
+            assert cache.get("m", "query") is not None
+        with patch('app.services.embedding_cache.time.monotonic', return_value=131.0):
+            assert cache.get("m", "query") is None
+
+    def test_cached_vectors_are_read_only(self):
+        """Test callers cannot mutate cached vectors."""
+        cache = EmbeddingCache(max_size=10, ttl=60)
+        vector = cache.set("m", "query", np.array([1.0, 2.0]))
+
+        assert vector.dtype == np.float32
+        with pytest.raises(ValueError):
+            vector[0] = 5.0
+
+    def test_redis_tier_shared_between_caches(self):
+        """Test a second process-local cache is warmed from Redis."""
+        redis_client = FakeRedis()
+        first = EmbeddingCache(max_size=10, ttl=60, redis_client=redis_client)
+        second = EmbeddingCache(max_size=10, ttl=60, redis_client=redis_client)
+
+        first.set("m", "query", [0.5, 0.25])
+        vector = second.get("m", "query")
+
+        np.testing.assert_array_equal(vector, [0.5, 0.25])
+        assert second.get_stats()['redis_hits'] == 1
+
+        # Promoted into the local tier
+        assert second.get("m", "query") is not None
+        assert second.get_stats()['memory_hits'] == 1
+
+    def test_redis_errors_degrade_to_miss(self):
+        """Test Redis failures are counted and treated as misses."""
+        redis_client = Mock()
+        redis_client.mget.side_effect = Exception("Connection refused")
+        cache = EmbeddingCache(max_size=10, ttl=60, redis_client=redis_client)
+
+        assert cache.get("m", "query") is None
+        assert cache.get_stats()['errors'] == 1
+
+
+class TestEmbeddingServiceCache:
+    """Test EmbeddingService uses the cache for single and batch requests."""
+
+    @pytest.fixture
+    def cache(self):
+        """Create an isolated cache."""
+        return EmbeddingCache(max_size=100, ttl=60)
+
+    @pytest.fixture
+    def embedding_service(self, app, cache):
+        """Create embedding service instance with the cache enabled."""
+        app.config['EMBEDDING_CACHE_ENABLED'] = True
+        with patch('app.services.embedding_service.embedding_cache', cache):
+            with patch('app.services.embedding_service.current_app') as mock_app:
+                mock_app.config.get.return_value = 'test-api-key'
+                service = EmbeddingService()
+            service.client = Mock()
+            yield service
+
+    def _response(self, count, dimension=8):
+        response = Mock()
+        response.data = [Mock(embedding=list(np.full(dimension, i + 1.0))) for i in range(count)]
+        return response
+
+    def test_repeat_query_skips_api(self, embedding_service, cache):
+        """Test a repeated query is served from the cache."""
+        embedding_service.client.embeddings.create.return_value = self._response(1)
+
+        first = embedding_service.generate_embedding("What are your opening hours?")
+        second = embedding_service.generate_embedding("What are your  opening hours?")
+
+        embedding_service.client.embeddings.create.assert_called_once()
+        np.testing.assert_array_equal(first, second)
+        assert cache.get_stats()['hits'] == 1
+
+    def test_batch_shares_cache_with_single_queries(self, embedding_service):
+        """Test batch generation only requests uncached, distinct texts."""
+        embedding_service.client.embeddings.create.return_value = self._response(1)
+        cached = embedding_service.generate_embedding("chunk one")
+
+        embedding_service.client.embeddings.create.reset_mock()
+        embedding_service.client.embeddings.create.return_value = self._response(1)
+
+        results = embedding_service.generate_embeddings_batch(["chunk one", "chunk two", "chunk two", ""])
+
+        embedding_service.client.embeddings.create.assert_called_once_with(
+            input=["chunk two"],
+            model="text-embedding-ada-002"
+        )
+        np.testing.assert_array_equal(results[0], cached)
+        np.testing.assert_array_equal(results[1], results[2])
+        assert results[3].size == 0
+
+        # Everything is cached now
+        embedding_service.client.embeddings.create.reset_mock()
+        embedding_service.generate_embeddings_batch(["chunk one", "chunk two"])
+        embedding_service.client.embeddings.create.assert_not_called()
@@ -0,0 +1,128 @@
+"""Tests for the concurrent embedding batch executor."""
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from app.services.embedding_executor import EmbeddingBatchExecutor, RateBudget
+
+
+class FakeClock:
+    """Clock advanced only by the fake sleep."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestRateBudget:
+    """Test cases for RateBudget."""
+
+    def test_requests_per_minute(self):
+        """Test requests beyond the per-minute allowance wait for a refill."""
+        clock = FakeClock()
+        budget = RateBudget(requests_per_minute=2, tokens_per_minute=1000, clock=clock, sleep=clock.sleep)
+
+        assert budget.acquire(10) == 0
+        assert budget.acquire(10) == 0
+        assert budget.acquire(10) == pytest.approx(30.0)
+
+    def test_tokens_per_minute(self):
+        """Test token-heavy requests are spread across the minute."""
+        clock = FakeClock()
+        budget = RateBudget(requests_per_minute=100, tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+
+        assert budget.acquire(600) == 0
+        assert budget.acquire(60) == pytest.approx(6.0)
+
+    def test_oversized_request_waits_for_full_budget(self):
+        """Test a request larger than the budget does not block forever."""
+        clock = FakeClock()
+        budget = RateBudget(requests_per_minute=100, tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+
+        assert budget.acquire(5000) == 0
+        assert budget.acquire(5000) == pytest.approx(60.0)
+
+
+class TestEmbeddingBatchExecutor:
+    """Test cases for EmbeddingBatchExecutor."""
+
+    def _client(self, fail_texts=(), fail_times=None):
+        """Client returning [len(text)] vectors and failing for selected texts."""
+        attempts = {}
+        lock = threading.Lock()
+
+        def create(input, model):
+            with lock:
+                for text in input:
+                    attempts[text] = attempts.get(text, 0) + 1
+                failing = [text for text in input if text in fail_texts
+                           and (fail_times is None or attempts[text] <= fail_times)]
+            if failing:
+                raise Exception("Rate limit exceeded")
+            response = Mock()
+            response.data = [Mock(embedding=[float(len(text))]) for text in input]
+            return response
+
+        client = Mock()
+        client.embeddings.create.side_effect = create
+        return client
+
+    def test_pack_batches_by_size_and_tokens(self):
+        """Test texts are packed under both the input and token limits."""
+        executor = EmbeddingBatchExecutor(Mock(), max_batch_size=3, max_batch_tokens=100)
+
+        assert executor.pack_batches([10, 10, 10, 10]) == [[0, 1, 2], [3]]
+        assert executor.pack_batches([60, 30, 20, 150, 5]) == [[0, 1], [2], [3], [4]]
+        assert executor.pack_batches([]) == []
+
+    def test_embed_runs_batches_concurrently(self):
+        """Test all batches are sent and results keep the input order."""
+        client = self._client()
+        executor = EmbeddingBatchExecutor(client, max_workers=4, max_batch_size=2, retry_delay=0)
+        texts = [f"text {'x' * i}" for i in range(7)]
+
+        result = executor.embed(texts, "test-model")
+
+        assert client.embeddings.create.call_count == 4
+        assert result.vectors == [[float(len(text))] for text in texts]
+        assert result.errors == {}
+
+    def test_embed_retries_failed_batch(self):
+        """Test a transient failure is retried with backoff."""
+        client = self._client(fail_texts={"flaky"}, fail_times=1)
+        executor = EmbeddingBatchExecutor(client, max_batch_size=1, retry_delay=0)
+
+        with patch('app.services.embedding_executor.time.sleep') as mock_sleep:
+            result = executor.embed(["stable", "flaky"], "test-model")
+
+        assert result.errors == {}
+        assert result.vectors[1] == [5.0]
+        assert result.retries == 1
+        mock_sleep.assert_called_once()
+
+    def test_embed_allows_partial_success(self):
+        """Test a batch that keeps failing only fails its own texts."""
+        client = self._client(fail_texts={"broken"})
+        executor = EmbeddingBatchExecutor(client, max_batch_size=2, max_retries=2, retry_delay=0)
+
+        result = executor.embed(["one", "broken", "three", "four"], "test-model")
+
+        assert result.vectors[0] is None and result.vectors[1] is None
+        assert result.vectors[2:] == [[5.0], [4.0]]
+        assert set(result.errors) == {0, 1}
+        assert "Rate limit exceeded" in result.errors[1]
+        assert result.requests == 3
+
+    def test_budget_is_shared_per_model(self):
+        """Test executors share one rate budget per model and limits."""
+        first = EmbeddingBatchExecutor(Mock(), requests_per_minute=123, tokens_per_minute=456)
+        second = EmbeddingBatchExecutor(Mock(), requests_per_minute=123, tokens_per_minute=456)
+
+        assert first.get_budget("test-model") is second.get_budget("test-model")
+        assert first.get_budget("test-model") is not first.get_budget("other-model")
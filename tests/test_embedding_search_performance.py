@@ -0,0 +1,80 @@
+"""Latency benchmarks for vectorized knowledge search scoring."""
+import time
+import pytest
+import numpy as np
+from unittest.mock import Mock, patch
+from app.services.embedding_service import EmbeddingService
+
+
+class TestVectorizedScoringPerformance:
+    """Benchmark search scoring latency against corpus size."""
+
+    DIMENSION = 384
+
+    @pytest.fixture
+    def embedding_service(self, app):
+        """Create embedding service instance."""
+        with app.app_context():
+            with patch('app.services.embedding_service.current_app') as mock_app:
+                mock_app.config.get.return_value = 'test-api-key'
+                service = EmbeddingService()
+                service.client = Mock()
+                return service
+
+    def _corpus(self, size):
+        rng = np.random.default_rng(size)
+        matrix = rng.normal(size=(size, self.DIMENSION)).astype(np.float32)
+        ids = np.arange(1, size + 1)
+        return ids, ids.copy(), matrix
+
+    def _time_scoring(self, embedding_service, corpus, query, runs=5):
+        with patch('app.models.knowledge.Embedding.load_vector_matrix', return_value=corpus):
+            timings = []
+            for _ in range(runs):
+                start_time = time.perf_counter()
+                results = embedding_service._score_embedding_matrix(1, "test-model", query, 50, -1.0)
+                timings.append(time.perf_counter() - start_time)
+        return min(timings), results
+
+    def test_scoring_latency_by_corpus_size(self, embedding_service):
+        """Test top-k scoring latency for 1k, 10k and 50k vectors."""
+        query = np.random.default_rng(0).normal(size=self.DIMENSION).astype(np.float32)
+        latencies = {}
+
+        for size in (1000, 10000, 50000):
+            corpus = self._corpus(size)
+            latencies[size], results = self._time_scoring(embedding_service, corpus, query)
+
+            assert len(results) == 50
+            scores = [score for _, _, score in results]
+            assert scores == sorted(scores, reverse=True)
+
+            # Top result matches a brute-force argmax
+            matrix = corpus[2]
+            expected = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+            assert results[0][0] == int(np.argmax(expected)) + 1
+
+        print("\nVectorized scoring latency:")
+        for size, latency in latencies.items():
+            print(f"  {size:>6} vectors: {latency * 1000:.2f}ms")
+
+        assert latencies[50000] < 1.0  # 50k vectors scored well under a second
+
+    def test_vectorized_scoring_beats_per_row_loop(self, embedding_service):
+        """Test the matrix product is faster than scoring embeddings one by one."""
+        corpus = self._corpus(5000)
+        query = np.random.default_rng(1).normal(size=self.DIMENSION).astype(np.float32)
+
+        vectorized_time, results = self._time_scoring(embedding_service, corpus, query, runs=3)
+
+        start_time = time.perf_counter()
+        per_row = [
+            embedding_service._calculate_cosine_similarity(query, vector)
+            for vector in corpus[2]
+        ]
+        loop_time = time.perf_counter() - start_time
+
+        print(f"\nPer-row loop: {loop_time * 1000:.2f}ms, vectorized: {vectorized_time * 1000:.2f}ms")
+
+        assert results[0][2] == pytest.approx(max(per_row), abs=1e-5)
+        assert vectorized_time < loop_time
@@ -1,6 +1,7 @@
 """Tests for embedding service functionality."""
 import pytest
 import numpy as np
+from datetime import datetime
 from unittest.mock import Mock, patch, MagicMock
 from app.services.embedding_service import EmbeddingService
 from app.models.knowledge import KnowledgeSource, Document, Chunk, Embedding
@@ -112,6 +113,32 @@ class TestEmbeddingService:
         assert results[1].size == 0  # Empty embedding for empty text
         assert results[2].size > 0  # Valid embedding
     
+    def test_generate_embeddings_batch_partial_failure(self, embedding_service, sample_embedding_vector):
+        """Test a failing request only fails its own texts when partial results are allowed."""
+        def create(input, model):
+            if "bad text" in input:
+                raise Exception("API Error")
+            response = Mock()
+            response.data = [Mock(embedding=sample_embedding_vector.tolist()) for _ in input]
+            return response
+        
+        embedding_service.client.embeddings.create.side_effect = create
+        
+        with patch('app.services.embedding_service.EmbeddingBatchExecutor.from_config') as mock_from_config:
+            from app.services.embedding_executor import EmbeddingBatchExecutor
+            mock_from_config.side_effect = lambda client: EmbeddingBatchExecutor(
+                client, max_batch_size=1, retry_delay=0
+            )
+            
+            results = embedding_service.generate_embeddings_batch(
+                ["good text", "bad text", "other text"], allow_partial=True
+            )
+            
+            assert [result.size for result in results] == [1536, 0, 1536]
+            
+            with pytest.raises(ProcessingError, match="1 of 1 embeddings failed"):
+                embedding_service.generate_embeddings_batch(["bad text"])
+    
     def test_create_chunk_embedding_success(self, embedding_service, sample_embedding_vector):
         """Test successful chunk embedding creation."""
         # Mock chunk
@@ -165,25 +192,67 @@ class TestEmbeddingService:
         mock_document.tenant_id = 1
         
         # Mock chunks
-        mock_chunks = [Mock(id=1, content="chunk 1"), Mock(id=2, content="chunk 2")]
+        mock_chunks = [
+            Mock(id=1, content="chunk 1", content_hash="hash-1"),
+            Mock(id=2, content="chunk 2", content_hash="hash-2")
+        ]
         
         with patch('app.models.knowledge.Document.get_by_id', return_value=mock_document):
             with patch('app.models.knowledge.Chunk.get_by_document', return_value=mock_chunks):
-                with patch('app.models.knowledge.Embedding.query') as mock_query:
+                with patch('app.models.knowledge.Embedding.query') as mock_query, \
+                     patch('app.models.knowledge.Embedding.find_vectors_by_content_hash', return_value={}):
                     mock_query.filter_by.return_value.filter.return_value.all.return_value = []
                     
                     embedding_service.generate_embeddings_batch = Mock(
                         return_value=[sample_embedding_vector, sample_embedding_vector]
                     )
                     
-                    with patch('app.models.knowledge.Embedding.create_from_vector') as mock_create:
-                        mock_embeddings = [Mock(), Mock()]
-                        mock_create.side_effect = mock_embeddings
+                    with patch('app.models.knowledge.Embedding.bulk_create', return_value=[11, 12]) as mock_bulk:
+                        result = embedding_service.create_document_embeddings(1, 1)
                         
+                        assert [embedding.id for embedding in result] == [11, 12]
+                        assert [embedding.chunk_id for embedding in result] == [1, 2]
+                        
+                        # Both embeddings are written with a single bulk insert
+                        mock_bulk.assert_called_once()
+                        assert len(mock_bulk.call_args[0][0]) == 2
+    
+    def test_create_document_embeddings_reuses_identical_chunks(self, embedding_service, sample_embedding_vector):
+        """Test that chunks with already embedded text reuse the stored vector."""
+        mock_document = Mock()
+        mock_document.id = 1
+        mock_document.tenant_id = 1
+        
+        mock_chunks = [
+            Mock(id=1, content="shared footer", content_hash="hash-shared"),
+            Mock(id=2, content="new text", content_hash="hash-new")
+        ]
+        stored_vectors = {"hash-shared": (b"stored-vector", 1536)}
+        
+        with patch('app.models.knowledge.Document.get_by_id', return_value=mock_document):
+            with patch('app.models.knowledge.Chunk.get_by_document', return_value=mock_chunks):
+                with patch('app.models.knowledge.Embedding.query') as mock_query, \
+                     patch('app.models.knowledge.Embedding.find_vectors_by_content_hash',
+                           return_value=stored_vectors), \
+                     patch('app.services.embedding_service.db') as mock_db:
+                    mock_query.filter_by.return_value.filter.return_value.all.return_value = []
+                    
+                    embedding_service.generate_embeddings_batch = Mock(return_value=[sample_embedding_vector])
+                    
+                    with patch('app.models.knowledge.Embedding.bulk_create', return_value=[11, 12]) as mock_bulk:
                         result = embedding_service.create_document_embeddings(1, 1)
                         
                         assert len(result) == 2
-                        assert mock_create.call_count == 2
+                        embedding_service.generate_embeddings_batch.assert_called_once_with(
+                            ["new text"], None, allow_partial=True
+                        )
+                        
+                        reused, generated = mock_bulk.call_args[0][0]
+                        assert reused['chunk_id'] == 1
+                        assert reused['vector_data'] == b"stored-vector"
+                        assert generated['chunk_id'] == 2
+                        mock_bulk.assert_called_once()
+                        mock_db.session.add.assert_not_called()
     
     def test_create_document_embeddings_document_not_found(self, embedding_service):
         """Test document embeddings creation with non-existent document."""
@@ -210,6 +279,8 @@ class TestEmbeddingService:
         mock_chunk.content = "test content"
         mock_chunk.position = 0
         mock_chunk.token_count = 10
+        mock_chunk.overlap_start = 0
+        mock_chunk.overlap_end = 0
         
         mock_document = Mock()
         mock_document.id = 1
@@ -223,32 +294,29 @@ class TestEmbeddingService:
         
         mock_chunk.document = mock_document
         
-        mock_embedding = Mock()
-        mock_embedding.id = 1
-        mock_embedding.chunk = mock_chunk
-        mock_embedding.get_vector.return_value = sample_embedding_vector
+        matrix = np.stack([sample_embedding_vector, -sample_embedding_vector])
         
-        with patch('app.models.knowledge.Embedding.query') as mock_query:
-            mock_query.join.return_value.filter.return_value.all.return_value = [mock_embedding]
-            
+        with patch('app.models.knowledge.Embedding.load_vector_matrix',
+                   return_value=(np.array([1, 2]), np.array([1, 2]), matrix)):
             embedding_service.generate_embedding = Mock(return_value=sample_embedding_vector)
-            embedding_service._calculate_cosine_similarity = Mock(return_value=0.9)
+            embedding_service._load_chunks_with_documents = Mock(return_value={1: mock_chunk})
             
             results = embedding_service.search_similar_chunks(1, "test query")
             
+            # Only the matching vector is loaded from the ORM
+            embedding_service._load_chunks_with_documents.assert_called_once_with([1])
             assert len(results) == 1
             result = results[0]
             assert result['chunk_id'] == 1
             assert result['document_id'] == 1
-            assert result['similarity_score'] == 0.9
+            assert result['similarity_score'] == pytest.approx(1.0, abs=1e-5)
             assert 'citations' in result
             assert 'metadata' in result
     
     def test_search_similar_chunks_no_embeddings(self, embedding_service):
         """Test similar chunks search with no embeddings."""
-        with patch('app.models.knowledge.Embedding.query') as mock_query:
-            mock_query.join.return_value.filter.return_value.all.return_value = []
-            
+        with patch('app.models.knowledge.Embedding.load_vector_matrix',
+                   return_value=([], [], np.empty((0, 3), dtype=np.float32))):
             embedding_service.generate_embedding = Mock(return_value=np.array([1, 2, 3]))
             
             results = embedding_service.search_similar_chunks(1, "test query")
@@ -256,18 +324,18 @@ class TestEmbeddingService:
     
     def test_search_similar_chunks_low_similarity(self, embedding_service, sample_embedding_vector):
         """Test similar chunks search with low similarity scores."""
-        mock_embedding = Mock()
-        mock_embedding.get_vector.return_value = sample_embedding_vector
-        mock_embedding.chunk = Mock()
+        # Orthogonal vector: cosine similarity 0, below threshold
+        orthogonal = np.zeros_like(sample_embedding_vector)
+        orthogonal[0], orthogonal[1] = sample_embedding_vector[1], -sample_embedding_vector[0]
         
-        with patch('app.models.knowledge.Embedding.query') as mock_query:
-            mock_query.join.return_value.filter.return_value.all.return_value = [mock_embedding]
-            
+        with patch('app.models.knowledge.Embedding.load_vector_matrix',
+                   return_value=(np.array([1]), np.array([1]), orthogonal[np.newaxis, :])):
             embedding_service.generate_embedding = Mock(return_value=sample_embedding_vector)
-            embedding_service._calculate_cosine_similarity = Mock(return_value=0.5)  # Below threshold
+            embedding_service._load_chunks_with_documents = Mock(return_value={})
             
             results = embedding_service.search_similar_chunks(1, "test query", min_similarity=0.7)
             assert results == []
+            embedding_service._load_chunks_with_documents.assert_not_called()
     
     def test_reindex_knowledge_source_success(self, embedding_service):
         """Test successful knowledge source re-indexing."""
@@ -278,15 +346,16 @@ class TestEmbeddingService:
         
         # Mock documents
         mock_documents = [Mock(id=1), Mock(id=2)]
+        mock_chunks = [Mock(id=1), Mock(id=2), Mock(id=3)]
         
         with patch('app.models.knowledge.KnowledgeSource.get_by_id', return_value=mock_source):
             with patch('app.models.knowledge.Document.get_by_source', return_value=mock_documents):
-                with patch('app.models.knowledge.Embedding.query') as mock_query:
-                    mock_query.join.return_value.filter.return_value.all.return_value = []
+                with patch('app.services.embedding_service.db') as mock_db, \
+                     patch('app.models.knowledge.Chunk.query') as mock_chunk_query:
+                    mock_db.session.query.return_value.join.return_value.filter.return_value = []
+                    mock_chunk_query.filter.return_value.order_by.return_value.all.return_value = mock_chunks
                     
-                    embedding_service.create_document_embeddings = Mock(
-                        side_effect=[[Mock(), Mock()], [Mock()]]  # 2 embeddings for doc1, 1 for doc2
-                    )
+                    embedding_service.create_chunk_embeddings = Mock(return_value=[Mock(), Mock(), Mock()])
                     
                     result = embedding_service.reindex_knowledge_source(1, 1)
                     
@@ -294,6 +363,62 @@ class TestEmbeddingService:
                     assert result['documents_processed'] == 2
                     assert result['embeddings_created'] == 3
                     assert result['embeddings_updated'] == 0
+                    assert result['embeddings_missing'] == 0
+                    
+                    # Chunks of all documents are embedded together
+                    embedding_service.create_chunk_embeddings.assert_called_once_with(
+                        1, mock_chunks, embedding_service.DEFAULT_MODEL
+                    )
+    
+    def test_reindex_knowledge_source_bulk_deletes_embeddings(self, embedding_service):
+        """Test existing embeddings are removed with one bulk delete."""
+        mock_source = Mock()
+        mock_source.id = 1
+        mock_source.tenant_id = 1
+        
+        with patch('app.models.knowledge.KnowledgeSource.get_by_id', return_value=mock_source):
+            with patch('app.models.knowledge.Document.get_by_source', return_value=[Mock(id=1)]):
+                with patch('app.services.embedding_service.db') as mock_db, \
+                     patch('app.models.knowledge.Embedding.query') as mock_query, \
+                     patch('app.models.knowledge.Chunk.query') as mock_chunk_query:
+                    mock_db.session.query.return_value.join.return_value.filter.return_value = [
+                        Mock(id=5), Mock(id=6)
+                    ]
+                    mock_chunk_query.filter.return_value.order_by.return_value.all.return_value = [
+                        Mock(id=1), Mock(id=2)
+                    ]
+                    embedding_service.create_chunk_embeddings = Mock(return_value=[Mock()])
+                    
+                    result = embedding_service.reindex_knowledge_source(1, 1)
+                    
+                    assert result['embeddings_updated'] == 2
+                    assert result['embeddings_missing'] == 1
+                    mock_query.filter.return_value.delete.assert_called_once_with(synchronize_session=False)
+                    mock_db.session.commit.assert_called_once()
+    
+    def test_reindex_knowledge_source_slices_chunks(self, embedding_service):
+        """Test a failed slice does not stop the remaining slices."""
+        mock_source = Mock()
+        mock_source.id = 1
+        mock_source.tenant_id = 1
+        mock_chunks = [Mock(id=i) for i in range(5)]
+        
+        with patch('app.models.knowledge.KnowledgeSource.get_by_id', return_value=mock_source):
+            with patch('app.models.knowledge.Document.get_by_source', return_value=[Mock(id=1)]):
+                with patch('app.services.embedding_service.db') as mock_db, \
+                     patch('app.models.knowledge.Chunk.query') as mock_chunk_query, \
+                     patch.object(EmbeddingService, 'REINDEX_SLICE_SIZE', 2):
+                    mock_db.session.query.return_value.join.return_value.filter.return_value = []
+                    mock_chunk_query.filter.return_value.order_by.return_value.all.return_value = mock_chunks
+                    embedding_service.create_chunk_embeddings = Mock(
+                        side_effect=[[Mock(), Mock()], ProcessingError("API down"), [Mock()]]
+                    )
+                    
+                    result = embedding_service.reindex_knowledge_source(1, 1)
+                    
+                    assert embedding_service.create_chunk_embeddings.call_count == 3
+                    assert result['embeddings_created'] == 3
+                    assert result['embeddings_missing'] == 2
     
     def test_reindex_knowledge_source_not_found(self, embedding_service):
         """Test knowledge source re-indexing with non-existent source."""
@@ -454,16 +579,10 @@ class TestEmbeddingService:
         
         mock_chunk.document = mock_document
         
-        mock_embedding = Mock()
-        mock_embedding.id = 1
-        mock_embedding.chunk = mock_chunk
-        mock_embedding.get_vector.return_value = sample_embedding_vector
-        
-        with patch('app.models.knowledge.Embedding.query') as mock_query:
-            mock_query.join.return_value.filter.return_value.join.return_value.filter.return_value.all.return_value = [mock_embedding]
-            
+        with patch('app.models.knowledge.Embedding.load_vector_matrix',
+                   return_value=(np.array([1]), np.array([1]), 0.9 * sample_embedding_vector[np.newaxis, :])) as mock_load:
             embedding_service.generate_embedding = Mock(return_value=sample_embedding_vector)
-            embedding_service._calculate_cosine_similarity = Mock(return_value=0.9)
+            embedding_service._load_chunks_with_documents = Mock(return_value={1: mock_chunk})
             embedding_service._calculate_relevance_score = Mock(return_value=0.85)
             embedding_service._generate_enhanced_citations = Mock(return_value={'test': 'citation'})
             
@@ -473,10 +592,11 @@ class TestEmbeddingService:
                 source_ids=[1]
             )
             
+            mock_load.assert_called_once_with(1, embedding_service.DEFAULT_MODEL, [1])
             assert len(results) == 1
             result = results[0]
             assert result['chunk_id'] == 1
-            assert result['similarity_score'] == 0.9
+            assert result['similarity_score'] == pytest.approx(1.0, abs=1e-5)
             assert result['relevance_score'] == 0.85
             assert 'content_preview' in result
             assert 'citations' in result
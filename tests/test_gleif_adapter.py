@@ -238,8 +238,9 @@ class TestGLEIFAdapter:
         assert len(results) == 2
         assert all(r['status'] in ['valid', 'not_found', 'error'] for r in results)
         
-        # Verify API was called for each LEI
-        assert mock_get.call_count == 2
+        # Verify the LEIs were looked up with one grouped request
+        assert mock_get.call_count == 1
+        assert 'filter[lei]' in mock_get.call_args[1]['params']
     
     @patch('requests.Session.get')
     def test_check_batch_with_errors(self, mock_get):
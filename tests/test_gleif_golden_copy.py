@@ -0,0 +1,359 @@
+"""Tests for the offline GLEIF Golden Copy store and bulk LEI lookups."""
+import csv
+import gzip
+import zipfile
+import pytest
+from unittest.mock import Mock, patch
+
+from app.services.kyb_adapters.gleif import GLEIFAdapter
+from app.services.kyb_adapters import gleif_golden_copy
+from app.services.kyb_adapters.gleif_golden_copy import GoldenCopyStore, lei_attributes
+
+
+def make_lei(base):
+    """Append ISO 17442 check digits to an 18-character LEI prefix."""
+    numeric = ''.join(str(int(char, 36)) for char in base)
+    return f"{base}{98 - int(numeric + '00') % 97:02d}"
+
+
+ALPHA = make_lei('5299000ALPHA000001')
+BETA = make_lei('5299000BETA0000002')
+GAMMA = make_lei('5299000GAMMA000003')
+
+LEI_COLUMNS = [
+    'LEI', 'Entity.LegalName', 'Entity.LegalAddress.FirstAddressLine',
+    'Entity.LegalAddress.AdditionalAddressLine.1', 'Entity.LegalAddress.City',
+    'Entity.LegalAddress.Country', 'Entity.LegalAddress.PostalCode',
+    'Entity.RegistrationAuthority.RegistrationAuthorityID', 'Entity.LegalForm.EntityLegalFormCode',
+    'Entity.EntityStatus', 'Registration.RegistrationStatus', 'Registration.LastUpdateDate'
+]
+
+RR_COLUMNS = [
+    'Relationship.StartNode.NodeID', 'Relationship.StartNode.NodeIDType',
+    'Relationship.EndNode.NodeID', 'Relationship.EndNode.NodeIDType',
+    'Relationship.RelationshipType', 'Relationship.RelationshipStatus',
+    'Registration.RegistrationStatus', 'Registration.LastUpdateDate'
+]
+
+
+def lei_row(lei, name, country='DE', status='ACTIVE', updated='2024-01-01T00:00:00Z'):
+    return [lei, name, 'Hauptstr. 1', 'Gebäude B', 'Berlin', country, '10115',
+            'RA000304', '2HBR', status, 'ISSUED', updated]
+
+
+def write_csv(path, columns, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    return str(path)
+
+
+LEI_XML = f"""<?xml version="1.0" encoding="UTF-8"?>
+<lei:LEIData xmlns:lei="http://www.gleif.org/data/schema/leidata/2016">
+  <lei:LEIRecords>
+    <lei:LEIRecord>
+      <lei:LEI>{GAMMA}</lei:LEI>
+      <lei:Entity>
+        <lei:LegalName xml:lang="en">Gamma Holdings Ltd</lei:LegalName>
+        <lei:LegalAddress>
+          <lei:FirstAddressLine>1 King Street</lei:FirstAddressLine>
+          <lei:AdditionalAddressLine>Floor 2</lei:AdditionalAddressLine>
+          <lei:City>London</lei:City>
+          <lei:Country>GB</lei:Country>
+          <lei:PostalCode>EC2V 8AU</lei:PostalCode>
+        </lei:LegalAddress>
+        <lei:RegistrationAuthority>
+          <lei:RegistrationAuthorityID>RA000585</lei:RegistrationAuthorityID>
+        </lei:RegistrationAuthority>
+        <lei:LegalForm><lei:EntityLegalFormCode>H0PO</lei:EntityLegalFormCode></lei:LegalForm>
+        <lei:EntityStatus>ACTIVE</lei:EntityStatus>
+      </lei:Entity>
+      <lei:Registration>
+        <lei:LastUpdateDate>2024-02-01T00:00:00Z</lei:LastUpdateDate>
+        <lei:RegistrationStatus>ISSUED</lei:RegistrationStatus>
+      </lei:Registration>
+    </lei:LEIRecord>
+  </lei:LEIRecords>
+</lei:LEIData>"""
+
+RR_XML = f"""<?xml version="1.0" encoding="UTF-8"?>
+<rr:RelationshipData xmlns:rr="http://www.gleif.org/data/schema/rr/2016">
+  <rr:RelationshipRecords>
+    <rr:RelationshipRecord>
+      <rr:Relationship>
+        <rr:StartNode><rr:NodeID>{ALPHA}</rr:NodeID><rr:NodeIDType>LEI</rr:NodeIDType></rr:StartNode>
+        <rr:EndNode><rr:NodeID>{GAMMA}</rr:NodeID><rr:NodeIDType>LEI</rr:NodeIDType></rr:EndNode>
+        <rr:RelationshipType>IS_DIRECTLY_CONSOLIDATED_BY</rr:RelationshipType>
+        <rr:RelationshipStatus>ACTIVE</rr:RelationshipStatus>
+      </rr:Relationship>
+      <rr:Registration>
+        <rr:LastUpdateDate>2024-02-01T00:00:00Z</rr:LastUpdateDate>
+        <rr:RegistrationStatus>PUBLISHED</rr:RegistrationStatus>
+      </rr:Registration>
+    </rr:RelationshipRecord>
+  </rr:RelationshipRecords>
+</rr:RelationshipData>"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    return GoldenCopyStore(str(tmp_path / 'golden_copy.db'))
+
+
+@pytest.fixture
+def lei_csv(tmp_path):
+    return write_csv(tmp_path / '20240101-0000-gleif-goldencopy-lei2-golden-copy.csv', LEI_COLUMNS, [
+        lei_row(ALPHA, 'Alpha GmbH'),
+        lei_row(BETA, 'Alpha Beta AG', country='AT')
+    ])
+
+
+@pytest.fixture
+def adapter(store, lei_csv):
+    store.ingest(lei_csv)
+    gleif_adapter = GLEIFAdapter()
+    gleif_adapter.golden_copy = store
+    return gleif_adapter
+
+
+def api_record(lei, name):
+    return {
+        'id': lei,
+        'type': 'lei-records',
+        'attributes': {
+            'lei': lei,
+            'entity': {'legalName': {'name': name}, 'status': 'ACTIVE', 'legalAddress': {'country': 'FR'}},
+            'registration': {}
+        }
+    }
+
+
+def api_response(records):
+    response = Mock()
+    response.status_code = 200
+    response.text = ''
+    response.json.return_value = {'data': records}
+    return response
+
+
+class TestGoldenCopyParsing:
+    """Test stream parsing of Golden Copy files."""
+
+    def test_csv_converted_to_api_attributes(self, store, lei_csv):
+        result = store.ingest(lei_csv)
+
+        attributes = store.get(ALPHA)
+        assert result['kind'] == 'lei'
+        assert result['records'] == 2
+        assert attributes['entity']['legalName']['name'] == 'Alpha GmbH'
+        assert attributes['entity']['legalAddress']['addressLines_2'] == 'Gebäude B'
+        assert attributes['registration']['registrationAuthority']['id'] == 'RA000304'
+
+    def test_zipped_xml(self, store, tmp_path):
+        path = tmp_path / 'lei2-golden-copy.xml.zip'
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('lei2-golden-copy.xml', LEI_XML)
+
+        store.ingest(str(path))
+
+        attributes = store.get(GAMMA)
+        assert attributes['entity']['legalName']['name'] == 'Gamma Holdings Ltd'
+        assert attributes['entity']['legalAddress']['addressLines_2'] == 'Floor 2'
+        assert attributes['entity']['legalForm']['id'] == 'H0PO'
+
+    def test_gzipped_relationship_xml(self, store, tmp_path):
+        path = tmp_path / 'rr-golden-copy.xml.gz'
+        with gzip.open(path, 'wt', encoding='utf-8') as handle:
+            handle.write(RR_XML)
+
+        result = store.ingest(str(path))
+
+        assert result['kind'] == 'rr'
+        assert store.relationships(GAMMA)[0]['relationship']['startNode']['id'] == ALPHA
+        assert store.relationships(ALPHA)[0]['relationship']['type'] == 'IS_DIRECTLY_CONSOLIDATED_BY'
+
+    def test_parsed_xml_records_are_released(self, tmp_path):
+        path = tmp_path / 'lei2-golden-copy.xml'
+        record = LEI_XML[LEI_XML.index('<lei:LEIRecord>'):LEI_XML.index('</lei:LEIRecords>')]
+        path.write_text(LEI_XML.replace(record, record * 3), encoding='utf-8')
+
+        parsed = []
+        iterparse = gleif_golden_copy.ET.iterparse
+
+        def recording_iterparse(*args, **kwargs):
+            for event, element in iterparse(*args, **kwargs):
+                parsed.append(element)
+                yield event, element
+
+        with patch.object(gleif_golden_copy.ET, 'iterparse', recording_iterparse):
+            rows = list(gleif_golden_copy._iter_rows(str(path)))
+
+        container = next(element for element in parsed if element.tag.endswith('LEIRecords'))
+        assert [kind for kind, _ in rows] == ['lei'] * 3
+        assert len(container) == 0
+
+    def test_record_without_lei_skipped(self):
+        assert lei_attributes({'Entity.LegalName': 'No LEI'}) is None
+
+    def test_unsupported_format(self, store, tmp_path):
+        path = tmp_path / 'golden-copy.json'
+        path.write_text('{}')
+
+        with pytest.raises(ValueError):
+            store.ingest(str(path))
+
+
+class TestGoldenCopyUpdates:
+    """Test full and delta ingestion."""
+
+    def test_full_file_replaces_records(self, store, lei_csv, tmp_path):
+        store.ingest(lei_csv)
+        full = write_csv(tmp_path / '20240102-full.csv', LEI_COLUMNS, [lei_row(BETA, 'Beta AG')])
+
+        store.ingest(full)
+
+        assert store.get(ALPHA) is None
+        assert store.get(BETA)['entity']['legalName']['name'] == 'Beta AG'
+
+    def test_delta_updates_only_newer_records(self, store, lei_csv, tmp_path):
+        store.ingest(lei_csv)
+        delta = write_csv(tmp_path / '20240102-delta.csv', LEI_COLUMNS, [
+            lei_row(ALPHA, 'Alpha Renamed GmbH', updated='2024-01-02T00:00:00Z'),
+            lei_row(BETA, 'Stale Beta AG', updated='2023-12-01T00:00:00Z'),
+            lei_row(GAMMA, 'Gamma GmbH', updated='2024-01-02T00:00:00Z')
+        ])
+
+        store.ingest(delta, delta=True)
+
+        assert store.get(ALPHA)['entity']['legalName']['name'] == 'Alpha Renamed GmbH'
+        assert store.get(BETA)['entity']['legalName']['name'] == 'Alpha Beta AG'
+        assert store.get(GAMMA) is not None
+        assert store.stats()['lei_records'] == 3
+
+    def test_ingested_file_skipped(self, store, lei_csv):
+        store.ingest(lei_csv)
+
+        assert store.ingest(lei_csv)['skipped'] is True
+        assert store.ingest(lei_csv, force=True)['records'] == 2
+
+    def test_failed_ingest_keeps_previous_records(self, store, lei_csv, tmp_path):
+        store.ingest(lei_csv)
+        broken = tmp_path / 'broken.xml'
+        broken.write_text(f'<LEIData><LEIRecord><LEI>{GAMMA}</LEI></LEIRecord><LEIRecord>')
+
+        with pytest.raises(Exception):
+            store.ingest(str(broken))
+
+        assert store.get(ALPHA) is not None
+
+
+class TestOfflineLookups:
+    """Test adapter lookups answered from the Golden Copy."""
+
+    @patch('requests.Session.get')
+    def test_check_single_offline(self, mock_get, adapter):
+        result = adapter.check_single(ALPHA)
+
+        mock_get.assert_not_called()
+        assert result['status'] == 'valid'
+        assert result['offline'] is True
+        assert result['legal_name'] == 'Alpha GmbH'
+        assert result['legal_address'] == 'Hauptstr. 1, Gebäude B, Berlin, 10115, DE'
+
+    @patch('requests.Session.get')
+    def test_check_single_falls_back_to_api(self, mock_get, adapter):
+        mock_get.return_value = api_response(api_record(GAMMA, 'Gamma SA'))
+
+        result = adapter.check_single(GAMMA)
+
+        assert mock_get.call_count == 1
+        assert result['legal_name'] == 'Gamma SA'
+        assert not result.get('offline')
+
+    @patch('requests.Session.get')
+    def test_search_by_name_offline(self, mock_get, adapter):
+        results = adapter.search_by_name('alpha')
+
+        mock_get.assert_not_called()
+        assert {r['lei_code'] for r in results} == {ALPHA, BETA}
+        assert adapter.search_by_name('Alpha GmbH')[0]['lei_code'] == ALPHA
+        assert [r['lei_code'] for r in adapter.search_by_name('Alpha', country_code='at')] == [BETA]
+
+    @patch('requests.Session.get')
+    def test_relationships_offline(self, mock_get, adapter, store, tmp_path):
+        write_csv(tmp_path / 'rr.csv', RR_COLUMNS, [
+            [ALPHA, 'LEI', BETA, 'LEI', 'IS_ULTIMATELY_CONSOLIDATED_BY', 'ACTIVE', 'PUBLISHED', '2024-01-01']
+        ])
+        store.ingest(str(tmp_path / 'rr.csv'))
+
+        result = adapter.get_lei_relationships(BETA)
+
+        mock_get.assert_not_called()
+        assert result['status'] == 'success'
+        assert result['relationships']['data'][0]['attributes']['relationship']['startNode']['id'] == ALPHA
+        assert adapter.get_lei_relationships(GAMMA)['status'] == 'not_found'
+
+    def test_update_golden_copy(self, adapter, tmp_path):
+        delta = write_csv(tmp_path / 'delta.csv', LEI_COLUMNS, [lei_row(GAMMA, 'Gamma GmbH')])
+
+        result = adapter.update_golden_copy(delta, delta=True)
+
+        assert result['success'] is True
+        assert result['records'] == 1
+        assert result['lei_records'] == 3
+        assert adapter.get_golden_copy_info()['enabled'] is True
+
+    def test_update_without_store(self):
+        result = GLEIFAdapter().update_golden_copy('missing.csv')
+
+        assert result['success'] is False
+
+
+class TestBulkCheck:
+    """Test grouping of batch LEI lookups into multi-LEI requests."""
+
+    @patch('requests.Session.get')
+    def test_groups_leis_into_requests(self, mock_get):
+        mock_get.return_value = api_response([api_record(ALPHA, 'Alpha SA')])
+        adapter = GLEIFAdapter()
+        adapter.bulk_batch_size = 2
+
+        results = adapter.check_batch([ALPHA, 'INVALID', BETA, GAMMA])
+
+        assert mock_get.call_count == 2
+        requested = sorted(call[1]['params']['filter[lei]'] for call in mock_get.call_args_list)
+        assert requested == sorted([f'{ALPHA},{BETA}', GAMMA])
+        assert [r['status'] for r in results] == ['valid', 'validation_error', 'not_found', 'not_found']
+        assert results[0]['identifier'] == ALPHA
+
+    @patch('requests.Session.get')
+    def test_offline_records_not_requested(self, mock_get, adapter):
+        mock_get.return_value = api_response([api_record(GAMMA, 'Gamma SA')])
+
+        results = adapter.check_batch([ALPHA, GAMMA, ALPHA])
+
+        assert mock_get.call_count == 1
+        assert mock_get.call_args[1]['params']['filter[lei]'] == GAMMA
+        assert [r['legal_name'] for r in results] == ['Alpha GmbH', 'Gamma SA', 'Alpha GmbH']
+
+    @patch('requests.Session.get')
+    def test_failed_request_marks_its_group(self, mock_get):
+        error = Mock()
+        error.status_code = 503
+        error.text = ''
+        mock_get.return_value = error
+        adapter = GLEIFAdapter()
+
+        results = adapter.check_batch([ALPHA, BETA])
+
+        assert [r['status'] for r in results] == ['unavailable', 'unavailable']
+
+    @patch('requests.Session.get')
+    def test_per_lei_mode(self, mock_get):
+        mock_get.return_value = api_response(api_record(ALPHA, 'Alpha SA'))
+        adapter = GLEIFAdapter()
+
+        adapter.check_batch([ALPHA, BETA], bulk=False, batch_delay=0)
+
+        assert mock_get.call_count == 2
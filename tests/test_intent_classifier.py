@@ -0,0 +1,217 @@
+"""Tests for tiered intent routing."""
+
+import json
+import pytest
+from unittest.mock import Mock, patch
+from app.secretary.agents.router_agent import RouterAgent
+from app.secretary.agents.base_agent import AgentContext
+from app.secretary.agents.intent_classifier import (
+    KeywordIntentMatcher, LocalIntentClassifier, load_replay_set
+)
+
+
+@pytest.fixture
+def router_agent():
+    """Create a RouterAgent with the fast path enabled and no trained classifier."""
+    return RouterAgent(fast_path=True, classifier=LocalIntentClassifier())
+
+
+@pytest.fixture
+def sample_context():
+    return AgentContext(tenant_id="test-tenant-123", channel_type="telegram")
+
+
+class TestKeywordIntentMatcher:
+    """Test cases for KeywordIntentMatcher."""
+
+    @pytest.fixture
+    def matcher(self):
+        return KeywordIntentMatcher(RouterAgent(fast_path=False).intent_categories)
+
+    def test_clear_match(self, matcher):
+        """Test several keywords of one category give a confident match."""
+        category, confidence, keywords = matcher.match("Please send me the invoice for my last payment")
+
+        assert category == "billing"
+        assert confidence >= 0.85
+        assert keywords == ["invoice", "payment"]
+
+    def test_single_keyword_is_not_confident(self, matcher):
+        """Test one keyword alone stays below the bypass threshold."""
+        category, confidence, _ = matcher.match("Do you offer a demo?")
+
+        assert category == "sales"
+        assert confidence < 0.85
+
+    def test_competing_categories_are_ambiguous(self, matcher):
+        """Test matches in two categories are left to the LLM."""
+        _, confidence, _ = matcher.match("I need help with a refund")
+
+        assert confidence <= 0.5
+
+    def test_word_boundaries(self, matcher):
+        """Test keywords inside other words do not match."""
+        category, _, _ = matcher.match("Rebuying habits of a quotidian life")
+
+        assert category is None
+
+    def test_other_languages(self, matcher):
+        """Test localized keywords are matched."""
+        category, confidence, _ = matcher.match("Ich habe eine Frage zu meiner Rechnung und der Zahlung")
+
+        assert category == "billing"
+        assert confidence >= 0.85
+
+
+class TestTieredRouting:
+    """Test cases for RouterAgent tiered intent detection."""
+
+    @pytest.mark.asyncio
+    async def test_keyword_tier_skips_llm(self, router_agent, sample_context):
+        """Test clear messages are routed without calling OpenAI."""
+        with patch.object(router_agent, '_call_openai') as mock_openai:
+            result = await router_agent.detect_intent(
+                "What is the pricing for the enterprise plan, and can I get a demo?", sample_context
+            )
+
+        mock_openai.assert_not_called()
+        assert result.category == "sales"
+        assert result.intent == "sales"
+        assert result.routing_metadata["tier"] == "keyword"
+        assert result.routing_metadata["llm_bypassed"] is True
+        assert result.message.startswith("What is the pricing")
+
+    @pytest.mark.asyncio
+    async def test_ambiguous_message_uses_llm(self, router_agent, sample_context):
+        """Test ambiguous messages still go to OpenAI."""
+        mock_response = json.dumps({"category": "billing", "confidence": 0.9, "language": "en"})
+
+        with patch.object(router_agent, '_call_openai', return_value=mock_response) as mock_openai:
+            result = await router_agent.detect_intent("I need help with a refund", sample_context)
+
+        mock_openai.assert_called_once()
+        assert result.category == "billing"
+        assert result.routing_metadata["tier"] == "llm"
+
+    @pytest.mark.asyncio
+    async def test_classifier_tier(self, sample_context):
+        """Test a confident local classifier prediction skips OpenAI."""
+        classifier = Mock(is_trained=True)
+        classifier.predict.return_value = ("operations", 0.93)
+        router_agent = RouterAgent(fast_path=True, classifier=classifier)
+
+        with patch.object(router_agent, '_call_openai') as mock_openai:
+            result = await router_agent.detect_intent("Where can I find your office?", sample_context)
+
+        mock_openai.assert_not_called()
+        assert result.category == "operations"
+        assert result.confidence == 0.93
+        assert result.routing_metadata["tier"] == "classifier"
+
+    @pytest.mark.asyncio
+    async def test_unconfident_classifier_uses_llm(self, sample_context):
+        """Test predictions below the threshold fall through to OpenAI."""
+        classifier = Mock(is_trained=True)
+        classifier.predict.return_value = ("operations", 0.41)
+        router_agent = RouterAgent(fast_path=True, classifier=classifier)
+        mock_response = json.dumps({"category": "support", "confidence": 0.8, "language": "en"})
+
+        with patch.object(router_agent, '_call_openai', return_value=mock_response):
+            result = await router_agent.detect_intent("Something odd happened yesterday", sample_context)
+
+        assert result.category == "support"
+        assert result.routing_metadata["tier"] == "llm"
+
+    @pytest.mark.asyncio
+    async def test_routing_metrics(self, router_agent, sample_context):
+        """Test the LLM bypass rate is tracked per tier."""
+        mock_response = json.dumps({"category": "support", "confidence": 0.8, "language": "en"})
+
+        with patch.object(router_agent, '_call_openai', return_value=mock_response):
+            await router_agent.detect_intent("Please send the invoice for this payment", sample_context)
+            await router_agent.detect_intent("The app shows an error and crashes on login", sample_context)
+            await router_agent.detect_intent("Something odd happened yesterday", sample_context)
+
+        metrics = router_agent.get_routing_metrics()
+        assert metrics["total"] == 3
+        assert metrics["by_tier"] == {"keyword": 2, "classifier": 0, "llm": 1}
+        assert metrics["llm_bypass_rate"] == pytest.approx(2 / 3)
+
+    @pytest.mark.asyncio
+    async def test_evaluate_replay(self, router_agent):
+        """Test replay evaluation reports bypass rate and accuracy without calling OpenAI."""
+        samples = load_replay_set([
+            json.dumps({"message": "Please send the invoice for this payment", "intent": "billing"}),
+            json.dumps({"message": "The app shows an error and crashes on login", "intent": "support"}),
+            json.dumps({"message": "What are your opening hours and address?", "intent": "billing"}),
+            "",
+            json.dumps({"message": "Something odd happened yesterday", "intent": "support"})
+        ])
+
+        with patch.object(router_agent, '_call_openai') as mock_openai:
+            report = await router_agent.evaluate_replay(samples)
+
+        mock_openai.assert_not_called()
+        assert report["samples"] == 4
+        assert report["llm_bypass_rate"] == 0.75
+        assert report["bypass_accuracy"] == pytest.approx(2 / 3)
+        assert report["by_tier"]["llm"]["count"] == 1
+        assert report["by_tier"]["llm"]["accuracy"] is None
+        assert router_agent.get_routing_metrics()["total"] == 0
+
+    def test_load_replay_set_rejects_unknown_intent(self):
+        """Test replay records must use a known intent."""
+        with pytest.raises(ValueError, match="Line 1"):
+            load_replay_set([json.dumps({"message": "Hi", "intent": "smalltalk"})])
+
+
+class TestLocalIntentClassifier:
+    """Test cases for LocalIntentClassifier."""
+
+    def _training_data(self):
+        examples = {
+            'sales': ["What does the premium plan cost", "Can I get a quote for 20 seats",
+                      "I would like to book a product demo", "Do you have discounts for startups"],
+            'support': ["The dashboard does not load", "I cannot log in to my account",
+                        "Uploading files fails every time", "The integration stopped syncing"],
+            'billing': ["I was charged twice this month", "Where can I download my invoice",
+                        "Please update my card details", "I want my money back for last month"],
+            'operations': ["When are you open on Saturdays", "What is your office address",
+                           "How can I reach your team by phone", "Are you closed on public holidays"]
+        }
+        texts, labels = [], []
+        for label, messages in examples.items():
+            for repeat in range(4):
+                for message in messages:
+                    texts.append(f"{message} {'please' * repeat}".strip())
+                    labels.append(label)
+        return texts, labels
+
+    def test_train_predict_save_load(self, tmp_path):
+        """Test a trained model predicts and survives a save/load round trip."""
+        pytest.importorskip('sklearn')
+        classifier = LocalIntentClassifier()
+        texts, labels = self._training_data()
+
+        counts = classifier.train(texts, labels)
+        assert counts == {'sales': 16, 'support': 16, 'billing': 16, 'operations': 16}
+
+        category, probability = classifier.predict("I was charged twice, where is my invoice")
+        assert category == "billing"
+        assert 0 < probability <= 1
+
+        path = tmp_path / "intent.pkl"
+        classifier.save(str(path))
+        loaded = LocalIntentClassifier.load(str(path))
+        assert loaded.predict("I was charged twice, where is my invoice")[0] == "billing"
+        assert loaded.sample_count == 64
+
+    def test_train_requires_enough_samples(self):
+        """Test training refuses tiny data sets."""
+        pytest.importorskip('sklearn')
+        with pytest.raises(ValueError, match="At least"):
+            LocalIntentClassifier().train(["hello"], ["sales"])
+
+    def test_untrained_predict(self):
+        """Test an untrained classifier makes no prediction."""
+        assert LocalIntentClassifier().predict("hello") == (None, 0.0)
@@ -47,7 +47,7 @@ class TestKnowledgeDocumentProcessing:
             test_file.name = 'test.txt'
             
             # Mock document processing
-            with patch('app.services.knowledge_service.DocumentProcessor') as mock_processor:
+            with patch('app.services.document_processor.DocumentProcessor') as mock_processor:
                 mock_processor.extract_text_from_file.return_value = {
                     'content': test_content,
                     'token_count': 12,
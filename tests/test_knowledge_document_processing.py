@@ -42,7 +42,7 @@ class TestDocumentUploadProcessing:
             test_file.name = 'test_document.txt'
             
             # Mock document processing
-            with patch('app.services.knowledge_service.DocumentProcessor') as mock_processor:
+            with patch('app.services.document_processor.DocumentProcessor') as mock_processor:
                 mock_processor.extract_text_from_file.return_value = {
                     'content': test_content.strip(),
                     'token_count': 85,
@@ -128,7 +128,7 @@ class TestDocumentUploadProcessing:
             test_file.name = 'test.pdf'
             
             # Mock PDF processing
-            with patch('app.services.knowledge_service.DocumentProcessor') as mock_processor:
+            with patch('app.services.document_processor.DocumentProcessor') as mock_processor:
                 mock_processor.extract_text_from_file.return_value = {
                     'content': 'This is extracted text from PDF document. It contains important business information.',
                     'token_count': 15,
@@ -226,7 +226,7 @@ class TestDocumentUploadProcessing:
             test_file.name = 'large_document.txt'
             
             # Mock processing with multiple chunks
-            with patch('app.services.knowledge_service.DocumentProcessor') as mock_processor:
+            with patch('app.services.document_processor.DocumentProcessor') as mock_processor:
                 mock_processor.extract_text_from_file.return_value = {
                     'content': large_content.strip(),
                     'token_count': 450,
@@ -301,7 +301,7 @@ class TestDocumentUploadProcessing:
             test_file1.name = 'original.txt'
             
             # Mock processing
-            with patch('app.services.knowledge_service.DocumentProcessor') as mock_processor:
+            with patch('app.services.document_processor.DocumentProcessor') as mock_processor:
                 mock_processor.extract_text_from_file.return_value = {
                     'content': test_content,
                     'token_count': 10,
@@ -406,7 +406,7 @@ class TestDocumentUploadProcessing:
             large_file.name = 'huge.txt'
             
             # Mock processor to raise size error
-            with patch('app.services.knowledge_service.DocumentProcessor') as mock_processor:
+            with patch('app.services.document_processor.DocumentProcessor') as mock_processor:
                 mock_processor.extract_text_from_file.side_effect = ProcessingError("File too large")
                 
                 response = self.client.post(
@@ -437,7 +437,7 @@ class TestDocumentUploadProcessing:
             test_file.name = 'error.txt'
             
             # Mock processing error
-            with patch('app.services.knowledge_service.DocumentProcessor') as mock_processor:
+            with patch('app.services.document_processor.DocumentProcessor') as mock_processor:
                 mock_processor.extract_text_from_file.side_effect = ProcessingError("Processing failed")
                 
                 response = self.client.post(
@@ -340,6 +340,47 @@ class TestEmbedding:
             assert embedding.model_name == "text-embedding-ada-002"
             assert embedding.dimension == 5
     
+    def test_bulk_create_chunks_and_embeddings(self, app):
+        """Test bulk inserts return generated ids in row order."""
+        with app.app_context():
+            tenant = Tenant(name="Test", slug="test")
+            tenant.save()
+            
+            document = Document(tenant_id=tenant.id, title="Bulk Document")
+            document.save()
+            
+            chunk_ids = Chunk.bulk_create([
+                {
+                    'tenant_id': tenant.id,
+                    'document_id': document.id,
+                    'content': f"Bulk chunk {position}",
+                    'position': position
+                }
+                for position in range(5)
+            ], batch_size=2)
+            
+            assert len(chunk_ids) == 5
+            chunks = {chunk.id: chunk for chunk in Chunk.query.filter(Chunk.id.in_(chunk_ids))}
+            assert [chunks[chunk_id].position for chunk_id in chunk_ids] == [0, 1, 2, 3, 4]
+            assert chunks[chunk_ids[0]].content_hash == Chunk.hash_content("Bulk chunk 0")
+            assert chunks[chunk_ids[0]].created_at is not None
+            
+            embedding_ids = Embedding.bulk_create([
+                {
+                    'tenant_id': tenant.id,
+                    'chunk_id': chunk_id,
+                    'model_name': "test-model",
+                    'vector': np.array([float(position), 1.0, 0.0])
+                }
+                for position, chunk_id in enumerate(chunk_ids)
+            ], batch_size=2)
+            
+            assert len(embedding_ids) == 5
+            embedding = Embedding.get_by_id(embedding_ids[3])
+            assert embedding.chunk_id == chunk_ids[3]
+            assert embedding.dimension == 3
+            np.testing.assert_array_equal(embedding.get_vector(), np.array([3.0, 1.0, 0.0]))
+    
     def test_embedding_vector_operations(self, app):
         """Test embedding vector operations."""
         with app.app_context():
@@ -35,12 +35,13 @@ class TestKnowledgeSearch:
             ]
             mock_service_instance.search_similar_chunks.return_value = mock_results
             
-            results = KnowledgeService.search_knowledge(
-                tenant_id=1,
-                query="test query",
-                limit=10,
-                min_similarity=0.7
-            )
+            with patch('app.services.knowledge_service.LexicalSearchIndex.search', return_value=[]):
+                results = KnowledgeService.search_knowledge(
+                    tenant_id=1,
+                    query="test query",
+                    limit=10,
+                    min_similarity=0.7
+                )
             
             assert len(results) == 1
             assert results[0]['similarity_score'] == 0.9
@@ -49,12 +50,15 @@ class TestKnowledgeSearch:
             mock_service_instance.search_similar_chunks.assert_called_once_with(
                 tenant_id=1,
                 query="test query",
-                limit=10,
-                min_similarity=0.7
+                limit=30,
+                min_similarity=0.7,
+                model=None,
+                source_ids=None,
+                query_vector=None
             )
     
     def test_search_knowledge_fallback_to_text_search(self):
-        """Test fallback to text search when vector search fails."""
+        """Test full-text results are returned when vector search fails."""
         with patch('app.services.knowledge_service.EmbeddingService') as mock_embedding_service:
             mock_service_instance = Mock()
             mock_embedding_service.return_value = mock_service_instance
@@ -62,20 +66,24 @@ class TestKnowledgeSearch:
             # Mock vector search failure
             mock_service_instance.search_similar_chunks.side_effect = Exception("Vector search failed")
             
-            # Mock text search
-            mock_document = Mock()
-            mock_document.id = 1
-            mock_document.title = "Test Document"
-            mock_document.content = "This is test content with query terms"
-            mock_document.url = "http://example.com"
-            mock_document.source = Mock()
-            mock_document.source.id = 1
-            mock_document.source.name = "Test Source"
-            mock_document.source.source_type = "url"
-            mock_document.source.source_url = "http://example.com"
+            # Mock full-text match
+            mock_chunk = Mock()
+            mock_chunk.id = 7
+            mock_chunk.content = "This is test content with query terms"
+            mock_chunk.position = 0
+            mock_chunk.token_count = 8
+            mock_chunk.get_content_preview.return_value = mock_chunk.content
+            mock_chunk.document.id = 1
+            mock_chunk.document.title = "Test Document"
+            mock_chunk.document.url = "http://example.com"
+            mock_chunk.document.source.id = 1
+            mock_chunk.document.source.name = "Test Source"
+            mock_chunk.document.source.source_type = "url"
+            mock_chunk.document.source.source_url = "http://example.com"
             
-            with patch('app.models.knowledge.Document.query') as mock_query:
-                mock_query.join.return_value.filter.return_value.limit.return_value.all.return_value = [mock_document]
+            with patch('app.services.knowledge_service.LexicalSearchIndex.search', return_value=[(7, 3.0)]), \
+                 patch('app.models.knowledge.Chunk.query') as mock_query:
+                mock_query.options.return_value.filter.return_value.all.return_value = [mock_chunk]
                 
                 results = KnowledgeService.search_knowledge(
                     tenant_id=1,
@@ -85,10 +93,37 @@ class TestKnowledgeSearch:
                 )
                 
                 assert len(results) == 1
+                assert results[0]['chunk_id'] == 7
                 assert results[0]['document_id'] == 1
                 assert results[0]['title'] == "Test Document"
-                assert 'citations' in results[0]
-                assert results[0]['metadata']['search_type'] == 'text_fallback'
+                assert results[0]['similarity_score'] == 0.75
+                assert results[0]['citations']['source_name'] == "Test Source"
+                assert results[0]['metadata']['search_type'] == 'lexical'
+    
+    def test_search_knowledge_fuses_vector_and_text_rankings(self):
+        """Test vector and full-text rankings are combined with reciprocal-rank fusion."""
+        vector_results = [
+            {'chunk_id': 1, 'similarity_score': 0.9, 'metadata': {'document_title': 'A'}},
+            {'chunk_id': 2, 'similarity_score': 0.8, 'metadata': {'document_title': 'B'}}
+        ]
+        lexical_results = [
+            {'chunk_id': 2, 'lexical_score': 4.0, 'metadata': {'search_type': 'lexical'}},
+            {'chunk_id': 3, 'lexical_score': 2.0, 'metadata': {'search_type': 'lexical'}}
+        ]
+        
+        with patch('app.services.knowledge_service.EmbeddingService') as mock_embedding_service, \
+             patch.object(KnowledgeService, '_search_chunk_text', return_value=lexical_results):
+            mock_embedding_service.return_value.search_similar_chunks.return_value = vector_results
+            
+            results = KnowledgeService.search_knowledge(tenant_id=1, query="test query", limit=2)
+        
+        # Chunk 2 is ranked by both searches and moves to the top
+        assert [result['chunk_id'] for result in results] == [2, 1]
+        assert results[0]['metadata']['search_type'] == 'hybrid'
+        assert results[0]['similarity_score'] == 0.8
+        assert results[0]['lexical_score'] == 4.0
+        assert results[1]['metadata']['search_type'] == 'vector'
+        assert results[0]['fusion_score'] > results[1]['fusion_score']
     
     def test_search_knowledge_no_results(self):
         """Test knowledge search with no results."""
@@ -99,10 +134,8 @@ class TestKnowledgeSearch:
             # Mock empty vector search results
             mock_service_instance.search_similar_chunks.return_value = []
             
-            # Mock empty text search results
-            with patch('app.models.knowledge.Document.query') as mock_query:
-                mock_query.join.return_value.filter.return_value.limit.return_value.all.return_value = []
-                
+            # Mock empty full-text results
+            with patch('app.services.knowledge_service.LexicalSearchIndex.search', return_value=[]):
                 results = KnowledgeService.search_knowledge(
                     tenant_id=1,
                     query="nonexistent query",
@@ -148,10 +181,11 @@ class TestKnowledgeSearch:
             ]
             mock_service_instance.search_similar_chunks.return_value = mock_results
             
-            results = KnowledgeService.search_knowledge(
-                tenant_id=1,
-                query="test query"
-            )
+            with patch('app.services.knowledge_service.LexicalSearchIndex.search', return_value=[]):
+                results = KnowledgeService.search_knowledge(
+                    tenant_id=1,
+                    query="test query"
+                )
             
             assert len(results) == 1
             result = results[0]
@@ -179,8 +213,8 @@ class TestKnowledgeSearch:
             # Mock both vector and text search failures
             mock_service_instance.search_similar_chunks.side_effect = Exception("Vector search failed")
             
-            with patch('app.models.knowledge.Document.query') as mock_query:
-                mock_query.join.side_effect = Exception("Database error")
+            with patch('app.services.knowledge_service.LexicalSearchIndex.search',
+                       side_effect=Exception("Database error")):
                 
                 with pytest.raises(ProcessingError, match="Failed to search knowledge"):
                     KnowledgeService.search_knowledge(
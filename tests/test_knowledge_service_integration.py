@@ -7,7 +7,8 @@ from werkzeug.datastructures import FileStorage
 from io import BytesIO
 
 from app.services.knowledge_service import KnowledgeService
-from app.models.knowledge import KnowledgeSource, Document, Chunk
+from app.services.site_crawler import CrawlPage
+from app.models.knowledge import KnowledgeSource, Document
 from app.utils.exceptions import ValidationError, ProcessingError
 
 
@@ -102,83 +103,73 @@ class TestKnowledgeServiceIntegration:
                     url="not-a-url"
                 )
     
-    @patch('app.services.knowledge_service.DocumentProcessor')
-    @patch('app.services.knowledge_service.TextChunker')
     @patch('os.makedirs')
     @patch('os.path.getsize')
-    def test_upload_document_success(self, mock_getsize, mock_makedirs, mock_chunker_class, 
-                                   mock_processor, mock_app_context, sample_knowledge_source):
-        """Test successful document upload and processing."""
-        # Setup mocks
+    def test_upload_document_success(self, mock_getsize, mock_makedirs,
+                                   mock_app_context, sample_knowledge_source):
+        """Test document upload creates a pending document and schedules ingestion."""
         mock_getsize.return_value = 1024
         
-        # Mock DocumentProcessor
-        mock_processor.extract_text_from_file.return_value = {
-            'content': 'Test document content',
-            'token_count': 10,
-            'content_hash': 'abc123',
-            'metadata': {'title': 'Test Document', 'format': 'plain_text'}
-        }
+        file = FileStorage(
+            stream=BytesIO(b"Test file content"),
+            filename="test.txt",
+            content_type="text/plain"
+        )
         
-        # Mock TextChunker
-        mock_chunker = MagicMock()
-        mock_chunker.chunk_document_content.return_value = [
-            {
-                'content': 'Test document content',
-                'position': 0,
-                'token_count': 10,
-                'overlap_start': 0,
-                'overlap_end': 0,
-                'chunk_type': 'single',
-                'is_first': True,
-                'is_last': True
-            }
-        ]
-        mock_chunker_class.return_value = mock_chunker
+        with patch.object(KnowledgeSource, 'get_by_id', return_value=sample_knowledge_source), \
+             patch.object(KnowledgeService, '_hash_file', return_value='filehash123'), \
+             patch.object(KnowledgeService, '_find_uploaded_file', return_value=None), \
+             patch.object(KnowledgeService, '_schedule_ingestion') as mock_schedule, \
+             patch.object(Document, 'create') as mock_doc_create:
+            mock_document = MagicMock()
+            mock_document.id = 1
+            mock_doc_create.return_value = mock_document
+            
+            result = KnowledgeService.upload_document(
+                tenant_id=1,
+                source_id=1,
+                file=file,
+                title="Custom Title"
+            )
+            
+            assert result == mock_document
+            create_kwargs = mock_doc_create.call_args.kwargs
+            assert create_kwargs['title'] == "Custom Title"
+            assert create_kwargs['extra_data'] == {'file_hash': 'filehash123'}
+            mock_document.update_progress.assert_called_once_with(stage='queued')
+            mock_schedule.assert_called_once_with(1, mock_document)
+    
+    @patch('os.remove')
+    @patch('os.makedirs')
+    @patch('os.path.getsize')
+    def test_upload_document_unchanged_file(self, mock_getsize, mock_makedirs, mock_remove,
+                                          mock_app_context, sample_knowledge_source):
+        """Test re-uploading identical file bytes reuses the existing document."""
+        mock_getsize.return_value = 1024
         
-        # Mock file
-        file_content = b"Test file content"
         file = FileStorage(
-            stream=BytesIO(file_content),
-            filename="test.txt",
+            stream=BytesIO(b"Test file content"),
+            filename="copy.txt",
             content_type="text/plain"
         )
         
-        # Mock database operations
-        with patch.object(KnowledgeSource, 'get_by_id', return_value=sample_knowledge_source):
-            with patch.object(Document, 'create') as mock_doc_create:
-                with patch.object(Chunk, 'create') as mock_chunk_create:
-                    mock_document = MagicMock()
-                    mock_document.id = 1
-                    mock_document.mark_as_processing.return_value = mock_document
-                    mock_document.mark_as_completed.return_value = mock_document
-                    mock_document.save.return_value = None
-                    mock_doc_create.return_value = mock_document
-                    
-                    mock_chunk = MagicMock()
-                    mock_chunk.save.return_value = None
-                    mock_chunk_create.return_value = mock_chunk
-                    
-                    sample_knowledge_source.update_statistics.return_value = sample_knowledge_source
-                    sample_knowledge_source.save.return_value = None
-                    
-                    # Test the upload
-                    result = KnowledgeService.upload_document(
-                        tenant_id=1,
-                        source_id=1,
-                        file=file,
-                        title="Custom Title"
-                    )
-                    
-                    # Assertions
-                    assert result == mock_document
-                    mock_processor.extract_text_from_file.assert_called_once()
-                    mock_chunker.chunk_document_content.assert_called_once()
-                    mock_doc_create.assert_called_once()
-                    mock_chunk_create.assert_called_once()
-                    mock_document.mark_as_processing.assert_called_once()
-                    mock_document.mark_as_completed.assert_called_once()
-                    sample_knowledge_source.update_statistics.assert_called_once()
+        existing_document = MagicMock()
+        existing_document.id = 7
+        existing_document.file_path = '/elsewhere/test.txt'
+        
+        with patch.object(KnowledgeSource, 'get_by_id', return_value=sample_knowledge_source), \
+             patch.object(KnowledgeService, '_hash_file', return_value='filehash123'), \
+             patch.object(KnowledgeService, '_find_uploaded_file', return_value=existing_document), \
+             patch.object(KnowledgeService, '_schedule_ingestion') as mock_schedule, \
+             patch('app.services.knowledge_service.EmbeddingService') as mock_embedding_service, \
+             patch.object(Document, 'create') as mock_doc_create:
+            result = KnowledgeService.upload_document(tenant_id=1, source_id=1, file=file)
+            
+            assert result == existing_document
+            mock_doc_create.assert_not_called()
+            mock_schedule.assert_not_called()
+            mock_remove.assert_called_once()
+            mock_embedding_service.return_value.create_document_embeddings.assert_called_once_with(1, 7)
     
     def test_upload_document_no_file(self, mock_app_context):
         """Test upload document with no file provided."""
@@ -224,123 +215,153 @@ class TestKnowledgeServiceIntegration:
             with pytest.raises(ValidationError, match="Source is not configured for document uploads"):
                 KnowledgeService.upload_document(tenant_id=1, source_id=1, file=file)
     
-    @patch('app.services.knowledge_service.WebScraper')
-    @patch('app.services.knowledge_service.TextChunker')
-    @patch('hashlib.sha256')
-    def test_crawl_url_success(self, mock_sha256, mock_chunker_class, mock_scraper_class,
-                              mock_app_context, sample_url_source):
+    @pytest.fixture
+    def mock_crawler(self):
+        """Mock the site crawler and the ingestion pipeline used by crawl_url."""
+        with patch('app.services.knowledge_service.WebScraper') as mock_scraper_class, \
+                patch('app.services.knowledge_service.SiteCrawler') as mock_crawler_class, \
+                patch('app.services.knowledge_service.DocumentIngestionPipeline') as mock_pipeline_class, \
+                patch('app.services.knowledge_service.db'), \
+                patch('app.services.knowledge_service.response_cache'), \
+                patch.object(KnowledgeService, '_crawled_documents', return_value={}) as mock_known:
+            mock_scraper = MagicMock()
+            mock_scraper.__enter__.return_value = mock_scraper
+            mock_scraper_class.return_value = mock_scraper
+            
+            crawler = MagicMock()
+            crawler.stats = {'fetched': 0, 'not_modified': 0, 'errors': 0, 'duplicates': 0}
+            mock_crawler_class.from_config.return_value = crawler
+            
+            crawler.known_documents = mock_known
+            crawler.pipeline = mock_pipeline_class.return_value
+            crawler.crawler_class = mock_crawler_class
+            yield crawler
+    
+    @staticmethod
+    def _page(url, content, status='fetched', **kwargs):
+        """Build a crawled page with scraped content."""
+        return CrawlPage(
+            url=url,
+            depth=0,
+            status=status,
+            content={'content': content, 'title': 'Web Page Title', 'url': url, 'metadata': {'format': 'html'}}
+            if content else None,
+            **kwargs
+        )
+    
+    def test_crawl_url_success(self, mock_app_context, sample_url_source, mock_crawler):
         """Test successful URL crawling and processing."""
-        # Setup mocks
-        mock_hash = MagicMock()
-        mock_hash.hexdigest.return_value = 'content_hash_123'
-        mock_sha256.return_value = mock_hash
-        
-        # Mock WebScraper
-        mock_scraper = MagicMock()
-        mock_scraper.__enter__.return_value = mock_scraper
-        mock_scraper.__exit__.return_value = None
-        mock_scraper.scrape_url.return_value = [
-            {
-                'content': 'Scraped web content',
-                'title': 'Web Page Title',
-                'url': 'https://example.com',
-                'token_count': 15,
-                'metadata': {'format': 'html'}
-            }
-        ]
-        mock_scraper_class.return_value = mock_scraper
+        mock_crawler.crawl.return_value = iter([
+            self._page('https://example.com/', 'Scraped web content', etag='"v1"', links=['https://example.com/a'])
+        ])
         
-        # Mock TextChunker
-        mock_chunker = MagicMock()
-        mock_chunker.chunk_document_content.return_value = [
-            {
-                'content': 'Scraped web content',
-                'position': 0,
-                'token_count': 15,
-                'overlap_start': 0,
-                'overlap_end': 0,
-                'chunk_type': 'single',
-                'is_first': True,
-                'is_last': True
-            }
-        ]
-        mock_chunker_class.return_value = mock_chunker
-        
-        # Mock database operations
         with patch.object(KnowledgeSource, 'get_by_id', return_value=sample_url_source):
             with patch.object(Document, 'find_by_content_hash', return_value=None):
                 with patch.object(Document, 'create') as mock_doc_create:
-                    with patch.object(Chunk, 'create') as mock_chunk_create:
-                        mock_document = MagicMock()
-                        mock_document.id = 1
-                        mock_document.mark_as_processing.return_value = mock_document
-                        mock_document.mark_as_completed.return_value = mock_document
-                        mock_document.save.return_value = None
-                        mock_doc_create.return_value = mock_document
-                        
-                        mock_chunk = MagicMock()
-                        mock_chunk.save.return_value = None
-                        mock_chunk_create.return_value = mock_chunk
-                        
-                        sample_url_source.mark_as_processing.return_value = sample_url_source
-                        sample_url_source.mark_as_completed.return_value = sample_url_source
-                        sample_url_source.update_statistics.return_value = sample_url_source
-                        sample_url_source.save.return_value = None
-                        
-                        # Test the crawl
-                        result = KnowledgeService.crawl_url(
-                            tenant_id=1,
-                            source_id=2,
-                            url="https://example.com"
-                        )
-                        
-                        # Assertions
-                        assert len(result) == 1
-                        assert result[0] == mock_document
-                        mock_scraper.scrape_url.assert_called_once_with("https://example.com", max_depth=1)
-                        mock_chunker.chunk_document_content.assert_called_once()
-                        mock_doc_create.assert_called_once()
-                        mock_chunk_create.assert_called_once()
-                        sample_url_source.mark_as_processing.assert_called_once()
-                        sample_url_source.mark_as_completed.assert_called_once()
+                    mock_document = MagicMock()
+                    mock_doc_create.return_value = mock_document
+                    
+                    result = KnowledgeService.crawl_url(
+                        tenant_id=1,
+                        source_id=2,
+                        url="https://example.com"
+                    )
+        
+        assert result == [mock_document]
+        mock_crawler.crawler_class.from_config.assert_called_once()
+        assert mock_crawler.crawler_class.from_config.call_args.kwargs['max_depth'] == 1
+        mock_crawler.crawl.assert_called_once_with("https://example.com")
+        
+        create_kwargs = mock_doc_create.call_args.kwargs
+        assert create_kwargs['url'] == 'https://example.com/'
+        assert create_kwargs['extra_data']['crawl']['etag'] == '"v1"'
+        assert create_kwargs['extra_data']['crawl']['links'] == ['https://example.com/a']
+        mock_crawler.pipeline.ingest.assert_called_once_with(
+            mock_document, ['Scraped web content'], {'format': 'html'}, update_source=False
+        )
+        sample_url_source.mark_as_processing.assert_called_once()
+        sample_url_source.mark_as_completed.assert_called_once()
+        sample_url_source.update_statistics.assert_called_once()
+    
+    def test_crawl_url_recrawl(self, mock_app_context, sample_url_source, mock_crawler):
+        """Test a re-crawl only re-ingests pages whose content changed."""
+        mock_crawler.known_documents.return_value = {
+            'https://example.com/same': (10, 'same_hash', {'etag': '"a"'}),
+            'https://example.com/changed': (11, 'old_hash', {'etag': '"b"'}),
+            'https://example.com/cached': (12, 'cached_hash', {'etag': '"c"', 'links': []})
+        }
+        mock_crawler.crawl.return_value = iter([
+            self._page('https://example.com/same', 'Same content'),
+            self._page('https://example.com/changed', 'New content', etag='"b2"'),
+            self._page('https://example.com/cached', None, status='not_modified', etag='"c"')
+        ])
+        
+        documents = {document_id: MagicMock(processing_status='completed', extra_data={}) for document_id in (10, 11)}
+        hashes = {'Same content': 'same_hash', 'New content': 'new_hash'}
+        
+        with patch.object(KnowledgeSource, 'get_by_id', return_value=sample_url_source), \
+                patch.object(Document, 'get_by_id', side_effect=documents.get), \
+                patch.object(Document, 'create') as mock_doc_create, \
+                patch('hashlib.sha256') as mock_sha256:
+            mock_sha256.side_effect = lambda data: MagicMock(hexdigest=MagicMock(return_value=hashes[data.decode()]))
+            
+            result = KnowledgeService.crawl_url(tenant_id=1, source_id=2)
+        
+        assert result == [documents[11]]
+        known_pages = mock_crawler.crawler_class.from_config.call_args.kwargs['known_pages']
+        assert known_pages['https://example.com/cached'] == {'etag': '"c"', 'links': []}
+        mock_doc_create.assert_not_called()
+        mock_crawler.pipeline.ingest.assert_called_once_with(
+            documents[11], ['New content'], {'format': 'html'}, update_source=False
+        )
+        assert documents[10].extra_data['crawl']['etag'] is None
+        assert documents[11].extra_data['crawl']['etag'] == '"b2"'
+        documents[10].save.assert_called_once()
     
-    @patch('app.services.knowledge_service.WebScraper')
-    def test_crawl_url_duplicate_content(self, mock_scraper_class, mock_app_context, sample_url_source):
+    def test_crawl_url_duplicate_content(self, mock_app_context, sample_url_source, mock_crawler):
         """Test URL crawling with duplicate content detection."""
-        # Mock WebScraper
-        mock_scraper = MagicMock()
-        mock_scraper.__enter__.return_value = mock_scraper
-        mock_scraper.__exit__.return_value = None
-        mock_scraper.scrape_url.return_value = [
-            {
-                'content': 'Duplicate content',
-                'title': 'Duplicate Page',
-                'url': 'https://example.com/duplicate',
-                'token_count': 10,
-                'metadata': {'format': 'html'}
-            }
-        ]
-        mock_scraper_class.return_value = mock_scraper
+        mock_crawler.crawl.return_value = iter([
+            self._page('https://example.com/duplicate', 'Duplicate content')
+        ])
         
-        # Mock existing document
-        existing_doc = MagicMock()
+        with patch.object(KnowledgeSource, 'get_by_id', return_value=sample_url_source):
+            with patch.object(Document, 'find_by_content_hash', return_value=MagicMock()):
+                with patch.object(Document, 'create') as mock_doc_create:
+                    result = KnowledgeService.crawl_url(tenant_id=1, source_id=2)
+        
+        # Should return empty list since content was duplicate
+        assert result == []
+        mock_doc_create.assert_not_called()
+        mock_crawler.pipeline.ingest.assert_not_called()
+    
+    def test_crawl_url_page_error(self, mock_app_context, sample_url_source, mock_crawler):
+        """Test a page that fails to ingest does not fail the crawl."""
+        mock_crawler.crawl.return_value = iter([
+            self._page('https://example.com/bad', 'Bad content'),
+            self._page('https://example.com/good', 'Good content')
+        ])
+        bad_document, good_document = MagicMock(id=1), MagicMock(id=2)
+        mock_crawler.pipeline.ingest.side_effect = [ProcessingError("No text content found in document"), None]
         
         with patch.object(KnowledgeSource, 'get_by_id', return_value=sample_url_source):
-            with patch('hashlib.sha256') as mock_sha256:
-                mock_hash = MagicMock()
-                mock_hash.hexdigest.return_value = 'duplicate_hash'
-                mock_sha256.return_value = mock_hash
-                
-                with patch.object(Document, 'find_by_content_hash', return_value=existing_doc):
-                    sample_url_source.mark_as_processing.return_value = sample_url_source
-                    sample_url_source.mark_as_completed.return_value = sample_url_source
-                    sample_url_source.update_statistics.return_value = sample_url_source
-                    sample_url_source.save.return_value = None
-                    
+            with patch.object(Document, 'find_by_content_hash', return_value=None):
+                with patch.object(Document, 'create', side_effect=[bad_document, good_document]):
                     result = KnowledgeService.crawl_url(tenant_id=1, source_id=2)
-                    
-                    # Should return empty list since content was duplicate
-                    assert result == []
+        
+        assert result == [good_document]
+        bad_document.mark_as_error.assert_called_once()
+        sample_url_source.mark_as_completed.assert_called_once()
+    
+    def test_crawl_url_scraping_error(self, mock_app_context, sample_url_source, mock_crawler):
+        """Test URL crawling with scraping error."""
+        mock_crawler.crawl.side_effect = ProcessingError("Scraping failed")
+        
+        with patch.object(KnowledgeSource, 'get_by_id', return_value=sample_url_source):
+            with pytest.raises(ProcessingError, match="Scraping failed"):
+                KnowledgeService.crawl_url(tenant_id=1, source_id=2)
+        
+        # Should mark source as error
+        sample_url_source.mark_as_error.assert_called_once_with("Scraping failed")
     
     def test_crawl_url_source_not_found(self, mock_app_context):
         """Test crawling URL with non-existent source."""
@@ -366,27 +387,6 @@ class TestKnowledgeServiceIntegration:
             with pytest.raises(ValidationError, match="No URL to crawl"):
                 KnowledgeService.crawl_url(tenant_id=1, source_id=2)
     
-    @patch('app.services.knowledge_service.WebScraper')
-    def test_crawl_url_scraping_error(self, mock_scraper_class, mock_app_context, sample_url_source):
-        """Test URL crawling with scraping error."""
-        # Mock WebScraper to raise error
-        mock_scraper = MagicMock()
-        mock_scraper.__enter__.return_value = mock_scraper
-        mock_scraper.__exit__.return_value = None
-        mock_scraper.scrape_url.side_effect = Exception("Scraping failed")
-        mock_scraper_class.return_value = mock_scraper
-        
-        with patch.object(KnowledgeSource, 'get_by_id', return_value=sample_url_source):
-            sample_url_source.mark_as_processing.return_value = sample_url_source
-            sample_url_source.mark_as_error.return_value = sample_url_source
-            sample_url_source.save.return_value = None
-            
-            with pytest.raises(Exception, match="Scraping failed"):
-                KnowledgeService.crawl_url(tenant_id=1, source_id=2)
-            
-            # Should mark source as error
-            sample_url_source.mark_as_error.assert_called_once_with("Scraping failed")
-    
     def test_get_sources(self, mock_app_context):
         """Test getting knowledge sources."""
         mock_sources = [MagicMock(), MagicMock()]
@@ -5,7 +5,7 @@ import pytest
 from app import create_app, db
 from app.models.tenant import Tenant
 from app.models.user import User
-from app.models.knowledge import KnowledgeSource, Document
+from app.models.knowledge import KnowledgeSource, Document, Chunk
 from app.services.knowledge_service import KnowledgeService
 from app.utils.exceptions import ValidationError, ProcessingError
 
@@ -162,6 +162,15 @@ class TestKnowledgeService:
             )
             doc2.save()
             
+            # Full-text search ranks chunk content
+            for document in (doc1, doc2):
+                Chunk.create(
+                    tenant_id=self.tenant.id,
+                    document_id=document.id,
+                    content=document.content,
+                    position=0
+                ).save()
+            
             # Search for Python
             results = KnowledgeService.search_knowledge(
                 tenant_id=self.tenant.id,
@@ -3,6 +3,7 @@ import pytest
 import json
 import os
 import tempfile
+import time
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 from app import create_app, db
@@ -170,6 +171,83 @@ class TestCollectCounterpartyData:
         assert result['status'] == 'skipped'
         assert result['reason'] == 'monitoring_disabled'
     
+    @patch('app.workers.kyb_monitoring.KYBService')
+    def test_collect_counterparty_data_skips_screened_sanctions(self, mock_kyb_service, app, counterparty, kyb_config):
+        """Test sanctions are left to list change re-screening once the current name is screened."""
+        mock_kyb_service.check_vat_number.return_value = {'status': 'valid', 'valid': True}
+        mock_kyb_service.check_lei_code.return_value = {'status': 'valid'}
+        mock_kyb_service.check_sanctions.return_value = []
+        counterparty.sanctions_screened_name = counterparty.name
+        db.session.commit()
+        
+        result = collect_counterparty_data(counterparty.id)
+        
+        assert 'vat' in result['check_types']
+        assert not [check_type for check_type in result['check_types'] if check_type.startswith('sanctions')]
+        mock_kyb_service.check_sanctions.assert_not_called()
+        
+        # A renamed counterparty is checked again
+        counterparty.name = "Renamed Company Ltd"
+        db.session.commit()
+        
+        result = collect_counterparty_data(counterparty.id)
+        
+        assert 'sanctions_eu' in result['check_types']
+    
+    @patch('app.workers.kyb_monitoring.KYBService')
+    def test_collect_counterparty_data_queries_sources_concurrently(self, mock_kyb_service, app, counterparty, kyb_config):
+        """Test sources are queried in parallel and their latency is reported."""
+        def slow(result):
+            def call(*args, **kwargs):
+                time.sleep(0.3)
+                return result
+            return call
+        
+        mock_kyb_service.check_vat_number.side_effect = slow({'status': 'valid', 'valid': True, 'source': 'VIES'})
+        mock_kyb_service.check_lei_code.side_effect = slow({'status': 'valid', 'valid': True, 'source': 'GLEIF'})
+        mock_kyb_service.check_sanctions.side_effect = slow([{'list': 'OFAC SDN', 'name': 'Test Company Ltd'}])
+        
+        start_time = time.monotonic()
+        result = collect_counterparty_data(counterparty.id)
+        elapsed = time.monotonic() - start_time
+        
+        # Three sources of 0.3s each take about as long as one of them
+        assert elapsed < 0.8
+        assert set(result['source_latency_ms']) == {'vies', 'gleif', 'sanctions'}
+        assert all(latency >= 300 for latency in result['source_latency_ms'].values())
+        
+        # One sanctions lookup serves every list
+        mock_kyb_service.check_sanctions.assert_called_once_with('Test Company Ltd', 'DE')
+        results = {r['source']: r for r in result['collection_results']}
+        assert results['SANCTIONS_OFAC']['match_count'] == 1
+        assert results['SANCTIONS_EU']['match_count'] == 0
+        assert len(result['snapshots_created']) == 5
+    
+    @patch('app.workers.kyb_monitoring.KYBService')
+    def test_collect_counterparty_data_source_deadline(self, mock_kyb_service, app, counterparty, kyb_config):
+        """Test a source that misses its deadline does not hold up the others."""
+        def hang(*args, **kwargs):
+            time.sleep(1.0)
+            return {'status': 'valid', 'valid': True}
+        
+        mock_kyb_service.check_vat_number.side_effect = hang
+        mock_kyb_service.check_lei_code.return_value = {'status': 'valid', 'valid': True, 'source': 'GLEIF'}
+        mock_kyb_service.check_sanctions.return_value = []
+        app.config['KYB_SOURCE_DEADLINES'] = {'vies': 0.1}
+        
+        start_time = time.monotonic()
+        result = collect_counterparty_data(counterparty.id)
+        
+        assert time.monotonic() - start_time < 1.0
+        vat_result = next(r for r in result['collection_results'] if r['source'] == 'VAT')
+        assert vat_result['status'] == 'error'
+        assert 'did not respond within 0.1s' in vat_result['error']
+        assert result['source_latency_ms']['vies'] == 100
+        
+        snapshot = CounterpartySnapshot.query.filter_by(counterparty_id=counterparty.id, check_type='vat').first()
+        assert snapshot.status == 'error'
+        assert CounterpartySnapshot.query.filter_by(counterparty_id=counterparty.id, check_type='lei').count() == 1
+    
     @patch('app.workers.kyb_monitoring.KYBService')
     def test_collect_counterparty_data_with_errors(self, mock_kyb_service, app, counterparty, kyb_config):
         """Test data collection with API errors."""
@@ -474,13 +552,15 @@ class TestScheduleCounterpartyMonitoring:
 class TestDailyKYBMonitoring:
     """Test daily_kyb_monitoring task."""
     
+    @patch('app.workers.kyb_monitoring.update_sanctions_data')
     @patch('app.workers.kyb_monitoring.schedule_counterparty_monitoring')
-    def test_daily_kyb_monitoring_success(self, mock_schedule, app, kyb_config):
+    def test_daily_kyb_monitoring_success(self, mock_schedule, mock_update_sanctions, app, kyb_config):
         """Test successful daily monitoring."""
         # Mock task result
         mock_task = Mock()
         mock_task.id = 'task_123'
         mock_schedule.apply_async.return_value = mock_task
+        mock_update_sanctions.apply_async.return_value = Mock(id='task_456')
         
         result = daily_kyb_monitoring()
         
@@ -488,6 +568,7 @@ class TestDailyKYBMonitoring:
         assert result['tenants_processed'] == 1
         assert result['tasks_scheduled'] == 1
         assert result['errors'] == 0
+        assert result['sanctions_update_task_id'] == 'task_456'
         
         # Verify scheduling was called
         mock_schedule.apply_async.assert_called_once_with(
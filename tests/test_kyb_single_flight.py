@@ -0,0 +1,239 @@
+"""Tests for single-flight coalescing of identical KYB lookups."""
+import json
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+from app.services.kyb_adapters.gleif import GLEIFAdapter
+from app.services.kyb_adapters.vies import VIESAdapter
+
+
+VALID_RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+    <soap:Body>
+        <checkVatResponse xmlns="urn:ec.europa.eu:taxud:vies:services:checkVat:types">
+            <countryCode>DE</countryCode>
+            <vatNumber>123456789</vatNumber>
+            <requestDate>2024-01-15</requestDate>
+            <valid>true</valid>
+            <name>Test Company GmbH</name>
+            <address>Test Street 123, 12345 Test City</address>
+        </checkVatResponse>
+    </soap:Body>
+</soap:Envelope>"""
+
+
+class FakeRedis:
+    """In-memory stand-in for the Redis commands used by the adapters."""
+
+    def __init__(self):
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        with self._lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = str(value).encode()
+            return True
+
+    def setex(self, key, seconds, value):
+        return self.set(key, value)
+
+    def incr(self, key):
+        with self._lock:
+            self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+            return int(self.data[key])
+
+    def expire(self, key, seconds):
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+
+def slow_vies_response(*args, **kwargs):
+    time.sleep(0.2)
+    response = Mock()
+    response.status_code = 200
+    response.text = VALID_RESPONSE
+    return response
+
+
+def run_concurrently(func, count):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        barrier.wait()
+        results[index] = func()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+class TestLocalCoalescing:
+    """Concurrent lookups within one process."""
+
+    @patch('requests.Session.post')
+    def test_identical_lookups_share_one_request(self, mock_post, redis_client):
+        mock_post.side_effect = slow_vies_response
+        adapter = VIESAdapter(redis_client=redis_client)
+        before = adapter.get_stats()['lookups']
+
+        results = run_concurrently(lambda: adapter.check_single('DE123456789'), 8)
+
+        assert mock_post.call_count == 1
+        assert all(result['status'] == 'valid' for result in results)
+        assert sum(1 for result in results if result.get('coalesced')) == 7
+        stats = adapter.get_stats()['lookups']
+        assert stats['coalesced_local'] - before['coalesced_local'] == 7
+        assert stats['lookups'] - before['lookups'] == 1
+
+    @patch('requests.Session.post')
+    def test_different_identifiers_are_not_coalesced(self, mock_post, redis_client):
+        mock_post.side_effect = slow_vies_response
+        adapter = VIESAdapter(redis_client=redis_client)
+        vat_numbers = ['DE123456789', 'DE987654321']
+
+        results = [None, None]
+
+        def check(index):
+            results[index] = adapter.check_single(vat_numbers[index])
+
+        threads = [threading.Thread(target=check, args=(index,)) for index in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert mock_post.call_count == 2
+        assert not any(result.get('coalesced') for result in results)
+
+    @patch('requests.Session.get')
+    def test_coalesces_without_redis(self, mock_get):
+        def slow_gleif_response(*args, **kwargs):
+            time.sleep(0.2)
+            response = Mock()
+            response.status_code = 404
+            response.text = ''
+            return response
+
+        mock_get.side_effect = slow_gleif_response
+        adapter = GLEIFAdapter()
+
+        results = run_concurrently(lambda: adapter.check_single('213800WAVVOPS85N2205'), 4)
+
+        assert mock_get.call_count == 1
+        assert all(result['status'] == 'not_found' for result in results)
+
+    @patch('requests.Session.post')
+    def test_followers_get_independent_copies(self, mock_post, redis_client):
+        mock_post.side_effect = slow_vies_response
+        adapter = VIESAdapter(redis_client=redis_client)
+
+        results = run_concurrently(lambda: adapter.check_single('DE123456789'), 3)
+        results[0]['company_name'] = 'Changed'
+
+        assert results[1]['company_name'] == 'Test Company GmbH'
+        assert results[2]['company_name'] == 'Test Company GmbH'
+
+
+class TestClusterCoalescing:
+    """Lookups leased by another worker through Redis."""
+
+    def _hold_lease(self, adapter, redis_client, vat_number='DE123456789'):
+        cache_key = adapter._get_cache_key(vat_number)
+        redis_client.set(f"kyb_lease:{cache_key}", 'other-worker', nx=True, ex=30)
+        return cache_key
+
+    @patch('requests.Session.post')
+    def test_waits_for_lease_holder_result(self, mock_post, redis_client):
+        adapter = VIESAdapter(redis_client=redis_client)
+        cache_key = self._hold_lease(adapter, redis_client)
+        published = {'status': 'valid', 'valid': True, 'identifier': 'DE123456789'}
+
+        def other_worker_finishes():
+            time.sleep(0.2)
+            redis_client.setex(f"kyb_flight:{cache_key}", 5, json.dumps(published))
+            redis_client.delete(f"kyb_lease:{cache_key}")
+
+        threading.Thread(target=other_worker_finishes).start()
+        result = adapter.check_single('DE123456789')
+
+        assert mock_post.call_count == 0
+        assert result['status'] == 'valid'
+        assert result['coalesced'] is True
+
+    @patch('requests.Session.post')
+    def test_queries_after_lease_released_without_result(self, mock_post, redis_client):
+        mock_post.side_effect = slow_vies_response
+        adapter = VIESAdapter(redis_client=redis_client)
+        cache_key = self._hold_lease(adapter, redis_client)
+
+        def other_worker_fails():
+            time.sleep(0.2)
+            redis_client.delete(f"kyb_lease:{cache_key}")
+
+        threading.Thread(target=other_worker_fails).start()
+        result = adapter.check_single('DE123456789')
+
+        assert mock_post.call_count == 1
+        assert result['status'] == 'valid'
+        assert not result.get('coalesced')
+
+    @patch('requests.Session.post')
+    def test_leader_publishes_result_and_releases_lease(self, mock_post, redis_client):
+        mock_post.side_effect = slow_vies_response
+        adapter = VIESAdapter(redis_client=redis_client)
+        cache_key = adapter._get_cache_key('DE123456789')
+
+        adapter.check_single('DE123456789')
+
+        assert f"kyb_lease:{cache_key}" not in redis_client.data
+        published = json.loads(redis_client.data[f"kyb_flight:{cache_key}"])
+        assert published['status'] == 'valid'
+
+    @patch('requests.Session.post')
+    def test_expired_wait_queries_directly(self, mock_post, redis_client):
+        mock_post.side_effect = slow_vies_response
+        adapter = VIESAdapter(redis_client=redis_client)
+        adapter.lease_ttl = 0.3
+        self._hold_lease(adapter, redis_client)
+
+        result = adapter.check_single('DE123456789')
+
+        assert mock_post.call_count == 1
+        assert result['status'] == 'valid'
+
+
+class TestLookupStats:
+    """Hit and coalescing counters exposed through get_stats()."""
+
+    @patch('requests.Session.post')
+    def test_cache_hits_counted(self, mock_post, redis_client):
+        mock_post.side_effect = slow_vies_response
+        adapter = VIESAdapter(redis_client=redis_client)
+        before = adapter.get_stats()['lookups']
+
+        adapter.check_single('DE123456789')
+        adapter.check_single('DE123456789')
+
+        stats = adapter.get_stats()['lookups']
+        assert stats['cache_hits'] - before['cache_hits'] == 1
+        assert stats['cache_misses'] - before['cache_misses'] == 1
+        assert mock_post.call_count == 1
@@ -0,0 +1,334 @@
+"""Tests for the shared KYB HTTP transport and circuit breaker."""
+import threading
+import time
+import uuid
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+from app.services.kyb_adapters.base import CircuitOpenError, DataSourceUnavailable
+from app.services.kyb_adapters.transport import CircuitBreaker, KYBTransport, LatencyHistogram
+from app.services.kyb_adapters.vies import VIESAdapter
+
+
+class FakeRedis:
+    """The subset of Redis commands used by the circuit breaker."""
+
+    def __init__(self):
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        with self._lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = str(value).encode()
+            return True
+
+    def setex(self, key, seconds, value):
+        return self.set(key, value)
+
+    def incr(self, key):
+        with self._lock:
+            self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+            return int(self.data[key])
+
+    def expire(self, key, seconds):
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+
+class KYBService:
+    """Local HTTP server with scripted per-path responses."""
+
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+        self.client_ports = set()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def script(self, path, *responses):
+        """Queue (status, delay) responses for a path; the last one repeats."""
+        self.responses[path] = list(responses)
+
+    def count(self, path):
+        return sum(1 for requested in self.requests if requested == path)
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with service._lock:
+                    service.requests.append(self.path)
+                    service.client_ports.add(self.client_address[1])
+                    queue = service.responses.get(self.path, [(404, 0)])
+                    status, delay = queue.pop(0) if len(queue) > 1 else queue[0]
+                time.sleep(delay)
+                body = b'{"ok": true}'
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def service():
+    kyb_service = KYBService()
+    thread = threading.Thread(target=kyb_service.server.serve_forever, daemon=True)
+    thread.start()
+    yield kyb_service
+    kyb_service.server.shutdown()
+    kyb_service.server.server_close()
+
+
+@pytest.fixture
+def transport():
+    return KYBTransport(pool_size=4, max_retries=2, retry_delay=0.01, hedge_min_samples=10)
+
+
+def unique_source():
+    return f"TEST{uuid.uuid4().hex[:8].upper()}"
+
+
+class TestLatencyHistogram:
+    """Test latency bucketing and percentiles."""
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.record(20)
+        for _ in range(10):
+            histogram.record(700)
+
+        snapshot = histogram.snapshot()
+
+        assert snapshot['count'] == 100
+        assert snapshot['p50_ms'] == 25
+        assert snapshot['p95_ms'] == 1000
+        assert snapshot['max_ms'] == 700
+        assert snapshot['buckets']['le_25'] == 90
+
+    def test_empty(self):
+        assert LatencyHistogram().snapshot()['p95_ms'] is None
+
+
+class TestCircuitBreaker:
+    """Test circuit breaker state transitions."""
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        breaker = CircuitBreaker(unique_source(), failure_threshold=3, reset_timeout=60)
+
+        for _ in range(3):
+            breaker.before_request()
+            breaker.record_failure()
+
+        assert breaker.state()['state'] == 'open'
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(unique_source(), failure_threshold=3, reset_timeout=60)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state()['state'] == 'closed'
+        assert breaker.state()['failures'] == 1
+
+    def test_half_open_allows_single_probe(self):
+        breaker = CircuitBreaker(unique_source(), failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+
+        assert breaker.state()['state'] == 'half_open'
+        breaker.before_request()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+
+        breaker.record_success()
+        assert breaker.state()['state'] == 'closed'
+        breaker.before_request()
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(unique_source(), failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+
+        breaker.before_request()
+        breaker.record_failure()
+
+        assert breaker.state()['state'] == 'open'
+
+    def test_state_shared_through_redis(self):
+        redis_client = FakeRedis()
+        source = unique_source()
+        first = CircuitBreaker(source, redis_client, failure_threshold=2, reset_timeout=60)
+        second = CircuitBreaker(source, redis_client, failure_threshold=2, reset_timeout=60)
+
+        first.record_failure()
+        second.record_failure()
+
+        with pytest.raises(CircuitOpenError):
+            first.before_request()
+        assert second.state()['state'] == 'open'
+
+    def test_redis_errors_fail_open(self):
+        redis_client = Mock()
+        redis_client.get.side_effect = ConnectionError("redis down")
+        redis_client.incr.side_effect = ConnectionError("redis down")
+        breaker = CircuitBreaker(unique_source(), redis_client, failure_threshold=1)
+
+        breaker.record_failure()
+        breaker.before_request()
+
+        assert breaker.state()['state'] == 'closed'
+
+
+class TestKYBTransport:
+    """Test the pooled transport against a local server."""
+
+    def test_reuses_keep_alive_connections(self, service, transport):
+        service.script('/lei', (200, 0))
+        source = unique_source()
+
+        for _ in range(10):
+            response = transport.get(source, f'{service.url}/lei', timeout=5)
+            assert response.status_code == 200
+
+        assert service.count('/lei') == 10
+        assert len(service.client_ports) == 1
+
+    def test_retries_server_errors(self, service, transport):
+        service.script('/flaky', (503, 0), (503, 0), (200, 0))
+        source = unique_source()
+
+        response = transport.get(source, f'{service.url}/flaky', timeout=5)
+
+        assert response.status_code == 200
+        assert service.count('/flaky') == 3
+        assert transport.get_stats(source)['retries'] == 2
+
+    def test_returns_last_error_response_when_retries_exhausted(self, service, transport):
+        service.script('/down', (503, 0))
+        source = unique_source()
+        breaker = CircuitBreaker(source, failure_threshold=5)
+
+        response = transport.get(source, f'{service.url}/down', timeout=5, breaker=breaker)
+
+        assert response.status_code == 503
+        assert service.count('/down') == 3
+        assert breaker.state()['failures'] == 1
+
+    def test_does_not_retry_non_idempotent_requests(self, transport):
+        source = unique_source()
+        with patch('requests.Session.post') as mock_post:
+            mock_post.side_effect = requests.exceptions.ConnectionError()
+            with pytest.raises(requests.exceptions.ConnectionError):
+                transport.post(source, 'http://127.0.0.1:9/submit', timeout=5)
+
+        assert mock_post.call_count == 1
+
+    def test_retries_bounded_by_timeout(self, transport):
+        transport.retry_delay = 1.0
+        source = unique_source()
+        with patch('requests.Session.get') as mock_get:
+            mock_get.side_effect = requests.exceptions.ConnectionError()
+            started = time.time()
+            with pytest.raises(requests.exceptions.ConnectionError):
+                transport.get(source, 'http://127.0.0.1:9/lei', timeout=0.3)
+
+        assert time.time() - started < 0.3
+        assert mock_get.call_count == 1
+
+    def test_open_circuit_skips_network(self, service, transport):
+        service.script('/down', (503, 0))
+        source = unique_source()
+        breaker = CircuitBreaker(source, failure_threshold=2, reset_timeout=60)
+
+        for _ in range(2):
+            transport.get(source, f'{service.url}/down', timeout=5, breaker=breaker)
+        calls = service.count('/down')
+
+        with pytest.raises(CircuitOpenError):
+            transport.get(source, f'{service.url}/down', timeout=5, breaker=breaker)
+        assert service.count('/down') == calls
+
+    def test_hedges_slow_requests(self, service, transport):
+        source = unique_source()
+        for _ in range(20):
+            transport.histogram(source).record(5)
+
+        # The first request stalls; the hedge sent after ~p95 answers immediately
+        service.script('/slow', (200, 2.0), (200, 0))
+        started = time.time()
+        response = transport.get(source, f'{service.url}/slow', timeout=5)
+
+        assert response.status_code == 200
+        assert time.time() - started < 1.0
+        assert service.count('/slow') == 2
+        assert transport.get_stats(source)['hedged'] == 1
+
+    def test_latency_stats(self, service, transport):
+        service.script('/lei', (200, 0))
+        source = unique_source()
+        for _ in range(5):
+            transport.get(source, f'{service.url}/lei', timeout=5)
+
+        stats = transport.get_stats(source)
+
+        assert stats['requests'] == 5
+        assert stats['latency']['count'] == 5
+        assert stats['latency']['p95_ms'] is not None
+        assert stats['pool_size'] == 4
+
+
+class TestAdapterIntegration:
+    """Test adapters routed through the shared transport."""
+
+    @patch('requests.Session.post')
+    def test_vies_outage_opens_circuit(self, mock_post):
+        mock_post.side_effect = requests.exceptions.ConnectionError()
+        adapter = VIESAdapter(redis_client=FakeRedis())
+        adapter.circuit_breaker.failure_threshold = 2
+
+        for _ in range(2):
+            result = adapter.check_single('DE123456789', force_refresh=True)
+            assert result['status'] == 'unavailable'
+        calls = mock_post.call_count
+
+        result = adapter.check_single('DE123456789', force_refresh=True)
+
+        assert result['status'] == 'unavailable'
+        assert 'circuit is open' in result['error']
+        assert mock_post.call_count == calls
+        assert adapter.get_stats()['circuit_breaker']['state'] == 'open'
+
+    def test_circuit_open_error_is_unavailable(self):
+        assert issubclass(CircuitOpenError, DataSourceUnavailable)
+
+    def test_get_stats_includes_transport(self):
+        stats = VIESAdapter().get_stats()
+
+        assert stats['circuit_breaker']['state'] in ('closed', 'open', 'half_open')
+        assert 'latency' in stats['transport']
@@ -0,0 +1,108 @@
+"""Tests for full-text search over knowledge chunks."""
+import pytest
+from unittest.mock import patch
+from app import db
+from app.models.tenant import Tenant
+from app.models.knowledge import KnowledgeSource, Document, Chunk
+from app.services.lexical_search import LexicalSearchIndex, reciprocal_rank_fusion
+
+
+class TestLexicalSearchIndex:
+    """Test cases for LexicalSearchIndex."""
+
+    @pytest.fixture
+    def corpus(self, app):
+        """Create two sources with chunks and a second tenant."""
+        with app.app_context():
+            tenant = Tenant(name="Test", slug="test")
+            tenant.save()
+            other_tenant = Tenant(name="Other", slug="other")
+            other_tenant.save()
+
+            sources = []
+            for name in ("Guides", "Policies"):
+                source = KnowledgeSource(tenant_id=tenant.id, name=name, source_type="document")
+                source.save()
+                sources.append(source)
+
+            guide = Document(tenant_id=tenant.id, source_id=sources[0].id, title="Guide")
+            guide.save()
+            policy = Document(tenant_id=tenant.id, source_id=sources[1].id, title="Policy")
+            policy.save()
+            other_source = KnowledgeSource(tenant_id=other_tenant.id, name="Other", source_type="document")
+            other_source.save()
+            other = Document(tenant_id=other_tenant.id, source_id=other_source.id, title="Other")
+            other.save()
+
+            chunk_ids = Chunk.bulk_create([
+                {'tenant_id': tenant.id, 'document_id': guide.id, 'position': 0,
+                 'content': "Refund requests are processed within five days. Refund policy applies."},
+                {'tenant_id': tenant.id, 'document_id': guide.id, 'position': 1,
+                 'content': "Opening hours are nine to five on weekdays."},
+                {'tenant_id': tenant.id, 'document_id': policy.id, 'position': 0,
+                 'content': "A refund is possible for unused services."},
+                {'tenant_id': other_tenant.id, 'document_id': other.id, 'position': 0,
+                 'content': "Refund refund refund for another tenant."}
+            ])
+
+            yield {
+                'tenant_id': tenant.id,
+                'source_ids': [source.id for source in sources],
+                'chunk_ids': chunk_ids
+            }
+
+    @pytest.mark.parametrize('backend', ['fts5', 'bm25'])
+    def test_search_ranks_matching_chunks(self, app, corpus, backend):
+        """Test matching chunks of the tenant are ranked by term frequency."""
+        with app.app_context():
+            if backend == 'fts5' and LexicalSearchIndex.backend() != 'fts5':
+                pytest.skip("SQLite build without FTS5")
+
+            with patch.object(LexicalSearchIndex, 'backend', return_value=backend):
+                matches = LexicalSearchIndex.search(corpus['tenant_id'], "refund policy", limit=10)
+
+            chunk_ids = corpus['chunk_ids']
+            assert [chunk_id for chunk_id, _ in matches] == [chunk_ids[0], chunk_ids[2]]
+            assert matches[0][1] > matches[1][1] > 0
+
+    @pytest.mark.parametrize('backend', ['fts5', 'bm25'])
+    def test_search_filters_sources(self, app, corpus, backend):
+        """Test results can be restricted to knowledge sources."""
+        with app.app_context():
+            if backend == 'fts5' and LexicalSearchIndex.backend() != 'fts5':
+                pytest.skip("SQLite build without FTS5")
+
+            with patch.object(LexicalSearchIndex, 'backend', return_value=backend):
+                matches = LexicalSearchIndex.search(
+                    corpus['tenant_id'], "refund", limit=10, source_ids=[corpus['source_ids'][1]]
+                )
+
+            assert [chunk_id for chunk_id, _ in matches] == [corpus['chunk_ids'][2]]
+
+    def test_index_follows_deleted_chunks(self, app, corpus):
+        """Test deleted chunks disappear from the full-text index."""
+        with app.app_context():
+            if LexicalSearchIndex.backend() != 'fts5':
+                pytest.skip("SQLite build without FTS5")
+
+            Chunk.query.filter(Chunk.id == corpus['chunk_ids'][0]).delete(synchronize_session=False)
+            db.session.commit()
+
+            matches = LexicalSearchIndex.search(corpus['tenant_id'], "refund", limit=10)
+            assert [chunk_id for chunk_id, _ in matches] == [corpus['chunk_ids'][2]]
+
+    def test_search_without_terms(self, app):
+        """Test punctuation-only queries return nothing without querying."""
+        with app.app_context():
+            assert LexicalSearchIndex.search(1, "?!", limit=10) == []
+
+
+def test_reciprocal_rank_fusion():
+    """Test items ranked by several lists move ahead of single-list items."""
+    fused = reciprocal_rank_fusion([
+        [{'chunk_id': 1}, {'chunk_id': 2}],
+        [{'chunk_id': 2}, {'chunk_id': 3}]
+    ], k=60)
+
+    assert [chunk_id for chunk_id, _ in fused] == [2, 1, 3]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
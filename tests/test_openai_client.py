@@ -0,0 +1,195 @@
+"""Tests for the shared asynchronous OpenAI client path."""
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from flask import current_app
+from app.services.openai_client import AsyncOpenAIClientPool, run_in_app_context
+from app.secretary.agents.base_agent import AgentContext, AgentResponse
+from app.secretary.agents.router_agent import RouterAgent
+
+
+class TestAsyncOpenAIClientPool:
+    """Test cases for AsyncOpenAIClientPool."""
+
+    def test_client_shared_within_event_loop(self):
+        """Test coroutines on one loop share a client and other loops get their own."""
+        pool = AsyncOpenAIClientPool()
+
+        async def get_clients():
+            return pool.get_client('test-key'), pool.get_client('test-key')
+
+        first, second = asyncio.run(get_clients())
+        other_loop_client, _ = asyncio.run(get_clients())
+
+        assert first is second
+        assert other_loop_client is not first
+
+    def test_client_requires_api_key(self):
+        """Test a missing API key is reported."""
+        pool = AsyncOpenAIClientPool()
+
+        async def get_client():
+            return pool.get_client()
+
+        with patch('app.services.openai_client._config', return_value=None):
+            with pytest.raises(ValueError, match="OpenAI API key not configured"):
+                asyncio.run(get_client())
+
+
+class TestRunInAppContext:
+    """Test cases for run_in_app_context."""
+
+    def test_runs_in_worker_thread_with_app_context(self, app):
+        """Test blocking work leaves the event loop thread and keeps app access."""
+        loop_thread = threading.get_ident()
+
+        def blocking_call(value):
+            return value, threading.get_ident(), current_app.name
+
+        with app.app_context():
+            value, thread_id, app_name = asyncio.run(run_in_app_context(blocking_call, 42))
+
+        assert value == 42
+        assert thread_id != loop_thread
+        assert app_name == app.name
+
+
+class TestAgentAsyncCalls:
+    """Test cases for the async OpenAI call in BaseAgent."""
+
+    @pytest.fixture
+    def context(self):
+        return AgentContext(tenant_id="1", channel_type="telegram")
+
+    def _client(self, create):
+        client = Mock()
+        client.chat.completions.create = create
+        return client
+
+    @pytest.mark.asyncio
+    async def test_call_openai_awaits_async_client(self, context):
+        """Test chat completions are awaited on the shared async client."""
+        response = Mock()
+        response.choices = [Mock()]
+        response.choices[0].message.content = "Hello"
+        create = AsyncMock(return_value=response)
+
+        agent = RouterAgent()
+        with patch('app.secretary.agents.base_agent.async_openai_clients') as mock_pool:
+            mock_pool.get_client.return_value = self._client(create)
+            mock_pool.request_timeout.return_value = 5.0
+
+            result = await agent._call_openai([{"role": "user", "content": "Hi"}], context)
+
+        assert result == "Hello"
+        create.assert_awaited_once()
+        assert create.call_args.kwargs['model'] == agent.model
+
+    @pytest.mark.asyncio
+    async def test_call_openai_times_out(self, context):
+        """Test a slow request is cancelled after the timeout."""
+        cancelled = asyncio.Event()
+
+        async def slow_create(**kwargs):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        agent = RouterAgent()
+        with patch('app.secretary.agents.base_agent.async_openai_clients') as mock_pool:
+            mock_pool.get_client.return_value = self._client(slow_create)
+
+            with pytest.raises(asyncio.TimeoutError):
+                await agent._call_openai([{"role": "user", "content": "Hi"}], context, timeout=0.01)
+
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_do_not_block_each_other(self, context):
+        """Test concurrent conversations overlap instead of running one after another."""
+        in_flight = 0
+        peak = 0
+
+        async def create(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            response = Mock()
+            response.choices = [Mock()]
+            response.choices[0].message.content = "ok"
+            return response
+
+        agent = RouterAgent()
+        with patch('app.secretary.agents.base_agent.async_openai_clients') as mock_pool:
+            mock_pool.get_client.return_value = self._client(create)
+            mock_pool.request_timeout.return_value = 5.0
+
+            results = await asyncio.gather(*[
+                agent._call_openai([{"role": "user", "content": str(i)}], context) for i in range(10)
+            ])
+
+        assert results == ["ok"] * 10
+        assert peak == 10
+
+    @pytest.mark.asyncio
+    async def test_process_stream_forwards_reply_tokens(self, context):
+        """Test reply tokens are streamed while analysis calls stay buffered."""
+        agent = RouterAgent()
+
+        def chunk(content):
+            item = Mock()
+            item.choices = [Mock()]
+            item.choices[0].delta.content = content
+            return item
+
+        async def token_stream():
+            for token in ["Hel", "lo", None, "!"]:
+                yield chunk(token)
+
+        async def create(**kwargs):
+            if kwargs.get('stream'):
+                return token_stream()
+            response = Mock()
+            response.choices = [Mock()]
+            response.choices[0].message.content = '{"analysis": true}'
+            return response
+
+        async def process(message, context):
+            analysis = await agent._call_openai([{"role": "user", "content": message}], context)
+            reply = await agent._call_openai([{"role": "user", "content": message}], context, stream=True)
+            return AgentResponse(content=reply, confidence=0.9, metadata={'analysis': analysis})
+
+        with patch('app.secretary.agents.base_agent.async_openai_clients') as mock_pool, \
+             patch.object(agent, 'process', side_effect=process):
+            mock_pool.get_client.return_value = self._client(create)
+            mock_pool.request_timeout.return_value = 5.0
+
+            events = [event async for event in agent.process_stream("Hi", context)]
+
+        assert [event.delta for event in events if not event.done] == ["Hel", "lo", "!"]
+        assert events[-1].done
+        assert events[-1].response.content == "Hello!"
+        assert events[-1].response.metadata['analysis'] == '{"analysis": true}'
+
+    @pytest.mark.asyncio
+    async def test_call_openai_without_stream_sink(self, context):
+        """Test stream=True outside process_stream makes a regular request."""
+        response = Mock()
+        response.choices = [Mock()]
+        response.choices[0].message.content = "Hello"
+        create = AsyncMock(return_value=response)
+
+        agent = RouterAgent()
+        with patch('app.secretary.agents.base_agent.async_openai_clients') as mock_pool:
+            mock_pool.get_client.return_value = self._client(create)
+            mock_pool.request_timeout.return_value = 5.0
+
+            result = await agent._call_openai([{"role": "user", "content": "Hi"}], context, stream=True)
+
+        assert result == "Hello"
+        assert 'stream' not in create.call_args.kwargs
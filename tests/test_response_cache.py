@@ -0,0 +1,257 @@
+"""Tests for the semantic response cache."""
+import threading
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app.services.response_cache import SemanticResponseCache
+from app.secretary.agents.orchestrator import AgentOrchestrator
+from app.secretary.agents.base_agent import AgentContext, AgentResponse
+from app.secretary.agents.router_agent import IntentResult
+
+
+class FakeRedis:
+    """Minimal dict-backed Redis stand-in for generation counters."""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def incr(self, key):
+        self.store[key] = int(self.store.get(key, 0)) + 1
+        return self.store[key]
+
+
+def cache_with_vectors(vectors, **kwargs):
+    """Create a cache whose embedder looks messages up in `vectors`."""
+    async def embed(message):
+        return vectors[message]
+    return SemanticResponseCache(embed=embed, ttl=60, similarity=0.9, max_entries=10, **kwargs)
+
+
+class TestSemanticResponseCache:
+    """Test cases for SemanticResponseCache."""
+
+    @pytest.mark.asyncio
+    async def test_similar_question_hits(self):
+        """Test a rephrased question reuses the stored answer."""
+        cache = cache_with_vectors({
+            "What are your opening hours?": [1.0, 0.0, 0.1],
+            "When are you open?": [0.98, 0.0, 0.15],
+            "How do I reset my password?": [0.0, 1.0, 0.0]
+        })
+
+        cached, key = await cache.lookup(1, "What are your opening hours?", "operations", "en")
+        assert cached is None
+        assert cache.store(key, "We are open 9-17.", 0.9, suggested_actions=["show_hours"])
+
+        cached, key = await cache.lookup(1, "When are you open?", "operations", "en")
+        assert key is None
+        assert cached.content == "We are open 9-17."
+        assert cached.suggested_actions == ["show_hours"]
+
+        cached, _ = await cache.lookup(1, "How do I reset my password?", "operations", "en")
+        assert cached is None
+
+        stats = cache.get_stats(1)
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+        assert stats['hit_rate'] == pytest.approx(1 / 3)
+
+    def test_scoped_by_tenant_intent_and_language(self):
+        """Test answers are only reused for the same tenant, intent and language."""
+        cache = SemanticResponseCache(ttl=60, similarity=0.9)
+        _, key = cache.find(1, "operations", "en", [1.0, 0.0])
+        cache.store(key, "We are open 9-17.", 0.9)
+
+        assert cache.find(1, "operations", "en", [1.0, 0.0])[0] is not None
+        assert cache.find(2, "operations", "en", [1.0, 0.0])[0] is None
+        assert cache.find(1, "sales", "en", [1.0, 0.0])[0] is None
+        assert cache.find(1, "operations", "de", [1.0, 0.0])[0] is None
+
+    def test_low_confidence_answers_are_not_stored(self):
+        """Test unconfident answers are not cached."""
+        cache = SemanticResponseCache(ttl=60, similarity=0.9)
+        _, key = cache.find(1, "support", "en", [1.0, 0.0])
+
+        assert cache.store(key, "Maybe try again?", 0.3) is False
+        assert cache.get_stats(1)['size'] == 0
+
+    def test_ttl_expiry(self):
+        """Test expired answers are not served."""
+        cache = SemanticResponseCache(ttl=60, similarity=0.9)
+        _, key = cache.find(1, "operations", "en", [1.0, 0.0])
+        cache.store(key, "We are open 9-17.", 0.9)
+
+        with patch('app.services.response_cache.time.monotonic', return_value=10 ** 9):
+            cached, key = cache.find(1, "operations", "en", [1.0, 0.0])
+
+        assert cached is None
+        assert key is not None
+        assert cache.get_stats(1)['size'] == 0
+
+    def test_expired_best_match_does_not_hide_live_answer(self):
+        """Test expired entries are dropped before picking the most similar one."""
+        cache = SemanticResponseCache(ttl=60, similarity=0.9)
+        _, old_key = cache.find(1, "operations", "en", [1.0, 0.0])
+        _, key = cache.find(1, "operations", "en", [0.98, 0.1])
+        cache.store(old_key, "Old hours.", 0.9)
+        cache.store(key, "We are open 9-17.", 0.9)
+        oldest = next(iter(cache._tenants["1"].entries.values()))
+        oldest.expires_at = 0
+
+        cached, _ = cache.find(1, "operations", "en", [1.0, 0.0])
+
+        assert cached.content == "We are open 9-17."
+        assert cache.get_stats(1)['size'] == 1
+
+    @pytest.mark.asyncio
+    async def test_lookup_reads_redis_off_the_event_loop(self):
+        """Test async lookups and stores do their Redis reads in a worker thread."""
+        redis_client = FakeRedis()
+        threads = []
+        get = redis_client.get
+        redis_client.get = lambda key: threads.append(threading.current_thread()) or get(key)
+        cache = cache_with_vectors({"Hello": [1.0, 0.0]}, redis_client=redis_client)
+
+        _, key = await cache.lookup(1, "Hello", "sales", "en")
+        assert await cache.store_async(key, "Hi!", 0.9)
+        cached, _ = await cache.lookup(1, "Hello", "sales", "en")
+
+        assert cached.content == "Hi!"
+        assert len(threads) == 3
+        assert threading.main_thread() not in threads
+
+    def test_lru_eviction_per_tenant(self):
+        """Test each tenant keeps at most max_entries answers."""
+        cache = SemanticResponseCache(ttl=60, similarity=0.99, max_entries=2)
+        for vector in ([1.0, 0.0], [0.0, 1.0], [1.0, 1.0]):
+            _, key = cache.find(1, "sales", "en", vector)
+            cache.store(key, f"answer {vector}", 0.9)
+
+        assert cache.find(1, "sales", "en", [1.0, 0.0])[0] is None
+        assert cache.find(1, "sales", "en", [1.0, 1.0])[0] is not None
+        assert cache.get_stats(1)['evictions'] == 1
+
+    def test_invalidation_drops_tenant_answers(self):
+        """Test knowledge changes drop answers, including ones still being generated."""
+        cache = SemanticResponseCache(ttl=60, similarity=0.9)
+        _, key = cache.find(1, "operations", "en", [1.0, 0.0])
+        cache.store(key, "We are open 9-17.", 0.9)
+        _, pending_key = cache.find(1, "support", "en", [0.0, 1.0])
+        _, other_key = cache.find(2, "operations", "en", [1.0, 0.0])
+        cache.store(other_key, "We are open 8-16.", 0.9)
+
+        cache.invalidate_tenant(1)
+
+        assert cache.find(1, "operations", "en", [1.0, 0.0])[0] is None
+        assert cache.store(pending_key, "Reset it in settings.", 0.9) is False
+        assert cache.find(2, "operations", "en", [1.0, 0.0])[0] is not None
+        assert cache.get_stats(1)['invalidations'] == 1
+
+    def test_shared_generation_invalidates_other_processes(self):
+        """Test an invalidation through Redis reaches another cache instance."""
+        redis_client = FakeRedis()
+        worker = SemanticResponseCache(ttl=60, similarity=0.9, redis_client=redis_client)
+        bot = SemanticResponseCache(ttl=60, similarity=0.9, redis_client=redis_client)
+        _, key = bot.find(1, "operations", "en", [1.0, 0.0])
+        bot.store(key, "We are open 9-17.", 0.9)
+
+        worker.invalidate_tenant(1)
+
+        assert bot.find(1, "operations", "en", [1.0, 0.0])[0] is None
+
+    @pytest.mark.asyncio
+    async def test_embedding_failure_is_a_miss(self):
+        """Test lookups degrade to a miss when the embedding call fails."""
+        cache = SemanticResponseCache(embed=AsyncMock(side_effect=RuntimeError("API down")))
+
+        assert await cache.lookup(1, "Hello", "sales", "en") == (None, None)
+        assert cache.get_stats(1)['errors'] == 1
+
+    @pytest.mark.asyncio
+    async def test_long_messages_are_not_cached(self):
+        """Test long messages skip the cache without embedding."""
+        embed = AsyncMock()
+        cache = SemanticResponseCache(embed=embed)
+
+        assert await cache.lookup(1, "x" * 5000, "sales", "en") == (None, None)
+        embed.assert_not_called()
+
+
+class TestOrchestratorResponseCache:
+    """Test cases for response caching in AgentOrchestrator."""
+
+    @pytest.fixture
+    def orchestrator(self):
+        cache = cache_with_vectors({
+            "What are your opening hours?": [1.0, 0.0],
+            "When are you open?": [0.99, 0.05]
+        })
+        cache.is_enabled = Mock(return_value=True)
+        orchestrator = AgentOrchestrator(cache=cache)
+
+        async def filter_input(message, context):
+            return Mock(is_safe=True, filtered_content=message)
+
+        async def detect_intent(message, context):
+            return IntentResult(
+                category="operations", confidence=0.9, language="en",
+                customer_context={}, routing_metadata={}, message=message
+            )
+
+        orchestrator.supervisor.filter_input = filter_input
+        orchestrator.supervisor.validate_response = AsyncMock(return_value=AgentResponse(
+            content="ok", confidence=1.0, metadata={"is_safe": True}
+        ))
+        orchestrator.router.detect_intent = detect_intent
+        orchestrator.agents['operations'].generate_response = AsyncMock(return_value=AgentResponse(
+            content="We are open 9-17.", confidence=0.9, intent="operations"
+        ))
+        return orchestrator
+
+    @pytest.mark.asyncio
+    async def test_repeated_question_skips_specialist(self, orchestrator):
+        """Test a repeated question is answered from the cache."""
+        context = AgentContext(tenant_id="tenant-1", conversation_id="conv-1", language="en")
+
+        first = await orchestrator.process_message("What are your opening hours?", context)
+        second = await orchestrator.process_message("When are you open?", context)
+
+        assert orchestrator.agents['operations'].generate_response.await_count == 1
+        assert first.content == second.content == "We are open 9-17."
+        assert "cached" not in first.metadata
+        assert second.metadata["cached"] is True
+        assert orchestrator.response_cache.get_stats("tenant-1")['hits'] == 1
+
+        health = await orchestrator.health_check()
+        assert health["response_cache"]["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_answers_needing_intervention_are_not_cached(self, orchestrator):
+        """Test answers the supervisor had to change are not reused."""
+        orchestrator.supervisor.validate_response = AsyncMock(return_value=AgentResponse(
+            content="[filtered]", confidence=1.0, metadata={"is_safe": False}
+        ))
+        context = AgentContext(tenant_id="tenant-1", conversation_id="conv-1", language="en")
+
+        await orchestrator.process_message("What are your opening hours?", context)
+        await orchestrator.process_message("What are your opening hours?", context)
+
+        assert orchestrator.agents['operations'].generate_response.await_count == 2
+        assert orchestrator.response_cache.get_stats("tenant-1")['stores'] == 0
+
+    @pytest.mark.asyncio
+    async def test_fallback_answers_are_not_cached(self, orchestrator):
+        """Test canned replies from failed generations are not reused."""
+        orchestrator.agents['operations'].generate_response = AsyncMock(return_value=AgentResponse(
+            content="Thank you for your question.", confidence=0.8, intent="operations",
+            metadata={"fallback": True}
+        ))
+        context = AgentContext(tenant_id="tenant-1", conversation_id="conv-1", language="en")
+
+        await orchestrator.process_message("What are your opening hours?", context)
+        await orchestrator.process_message("What are your opening hours?", context)
+
+        assert orchestrator.agents['operations'].generate_response.await_count == 2
+        assert orchestrator.response_cache.get_stats("tenant-1")['stores'] == 0
@@ -12,8 +12,8 @@ class TestRouterAgent:
     
     @pytest.fixture
     def router_agent(self):
-        """Create a RouterAgent instance for testing."""
-        return RouterAgent()
+        """Create a RouterAgent that always asks the LLM."""
+        return RouterAgent(fast_path=False)
     
     @pytest.fixture
     def sample_context(self):
@@ -0,0 +1,355 @@
+"""Tests for the indexed sanctions list screening."""
+import random
+import time
+import pytest
+from unittest.mock import patch
+from app.services.kyb_adapters import EUSanctionsAdapter, OFACSanctionsAdapter, UKSanctionsAdapter
+from app.services.kyb_adapters.sanctions_index import (
+    SanctionsIndex, SanctionsIndexHolder, SanctionsRecord, diff_fingerprints, jaro_winkler,
+    load_sanctions_index, name_similarity, name_tokens, normalize_name, parse_eu_xml, parse_ofac_csv, parse_ofac_xml,
+    parse_uk_csv, parse_uk_xml
+)
+
+
+EU_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<export xmlns="http://eu.europa.ec/fpi/fsd/export">
+  <sanctionEntity logicalId="13" euReferenceNumber="EU.27.28">
+    <remark>State-owned bank</remark>
+    <regulation programme="UKR" publicationDate="2022-02-28"/>
+    <regulation programme="RUS" publicationDate="2014-07-31"/>
+    <subjectType code="enterprise"/>
+    <nameAlias wholeName="Sberbank of Russia"/>
+    <nameAlias wholeName="PAO Sberbank"/>
+  </sanctionEntity>
+  <sanctionEntity logicalId="14" euReferenceNumber="EU.1.1">
+    <regulation programme="RUS" publicationDate="2022-02-25"/>
+    <subjectType code="person"/>
+    <nameAlias wholeName="Sergey Viktorovich Lavrov"/>
+  </sanctionEntity>
+</export>
+"""
+
+OFAC_XML = """<?xml version="1.0" standalone="yes"?>
+<sdnList xmlns="https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/XML">
+  <sdnEntry>
+    <uid>36</uid>
+    <lastName>AEROCARIBBEAN AIRLINES</lastName>
+    <sdnType>Entity</sdnType>
+    <programList><program>CUBA</program></programList>
+    <akaList>
+      <aka><uid>12</uid><type>a.k.a.</type><lastName>AERO-CARIBBEAN</lastName></aka>
+    </akaList>
+  </sdnEntry>
+  <sdnEntry>
+    <uid>2674</uid>
+    <firstName>Abu</firstName>
+    <lastName>ABBAS</lastName>
+    <sdnType>Individual</sdnType>
+    <programList><program>SDGT</program><program>SDT</program></programList>
+  </sdnEntry>
+</sdnList>
+"""
+
+OFAC_SDN_CSV = """36,"AEROCARIBBEAN AIRLINES",-0- ,"CUBA",-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0-
+2674,"ABBAS, Abu","individual","SDGT] [SDT",-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,"DOB 10 Dec 1948."
+"""
+
+OFAC_ALT_CSV = """36,12,"aka","AERO-CARIBBEAN",-0-
+"""
+
+UK_CSV = """Last Updated,28/02/2024
+Name 6,Name 1,Name 2,Name 3,Name 4,Name 5,Title,Group Type,Alias Type,Regime,Listed On,UK Sanctions List Ref,Group ID
+GAZPROM,,,,,,,Entity,Primary name,Russia,16/03/2022,RUS0250,14188
+GAZPROM PJSC,,,,,,,Entity,AKA,Russia,16/03/2022,RUS0250,14188
+PUTIN,Vladimir,Vladimirovich,,,,President,Individual,Primary name,Russia,28/02/2022,RUS0251,14200
+"""
+
+UK_XML = """<?xml version="1.0" encoding="utf-8"?>
+<ArrayOfFinancialSanctionsTarget>
+  <FinancialSanctionsTarget>
+    <Name6>GAZPROM</Name6>
+    <GroupTypeDescription>Entity</GroupTypeDescription>
+    <AliasType>Primary name</AliasType>
+    <RegimeName>Russia</RegimeName>
+    <DateListed>2022-03-16T00:00:00</DateListed>
+    <GroupID>14188</GroupID>
+    <UKSanctionsListRef>RUS0250</UKSanctionsListRef>
+  </FinancialSanctionsTarget>
+</ArrayOfFinancialSanctionsTarget>
+"""
+
+RECORDS = [
+    SanctionsRecord(uid='1', name='SBERBANK OF RUSSIA', aliases=['SBERBANK', 'SBER'], entity_type='company',
+                    programs=['RUS']),
+    SanctionsRecord(uid='2', name='VLADIMIR VLADIMIROVICH PUTIN', aliases=['VLADIMIR PUTIN'],
+                    entity_type='individual', programs=['RUS']),
+    SanctionsRecord(uid='3', name='ROSNEFT OIL COMPANY', aliases=['ROSNEFT'], entity_type='company',
+                    programs=['UKR']),
+    SanctionsRecord(uid='4', name='BANK ROSSIYA', entity_type='company', programs=['RUS'])
+]
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+class TestNameMatching:
+    """Test cases for name normalization and similarity."""
+
+    def test_jaro_winkler_reference_values(self):
+        """Test Jaro-Winkler against the textbook examples."""
+        assert jaro_winkler('MARTHA', 'MARHTA') == pytest.approx(0.9611, abs=1e-4)
+        assert jaro_winkler('DWAYNE', 'DUANE') == pytest.approx(0.84, abs=1e-4)
+        assert jaro_winkler('DIXON', 'DICKSONX') == pytest.approx(0.8133, abs=1e-4)
+        assert jaro_winkler('ABC', 'XYZ') == 0.0
+
+    def test_normalization_drops_noise(self):
+        """Test accents, punctuation and legal forms are ignored."""
+        assert normalize_name('  Société  Générale, S.A. ') == 'SOCIETE GENERALE S A'
+        assert name_tokens('Gazprom Neft PJSC') == ('GAZPROM', 'NEFT')
+        assert name_tokens('The Company Ltd') == ('THE', 'COMPANY', 'LTD')
+
+    def test_name_similarity(self):
+        """Test word order and misspellings still score high."""
+        assert name_similarity('PUTIN VLADIMIR', 'VLADIMIR PUTIN') == 1.0
+        assert name_similarity('SBERBNAK', 'SBERBANK') >= 0.9
+        assert name_similarity('GAZ PROM', 'GAZPROM') >= 0.9
+        assert name_similarity('DEUTSCHE BANK', 'BANK ROSSIYA') < 0.8
+
+
+class TestSanctionsIndex:
+    """Test cases for SanctionsIndex."""
+
+    @pytest.fixture
+    def index(self):
+        return SanctionsIndex(RECORDS)
+
+    def test_exact_and_fuzzy_matches(self, index):
+        """Test exact names, typos, reordered words and legal forms match."""
+        for query in ['Sberbank of Russia', 'SBERBNAK OF RUSSIA', 'PJSC Sberbank', 'Putin, Vladimir Vladimirovich']:
+            matches = index.screen(query)
+            assert len(matches) == 1, query
+            assert matches[0].score >= 0.9
+
+        assert index.screen('Sberbank of Russia')[0].record.uid == '1'
+
+    def test_alias_matches(self, index):
+        """Test aliases match unless excluded."""
+        match = index.screen('Sber')[0]
+
+        assert match.record.uid == '1'
+        assert match.match_type == 'alias'
+        assert match.matched_name == 'SBER'
+        assert index.screen('Sber', include_aliases=False) == []
+
+    def test_no_false_positives(self, index):
+        """Test unrelated names sharing common words do not match."""
+        for query in ['Deutsche Bank AG', 'Russia Travel Company', 'Vladimir Nabokov', 'Clean Company Ltd']:
+            assert index.screen(query) == [], query
+
+    def test_record_filter_and_lookup(self, index):
+        """Test screening can be limited to some records and records found by ID."""
+        assert index.screen('Rosneft', record_filter=lambda record: 'RUS' in record.programs) == []
+        assert index.get('4').name == 'BANK ROSSIYA'
+        assert index.get('missing') is None
+        assert index.stats()['total_entities'] == 4
+        assert index.stats()['individuals'] == 1
+
+    def test_holder_swaps_index(self):
+        """Test the holder replaces the index as a whole."""
+        holder = SanctionsIndexHolder()
+        first = SanctionsIndex(RECORDS[:1])
+
+        assert holder.swap(first, 'first') is None
+        assert holder.swap(SanctionsIndex(RECORDS), 'second') is first
+        assert holder.source == 'second'
+        assert len(holder.index.records) == 4
+
+    def test_versions_and_diff(self, index):
+        """Test list versions follow the contents and diffs name the changed entries."""
+        changed = [
+            RECORDS[0],
+            SanctionsRecord(uid=RECORDS[1].uid, name=RECORDS[1].name, aliases=['NEW ALIAS'],
+                            entity_type=RECORDS[1].entity_type, programs=RECORDS[1].programs),
+            RECORDS[3],
+            SanctionsRecord(uid='5', name='ACME TRADING LLC', entity_type='company')
+        ]
+        updated = SanctionsIndex(changed)
+
+        assert SanctionsIndex(list(reversed(RECORDS))).version == index.version
+        assert updated.version != index.version
+
+        diff = diff_fingerprints(index.fingerprints(), updated.fingerprints())
+        assert (diff.added, diff.modified, diff.removed) == (['5'], [RECORDS[1].uid], [RECORDS[2].uid])
+        assert diff.changed == ['5', RECORDS[1].uid]
+        assert diff_fingerprints(index.fingerprints(), index.fingerprints()).is_empty
+
+    def test_subset_keeps_list_weights(self, index):
+        """Test a subset screens its parties as the full index does."""
+        subset = index.subset(['1', 'missing'])
+
+        assert [record.uid for record in subset.records] == ['1']
+        assert subset.screen('PJSC Sberbank')[0].score == index.screen('PJSC Sberbank')[0].score
+        assert subset.screen('Bank Rossiya') == []
+
+
+class TestListParsers:
+    """Test cases for the list file parsers."""
+
+    def test_parse_eu_xml(self, tmp_path):
+        """Test EU entities with aliases, programmes and subject types."""
+        records = list(parse_eu_xml(write(tmp_path, 'eu.xml', EU_XML)))
+
+        assert [record.name for record in records] == ['Sberbank of Russia', 'Sergey Viktorovich Lavrov']
+        assert records[0].aliases == ['PAO Sberbank']
+        assert records[0].programs == ['UKR', 'RUS']
+        assert records[0].listing_date == '2014-07-31'
+        assert records[0].entity_type == 'company'
+        assert records[0].details['reason'] == 'State-owned bank'
+        assert records[1].entity_type == 'individual'
+
+    def test_parse_ofac_xml(self, tmp_path):
+        """Test OFAC entries join first and last names and read aliases."""
+        records = list(parse_ofac_xml(write(tmp_path, 'sdn.xml', OFAC_XML)))
+
+        assert [record.uid for record in records] == ['36', '2674']
+        assert records[0].aliases == ['AERO-CARIBBEAN']
+        assert records[1].name == 'Abu ABBAS'
+        assert records[1].programs == ['SDGT', 'SDT']
+        assert records[1].entity_type == 'individual'
+
+    def test_parse_ofac_csv(self, tmp_path):
+        """Test OFAC CSV rows with aliases from alt.csv."""
+        write(tmp_path, 'alt.csv', OFAC_ALT_CSV)
+        records = list(parse_ofac_csv(write(tmp_path, 'sdn.csv', OFAC_SDN_CSV)))
+
+        assert records[0].aliases == ['AERO-CARIBBEAN']
+        assert records[0].entity_type == 'entity'
+        assert records[1].programs == ['SDGT', 'SDT']
+        assert records[1].details['remarks'] == 'DOB 10 Dec 1948.'
+
+    def test_parse_uk_csv(self, tmp_path):
+        """Test UK rows are grouped into one record per group."""
+        records = list(parse_uk_csv(write(tmp_path, 'ConList.csv', UK_CSV)))
+
+        assert len(records) == 2
+        assert records[0].uid == 'RUS0250'
+        assert records[0].aliases == ['GAZPROM PJSC']
+        assert records[0].listing_date == '2022-03-16'
+        assert records[1].name == 'Vladimir Vladimirovich PUTIN'
+
+    def test_parse_uk_xml(self, tmp_path):
+        """Test UK XML targets."""
+        records = list(parse_uk_xml(write(tmp_path, 'ConList.xml', UK_XML)))
+
+        assert [(record.uid, record.name, record.programs) for record in records] == [
+            ('RUS0250', 'GAZPROM', ['Russia'])
+        ]
+
+    def test_load_rejects_unknown_format(self, tmp_path):
+        """Test unsupported and missing files raise."""
+        with pytest.raises(ValueError):
+            load_sanctions_index(write(tmp_path, 'list.json', '{}'), {'.xml': parse_eu_xml})
+        with pytest.raises(FileNotFoundError):
+            load_sanctions_index(str(tmp_path / 'missing.xml'), {'.xml': parse_eu_xml})
+
+
+class TestAdapterIndex:
+    """Test cases for screening through the sanctions adapters."""
+
+    @pytest.fixture
+    def holders(self):
+        with patch.object(EUSanctionsAdapter, '_index_holder', SanctionsIndexHolder()), \
+                patch.object(OFACSanctionsAdapter, '_index_holder', SanctionsIndexHolder()), \
+                patch.object(UKSanctionsAdapter, '_index_holder', SanctionsIndexHolder()):
+            yield
+
+    def test_update_swaps_in_list_file(self, holders, tmp_path):
+        """Test updating from a list file replaces the sample records."""
+        adapter = EUSanctionsAdapter()
+        assert adapter.check_single('SBERBANK OF RUSSIA')['status'] == 'match'
+        assert adapter._index_holder.source == 'sample'
+
+        update = adapter.update_sanctions_data(write(tmp_path, 'eu.xml', EU_XML))
+
+        assert update['success'] is True
+        assert update['total_entities'] == 2
+        result = adapter.check_single('Lavrov Sergey', force_refresh=True)
+        assert result['status'] == 'match'
+        assert result['matches'][0]['sanctions_program'] == 'RUS'
+        assert adapter.check_single('GAZPROM', force_refresh=True)['status'] == 'no_match'
+
+    def test_failed_update_keeps_index(self, holders, tmp_path):
+        """Test a broken list file leaves the current index in place."""
+        adapter = OFACSanctionsAdapter()
+        adapter.update_sanctions_data(write(tmp_path, 'sdn.xml', OFAC_XML))
+
+        update = adapter.update_sanctions_data(write(tmp_path, 'broken.xml', '<sdnList><sdnEntry>'))
+
+        assert update['success'] is False
+        assert adapter.check_single('AERO CARIBBEAN')['matches'][0]['ofac_uid'] == '36'
+
+    def test_screen_names_in_bulk(self, holders):
+        """Test bulk screening returns one check_single style result per distinct name."""
+        adapter = OFACSanctionsAdapter()
+
+        results = adapter.screen_names(['Sberbank', 'Clean Company', 'Sberbank', 'ab'])
+
+        assert list(results) == ['Sberbank', 'Clean Company', 'ab']
+        assert results['Sberbank']['status'] == 'match'
+        assert results['Sberbank']['matches'][0]['ofac_uid'] == '36418'
+        assert results['Sberbank']['match_threshold'] == OFACSanctionsAdapter.DEFAULT_MATCH_THRESHOLD
+        assert results['Clean Company']['status'] == 'no_match'
+        assert results['ab']['status'] == 'validation_error'
+
+    def test_regime_filter(self, holders):
+        """Test UK screening limited to other regimes finds nothing."""
+        adapter = UKSanctionsAdapter()
+
+        assert adapter.check_single('GAZPROM', regimes=['Russia'])['status'] == 'match'
+        assert adapter.check_single('GAZPROM', regimes=['Iran'])['status'] == 'no_match'
+
+
+class TestScreeningLatency:
+    """Benchmark screening against a list of realistic size."""
+
+    SYLLABLES = ['ka', 'ro', 'vi', 'lan', 'mer', 'to', 'sha', 'dun', 'pel', 'zor', 'bar', 'nik', 'ost', 'gaz',
+                 'fa', 'ri', 'mon', 'tel', 'us', 'ev', 'ak', 'hol', 'din', 'sa', 'bek', 'chu', 'gor', 'il',
+                 'jas', 'kov', 'lu', 'mak', 'nor', 'om', 'pra', 'quin', 'sel', 'tur', 'ul', 'vas', 'wen',
+                 'yar', 'zem', 'ab', 'dor', 'hu', 'ker', 'lis']
+    SUFFIXES = ['BANK', 'TRADING', 'HOLDING', 'SHIPPING', 'GROUP', 'INDUSTRIES', 'OIL', 'INVEST']
+
+    def _random_name(self, generator):
+        words = [
+            ''.join(generator.choice(self.SYLLABLES) for _ in range(generator.randint(2, 4))).upper()
+            for _ in range(generator.randint(1, 3))
+        ]
+        if generator.random() < 0.5:
+            words.append(generator.choice(self.SUFFIXES))
+        return ' '.join(words)
+
+    def test_screening_latency(self):
+        """Test a screen of a 20,000 party list stays in the low milliseconds."""
+        generator = random.Random(7)
+        records = [
+            SanctionsRecord(uid=str(number), name=self._random_name(generator),
+                            aliases=[self._random_name(generator)] if number % 3 == 0 else [])
+            for number in range(20000)
+        ]
+        index = SanctionsIndex(records)
+        queries = [self._random_name(generator) for _ in range(300)]
+        queries += [records[number].name.replace('A', 'E', 1) for number in range(0, 20000, 100)]
+
+        timings = []
+        for _ in range(2):
+            start_time = time.perf_counter()
+            hits = sum(1 for query in queries if index.screen(query))
+            timings.append((time.perf_counter() - start_time) / len(queries) * 1000)
+
+        print(f"\nSanctions screening over {index.name_count} names: "
+              f"{timings[0]:.2f} ms/query first run, {timings[1]:.2f} ms/query repeated, {hits} hits")
+
+        assert hits >= 200
+        assert timings[0] < 10.0
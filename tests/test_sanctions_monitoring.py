@@ -5,17 +5,21 @@ from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime, timedelta
 
 from app import create_app, db
-from app.models.kyb_monitoring import Counterparty, CounterpartySnapshot, KYBAlert, KYBMonitoringConfig
+from app.models.kyb_monitoring import (
+    Counterparty, CounterpartySnapshot, KYBAlert, KYBMonitoringConfig, SanctionsListVersion
+)
 from app.models.tenant import Tenant
 from app.services.sanctions_service import SanctionsMonitoringService
 from app.services.kyb_adapters.sanctions_eu import EUSanctionsAdapter
 from app.services.kyb_adapters.sanctions_ofac import OFACSanctionsAdapter
 from app.services.kyb_adapters.sanctions_uk import UKSanctionsAdapter
 from app.services.kyb_adapters.base import ValidationError, DataSourceUnavailable, RateLimitExceeded
+from app.services.kyb_adapters.sanctions_index import SanctionsIndexHolder, SanctionsRecord
 from app.workers.kyb_monitoring import (
     check_counterparty_sanctions, batch_check_sanctions, 
     generate_sanctions_alerts, update_sanctions_data,
-    schedule_sanctions_monitoring
+    schedule_sanctions_monitoring, screen_tenant_sanctions,
+    rescreen_sanctions_changes
 )
 
 
@@ -321,6 +325,123 @@ class TestSanctionsMonitoringService:
         
         assert len(results) == 3
         assert all('status' in result for result in results)
+        assert [result['counterparty_id'] for result in results] == [cp.id for cp in counterparties]
+        assert [result['status'] for result in results] == ['no_match', 'match', 'no_match']
+    
+    def test_batch_check_unknown_counterparty(self, app, counterparty, kyb_config):
+        """Test unknown counterparties are reported as errors in place."""
+        service = SanctionsMonitoringService()
+        results = service.batch_check_counterparties([999999, counterparty.id])
+        
+        assert results[0]['status'] == 'error'
+        assert results[1]['counterparty_id'] == counterparty.id
+        assert results[1]['status'] == 'match'
+    
+    def test_screen_portfolio_bulk_writes(self, app, tenant, kyb_config):
+        """Test portfolio screening writes snapshots, alerts and risk updates in bulk."""
+        names = ["SBERBANK", "Clean Company", "SBERBANK", "Another Company"]
+        counterparties = [
+            Counterparty(tenant_id=tenant.id, name=name, monitoring_enabled=True) for name in names
+        ]
+        counterparties.append(Counterparty(tenant_id=tenant.id, name="Gazprom", monitoring_enabled=False))
+        db.session.add_all(counterparties)
+        db.session.commit()
+        
+        service = SanctionsMonitoringService()
+        results = service.screen_portfolio(tenant.id)
+        
+        assert len(results) == 4
+        matched_ids = [result['counterparty_id'] for result in results if result['status'] == 'match']
+        assert matched_ids == [counterparties[0].id, counterparties[2].id]
+        assert all(result['alerts_generated'] == 3 for result in results if result['status'] == 'match')
+        
+        snapshots = CounterpartySnapshot.query.filter_by(tenant_id=tenant.id).all()
+        assert len(snapshots) == 4 * 3
+        alerts = KYBAlert.query.filter_by(tenant_id=tenant.id, alert_type='sanctions_match').all()
+        assert sorted(alert.counterparty_id for alert in alerts) == sorted(matched_ids * 3)
+        
+        db.session.expire_all()
+        assert Counterparty.query.get(counterparties[0].id).risk_level == 'critical'
+        assert Counterparty.query.get(counterparties[0].id).status == 'under_review'
+        assert Counterparty.query.get(counterparties[1].id).risk_score == 0.0
+    
+    def test_rescreen_list_changes(self, app, tenant, kyb_config):
+        """Test list updates re-screen only changed entries plus new and renamed counterparties."""
+        clean = Counterparty(tenant_id=tenant.id, name="Clean Company", monitoring_enabled=True)
+        acme = Counterparty(tenant_id=tenant.id, name="Acme Trading", monitoring_enabled=True)
+        db.session.add_all([clean, acme])
+        db.session.commit()
+        
+        with patch.object(EUSanctionsAdapter, '_index_holder', SanctionsIndexHolder()), \
+                patch.object(OFACSanctionsAdapter, '_index_holder', SanctionsIndexHolder()), \
+                patch.object(UKSanctionsAdapter, '_index_holder', SanctionsIndexHolder()):
+            service = SanctionsMonitoringService()
+            
+            # No earlier re-screening: the whole portfolio is checked
+            first = service.rescreen_list_changes(tenant.id)
+            assert first['rescreened'] == 2
+            assert first['changed_entries'] == {'EU': 'all', 'OFAC': 'all', 'UK': 'all'}
+            assert Counterparty.query.get(acme.id).sanctions_screened_name == "Acme Trading"
+            
+            # Nothing changed
+            assert service.rescreen_list_changes(tenant.id)['rescreened'] == 0
+            
+            # An EU update lists Acme; only the names matching the new entry get a full check
+            listed = SanctionsRecord(uid='EU.9999.01', name='ACME TRADING LLC', entity_type='company')
+            with patch.object(EUSanctionsAdapter, 'SAMPLE_RECORDS', EUSanctionsAdapter.SAMPLE_RECORDS + [listed]):
+                update = service.update_all_sanctions_data()
+            assert update['results']['EU']['changes']['added'] == 1
+            assert update['results']['OFAC']['changes']['changed'] is False
+            
+            result = service.rescreen_list_changes(tenant.id)
+            assert result['changed_entries'] == {'EU': 1, 'OFAC': 0, 'UK': 0}
+            assert result['rescreened'] == 1
+            assert result['matched_counterparty_ids'] == [acme.id]
+            assert KYBAlert.query.filter_by(counterparty_id=acme.id, source='SanctionsMonitor_EU').count() == 1
+            
+            # A renamed counterparty is checked against the full lists
+            Counterparty.query.get(clean.id).name = "Sberbank"
+            db.session.commit()
+            
+            renamed = service.rescreen_list_changes(tenant.id)
+            assert renamed['new_or_renamed'] == 1
+            assert renamed['matched_counterparty_ids'] == [clean.id]
+        
+        versions = SanctionsListVersion.query.filter_by(source='EU').order_by(SanctionsListVersion.id).all()
+        assert len(versions) == 2
+        assert versions[0].changes is None and not versions[0].entries
+        assert versions[1].changes == {'added': ['EU.9999.01'], 'modified': [], 'removed': []}
+    
+    def test_rescreen_skips_list_that_fails_to_load(self, app, tenant, kyb_config):
+        """Test a source whose updated list cannot be loaded keeps its screened version."""
+        acme = Counterparty(tenant_id=tenant.id, name="Acme Trading", monitoring_enabled=True)
+        db.session.add(acme)
+        db.session.commit()
+        
+        with patch.object(EUSanctionsAdapter, '_index_holder', SanctionsIndexHolder()), \
+                patch.object(OFACSanctionsAdapter, '_index_holder', SanctionsIndexHolder()), \
+                patch.object(UKSanctionsAdapter, '_index_holder', SanctionsIndexHolder()):
+            service = SanctionsMonitoringService()
+            service.rescreen_list_changes(tenant.id)
+            screened_eu = KYBMonitoringConfig.query.filter_by(tenant_id=tenant.id).first().sanctions_list_versions['EU']
+            
+            listed = SanctionsRecord(uid='EU.9999.01', name='ACME TRADING LLC', entity_type='company')
+            with patch.object(EUSanctionsAdapter, 'SAMPLE_RECORDS', EUSanctionsAdapter.SAMPLE_RECORDS + [listed]):
+                service.update_all_sanctions_data()
+            
+            with patch.object(EUSanctionsAdapter, 'ensure_list_version', side_effect=IOError("list file missing")):
+                skipped = service.rescreen_list_changes(tenant.id)
+            assert skipped['changed_entries']['EU'] == 'unavailable'
+            assert 'EU' not in skipped['list_versions']
+            assert skipped['rescreened'] == 0
+            db.session.expire_all()
+            config = KYBMonitoringConfig.query.filter_by(tenant_id=tenant.id).first()
+            assert config.sanctions_list_versions['EU'] == screened_eu
+            
+            # Once the list loads again, the missed EU changes are re-screened
+            result = service.rescreen_list_changes(tenant.id)
+            assert result['changed_entries']['EU'] == 1
+            assert result['matched_counterparty_ids'] == [acme.id]
     
     def test_get_sanctions_statistics(self, app, tenant, counterparty, kyb_config):
         """Test getting sanctions statistics."""
@@ -381,6 +502,57 @@ class TestSanctionsWorkerTasks:
         assert result['total_matches'] == 1
         mock_service.check_counterparty_sanctions.assert_called_once_with(counterparty.id)
     
+    @patch('app.workers.kyb_monitoring.SanctionsMonitoringService')
+    def test_screen_tenant_sanctions_task(self, mock_service_class, app, tenant):
+        """Test portfolio sanctions screening task."""
+        mock_service = Mock()
+        mock_service.screen_portfolio.return_value = [
+            {'counterparty_id': 1, 'status': 'no_match', 'total_matches': 0, 'alerts_generated': 0},
+            {'counterparty_id': 2, 'status': 'match', 'total_matches': 2, 'alerts_generated': 2}
+        ]
+        mock_service_class.return_value = mock_service
+        
+        result = screen_tenant_sanctions(tenant.id)
+        
+        assert result['total_checked'] == 2
+        assert result['matched_counterparty_ids'] == [2]
+        assert result['alerts_generated'] == 2
+        mock_service.screen_portfolio.assert_called_once_with(tenant.id)
+    
+    @patch('app.workers.kyb_monitoring.SanctionsMonitoringService')
+    def test_rescreen_sanctions_changes_task(self, mock_service_class, app, tenant):
+        """Test sanctions delta re-screening task."""
+        mock_service = Mock()
+        mock_service.rescreen_list_changes.return_value = {
+            'tenant_id': tenant.id,
+            'total_counterparties': 10,
+            'rescreened': 1,
+            'matched_counterparty_ids': [2],
+            'results': [{'counterparty_id': 2, 'status': 'match', 'total_matches': 1, 'alerts_generated': 1}]
+        }
+        mock_service_class.return_value = mock_service
+        
+        result = rescreen_sanctions_changes(tenant.id)
+        
+        assert 'results' not in result
+        assert result['total_matches'] == 1
+        assert result['alerts_generated'] == 1
+        mock_service.rescreen_list_changes.assert_called_once_with(tenant.id)
+    
+    @patch('app.workers.kyb_monitoring.rescreen_sanctions_changes')
+    @patch('app.workers.kyb_monitoring.SanctionsMonitoringService')
+    def test_update_sanctions_data_schedules_rescreens(self, mock_service_class, mock_rescreen, app, kyb_config):
+        """Test a list update schedules a delta re-screening per tenant."""
+        mock_service = Mock()
+        mock_service.update_all_sanctions_data.return_value = {'sources_updated': ['EU'], 'results': {}}
+        mock_service_class.return_value = mock_service
+        mock_rescreen.apply_async.return_value = Mock(id='task_123')
+        
+        result = update_sanctions_data()
+        
+        assert result['rescreens_scheduled'] == [{'tenant_id': kyb_config.tenant_id, 'task_id': 'task_123'}]
+        mock_rescreen.apply_async.assert_called_once_with(args=[kyb_config.tenant_id])
+    
     @patch('app.workers.kyb_monitoring.SanctionsMonitoringService')
     def test_batch_check_sanctions_task(self, mock_service_class, app, tenant):
         """Test batch sanctions check task."""
@@ -488,7 +660,7 @@ class TestSanctionsErrorHandling:
         with pytest.raises(ValidationError):
             adapter.check_single("")
     
-    @patch('app.services.kyb_adapters.sanctions_eu.requests.Session.post')
+    @patch('requests.Session.post')
     def test_adapter_network_error(self, mock_post):
         """Test handling of network errors."""
         mock_post.side_effect = Exception("Network error")
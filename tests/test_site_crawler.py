@@ -0,0 +1,318 @@
+"""Tests for the concurrent site crawler against a local HTTP server."""
+import gzip
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.site_crawler import (
+    SiteCrawler, RobotsCache, canonicalize_url, extract_links, parse_sitemap
+)
+from app.services.web_scraper import WebScraper
+from app.utils.exceptions import ProcessingError
+
+
+def html_page(title, *links):
+    anchors = ''.join(f'<a href="{link}">{link}</a> ' for link in links)
+    return f'<html><head><title>{title}</title></head><body><main><p>{title} text.</p>{anchors}</main></body></html>'
+
+
+class LocalSite:
+    """Pages served by a local HTTP server, recording every request."""
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.latency = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def add(self, path, body, content_type='text/html; charset=utf-8', status=200, headers=None):
+        self.routes[path] = (status, content_type, body.encode() if isinstance(body, str) else body, headers or {})
+
+    def requested(self, path):
+        return [headers for requested_path, headers in self.requests if requested_path == path]
+
+    def page_requests(self):
+        return [path for path, _ in self.requests if path != '/robots.txt']
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with site._lock:
+                    site.requests.append((self.path, dict(self.headers)))
+                    site.in_flight += 1
+                    site.max_in_flight = max(site.max_in_flight, site.in_flight)
+                try:
+                    time.sleep(site.latency)
+                    self._respond()
+                finally:
+                    with site._lock:
+                        site.in_flight -= 1
+
+            def _respond(self):
+                if self.path not in site.routes:
+                    self.send_error(404)
+                    return
+
+                status, content_type, body, headers = site.routes[self.path]
+                etag = headers.get('ETag')
+                if etag and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def site():
+    local_site = LocalSite()
+    thread = threading.Thread(target=local_site.server.serve_forever, daemon=True)
+    thread.start()
+    yield local_site
+    local_site.server.shutdown()
+    local_site.server.server_close()
+
+
+@pytest.fixture
+def scraper():
+    with WebScraper() as web_scraper:
+        yield web_scraper
+
+
+def crawl(scraper, url, **kwargs):
+    kwargs.setdefault('host_delay', 0)
+    kwargs.setdefault('robots', RobotsCache())
+    return list(SiteCrawler(scraper, **kwargs).crawl(url))
+
+
+class TestCanonicalization:
+    """Test cases for URL canonicalization and link extraction."""
+
+    def test_canonicalize_url(self):
+        """Test equivalent spellings of a URL canonicalize to one URL."""
+        assert canonicalize_url('HTTP://Example.COM:80/a/./b/../c?b=2&a=1&utm_source=x#top') == \
+            'http://example.com/a/c?a=1&b=2'
+        assert canonicalize_url('https://example.com:443') == 'https://example.com/'
+        assert canonicalize_url('https://example.com:8443/docs/') == 'https://example.com:8443/docs/'
+        assert canonicalize_url('/guide/my page?fbclid=1', 'https://example.com/docs/') == \
+            'https://example.com/guide/my%20page'
+        assert canonicalize_url('https://example.com/%7euser/%c3%a9') == 'https://example.com/%7Euser/%C3%A9'
+        assert canonicalize_url('mailto:team@example.com') is None
+        assert canonicalize_url('javascript:void(0)') is None
+
+    def test_extract_links(self):
+        """Test links resolve against <base> and skip nofollow links."""
+        html = (
+            '<base href="https://example.com/docs/">'
+            '<a href="intro.html#setup">Intro</a>'
+            '<a href="intro.html">Intro again</a>'
+            '<a href="/login" rel="nofollow">Login</a>'
+            '<a href="mailto:team@example.com">Mail</a>'
+            '<iframe src="embed.html"></iframe>'
+        )
+
+        assert extract_links(html, 'https://example.com/') == [
+            'https://example.com/docs/intro.html',
+            'https://example.com/docs/embed.html'
+        ]
+        assert extract_links('<meta name="robots" content="noindex, nofollow"><a href="/a">A</a>',
+                             'https://example.com/') == []
+
+    def test_parse_sitemap(self):
+        """Test sitemaps and sitemap indexes, plain and gzipped."""
+        urlset = (
+            '<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            '<url><loc> https://example.com/a </loc></url><url><loc>https://example.com/b</loc></url></urlset>'
+        ).encode()
+        index = (
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            '<sitemap><loc>https://example.com/pages.xml.gz</loc></sitemap></sitemapindex>'
+        ).encode()
+
+        assert parse_sitemap(urlset) == (['https://example.com/a', 'https://example.com/b'], [])
+        assert parse_sitemap(gzip.compress(urlset)) == parse_sitemap(urlset)
+        assert parse_sitemap(index) == ([], ['https://example.com/pages.xml.gz'])
+
+
+class TestSiteCrawler:
+    """Test cases for SiteCrawler."""
+
+    def test_single_page(self, site, scraper):
+        """Test depth 1 fetches only the start page."""
+        site.add('/', html_page('Home', '/a'))
+
+        pages = crawl(scraper, site.url, max_depth=1)
+
+        assert [(page.url, page.status) for page in pages] == [(f'{site.url}/', 'fetched')]
+        assert pages[0].content['title'] == 'Home'
+        assert pages[0].links == [f'{site.url}/a']
+        assert site.requested('/a') == []
+
+    def test_crawl_follows_rules(self, site, scraper):
+        """Test depth, scope, robots.txt, sitemap seeding and URL dedup."""
+        site.add('/robots.txt', 'User-agent: *\nDisallow: /docs/private/\n', content_type='text/plain')
+        site.add('/sitemap.xml', (
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f'<url><loc>{site.url}/docs/orphan</loc></url>'
+            f'<url><loc>{site.url}/blog/post</loc></url></urlset>'
+        ), content_type='application/xml')
+        site.add('/docs/', html_page(
+            'Docs', 'a', 'a#install', 'a?utm_source=nav', 'private/secret', '/blog/post', 'https://other.example/'
+        ))
+        site.add('/docs/a', html_page('A', 'b', '/docs/'))
+        site.add('/docs/b', html_page('B', 'c'))
+        site.add('/docs/orphan', html_page('Orphan'))
+        site.add('/docs/private/secret', html_page('Secret'))
+
+        pages = crawl(scraper, f'{site.url}/docs/', max_depth=3)
+
+        assert {page.url: page.depth for page in pages} == {
+            f'{site.url}/docs/': 0,
+            f'{site.url}/docs/a': 1,
+            f'{site.url}/docs/orphan': 1,
+            f'{site.url}/docs/b': 2
+        }
+        assert all(page.status == 'fetched' for page in pages)
+        assert [len(site.requested(path)) for path in ('/docs/', '/docs/a', '/docs/b', '/robots.txt')] == [1, 1, 1, 1]
+        assert site.requested('/docs/c') == []
+        assert site.requested('/docs/private/secret') == []
+        assert site.requested('/blog/post') == []
+
+    def test_redirect_dedup(self, site, scraper):
+        """Test a redirect onto a crawled page does not yield it twice."""
+        site.add('/', html_page('Home', '/old', '/new'))
+        site.add('/old', '', status=301, headers={'Location': '/new'})
+        site.add('/new', html_page('New'))
+
+        pages = crawl(scraper, site.url, max_depth=2, workers=1, use_sitemaps=False)
+
+        assert sorted(page.url for page in pages) == [f'{site.url}/', f'{site.url}/new']
+
+    def test_conditional_recrawl(self, site, scraper):
+        """Test a re-crawl sends validators and only downloads changed pages."""
+        site.add('/', html_page('Home', '/a', '/b'), headers={'ETag': '"home-1"'})
+        site.add('/a', html_page('A'), headers={'ETag': '"a-1"', 'Last-Modified': 'Mon, 05 Oct 2026 10:00:00 GMT'})
+        site.add('/b', html_page('B'), headers={'ETag': '"b-1"'})
+
+        first = crawl(scraper, site.url, max_depth=2, use_sitemaps=False)
+        known_pages = {
+            page.url: {'etag': page.etag, 'last_modified': page.last_modified, 'links': page.links}
+            for page in first
+        }
+        site.add('/b', html_page('B changed'), headers={'ETag': '"b-2"'})
+        site.requests.clear()
+
+        second = crawl(scraper, site.url, max_depth=2, use_sitemaps=False, known_pages=known_pages)
+
+        statuses = {page.url: page.status for page in second}
+        assert statuses == {
+            f'{site.url}/': 'not_modified',
+            f'{site.url}/a': 'not_modified',
+            f'{site.url}/b': 'fetched'
+        }
+        assert site.requested('/')[0]['If-None-Match'] == '"home-1"'
+        assert site.requested('/a')[0]['If-Modified-Since'] == 'Mon, 05 Oct 2026 10:00:00 GMT'
+        changed = next(page for page in second if page.status == 'fetched')
+        assert changed.content['title'] == 'B changed'
+        assert changed.etag == '"b-2"'
+
+    def test_host_budget(self, site, scraper):
+        """Test requests to one host respect its concurrency and delay."""
+        site.add('/', html_page('Home', *[f'/p{number}' for number in range(12)]))
+        for number in range(12):
+            site.add(f'/p{number}', html_page(f'Page {number}'))
+        site.latency = 0.05
+
+        crawl(scraper, site.url, max_depth=2, workers=8, host_concurrency=2, use_sitemaps=False)
+        assert site.max_in_flight == 2
+
+        site.latency = 0
+        start_time = time.monotonic()
+        crawl(scraper, site.url, max_depth=2, workers=8, host_delay=0.05, use_sitemaps=False)
+        assert time.monotonic() - start_time >= 12 * 0.05
+
+    def test_max_pages(self, site, scraper):
+        """Test the crawl stops fetching at the page limit."""
+        site.add('/', html_page('Home', *[f'/p{number}' for number in range(20)]))
+        for number in range(20):
+            site.add(f'/p{number}', html_page(f'Page {number}'))
+
+        pages = crawl(scraper, site.url, max_depth=2, max_pages=5, use_sitemaps=False)
+
+        assert len(pages) == 5
+        assert len(site.page_requests()) == 5
+
+    def test_start_page_errors(self, site, scraper):
+        """Test a failing start page fails the crawl, other failures only skip the page."""
+        site.add('/', html_page('Home', '/missing'))
+
+        pages = crawl(scraper, site.url, max_depth=2, use_sitemaps=False)
+        assert [page.status for page in pages] == ['fetched', 'error']
+
+        with pytest.raises(ProcessingError):
+            crawl(scraper, f'{site.url}/missing', max_depth=2, use_sitemaps=False)
+
+    def test_close_stops_crawl(self, site, scraper):
+        """Test closing the page iterator early stops fetching."""
+        site.add('/', html_page('Home', *[f'/p{number}' for number in range(50)]))
+        for number in range(50):
+            site.add(f'/p{number}', html_page(f'Page {number}'))
+
+        pages = SiteCrawler(scraper, max_depth=2, workers=2, host_delay=0.01,
+                            use_sitemaps=False, robots=RobotsCache()).crawl(site.url)
+        next(pages)
+        pages.close()
+
+        assert len(site.page_requests()) < 20
+
+    def test_scraper_delegates_depth(self, site, scraper):
+        """Test WebScraper.scrape_url crawls links beyond depth 1."""
+        site.add('/', html_page('Home', '/a'))
+        site.add('/a', html_page('A'))
+
+        results = scraper.scrape_url(site.url, max_depth=2)
+
+        assert sorted(result['title'] for result in results) == ['A', 'Home']
+
+
+class TestCrawlerThroughput:
+    """Benchmark concurrent crawling against fetching one page at a time."""
+
+    def test_docs_site_throughput(self, site, scraper):
+        """Test a docs site crawls far faster than sequential fetching."""
+        page_count = 300
+        site.add('/', html_page('Home', *[f'/docs/{number}' for number in range(page_count)]))
+        for number in range(page_count):
+            site.add(f'/docs/{number}', html_page(f'Doc {number}', f'/docs/{(number + 1) % page_count}'))
+        site.latency = 0.02
+
+        start_time = time.monotonic()
+        pages = crawl(scraper, site.url, max_depth=3, workers=8, host_concurrency=8, use_sitemaps=False)
+        elapsed = time.monotonic() - start_time
+        sequential = (page_count + 1) * site.latency
+
+        print(f"\nCrawled {len(pages)} pages in {elapsed:.2f}s ({len(pages) / elapsed:.0f} pages/s), "
+              f"sequential latency alone {sequential:.2f}s")
+
+        assert len(pages) == page_count + 1
+        assert elapsed < sequential / 2
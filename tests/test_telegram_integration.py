@@ -8,7 +8,7 @@ from app import create_app
 from app.channels.telegram_bot import TelegramBotHandler, get_telegram_bot_handler
 from app.services.telegram_service import TelegramService, get_telegram_service
 from app.models import Channel, InboxMessage, Thread, Attachment
-from app.secretary.agents.base_agent import AgentContext, AgentResponse
+from app.secretary.agents.base_agent import AgentContext, AgentResponse, AgentStreamEvent
 
 
 @pytest.fixture
@@ -214,7 +214,7 @@ class TestTelegramBotHandler:
         """Test text message handling."""
         telegram_handler._store_message = AsyncMock()
         telegram_handler._create_agent_context = AsyncMock()
-        telegram_handler._send_ai_response = AsyncMock()
+        telegram_handler._send_ai_response_stream = AsyncMock()
         
         # Mock agent context
         mock_context = AgentContext(
@@ -226,13 +226,9 @@ class TestTelegramBotHandler:
         )
         telegram_handler._create_agent_context.return_value = mock_context
         
-        # Mock orchestrator response
-        mock_response = AgentResponse(
-            content="Hello! How can I help you?",
-            confidence=0.9,
-            intent="greeting"
-        )
-        telegram_handler.orchestrator.process_message = AsyncMock(return_value=mock_response)
+        # Mock orchestrator stream
+        mock_stream = Mock()
+        telegram_handler.orchestrator.process_message_stream = Mock(return_value=mock_stream)
         
         await telegram_handler.handle_text_message(mock_update, None)
         
@@ -246,12 +242,12 @@ class TestTelegramBotHandler:
         telegram_handler._create_agent_context.assert_called_once()
         
         # Verify orchestrator was called
-        telegram_handler.orchestrator.process_message.assert_called_once_with(
+        telegram_handler.orchestrator.process_message_stream.assert_called_once_with(
             "Hello, bot!", mock_context
         )
         
-        # Verify AI response was sent
-        telegram_handler._send_ai_response.assert_called_once_with(mock_update, mock_response)
+        # Verify AI response was streamed
+        telegram_handler._send_ai_response_stream.assert_called_once_with(mock_update, mock_stream)
     
     @pytest.mark.asyncio
     async def test_handle_photo_message(self, telegram_handler, mock_update):
@@ -394,6 +390,69 @@ class TestTelegramBotHandler:
         # Verify message was stored
         telegram_handler._store_message.assert_called_once()
     
+    @pytest.mark.asyncio
+    async def test_send_ai_response_stream(self, telegram_handler, mock_update):
+        """Test a streamed response is sent once and edited to the final text."""
+        telegram_handler._store_message = AsyncMock()
+        telegram_handler.stream_edit_interval = 0
+        sent_message = Mock()
+        sent_message.edit_text = AsyncMock()
+        mock_update.effective_chat.send_message.return_value = sent_message
+        
+        final_response = AgentResponse(content="Hello! How can I help you?", confidence=0.9, intent="greeting")
+        
+        async def events():
+            yield AgentStreamEvent(delta="Hello! ")
+            yield AgentStreamEvent(delta="How can I help you?")
+            yield AgentStreamEvent(done=True, response=final_response)
+        
+        await telegram_handler._send_ai_response_stream(mock_update, events())
+        
+        # First delta is sent immediately, later text arrives as edits
+        mock_update.effective_chat.send_message.assert_called_once_with(text="Hello! ")
+        edits = [call.kwargs['text'] for call in sent_message.edit_text.call_args_list]
+        assert edits == ["Hello! How can I help you?", "Hello! How can I help you?"]
+        assert sent_message.edit_text.call_args.kwargs['reply_markup'] is None
+        
+        telegram_handler._store_message.assert_called_once_with(
+            mock_update, "ai_response", "Hello! How can I help you?", direction="outbound"
+        )
+    
+    @pytest.mark.asyncio
+    async def test_send_ai_response_stream_throttles_edits(self, telegram_handler, mock_update):
+        """Test edits are limited to one per interval."""
+        telegram_handler._store_message = AsyncMock()
+        telegram_handler.stream_edit_interval = 60
+        sent_message = Mock()
+        sent_message.edit_text = AsyncMock()
+        mock_update.effective_chat.send_message.return_value = sent_message
+        
+        final_response = AgentResponse(content="one two three four", confidence=0.9, intent="test")
+        
+        async def events():
+            for word in ["one ", "two ", "three ", "four"]:
+                yield AgentStreamEvent(delta=word)
+            yield AgentStreamEvent(done=True, response=final_response)
+        
+        await telegram_handler._send_ai_response_stream(mock_update, events())
+        
+        # Only the final edit happens inside the interval
+        sent_message.edit_text.assert_called_once()
+        assert sent_message.edit_text.call_args.kwargs['text'] == "one two three four"
+    
+    @pytest.mark.asyncio
+    async def test_send_ai_response_stream_without_deltas(self, telegram_handler, mock_update):
+        """Test a reply without streamed text is sent normally."""
+        telegram_handler._send_ai_response = AsyncMock()
+        response = AgentResponse(content="Content blocked", confidence=1.0, intent="safety_violation")
+        
+        async def events():
+            yield AgentStreamEvent(done=True, response=response)
+        
+        await telegram_handler._send_ai_response_stream(mock_update, events())
+        
+        telegram_handler._send_ai_response.assert_called_once_with(mock_update, response)
+    
     @pytest.mark.asyncio
     async def test_send_ai_response_with_handoff(self, telegram_handler, mock_update):
         """Test sending AI response that requires handoff."""
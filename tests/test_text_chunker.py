@@ -148,6 +148,45 @@ Fourth paragraph with even more content."""
                 # If it doesn't end with period, it might be a partial sentence due to size constraints
                 pass
     
+    def test_chunk_by_sentences_running_token_counts(self):
+        """Test running token counts match counting each chunk from scratch."""
+        text = " ".join(
+            f"Sentence number {i} talks about topic {i % 7} in some detail." for i in range(200)
+        )
+        config = ChunkConfig(chunk_size=60, overlap=15, min_chunk_size=5)
+        
+        chunker = TextChunker(config)
+        chunks = chunker._chunk_by_sentences(text, config)
+        
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert chunk['token_count'] == chunker._count_tokens(chunk['content'])
+            assert chunk['token_count'] <= config.chunk_size
+    
+    def test_chunk_by_sentences_overlap_matches_full_chunk(self):
+        """Test overlap taken from trailing sentences matches overlap of the whole chunk."""
+        chunker = TextChunker()
+        parts = [f"Sentence {i} has a few more words in it" for i in range(30)]
+        part_sizes = [chunker._measure(parts[0])] + [
+            chunker._measure(parts[i - 1] + " " + parts[i]) - chunker._measure(parts[i - 1])
+            for i in range(1, len(parts))
+        ]
+        
+        overlap = chunker._get_overlap_from_parts(parts, part_sizes, " ", 20)
+        
+        assert overlap == chunker._get_overlap_text(" ".join(parts), 20)
+    
+    def test_chunk_by_words_stops_at_end_of_text(self):
+        """Test the last window ends chunking instead of repeating forever."""
+        config = ChunkConfig(chunk_size=50, overlap=10)
+        chunker = TextChunker(config)
+        chunker.encoding = None
+        
+        chunks = chunker._chunk_by_tokens("word " * 100, config)
+        
+        assert len(chunks) == 3
+        assert [chunk['position'] for chunk in chunks] == [0, 1, 2]
+    
     @patch('tiktoken.get_encoding')
     def test_chunk_by_words_fallback(self, mock_encoding):
         """Test word-based chunking when tokenizer is not available."""
@@ -188,6 +227,43 @@ Fourth paragraph with even more content."""
             assert chunk['source_type'] == 'markdown'
             assert chunk['source_title'] == 'Test Document'
     
+    def test_chunk_document_stream(self):
+        """Test streamed chunking numbers chunks across windows."""
+        chunker = TextChunker()
+        chunker.STREAM_WINDOW_CHARS = 3000
+        
+        sections = [
+            " ".join(f"Page {page} sentence {i} is about refunds and delivery." for i in range(40))
+            for page in range(30)
+        ]
+        
+        chunks = list(chunker.chunk_document_stream(iter(sections), {'format': 'pdf'}))
+        
+        assert len(chunks) > 1
+        assert [chunk['position'] for chunk in chunks] == list(range(len(chunks)))
+        assert chunks[0]['is_first'] is True
+        assert chunks[0]['overlap_start'] == 0
+        assert [chunk['is_last'] for chunk in chunks].count(True) == 1
+        assert chunks[-1]['is_last'] is True
+        assert chunks[-1]['overlap_end'] == 0
+        assert all(chunk['source_type'] == 'pdf' for chunk in chunks)
+        
+        # No text is lost at window boundaries
+        streamed = " ".join(chunk['content'] for chunk in chunks)
+        for page in range(30):
+            assert f"Page {page} sentence 39 is about refunds and delivery" in streamed
+    
+    def test_chunk_document_stream_short_document(self):
+        """Test streamed chunking of a document smaller than one window."""
+        chunker = TextChunker()
+        
+        chunks = list(chunker.chunk_document_stream(["Short page one.", "", "Short page two."]))
+        
+        assert len(chunks) == 1
+        assert chunks[0]['is_first'] is True
+        assert chunks[0]['is_last'] is True
+        assert "Short page two." in chunks[0]['content']
+    
     def test_create_document_config_pdf(self):
         """Test document-specific configuration for PDF."""
         chunker = TextChunker()
@@ -0,0 +1,77 @@
+"""Benchmarks for chunking large documents."""
+import time
+import pytest
+from app.services.text_chunker import TextChunker, ChunkConfig
+
+
+class TestTextChunkerPerformance:
+    """Benchmark chunking cost against document size."""
+
+    def _document(self, size_bytes):
+        sentences = []
+        length = 0
+        i = 0
+        while length < size_bytes:
+            sentence = (
+                f"Section {i // 50} clause {i} explains how invoice {i * 7} is handled "
+                f"when the customer asks about delivery, refunds or support hours."
+            )
+            sentences.append(sentence)
+            length += len(sentence) + 1
+            i += 1
+        return " ".join(sentences)
+
+    def _counting_encoding(self, chunker):
+        """Wrap the tokenizer so the amount of text it encodes can be measured."""
+        encoding = chunker.encoding
+        if encoding is None:
+            pytest.skip("tiktoken encoding not available")
+
+        stats = {'characters': 0}
+
+        class CountingEncoding:
+            def encode(self, text, *args, **kwargs):
+                stats['characters'] += len(text)
+                return encoding.encode(text, *args, **kwargs)
+
+            def decode(self, tokens, *args, **kwargs):
+                return encoding.decode(tokens, *args, **kwargs)
+
+        chunker.encoding = CountingEncoding()
+        return stats
+
+    def test_chunking_1mb_document(self):
+        """Test a 1 MB document is chunked with a bounded amount of tokenizer work."""
+        text = self._document(1024 * 1024)
+        chunker = TextChunker()
+        stats = self._counting_encoding(chunker)
+
+        start_time = time.perf_counter()
+        chunks = chunker.chunk_text(text)
+        elapsed = time.perf_counter() - start_time
+
+        print(f"\nChunked {len(text) / 1024 / 1024:.2f}MB into {len(chunks)} chunks in {elapsed:.2f}s, "
+              f"encoded {stats['characters'] / len(text):.1f}x the document")
+
+        assert len(chunks) > 100
+        assert all(chunk['token_count'] <= chunker.config.chunk_size for chunk in chunks)
+        assert [chunk['chunk_index'] for chunk in chunks] == list(range(len(chunks)))
+
+        # Each sentence is encoded a constant number of times, not once per appended sentence
+        assert stats['characters'] < 10 * len(text)
+
+    def test_chunking_work_scales_linearly(self):
+        """Test tokenizer work grows linearly with document size."""
+        config = ChunkConfig(chunk_size=800, overlap=150, preserve_paragraphs=False)
+        work = {}
+
+        for size in (256 * 1024, 1024 * 1024):
+            chunker = TextChunker(config)
+            stats = self._counting_encoding(chunker)
+            text = self._document(size)
+            chunker.chunk_text(text, config)
+            work[size] = stats['characters'] / len(text)
+
+        print(f"\nEncoded characters per document character: {work}")
+
+        assert work[1024 * 1024] == pytest.approx(work[256 * 1024], rel=0.1)
@@ -0,0 +1,219 @@
+"""Tests for the single-pass PII and toxic language scanner."""
+import re
+import time
+import pytest
+from unittest.mock import patch
+from app.utils.text_scanner import PatternScanner, ScanMatch, word_list_pattern
+from app.secretary.agents.supervisor_agent import SupervisorAgent
+from app.services.pii_service import PIIDetector
+
+
+SAMPLE_PARAGRAPH = (
+    "Hello team, please reach me at jane.doe@example.com or call (555) 123-4567 "
+    "about invoice 2024-118. The card ending 4532-1234-5678-9012 was charged twice, "
+    "so refund it to DE89370400440532013000. This stupid portal keeps logging me out. "
+    "We also discussed the quarterly roadmap, the new office and the hiring plan in detail. "
+)
+
+
+class TestPatternScanner:
+    """Test cases for PatternScanner."""
+
+    def test_matches_carry_type_and_span(self):
+        """Test every match reports its pattern type and position."""
+        scanner = PatternScanner({'number': r'\d+', 'word': word_list_pattern(['cat', 'dog'])})
+
+        matches = scanner.scan("2 cats, 1 dog and 12 DOGS")
+
+        assert matches == [
+            ScanMatch('number', '2', 0, 1),
+            ScanMatch('number', '1', 8, 9),
+            ScanMatch('word', 'dog', 10, 13),
+            ScanMatch('number', '12', 18, 20)
+        ]
+        assert scanner.count("2 cats, 1 dog") == {'number': 2, 'word': 1}
+
+    def test_first_pattern_wins_overlaps(self):
+        """Test overlapping patterns resolve to the one listed first."""
+        scanner = PatternScanner({'card': r'\b(?:\d{4}-){3}\d{4}\b', 'short': r'\b\d{4}\b'})
+
+        assert [match.type for match in scanner.scan("4532-1234-5678-9012 and 2024")] == ['card', 'short']
+
+    def test_nested_groups_keep_type(self):
+        """Test patterns with their own capturing groups still report their name."""
+        scanner = PatternScanner({'iban': r'\b[A-Z]{2}\d{2}([A-Z0-9]?){0,16}\b'})
+
+        assert scanner.scan("DE89ABC")[0].type == 'iban'
+
+    def test_word_list_prefers_longest_word(self):
+        """Test a word list matches whole words and longer words first."""
+        scanner = PatternScanner({'toxic': word_list_pattern(['fuck', 'fucking', 'a.b'])})
+
+        assert [match.value for match in scanner.scan("fucking fuckers a.b axb")] == ['fucking', 'a.b']
+
+    def test_mask_rewrites_in_one_pass(self):
+        """Test masking replaces chosen matches and keeps the others."""
+        scanner = PatternScanner({'number': r'\d+', 'word': r'\bsecret\b'})
+
+        masked, replaced = scanner.mask(
+            "secret 42 and 7",
+            lambda match: '#' * len(match.value) if match.type == 'number' else None
+        )
+
+        assert masked == "secret ## and #"
+        assert [match.value for match in replaced] == ['42', '7']
+        assert scanner.mask("nothing here", lambda match: '#') == ("nothing here", [])
+        assert scanner.mask("", lambda match: '#') == ("", [])
+
+    def test_start_restricts_match_positions(self):
+        """Test matches only begin where the start pattern allows."""
+        scanner = PatternScanner({'number': r'\d{3}'}, start=r'\b')
+
+        assert [match.value for match in scanner.scan("abc123 456")] == ['456']
+
+    def test_invalid_pattern_name(self):
+        """Test pattern names must be usable as group names."""
+        with pytest.raises(ValueError, match="credit-card"):
+            PatternScanner({'credit-card': r'\d{16}'})
+
+
+class TestSupervisorScanning:
+    """Test cases for single-pass scanning in SupervisorAgent."""
+
+    @pytest.fixture
+    def supervisor_agent(self):
+        return SupervisorAgent()
+
+    def test_scan_content_detects_and_masks(self, supervisor_agent):
+        """Test one scan yields toxic and PII violations and the masked text."""
+        toxic, pii, masked = supervisor_agent._scan_content(
+            "You stupid idiot, mail kill@example.com or call 555-123-4567. Card 4532-1234-5678-9012."
+        )
+
+        assert toxic == ["Toxic language detected: stupid, idiot"]
+        assert pii == [
+            "PII detected (email): 1 instances",
+            "PII detected (credit_card): 1 instances",
+            "PII detected (phone): 1 instances"
+        ]
+        assert masked == (
+            "You ****** *****, mail [EMAIL_REDACTED] or call [PHONE_REDACTED]. Card [CARD_REDACTED]."
+        )
+
+    def test_masking_matches_detection_case(self, supervisor_agent):
+        """Test lowercase IBANs are masked as well as detected."""
+        content = "IBAN de89370400440532013000"
+
+        assert supervisor_agent._detect_pii(content) == ["PII detected (iban): 1 instances"]
+        assert supervisor_agent._mask_pii(content) == "IBAN [IBAN_REDACTED]"
+
+    def test_partial_masks(self, supervisor_agent):
+        """Test the toxic and PII masks only touch their own matches."""
+        content = "Damn, my SSN is 123-45-6789"
+
+        assert supervisor_agent._mask_toxic_content(content) == "****, my SSN is 123-45-6789"
+        assert supervisor_agent._mask_pii(content) == "Damn, my SSN is [SSN_REDACTED]"
+        assert supervisor_agent.filter_stream_window(content) == "****, my SSN is [SSN_REDACTED]"
+
+    def test_scanner_is_shared(self, supervisor_agent):
+        """Test supervisors reuse one compiled scanner."""
+        assert SupervisorAgent().content_scanner is supervisor_agent.content_scanner
+
+
+class TestPIIDetectorScanning:
+    """Test cases for single-pass scanning in PIIDetector."""
+
+    @pytest.fixture
+    def pii_detector(self):
+        return PIIDetector()
+
+    def test_matches_do_not_overlap(self, pii_detector):
+        """Test each piece of text is reported as one PII type, in text order."""
+        detected = pii_detector.detect_pii_in_text(
+            "IBAN: DE89370400440532013000, VAT: DE123456789, SSN: 123-45-6789, call +1-555-123-4567"
+        )
+
+        assert [(item['type'], item['value']) for item in detected] == [
+            ('iban', 'DE89370400440532013000'),
+            ('vat_number', 'DE123456789'),
+            ('ssn', '123-45-6789'),
+            ('phone', '+1-555-123-4567')
+        ]
+
+    def test_mask_keeps_lengths_and_order(self, pii_detector):
+        """Test masking preserves lengths and reports items in text order."""
+        text = "Mail john.doe@example.com or call (555) 123-4567"
+
+        masked_text, masked_items = pii_detector.mask_pii_in_text(text)
+
+        assert masked_text == "Mail jo****************om or call (5**********67"
+        assert [item['type'] for item in masked_items] == ['email', 'phone']
+        assert [item['position'] for item in masked_items] == [(5, 25), (34, 48)]
+
+
+class CountingRegex:
+    """Wraps a compiled pattern and records every text it scans."""
+
+    def __init__(self, regex):
+        self.regex = regex
+        self.scanned = []
+
+    def finditer(self, text):
+        self.scanned.append(text)
+        return self.regex.finditer(text)
+
+
+class TestScannerThroughput:
+    """Benchmark scanning throughput against one pass per pattern; timings are reported, not asserted."""
+
+    def _throughput(self, function, text, runs=3):
+        timings = []
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            function(text)
+            timings.append(time.perf_counter() - start_time)
+        return len(text.encode()) / min(timings) / 1_000_000
+
+    def _per_pattern_scan(self, detector):
+        regexes = [re.compile(config['pattern'], re.IGNORECASE) for config in detector.PII_PATTERNS.values()]
+        return lambda text: [match for regex in regexes for match in regex.finditer(text)]
+
+    def test_pii_scan_throughput(self):
+        """Test the single-pass PII scan reads bulk text once and loses no per-pattern finding."""
+        detector = PIIDetector()
+        text = SAMPLE_PARAGRAPH * 4000
+
+        counting = CountingRegex(detector.scanner.regex)
+        with patch.object(detector.scanner, 'regex', counting):
+            matches = detector.scanner.scan(text)
+        assert counting.scanned == [text]
+
+        paragraph_matches = detector.scanner.scan(SAMPLE_PARAGRAPH)
+        assert len(matches) == 4000 * len(paragraph_matches)
+
+        # Per-pattern matches overlapping a higher-priority match are folded into it
+        spans = [(match.start, match.end) for match in paragraph_matches]
+        for match in self._per_pattern_scan(detector)(SAMPLE_PARAGRAPH):
+            assert any(start <= match.start() and match.end() <= end for start, end in spans)
+
+        single_pass = self._throughput(detector.scanner.scan, text)
+        per_pattern = self._throughput(self._per_pattern_scan(detector), text)
+        print(f"\nPII scan of {len(text) / 1_000_000:.1f} MB: "
+              f"single pass {single_pass:.2f} MB/s, per pattern {per_pattern:.2f} MB/s")
+
+    def test_supervisor_message_throughput(self):
+        """Test supervisor filtering scans each chat-sized message once."""
+        supervisor_agent = SupervisorAgent()
+        messages = [SAMPLE_PARAGRAPH[offset:offset + 160] for offset in range(0, len(SAMPLE_PARAGRAPH), 40)] * 500
+
+        counting = CountingRegex(supervisor_agent.content_scanner.regex)
+        start_time = time.perf_counter()
+        with patch.object(supervisor_agent.content_scanner, 'regex', counting):
+            filtered = [supervisor_agent.filter_stream_window(message) for message in messages]
+        elapsed = time.perf_counter() - start_time
+        megabytes = sum(len(message.encode()) for message in messages) / 1_000_000
+
+        print(f"\nSupervisor filtering: {len(messages) / elapsed:.0f} messages/s, {megabytes / elapsed:.2f} MB/s")
+
+        assert counting.scanned == messages
+        assert all('jane.doe@example.com' not in content for content in filtered)
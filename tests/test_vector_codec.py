@@ -0,0 +1,106 @@
+"""Tests for the embedding vector storage format."""
+import pickle
+import pytest
+import numpy as np
+from app.utils.vector_codec import (
+    encode_vector, decode_vector, decode_vectors, is_legacy_vector, stored_dtype, HEADER
+)
+from app.models.tenant import Tenant
+from app.models.knowledge import KnowledgeSource, Document, Chunk, Embedding
+from app import db
+
+
+class TestVectorCodec:
+    """Test cases for vector encoding and decoding."""
+
+    @pytest.fixture
+    def vector(self):
+        """Create a sample embedding vector."""
+        return np.random.default_rng(1).normal(size=1536)
+
+    def test_float32_round_trip_is_zero_copy(self, vector):
+        """Test float32 encoding halves storage and decodes as a view."""
+        data = encode_vector(vector)
+
+        assert len(data) == HEADER.size + 1536 * 4
+        assert len(data) < len(pickle.dumps(vector))
+
+        decoded = decode_vector(data)
+        assert decoded.dtype == np.float32
+        assert not decoded.flags.owndata
+        np.testing.assert_allclose(decoded, vector, rtol=1e-6)
+
+    def test_quantized_round_trip(self, vector):
+        """Test float16 and int8 encodings stay close to the original."""
+        float16 = decode_vector(encode_vector(vector, 'float16'))
+        int8 = decode_vector(encode_vector(vector, 'int8'))
+
+        assert stored_dtype(encode_vector(vector, 'int8')) == 'int8'
+        np.testing.assert_allclose(float16, vector, atol=1e-2)
+        cosine = np.dot(int8, vector) / (np.linalg.norm(int8) * np.linalg.norm(vector))
+        assert cosine > 0.999
+
+    def test_legacy_pickle_is_decoded(self, vector):
+        """Test rows written with pickle are still readable."""
+        legacy = pickle.dumps(vector)
+
+        assert is_legacy_vector(legacy)
+        assert stored_dtype(legacy) is None
+        np.testing.assert_array_equal(decode_vector(legacy), vector)
+
+    def test_decode_vectors_builds_contiguous_matrix(self, vector):
+        """Test bulk decoding of current and mixed-format rows."""
+        rows = [encode_vector(vector * i) for i in range(1, 4)]
+        matrix = decode_vectors(rows)
+
+        assert matrix.shape == (3, 1536)
+        assert matrix.flags.c_contiguous
+        np.testing.assert_allclose(matrix[2], vector * 3, rtol=1e-6)
+
+        mixed = decode_vectors([pickle.dumps(vector), encode_vector(vector, 'float16')])
+        assert mixed.shape == (2, 1536)
+        assert mixed.dtype == np.float32
+
+    def test_unsupported_dtype(self, vector):
+        """Test encoding with an unknown dtype."""
+        with pytest.raises(ValueError, match="Unsupported vector storage dtype"):
+            encode_vector(vector, 'float64')
+
+
+class TestEmbeddingVectorStorage:
+    """Test Embedding bulk helpers and storage migration."""
+
+    def test_load_vector_matrix_and_migration(self, app):
+        """Test migrating legacy rows and loading a tenant matrix."""
+        with app.app_context():
+            tenant = Tenant(name="Test", slug="test")
+            tenant.save()
+
+            source = KnowledgeSource(tenant_id=tenant.id, name="Source", source_type="document")
+            source.save()
+            document = Document(tenant_id=tenant.id, source_id=source.id, title="Doc")
+            document.save()
+
+            vectors = [np.array([1.0, 0.0, 0.0]), np.array([0.0, 1.0, 0.0]), np.array([0.0, 0.0, 1.0])]
+            for i, vector in enumerate(vectors):
+                chunk = Chunk(tenant_id=tenant.id, document_id=document.id, content=f"chunk {i}", position=i)
+                chunk.save()
+                embedding = Embedding(tenant_id=tenant.id, chunk_id=chunk.id, model_name="test-model",
+                                      vector_data=pickle.dumps(vector), dimension=3)
+                db.session.add(embedding)
+            db.session.commit()
+
+            result = Embedding.migrate_vector_storage(batch_size=2)
+            assert result == {'scanned': 3, 'rewritten': 3}
+
+            # Re-running is a no-op
+            assert Embedding.migrate_vector_storage(batch_size=2)['rewritten'] == 0
+
+            db.session.expire_all()
+            assert all(not is_legacy_vector(e.vector_data) for e in Embedding.query.all())
+
+            embedding_ids, chunk_ids, matrix = Embedding.load_vector_matrix(
+                tenant.id, "test-model", source_ids=[source.id]
+            )
+            assert len(embedding_ids) == len(chunk_ids) == 3
+            np.testing.assert_array_equal(matrix, np.eye(3, dtype=np.float32))
@@ -0,0 +1,224 @@
+"""Tests for the in-process knowledge vector index."""
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from app.services.vector_index import VectorIndex, VectorIndexManager
+from app.models.tenant import Tenant
+from app.models.knowledge import KnowledgeSource, Document, Chunk, Embedding
+from app.utils.vector_codec import encode_vector
+
+
+class TestVectorIndex:
+    """Test cases for VectorIndex."""
+
+    @pytest.fixture
+    def random_vectors(self):
+        """Create random unit vectors."""
+        rng = np.random.default_rng(42)
+        return rng.normal(size=(200, 16)).astype(np.float32)
+
+    def test_exact_search_matches_brute_force(self, random_vectors):
+        """Test that exhaustive search returns the true nearest neighbours."""
+        index = VectorIndex(16)
+        index.add(range(1, 201), range(1001, 1201), [1] * 200, random_vectors)
+
+        query = random_vectors[10] + 0.01
+        results = index.search(query, k=5)
+
+        normalized = random_vectors / np.linalg.norm(random_vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5] + 1
+
+        assert [embedding_id for embedding_id, _, _ in results] == list(expected)
+        assert results[0][0] == 11
+        assert results[0][1] == 1011
+        assert results[0][2] > results[-1][2]
+
+    def test_min_similarity_and_source_filter(self, random_vectors):
+        """Test similarity threshold and source filtering."""
+        index = VectorIndex(16)
+        source_ids = [1 if i % 2 == 0 else 2 for i in range(200)]
+        index.add(range(1, 201), range(1, 201), source_ids, random_vectors)
+
+        results = index.search(random_vectors[0], k=10, source_ids=[2])
+        assert results
+        assert all(embedding_id % 2 == 0 for embedding_id, _, _ in results)  # Odd rows belong to source 2
+
+        results = index.search(random_vectors[0], k=10, min_similarity=0.999)
+        assert [embedding_id for embedding_id, _, _ in results] == [1]
+
+    def test_remove_and_replace(self, random_vectors):
+        """Test removing rows and re-adding an existing id."""
+        index = VectorIndex(16)
+        index.add([1, 2, 3], [1, 2, 3], [1, 1, 1], random_vectors[:3])
+
+        index.remove([2])
+        assert len(index) == 2
+        assert 2 not in [embedding_id for embedding_id, _, _ in index.search(random_vectors[1], k=3)]
+
+        index.add([1], [1], [1], random_vectors[5:6])
+        assert len(index) == 2
+        assert index.search(random_vectors[5], k=1)[0][0] == 1
+
+    def test_updates_swap_in_a_new_snapshot(self, random_vectors):
+        """Test that writers never mutate a snapshot a concurrent search may hold."""
+        index = VectorIndex(16)
+        index.add([1, 2, 3], [1, 2, 3], [1, 1, 1], random_vectors[:3])
+        snapshot = index.snapshot
+
+        index.remove([2])
+        index.add([4], [4], [1], random_vectors[3:4])
+
+        assert index.snapshot is not snapshot
+        assert list(snapshot.embedding_ids) == [1, 2, 3]
+        assert snapshot.vectors.shape == (3, 16)
+        assert list(index.snapshot.embedding_ids) == [1, 3, 4]
+
+    def test_ivf_search_recall(self):
+        """Test that IVF probing finds the query's own vector."""
+        rng = np.random.default_rng(7)
+        vectors = rng.normal(size=(2000, 8)).astype(np.float32)
+
+        index = VectorIndex(8)
+        index.EXACT_SEARCH_THRESHOLD = 500
+        index.add(range(1, 2001), range(1, 2001), [None] * 2000, vectors)
+
+        assert index.centroids is not None
+        hits = sum(
+            index.search(vectors[i], k=1, nprobe=8)[0][0] == i + 1
+            for i in range(0, 2000, 50)
+        )
+        assert hits >= 36  # At least 90% recall@1 on 40 probes
+
+    def test_add_without_retrain_leaves_training_to_caller(self):
+        """Test that bulk loads can defer k-means until an explicit train()."""
+        vectors = np.random.default_rng(3).normal(size=(600, 8)).astype(np.float32)
+
+        index = VectorIndex(8)
+        index.EXACT_SEARCH_THRESHOLD = 500
+        index.add(range(1, 601), range(1, 601), [None] * 600, vectors, retrain=False)
+        assert index.centroids is None
+
+        index.train()
+        assert index.centroids is not None
+        assert index.search(vectors[0], k=1)[0][0] == 1
+
+    def test_save_and_load(self, random_vectors, tmp_path):
+        """Test index persistence round trip."""
+        index = VectorIndex(16)
+        index.add(range(1, 201), range(1, 201), [3] * 200, random_vectors)
+
+        path = str(tmp_path / 'index.npz')
+        index.save(path)
+        loaded = VectorIndex.load(path)
+
+        assert len(loaded) == 200
+        assert loaded.max_embedding_id == 200
+        assert loaded.search(random_vectors[3], k=3) == index.search(random_vectors[3], k=3)
+
+
+class TestVectorIndexManager:
+    """Test VectorIndexManager against the embeddings table."""
+
+    @pytest.fixture
+    def index_app(self, app, tmp_path):
+        """Enable the vector index for a test app."""
+        app.config['VECTOR_INDEX_ENABLED'] = True
+        app.config['VECTOR_INDEX_FOLDER'] = str(tmp_path)
+        app.config['VECTOR_INDEX_SYNC_INTERVAL'] = 0
+        return app
+
+    def _create_embeddings(self, tenant, vectors, source_name="Source"):
+        source = KnowledgeSource(tenant_id=tenant.id, name=source_name, source_type="document")
+        source.save()
+        document = Document(tenant_id=tenant.id, source_id=source.id, title=f"{source_name} doc")
+        document.save()
+
+        embeddings = []
+        for i, vector in enumerate(vectors):
+            chunk = Chunk(tenant_id=tenant.id, document_id=document.id, content=f"content {i}", position=i)
+            chunk.save()
+            embeddings.append(Embedding.create_from_vector(
+                tenant_id=tenant.id,
+                chunk_id=chunk.id,
+                vector=np.asarray(vector, dtype=float),
+                model_name="test-model"
+            ))
+        return source, embeddings
+
+    def test_build_sync_and_filter(self, index_app, tmp_path):
+        """Test building from the table, catching up on new rows and source filtering."""
+        with index_app.app_context():
+            tenant = Tenant(name="Test", slug="test")
+            tenant.save()
+
+            source_a, _ = self._create_embeddings(tenant, [[1, 0, 0], [0.9, 0.1, 0]], "A")
+            manager = VectorIndexManager()
+
+            results = manager.search(tenant.id, "test-model", np.array([1.0, 0, 0]), k=5)
+            assert len(results) == 2
+            assert (tmp_path / f"tenant_{tenant.id}" / "test-model.npz").exists()
+
+            # New rows written elsewhere are picked up on the next sync
+            source_b, embeddings_b = self._create_embeddings(tenant, [[0.95, 0.05, 0]], "B")
+            results = manager.search(tenant.id, "test-model", np.array([1.0, 0, 0]), k=5)
+            assert len(results) == 3
+
+            results = manager.search(tenant.id, "test-model", np.array([1.0, 0, 0]), k=5,
+                                     source_ids=[source_b.id])
+            assert [embedding_id for embedding_id, _, _ in results] == [embeddings_b[0].id]
+
+            # Deletions trigger a rebuild
+            embeddings_b[0].delete()
+            results = manager.search(tenant.id, "test-model", np.array([1.0, 0, 0]), k=5)
+            assert len(results) == 2
+
+    def test_find_similar_uses_index(self, index_app):
+        """Test Embedding.find_similar returns the same shape through the index."""
+        with index_app.app_context():
+            tenant = Tenant(name="Test", slug="test")
+            tenant.save()
+
+            _, embeddings = self._create_embeddings(
+                tenant, [[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0], [0, 0, 1]]
+            )
+
+            similar = Embedding.find_similar(
+                tenant_id=tenant.id,
+                query_vector=np.array([0.95, 0.05, 0.0]),
+                model_name="test-model",
+                limit=2,
+                min_similarity=0.8
+            )
+
+            assert len(similar) == 2
+            assert {embedding.id for embedding, _ in similar} == {embeddings[0].id, embeddings[1].id}
+            assert similar[0][1] >= similar[1][1] > 0.8
+
+    def test_incremental_changes_are_persisted_lazily(self, index_app, tmp_path):
+        """Test live updates are written within the persist interval only on flush."""
+        index_app.config['VECTOR_INDEX_PERSIST_INTERVAL'] = 3600
+        with index_app.app_context():
+            tenant = Tenant(name="Test", slug="test")
+            tenant.save()
+
+            self._create_embeddings(tenant, [[1, 0, 0]], "A")
+            manager = VectorIndexManager()
+            manager.get_index(tenant.id, "test-model")
+            path = str(tmp_path / f"tenant_{tenant.id}" / "test-model.npz")
+
+            _, embeddings = self._create_embeddings(tenant, [[0, 1, 0], [0, 0, 1]], "B")
+            manager.add_embeddings(tenant.id, "test-model", embeddings)
+            manager.remove_embeddings(tenant.id, "test-model", [embeddings[1].id])
+            assert len(VectorIndex.load(path)) == 1
+
+            manager.flush()
+            assert len(VectorIndex.load(path)) == 2
+
+    def test_batch_without_matching_dimension_is_skipped(self):
+        """Test a batch whose rows all have another dimension decodes to nothing."""
+        rows = [
+            SimpleNamespace(id=2, chunk_id=2, source_id=1, vector_data=encode_vector([1.0, 0])),
+            SimpleNamespace(id=3, chunk_id=3, source_id=1, vector_data=encode_vector([1.0, 0, 0, 0]))
+        ]
+
+        assert VectorIndexManager._decode_rows(rows, 3) == ([], None)
@@ -163,6 +163,72 @@ class TestWebWidgetAPI:
         assert message.sender_id == 'customer_123'
         assert message.get_metadata('source') == 'web_widget'
     
+    def test_stream_widget_reply(self, client, auth_headers, tenant):
+        """Test the AI reply is streamed as server-sent events and stored."""
+        from app.secretary.agents.base_agent import AgentResponse, AgentStreamEvent
+        
+        channel = Channel.create(
+            tenant_id=tenant.id,
+            name='Web Widget',
+            type='web_widget',
+            is_active=True
+        )
+        channel.save()
+        
+        thread = Thread.create(
+            tenant_id=tenant.id,
+            channel_id=channel.id,
+            customer_id='customer_123',
+            customer_name='John Doe',
+            status='open'
+        )
+        thread.save()
+        
+        message = InboxMessage.create_inbound(
+            tenant_id=tenant.id,
+            channel_id=channel.id,
+            thread_id=thread.id,
+            sender_id='customer_123',
+            content='What are your opening hours?'
+        )
+        
+        async def reply_stream(content, context):
+            yield AgentStreamEvent(delta='We are open ')
+            yield AgentStreamEvent(delta='9 to 5.')
+            yield AgentStreamEvent(done=True, response=AgentResponse(
+                content='We are open 9 to 5.', confidence=0.9, intent='operations'
+            ))
+        
+        orchestrator = MagicMock()
+        orchestrator.process_message_stream.side_effect = reply_stream
+        
+        with patch('app.channels.widget_api._get_orchestrator', return_value=orchestrator), \
+             patch('app.utils.websocket_manager.emit_with_fallback') as mock_emit:
+            response = client.get(
+                f'/api/v1/channels/widget/thread/{thread.id}/messages/{message.id}/reply/stream',
+                headers=auth_headers
+            )
+            body = response.get_data(as_text=True)
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        
+        events = [block.split('\n') for block in body.strip().split('\n\n')]
+        assert [lines[0] for lines in events] == ['event: delta', 'event: delta', 'event: done']
+        assert json.loads(events[0][1][len('data: '):])['delta'] == 'We are open '
+        
+        context = orchestrator.process_message_stream.call_args.args[1]
+        assert context.channel_type == 'web_widget'
+        assert context.conversation_id == str(thread.id)
+        
+        emitted = [call.args[0] for call in mock_emit.call_args_list]
+        assert emitted == ['ai_response_delta', 'ai_response_delta', 'ai_response_complete']
+        assert mock_emit.call_args.kwargs['room'] == f"thread_{thread.id}"
+        
+        reply = InboxMessage.query.filter_by(thread_id=thread.id, direction='outbound').first()
+        assert reply.content == 'We are open 9 to 5.'
+        assert reply.get_metadata('reply_to') == message.id
+    
     def test_send_widget_message_empty_content(self, client, auth_headers, tenant):
         """Test sending empty message fails."""
         # Create channel and thread